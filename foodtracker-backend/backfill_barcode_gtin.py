@@ -0,0 +1,162 @@
+import argparse
+import sys
+import time
+from typing import List, Optional, Tuple
+
+import mysql.connector
+from tqdm import tqdm
+
+from barcodes import gtin14
+from foodtracker_db import ConnectionFactory, load_db_config
+from import_metrics import ImportMetrics, add_metrics_arguments
+
+
+class BarcodeGtinBackfill:
+    """Fills food_barcode.gtin for rows written before the importers computed it."""
+
+    def __init__(
+        self,
+        env_file_path: Optional[str] = None,
+        batch_rows: int = 20000,
+        recompute_all: bool = False,
+        metrics: Optional[ImportMetrics] = None,
+    ):
+        self.batch_rows = max(batch_rows, 1)
+        self.recompute_all = recompute_all
+        self.metrics = metrics or ImportMetrics("backfill_barcode_gtin")
+        self.db_config = load_db_config(env_file_path)
+        self.connections = ConnectionFactory(self.db_config, pool_size=1)
+        self.scanned_rows = 0
+        self.updated_rows = 0
+        self.invalid_rows = 0
+
+    def _pending_count(self, cursor: mysql.connector.cursor.MySQLCursor) -> int:
+        where_sql = "" if self.recompute_all else " WHERE gtin IS NULL"
+        cursor.execute(f"SELECT COUNT(*) FROM food_barcode{where_sql}")
+        return int(cursor.fetchone()[0] or 0)
+
+    def _next_batch(self, cursor: mysql.connector.cursor.MySQLCursor, after_id: int) -> List[Tuple[int, str]]:
+        # Keyset pagination on the primary key; rows that stay NULL (not a GTIN) are never re-read.
+        where_sql = "" if self.recompute_all else " AND gtin IS NULL"
+        cursor.execute(
+            f"SELECT id, barcode FROM food_barcode WHERE id > %s{where_sql} ORDER BY id LIMIT %s",
+            (after_id, self.batch_rows),
+        )
+        return [(int(row_id), str(barcode)) for row_id, barcode in cursor.fetchall()]
+
+    def _apply_batch(
+        self,
+        cursor: mysql.connector.cursor.MySQLCursor,
+        rows: List[Tuple[int, Optional[str]]],
+    ) -> int:
+        cursor.execute("TRUNCATE TABLE tmp_barcode_gtin")
+        # executemany() rewrites this into a single multi-row INSERT.
+        cursor.executemany("INSERT INTO tmp_barcode_gtin (id, gtin) VALUES (%s, %s)", rows)
+        cursor.execute(
+            "UPDATE food_barcode b JOIN tmp_barcode_gtin t ON t.id = b.id "
+            "SET b.gtin = t.gtin WHERE NOT (b.gtin <=> t.gtin)"
+        )
+        return cursor.rowcount or 0
+
+    def backfill(self, dry_run: bool = False) -> None:
+        print(
+            "Target DB: "
+            f"{self.db_config['user']}@{self.db_config['host']}:{self.db_config['port']}/{self.db_config['database']}"
+        )
+        started_at = time.perf_counter()
+        conn = self.connections.connect()
+        cursor = conn.cursor()
+        try:
+            pending_count = self._pending_count(cursor)
+            print(f"Rows to scan: {pending_count}")
+            cursor.execute("DROP TEMPORARY TABLE IF EXISTS tmp_barcode_gtin")
+            cursor.execute(
+                "CREATE TEMPORARY TABLE tmp_barcode_gtin ("
+                "id INT NOT NULL PRIMARY KEY, "
+                "gtin CHAR(14) NULL"
+                ")"
+            )
+
+            progress = tqdm(
+                total=pending_count,
+                unit="rows",
+                desc="Barcodes scanned",
+                dynamic_ncols=True,
+                file=sys.stdout,
+            )
+            try:
+                after_id = 0
+                while True:
+                    with self.metrics.timer("batch_read"):
+                        batch = self._next_batch(cursor, after_id)
+                    if not batch:
+                        break
+                    after_id = batch[-1][0]
+
+                    with self.metrics.timer("normalize"):
+                        rows = [(row_id, gtin14(barcode)) for row_id, barcode in batch]
+                    self.scanned_rows += len(rows)
+                    self.invalid_rows += sum(1 for _, gtin in rows if gtin is None)
+
+                    if not dry_run:
+                        with self.metrics.timer("batch_update"):
+                            self.updated_rows += self._apply_batch(cursor, rows)
+                        # Commit each batch so row locks are released quickly.
+                        self.metrics.commit(conn)
+                    progress.update(len(rows))
+            finally:
+                progress.close()
+
+            cursor.execute("DROP TEMPORARY TABLE IF EXISTS tmp_barcode_gtin")
+        finally:
+            cursor.close()
+            conn.close()
+
+        self.metrics.count("rows_scanned", self.scanned_rows)
+        self.metrics.count("rows_updated", self.updated_rows)
+        self.metrics.count("rows_not_gtin", self.invalid_rows)
+
+        elapsed_s = max(time.perf_counter() - started_at, 0.0001)
+        print(f"Rows scanned: {self.scanned_rows}")
+        print(f"Rows updated: {self.updated_rows}{' (dry run)' if dry_run else ''}")
+        print(f"Not a valid GTIN (left NULL): {self.invalid_rows}")
+        print(f"Elapsed: {elapsed_s:.2f}s")
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(
+        description="Fill food_barcode.gtin with the canonical GTIN-14 of each stored barcode."
+    )
+    parser.add_argument(
+        "--env-file",
+        default=None,
+        help="Optional path to .env file with DB_HOST/DB_PORT/DB_USER/DB_PASSWORD/DB_NAME.",
+    )
+    parser.add_argument("--batch-rows", type=int, default=20000, help="Barcodes read and updated per transaction.")
+    parser.add_argument(
+        "--all",
+        action="store_true",
+        help="Recompute every row, not only rows whose gtin is still NULL.",
+    )
+    parser.add_argument(
+        "--dry-run",
+        action="store_true",
+        help="Only report how many barcodes would get a GTIN.",
+    )
+    add_metrics_arguments(parser)
+    args = parser.parse_args()
+    metrics = ImportMetrics.from_args("backfill_barcode_gtin", args)
+
+    backfill = BarcodeGtinBackfill(
+        env_file_path=args.env_file,
+        batch_rows=args.batch_rows,
+        recompute_all=args.all,
+        metrics=metrics,
+    )
+    with metrics.session(), metrics.stage("backfill"):
+        backfill.backfill(dry_run=args.dry_run)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
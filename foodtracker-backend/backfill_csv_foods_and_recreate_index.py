@@ -1,15 +1,18 @@
 import argparse
-import os
+import json
 import sys
 import time
+import urllib.parse
 import urllib.request
-from pathlib import Path
-from typing import Dict, List, Optional
+from typing import Dict, List, Optional, Tuple
 
 import mysql.connector
 import pandas as pd
 from tqdm import tqdm
 
+from foodtracker_db import ConnectionFactory, load_db_config
+from import_metrics import ImportMetrics, add_metrics_arguments
+
 
 class CsvFoodBackfill:
     def __init__(
@@ -17,160 +20,207 @@ class CsvFoodBackfill:
         csv_file_path: str,
         env_file_path: Optional[str] = None,
         api_url: Optional[str] = None,
-        update_batch_size: int = 1000,
+        update_batch_size: int = 10000,
+        metrics: Optional[ImportMetrics] = None,
     ):
         self.csv_file_path = csv_file_path
         self.env_file_path = env_file_path
         self.api_url = api_url
         self.update_batch_size = update_batch_size
-        self.db_config = self._load_db_config(env_file_path)
+        self.metrics = metrics or ImportMetrics("backfill_csv_foods_and_recreate_index")
+        self.db_config = load_db_config(env_file_path)
+        self.connections = ConnectionFactory(self.db_config, pool_size=1)
         self.updated_rows = 0
         self.scanned_rows = 0
 
-    def _load_db_config(self, env_file_path: Optional[str]) -> Dict:
-        if env_file_path:
-            env_path = Path(env_file_path)
-        else:
-            env_path = Path(__file__).with_name(".env")
-
-        if env_path.exists():
-            self._load_env_file(env_path)
-
-        host = os.getenv("DB_HOST")
-        port = os.getenv("DB_PORT", "3306")
-        user = os.getenv("DB_USER")
-        password = os.getenv("DB_PASSWORD")
-        database = os.getenv("DB_NAME")
-
-        missing = [
-            key
-            for key, value in {
-                "DB_HOST": host,
-                "DB_USER": user,
-                "DB_PASSWORD": password,
-                "DB_NAME": database,
-            }.items()
-            if not value
-        ]
-
-        if missing:
-            raise ValueError(
-                f"Missing required DB settings: {', '.join(missing)}. "
-                f"Set them in environment or {env_path}."
-            )
-
-        try:
-            parsed_port = int(port)
-        except ValueError as exc:
-            raise ValueError(f"Invalid DB_PORT value: {port}") from exc
-
-        return {
-            "host": host,
-            "port": parsed_port,
-            "user": user,
-            "password": password,
-            "database": database,
-            "autocommit": False,
-        }
-
-    def _load_env_file(self, env_path: Path) -> None:
-        for line in env_path.read_text(encoding="utf-8").splitlines():
-            stripped = line.strip()
-            if not stripped or stripped.startswith("#") or "=" not in stripped:
-                continue
-            key, raw_value = stripped.split("=", 1)
-            key = key.strip()
-            value = raw_value.strip()
-            if value.startswith(("'", '"')) and value.endswith(("'", '"')) and len(value) >= 2:
-                value = value[1:-1]
-            os.environ.setdefault(key, value)
-
     def _clean_string(self, value) -> Optional[str]:
         if pd.isna(value) or value in ("", "N/A", "NULL", "null", "None"):
             return None
         return str(value).strip()
 
-    def _update_is_csv_food(
+    def _read_source_ids(self) -> List[str]:
+        header = pd.read_csv(self.csv_file_path, skiprows=[0, 1, 2], nrows=0)
+        if "ID" not in header.columns:
+            raise RuntimeError(
+                "CSV header missing expected 'ID' column. "
+                f"Found columns: {', '.join(str(col) for col in header.columns)}"
+            )
+
+        progress = tqdm(
+            total=None,
+            unit="rows",
+            desc="Rows scanned",
+            leave=True,
+            dynamic_ncols=True,
+            file=sys.stdout,
+            disable=False,
+        )
+
+        # Only the ID column is parsed; every other column is skipped by the reader.
+        source_ids: Dict[str, None] = {}
+        try:
+            for chunk in self.metrics.timed_iter(
+                "parse",
+                pd.read_csv(
+                    self.csv_file_path,
+                    skiprows=[0, 1, 2],
+                    usecols=["ID"],
+                    dtype=str,
+                    chunksize=50000,
+                ),
+            ):
+                for raw_value in chunk["ID"].tolist():
+                    cleaned = self._clean_string(raw_value)
+                    if cleaned:
+                        source_ids[cleaned] = None
+                self.scanned_rows += len(chunk)
+                progress.update(len(chunk))
+        finally:
+            progress.close()
+
+        return list(source_ids)
+
+    def _stage_source_ids(
         self,
         cursor: mysql.connector.cursor.MySQLCursor,
         source_ids: List[str],
+    ) -> None:
+        cursor.execute("DROP TEMPORARY TABLE IF EXISTS tmp_csv_source_ids")
+        cursor.execute(
+            "CREATE TEMPORARY TABLE tmp_csv_source_ids ("
+            "sourceId VARCHAR(255) NOT NULL PRIMARY KEY"
+            ")"
+        )
+        if source_ids:
+            # executemany() rewrites this into a single multi-row INSERT.
+            cursor.executemany(
+                "INSERT IGNORE INTO tmp_csv_source_ids (sourceId) VALUES (%s)",
+                [(source_id,) for source_id in source_ids],
+            )
+
+    def _pending_id_range(
+        self,
+        cursor: mysql.connector.cursor.MySQLCursor,
+    ) -> Tuple[int, Optional[int], Optional[int]]:
+        cursor.execute(
+            "SELECT COUNT(*), MIN(f.id), MAX(f.id) FROM food f "
+            "JOIN tmp_csv_source_ids t ON t.sourceId = f.sourceId "
+            "WHERE f.isCsvFood = 0"
+        )
+        count, min_id, max_id = cursor.fetchone()
+        return int(count or 0), min_id, max_id
+
+    def _update_is_csv_food(
+        self,
+        cursor: mysql.connector.cursor.MySQLCursor,
+        start_id: int,
+        end_id: int,
     ) -> int:
-        if not source_ids:
-            return 0
-        placeholders = ", ".join(["%s"] * len(source_ids))
-        sql = f"UPDATE food SET isCsvFood = 1 WHERE sourceId IN ({placeholders})"
-        cursor.execute(sql, source_ids)
+        cursor.execute(
+            "UPDATE food f JOIN tmp_csv_source_ids t ON t.sourceId = f.sourceId "
+            "SET f.isCsvFood = 1 "
+            "WHERE f.id BETWEEN %s AND %s AND f.isCsvFood = 0",
+            (start_id, end_id),
+        )
         return cursor.rowcount or 0
 
-    def backfill(self) -> None:
+    def backfill(self, dry_run: bool = False) -> None:
         print(f"Starting CSV backfill from {self.csv_file_path}")
         print(
             "Target DB: "
             f"{self.db_config['user']}@{self.db_config['host']}:{self.db_config['port']}/{self.db_config['database']}"
         )
 
-        conn = mysql.connector.connect(**self.db_config)
-        cursor = conn.cursor()
         started_at = time.perf_counter()
+        with self.metrics.stage("read-source-ids"):
+            source_ids = self._read_source_ids()
+        print(f"Unique source IDs: {len(source_ids)}")
 
-        progress = tqdm(
-            total=None,
-            unit="rows",
-            desc="Rows scanned",
-            leave=True,
-            dynamic_ncols=True,
-            file=sys.stdout,
-            disable=False,
-        )
+        conn = self.connections.connect()
+        cursor = conn.cursor()
 
         try:
-            for chunk in pd.read_csv(
-                self.csv_file_path,
-                skiprows=[0, 1, 2],
-                chunksize=5000,
-                low_memory=False,
-            ):
-                if "ID" not in chunk.columns:
-                    raise RuntimeError(
-                        "CSV header missing expected 'ID' column. "
-                        f"Found columns: {', '.join(str(col) for col in chunk.columns)}"
-                    )
-
-                ids = [
-                    cleaned
-                    for raw_value in chunk["ID"].tolist()
-                    if (cleaned := self._clean_string(raw_value))
-                ]
-                self.scanned_rows += len(chunk)
-                progress.update(len(chunk))
+            with self.metrics.stage("stage-source-ids"):
+                self._stage_source_ids(cursor, source_ids)
+                self.metrics.commit(conn)
 
-                if not ids:
-                    continue
+            pending_count, min_id, max_id = self._pending_id_range(cursor)
+            print(f"Rows to update: {pending_count}")
 
-                unique_ids = list(dict.fromkeys(ids))
-                for i in range(0, len(unique_ids), self.update_batch_size):
-                    batch = unique_ids[i : i + self.update_batch_size]
-                    self.updated_rows += self._update_is_csv_food(cursor, batch)
-                conn.commit()
+            if dry_run:
+                print("Dry run: no rows updated.")
+            elif pending_count and min_id is not None and max_id is not None:
+                range_size = max(self.update_batch_size, 1)
+                progress = tqdm(
+                    total=pending_count,
+                    unit="rows",
+                    desc="Rows updated",
+                    leave=True,
+                    dynamic_ncols=True,
+                    file=sys.stdout,
+                    disable=False,
+                )
+                try:
+                    for start_id in range(int(min_id), int(max_id) + 1, range_size):
+                        end_id = start_id + range_size - 1
+                        with self.metrics.timer("range_update"):
+                            updated = self._update_is_csv_food(cursor, start_id, end_id)
+                        # Commit each id range so row locks are released quickly.
+                        self.metrics.commit(conn)
+                        self.updated_rows += updated
+                        progress.update(updated)
+                finally:
+                    progress.close()
+
+            cursor.execute("DROP TEMPORARY TABLE IF EXISTS tmp_csv_source_ids")
         finally:
             cursor.close()
             conn.close()
-            progress.close()
+
+        self.metrics.count("rows_scanned", self.scanned_rows)
+        self.metrics.count("rows_updated", self.updated_rows)
 
         elapsed_s = max(time.perf_counter() - started_at, 0.0001)
         print(f"Rows scanned: {self.scanned_rows}")
         print(f"Rows updated: {self.updated_rows}")
         print(f"Elapsed: {elapsed_s:.2f}s")
 
-    def recreate_index(self) -> None:
+    def recreate_index(self, poll_interval_s: float = 2.0) -> None:
         if not self.api_url:
             return
         print(f"Calling recreate index endpoint: {self.api_url}")
         request = urllib.request.Request(self.api_url, method="POST")
         with urllib.request.urlopen(request, timeout=30) as response:
             status = response.status
-            body = response.read().decode("utf-8").strip()
-        print(f"Recreate index response: {status} {body}")
+            job = json.loads(response.read().decode("utf-8"))
+        print(f"Recreate index job started: {status} {job.get('jobId')}")
+
+        job_url = urllib.parse.urljoin(self.api_url, f"reindex-jobs/{job['jobId']}")
+        progress = tqdm(
+            total=job.get("totalCount") or None,
+            unit="foods",
+            desc="Foods indexed",
+            leave=True,
+            dynamic_ncols=True,
+            file=sys.stdout,
+            disable=False,
+        )
+        try:
+            while job.get("status") == "running":
+                time.sleep(poll_interval_s)
+                with urllib.request.urlopen(job_url, timeout=30) as response:
+                    job = json.loads(response.read().decode("utf-8"))
+                progress.update(int(job.get("indexedCount", 0)) - progress.n)
+                progress.set_postfix(
+                    rate=f"{job.get('ratePerSecond', 0)}/s",
+                    eta="?" if job.get("etaSeconds") is None else f"{job['etaSeconds']}s",
+                )
+        finally:
+            progress.close()
+
+        if job.get("status") != "completed":
+            raise RuntimeError(f"Recreate index job failed: {job.get('error')}")
+        print(f"Recreate index complete. Foods indexed: {job.get('indexedCount', 0)}")
 
 
 if __name__ == "__main__":
@@ -200,17 +250,29 @@ if __name__ == "__main__":
     parser.add_argument(
         "--update-batch-size",
         type=int,
-        default=1000,
-        help="How many source IDs to update per statement.",
+        default=10000,
+        help="Width of the food.id range updated (and committed) per statement.",
+    )
+    parser.add_argument(
+        "--dry-run",
+        action="store_true",
+        help="Only report how many rows would be updated.",
     )
+    add_metrics_arguments(parser)
 
     args = parser.parse_args()
+    metrics = ImportMetrics.from_args("backfill_csv_foods_and_recreate_index", args)
 
     backfill = CsvFoodBackfill(
         args.csv_file,
         env_file_path=args.env_file,
         api_url=None if args.skip_recreate_index else args.recreate_index_url,
         update_batch_size=args.update_batch_size,
+        metrics=metrics,
     )
-    backfill.backfill()
-    backfill.recreate_index()
+    with metrics.session():
+        with metrics.stage("backfill"):
+            backfill.backfill(dry_run=args.dry_run)
+        if not args.dry_run:
+            with metrics.stage("recreate-index"):
+                backfill.recreate_index()
@@ -0,0 +1,173 @@
+import argparse
+import re
+from collections import Counter
+from pathlib import Path
+from typing import Any, List, Optional, TextIO, Tuple
+
+import numpy as np
+import pandas as pd
+
+# GTIN-8 (EAN-8), GTIN-12 (UPC-A), GTIN-13 (EAN-13) and GTIN-14; all become GTIN-14 by left-padding zeros.
+GTIN_LENGTHS = (8, 12, 13, 14)
+# Separators people and sources put into printed codes.
+_SEPARATORS_RE = re.compile(r"[\s.\-]")
+
+# GS1 prefixes (first three digits of the GTIN-13 form) of UPC coupons (050-059) and refund receipts and
+# coupons (980-999); they never name a food. ISSN/ISBN (977-979) stay valid.
+COUPON_PREFIX_RANGES = ((50, 59), (980, 999))
+# Restricted circulation prefixes: in-store and company-internal numbers (020-029, 040-049, 200-299), which
+# retailers also print on their private-label products, plus GTIN-8 numbers starting with 0 or 2.
+IN_STORE_PREFIX_RANGES = ((20, 29), (40, 49), (200, 299))
+IN_STORE_GTIN8_LEADS = ("0", "2")
+
+# Reasons filter_barcodes() rejects a code for, in the order they are checked.
+REJECT_REASONS = (
+    "missing", "not-digits", "length", "all-zeros", "check-digit", "coupon-prefix", "in-store-prefix",
+)
+# GS1 mod-10 weights of the 13 payload digits of a GTIN-14, left to right.
+_CHECK_WEIGHTS = np.array([3, 1] * 6 + [3], dtype=np.int64)
+
+
+def gs1_check_digit(payload: str) -> int:
+    """GS1 mod-10 check digit of ``payload`` (the digits before the check digit)."""
+    total = sum(int(digit) * (3 if position % 2 == 0 else 1) for position, digit in enumerate(reversed(payload)))
+    return (10 - total % 10) % 10
+
+
+def gtin14(code: Optional[str]) -> Optional[str]:
+    """Canonical GTIN-14 of a scanned or imported barcode, or None if it is not a valid GTIN.
+
+    UPC-A ``036000291452`` and EAN-13 ``0036000291452`` both become ``00036000291452``, so one key
+    matches every way a source spells the same product.
+    """
+    digits = _SEPARATORS_RE.sub("", code or "")
+    # isascii(): str.isdigit() also accepts fullwidth and other Unicode digits, which toGtin14 rejects.
+    if not (digits.isascii() and digits.isdigit()) or len(digits) not in GTIN_LENGTHS or not digits.strip("0"):
+        return None
+    if gs1_check_digit(digits[:-1]) != int(digits[-1]):
+        return None
+    return digits.zfill(14)
+
+
+def _prefix_in(prefixes: np.ndarray, ranges: Tuple[Tuple[int, int], ...]) -> np.ndarray:
+    matched = np.zeros(len(prefixes), dtype=bool)
+    for low, high in ranges:
+        matched |= (prefixes >= low) & (prefixes <= high)
+    return matched
+
+
+def filter_barcodes(codes: pd.Series, reject_in_store: bool = False) -> Tuple[pd.Series, pd.Series]:
+    """Vectorized gtin14() over a column of codes, plus a GS1 prefix check.
+
+    Returns ``(gtins, reasons)`` aligned with ``codes``: the GTIN-14 of each accepted code (missing when
+    rejected) and the ``REJECT_REASONS`` entry of each rejected code (missing when accepted).
+    Coupon prefixes are always rejected; in-store prefixes only with ``reject_in_store``.
+    """
+    digits = codes.fillna("").astype(str).str.replace(_SEPARATORS_RE.pattern, "", regex=True)
+    lengths = digits.str.len().to_numpy()
+    reasons = np.full(len(digits), None, dtype=object)
+
+    missing = lengths == 0
+    reasons[missing] = "missing"
+    # [0-9], not \d: \d also matches Unicode digits, which would then fail the ASCII encode below.
+    not_digits = ~missing & ~digits.str.fullmatch(r"[0-9]+").fillna(False).to_numpy(dtype=bool)
+    reasons[not_digits] = "not-digits"
+    bad_length = ~missing & ~not_digits & ~np.isin(lengths, GTIN_LENGTHS)
+    reasons[bad_length] = "length"
+    all_zeros = ~missing & ~not_digits & ~bad_length & digits.str.fullmatch(r"0+").to_numpy(dtype=bool)
+    reasons[all_zeros] = "all-zeros"
+
+    candidates = np.flatnonzero(~(missing | not_digits | bad_length | all_zeros))
+    padded = digits.iloc[candidates].str.zfill(14)
+    matrix = (
+        np.frombuffer("".join(padded).encode("ascii"), dtype=np.uint8).reshape(-1, 14).astype(np.int64) - 48
+    )
+    check_ok = (10 - matrix[:, :13] @ _CHECK_WEIGHTS % 10) % 10 == matrix[:, 13]
+    reasons[candidates[~check_ok]] = "check-digit"
+
+    prefixes = matrix[:, 1] * 100 + matrix[:, 2] * 10 + matrix[:, 3]
+    coupon = check_ok & _prefix_in(prefixes, COUPON_PREFIX_RANGES)
+    reasons[candidates[coupon]] = "coupon-prefix"
+    if reject_in_store:
+        in_store = _prefix_in(prefixes, IN_STORE_PREFIX_RANGES)
+        gtin8 = lengths[candidates] == 8
+        in_store |= gtin8 & np.isin(matrix[:, 6], [int(lead) for lead in IN_STORE_GTIN8_LEADS])
+        reasons[candidates[check_ok & ~coupon & in_store]] = "in-store-prefix"
+
+    gtins = np.full(len(digits), None, dtype=object)
+    gtins[candidates] = padded.to_numpy(dtype=object)
+    gtins[pd.notna(reasons)] = None
+    return pd.Series(gtins, index=codes.index), pd.Series(reasons, index=codes.index)
+
+
+class BarcodeRejectLog:
+    """Drops rows with unusable barcodes from import chunks and logs them to a TSV file.
+
+    Like the dead-letter file, the rejects file is only created once the first code is rejected.
+    Each line holds the raw code and the reason; per-reason counts are kept for the summary.
+    """
+
+    def __init__(self, source: str, path: Optional[str] = None, reject_in_store: bool = False) -> None:
+        self.source = source
+        self.path = Path(path) if path else Path(f"{source}.barcode_rejects.tsv")
+        self.reject_in_store = reject_in_store
+        self.counts: Counter = Counter()
+        self._handle: Optional[TextIO] = None
+
+    @classmethod
+    def from_args(cls, source: str, args: argparse.Namespace) -> "BarcodeRejectLog":
+        return cls(source, args.barcode_rejects_file, reject_in_store=args.reject_in_store_barcodes)
+
+    @property
+    def count(self) -> int:
+        return sum(self.counts.values())
+
+    def filter(self, chunk: pd.DataFrame, column: str = "code") -> pd.DataFrame:
+        """Rows of ``chunk`` whose ``column`` is a usable GTIN; the others are logged."""
+        _gtins, reasons = filter_barcodes(chunk[column], reject_in_store=self.reject_in_store)
+        rejected = reasons.notna().to_numpy()
+        if not rejected.any():
+            return chunk
+
+        rejects = pd.DataFrame({"code": chunk[column][rejected], "reason": reasons[rejected]})
+        self.counts.update(rejects["reason"].value_counts().to_dict())
+        if self._handle is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            write_header = not self.path.exists() or self.path.stat().st_size == 0
+            self._handle = self.path.open("a", encoding="utf-8", newline="")
+            if write_header:
+                self._handle.write("code\treason\n")
+        rejects.to_csv(self._handle, sep="\t", header=False, index=False)
+        return chunk[~rejected]
+
+    def summary(self) -> str:
+        if not self.counts:
+            return "none"
+        return f"{self.count} rows in {self.path}"
+
+    def reason_summary(self) -> List[str]:
+        return [f"{self.counts[reason]:>8}  {reason}" for reason in REJECT_REASONS if self.counts[reason]]
+
+    def close(self) -> None:
+        if self._handle is not None:
+            self._handle.close()
+            self._handle = None
+
+    def __enter__(self) -> "BarcodeRejectLog":
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.close()
+
+
+def add_barcode_filter_arguments(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument(
+        "--barcode-rejects-file",
+        default=None,
+        help="TSV file for OpenFoodFacts codes rejected before import (default: <script>.barcode_rejects.tsv).",
+    )
+    parser.add_argument(
+        "--reject-in-store-barcodes",
+        action="store_true",
+        help="Also reject in-store and company-internal GS1 prefixes (retailer private labels use them too).",
+    )
@@ -0,0 +1,99 @@
+import argparse
+import statistics
+from collections import deque
+from typing import Deque, Optional
+
+
+class AdaptiveBatchSizer:
+    """Steers the rows-per-transaction count toward a target commit latency.
+
+    Each finished batch updates a smoothed seconds-per-row estimate; the next size is the number
+    of rows that estimate says fits in ``target_latency_s``. A single step can at most double or
+    halve the size, so one lock wait does not collapse the batch and one lucky batch does not
+    blow it up. With ``target_latency_s <= 0`` the size stays fixed.
+    """
+
+    MAX_STEP_FACTOR = 2.0
+
+    def __init__(
+        self,
+        initial_size: int,
+        target_latency_s: float = 0.2,
+        min_size: int = 10,
+        max_size: int = 5000,
+        smoothing: float = 0.3,
+        window: int = 20,
+    ) -> None:
+        self.target_latency_s = target_latency_s
+        self.enabled = target_latency_s > 0
+        self.min_size = max(min_size, 1)
+        self.max_size = max(max_size, self.min_size)
+        self.smoothing = min(max(smoothing, 0.01), 1.0)
+        self.size = self._clamp(initial_size) if self.enabled else max(initial_size, 1)
+        self.batches = 0
+        self.row_latency_s: Optional[float] = None
+        self.recent_sizes: Deque[int] = deque(maxlen=max(window, 1))
+
+    @classmethod
+    def from_args(cls, args: argparse.Namespace) -> "AdaptiveBatchSizer":
+        return cls(
+            args.batch_size,
+            target_latency_s=max(args.target_commit_latency_ms, 0) / 1000.0,
+            min_size=args.min_batch_size,
+            max_size=args.max_batch_size,
+        )
+
+    def _clamp(self, size: float) -> int:
+        return int(min(max(round(size), self.min_size), self.max_size))
+
+    def observe(self, rows: int, latency_s: float) -> int:
+        """Record one committed batch and return the size to use for the next one."""
+        if rows <= 0:
+            return self.size
+        self.batches += 1
+        if not self.enabled:
+            return self.size
+
+        per_row_s = max(latency_s, 0.0) / rows
+        if self.row_latency_s is None:
+            self.row_latency_s = per_row_s
+        else:
+            self.row_latency_s += self.smoothing * (per_row_s - self.row_latency_s)
+
+        ideal = self.target_latency_s / max(self.row_latency_s, 1e-9)
+        stepped = min(max(ideal, self.size / self.MAX_STEP_FACTOR), self.size * self.MAX_STEP_FACTOR)
+        self.size = self._clamp(stepped)
+        self.recent_sizes.append(self.size)
+        return self.size
+
+    @property
+    def converged_size(self) -> int:
+        if not self.recent_sizes:
+            return self.size
+        return int(statistics.median(self.recent_sizes))
+
+    def describe(self) -> str:
+        if not self.enabled:
+            return f"fixed at {self.size}"
+        return (
+            f"converged to {self.converged_size} "
+            f"(target {self.target_latency_s * 1000:.0f} ms, bounds {self.min_size}-{self.max_size}, "
+            f"{self.batches} batches)"
+        )
+
+
+def add_batch_size_arguments(parser: argparse.ArgumentParser, default_batch_size: int) -> None:
+    parser.add_argument(
+        "--batch-size",
+        type=int,
+        default=default_batch_size,
+        help="Rows per DB transaction (the starting size when adaptive sizing is on).",
+    )
+    parser.add_argument(
+        "--target-commit-latency-ms",
+        type=float,
+        default=200.0,
+        help="Grow or shrink the batch size toward this transaction latency; 0 keeps --batch-size fixed.",
+    )
+    parser.add_argument("--min-batch-size", type=int, default=10, help="Lower bound for adaptive batch sizing.")
+    parser.add_argument("--max-batch-size", type=int, default=5000, help="Upper bound for adaptive batch sizing.")
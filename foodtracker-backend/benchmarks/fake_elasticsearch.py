@@ -0,0 +1,103 @@
+import gzip
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Tuple
+
+
+class FakeElasticsearchState:
+    def __init__(self) -> None:
+        self.lock = threading.Lock()
+        self.indices: Dict[str, int] = {}
+        self.bulk_requests = 0
+        self.bulk_bytes = 0
+        self.documents = 0
+
+    def snapshot(self) -> Dict[str, int]:
+        with self.lock:
+            return {
+                "bulk_requests": self.bulk_requests,
+                "bulk_bytes": self.bulk_bytes,
+                "documents": self.documents,
+            }
+
+
+class FakeElasticsearchHandler(BaseHTTPRequestHandler):
+    """Accepts the index, bulk and settings calls the importers make and counts documents."""
+
+    state: FakeElasticsearchState
+
+    def log_message(self, format, *args) -> None:  # noqa: A002 - BaseHTTPRequestHandler signature
+        return
+
+    def _read_body(self) -> bytes:
+        length = int(self.headers.get("Content-Length") or 0)
+        body = self.rfile.read(length) if length else b""
+        if self.headers.get("Content-Encoding") == "gzip":
+            body = gzip.decompress(body)
+        return body
+
+    def _send_json(self, status: int, payload) -> None:
+        encoded = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(encoded)))
+        self.end_headers()
+        self.wfile.write(encoded)
+
+    def _index_name(self) -> str:
+        return self.path.split("?", 1)[0].strip("/").split("/", 1)[0]
+
+    def do_GET(self) -> None:
+        if self.path.startswith("/_cat/indices"):
+            with self.state.lock:
+                self._send_json(200, [{"index": name} for name in self.state.indices])
+            return
+        self._send_json(200, {"acknowledged": True})
+
+    def do_HEAD(self) -> None:
+        with self.state.lock:
+            exists = self._index_name() in self.state.indices
+        self.send_response(200 if exists else 404)
+        self.end_headers()
+
+    def do_PUT(self) -> None:
+        self._read_body()
+        name = self._index_name()
+        if "/_settings" not in self.path:
+            with self.state.lock:
+                self.state.indices.setdefault(name, 0)
+        self._send_json(200, {"acknowledged": True, "index": name})
+
+    def do_DELETE(self) -> None:
+        name = self._index_name()
+        with self.state.lock:
+            existed = self.state.indices.pop(name, None) is not None
+        self._send_json(200 if existed else 404, {"acknowledged": existed})
+
+    def do_POST(self) -> None:
+        body = self._read_body()
+        if "_bulk" not in self.path:
+            self._send_json(200, {"acknowledged": True})
+            return
+
+        lines = [line for line in body.split(b"\n") if line]
+        items = []
+        for action_line in lines[0::2]:
+            action, meta = next(iter(json.loads(action_line).items()))
+            items.append({action: {"_index": meta.get("_index"), "_id": meta.get("_id"), "status": 200}})
+
+        with self.state.lock:
+            self.state.bulk_requests += 1
+            self.state.bulk_bytes += len(body)
+            self.state.documents += len(items)
+        self._send_json(200, {"took": 0, "errors": False, "items": items})
+
+
+def start_fake_elasticsearch(host: str = "127.0.0.1", port: int = 0) -> Tuple[ThreadingHTTPServer, FakeElasticsearchState]:
+    state = FakeElasticsearchState()
+    handler = type("BoundFakeElasticsearchHandler", (FakeElasticsearchHandler,), {"state": state})
+    server = ThreadingHTTPServer((host, port), handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server, state
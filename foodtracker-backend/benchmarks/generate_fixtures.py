@@ -0,0 +1,324 @@
+import argparse
+import csv
+import random
+import re
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+FDC_NUTRIENTS: List[Tuple[int, str, str]] = [
+    (1008, "Energy", "KCAL"),
+    (1062, "Energy", "kJ"),
+    (2047, "Energy (Atwater General Factors)", "KCAL"),
+    (1003, "Protein", "G"),
+    (1004, "Total lipid (fat)", "G"),
+    (1005, "Carbohydrate, by difference", "G"),
+    (1079, "Fiber, total dietary", "G"),
+    (2000, "Total Sugars", "G"),
+    (1235, "Sugars, added", "G"),
+    (1093, "Sodium, Na", "MG"),
+    (1258, "Fatty acids, total saturated", "G"),
+    (1257, "Fatty acids, total trans", "G"),
+    (1253, "Cholesterol", "MG"),
+    (1051, "Water", "G"),
+    (1292, "Fatty acids, total monounsaturated", "G"),
+    (1293, "Fatty acids, total polyunsaturated", "G"),
+    (1087, "Calcium, Ca", "MG"),
+    (1089, "Iron, Fe", "MG"),
+    (1092, "Potassium, K", "MG"),
+    (1090, "Magnesium, Mg", "MG"),
+    (1104, "Vitamin A, IU", "IU"),
+    (1106, "Vitamin A, RAE", "UG"),
+    (1162, "Vitamin C, total ascorbic acid", "MG"),
+    (1178, "Vitamin B-12", "UG"),
+    (1114, "Vitamin D (D2 + D3)", "UG"),
+    (1109, "Vitamin E (alpha-tocopherol)", "MG"),
+    (1091, "Phosphorus, P", "MG"),
+    (1095, "Zinc, Zn", "MG"),
+    (1098, "Copper, Cu", "MG"),
+    (1101, "Manganese, Mn", "MG"),
+    (1103, "Selenium, Se", "UG"),
+    (1165, "Thiamin", "MG"),
+    (1166, "Riboflavin", "MG"),
+    (1167, "Niacin", "MG"),
+    (1170, "Pantothenic acid", "MG"),
+    (1175, "Vitamin B-6", "MG"),
+    (1190, "Folate, DFE", "UG"),
+    (1177, "Folate, total", "UG"),
+    (1180, "Choline, total", "MG"),
+    (1185, "Vitamin K (phylloquinone)", "UG"),
+]
+
+MEASURE_UNITS: List[Tuple[int, str]] = [
+    (1000, "cup"),
+    (1001, "tablespoon"),
+    (1002, "teaspoon"),
+    (1043, "piece"),
+    (1050, "slice"),
+    (1068, "serving"),
+    (9999, "undetermined"),
+]
+
+FOOD_WORDS = [
+    "apple", "banana", "chicken", "breast", "rice", "brown", "white", "oat", "milk", "yogurt",
+    "greek", "cheddar", "cheese", "bread", "whole", "wheat", "pasta", "tomato", "sauce", "bean",
+    "black", "kidney", "almond", "butter", "peanut", "salmon", "tuna", "egg", "spinach", "kale",
+    "potato", "sweet", "corn", "chip", "cookie", "chocolate", "vanilla", "granola", "bar", "soup",
+]
+BRANDS = [
+    "Acme Foods", "Green Valley", "Sunrise Farms", "Blue Harbor", "Golden Mill", "Happy Cow",
+    "Trail Mix Co", "Urban Pantry", "Northfield", "Riverbend",
+]
+OFF_NUTRIENT_COLUMNS = [
+    "energy-kcal_100g", "energy-kj_100g", "fat_100g", "saturated-fat_100g", "trans-fat_100g",
+    "cholesterol_100g", "carbohydrates_100g", "sugars_100g", "added-sugars_100g", "fiber_100g",
+    "proteins_100g", "salt_100g", "sodium_100g", "calcium_100g", "iron_100g", "potassium_100g",
+    "magnesium_100g", "vitamin-a_100g", "vitamin-c_100g", "vitamin-d_100g", "vitamin-b12_100g",
+]
+MYFOODDATA_NUTRIENT_COLUMNS = [
+    "Calories", "Fat (g)", "Protein (g)", "Carbohydrate (g)", "Sugars (g)", "Fiber (g)",
+    "Cholesterol (mg)", "Saturated Fats (g)", "Calcium (mg)", "Iron, Fe (mg)", "Potassium, K (mg)",
+    "Magnesium (mg)", "Vitamin A, RAE (mcg)", "Vitamin C (mg)", "Vitamin B-12 (mcg)", "Vitamin D (mcg)",
+    "Sodium (mg)", "Water (g)", "Net-Carbs (g)", "PRAL score",
+]
+
+
+class FixtureGenerator:
+    def __init__(self, output_dir: Path, foods: int, openfoodfacts: int, myfooddata: int, seed: int = 42):
+        self.output_dir = output_dir
+        self.foods = foods
+        self.openfoodfacts = openfoodfacts
+        self.myfooddata = myfooddata
+        self.random = random.Random(seed)
+        self.fdc_dir = output_dir / "fdc"
+        self.row_counts: Dict[str, int] = {}
+
+    def _food_name(self) -> str:
+        return " ".join(self.random.sample(FOOD_WORDS, self.random.randint(2, 5)))
+
+    def _upc(self) -> str:
+        digits = [self.random.randint(0, 9) for _ in range(11)]
+        total = sum(digit * (3 if index % 2 == 0 else 1) for index, digit in enumerate(digits))
+        digits.append((10 - total % 10) % 10)
+        return "".join(str(digit) for digit in digits)
+
+    def _macros(self) -> Tuple[float, float, float]:
+        protein = round(self.random.uniform(0, 35), 2)
+        carbs = round(self.random.uniform(0, 80), 2)
+        fat = round(self.random.uniform(0, 40), 2)
+        return protein, carbs, fat
+
+    def _write(self, path: Path, header: List[str], rows, delimiter: str = ",") -> None:
+        count = 0
+        with path.open("w", newline="", encoding="utf-8") as handle:
+            writer = csv.writer(handle, delimiter=delimiter)
+            writer.writerow(header)
+            for row in rows:
+                writer.writerow(row)
+                count += 1
+        self.row_counts[path.name] = count
+
+    def generate_fdc(self) -> None:
+        self.fdc_dir.mkdir(parents=True, exist_ok=True)
+        first_fdc_id = 100000
+        branded_ids = set(
+            fdc_id for fdc_id in range(first_fdc_id, first_fdc_id + self.foods) if self.random.random() < 0.7
+        )
+
+        self._write(
+            self.fdc_dir / "nutrient.csv",
+            ["id", "name", "unit_name", "nutrient_nbr", "rank"],
+            ([nutrient_id, name, unit, nutrient_id - 700, index] for index, (nutrient_id, name, unit) in enumerate(FDC_NUTRIENTS)),
+        )
+        self._write(
+            self.fdc_dir / "measure_unit.csv",
+            ["id", "name"],
+            MEASURE_UNITS,
+        )
+        self._write(
+            self.fdc_dir / "food.csv",
+            ["fdc_id", "data_type", "description", "food_category_id", "publication_date"],
+            (
+                [
+                    fdc_id,
+                    "branded_food" if fdc_id in branded_ids else "sr_legacy_food",
+                    self._food_name().upper() if fdc_id in branded_ids else self._food_name().capitalize(),
+                    self.random.randint(1, 28),
+                    "2025-12-18",
+                ]
+                for fdc_id in range(first_fdc_id, first_fdc_id + self.foods)
+            ),
+        )
+
+        def nutrient_rows():
+            row_id = 1
+            for fdc_id in range(first_fdc_id, first_fdc_id + self.foods):
+                protein, carbs, fat = self._macros()
+                calories = round(protein * 4 + carbs * 4 + fat * 9, 1)
+                base = {1008: calories, 1062: round(calories * 4.184, 1), 1003: protein, 1004: fat, 1005: carbs}
+                sampled = self.random.sample(FDC_NUTRIENTS[3:], self.random.randint(10, len(FDC_NUTRIENTS) - 3))
+                nutrient_ids = sorted(set(base) | {nutrient_id for nutrient_id, _name, _unit in sampled})
+                for nutrient_id in nutrient_ids:
+                    amount = base.get(nutrient_id, round(self.random.uniform(0, 500), 3))
+                    yield [row_id, fdc_id, nutrient_id, amount, "", 71, "", "", "", "", ""]
+                    row_id += 1
+
+        self._write(
+            self.fdc_dir / "food_nutrient.csv",
+            [
+                "id", "fdc_id", "nutrient_id", "amount", "data_points", "derivation_id",
+                "min", "max", "median", "footnote", "min_year_acquired",
+            ],
+            nutrient_rows(),
+        )
+
+        def branded_rows():
+            for fdc_id in sorted(branded_ids):
+                serving = round(self.random.uniform(10, 250), 1)
+                yield [
+                    fdc_id, self.random.choice(BRANDS), "", "", self._upc(), "water, salt", "",
+                    serving, "g", f"1 serving ({serving:g} g)", "Snacks", "GDSN", "", "2025-01-01",
+                    "2025-01-01", "United States", "", "", "", "",
+                ]
+
+        self._write(
+            self.fdc_dir / "branded_food.csv",
+            [
+                "fdc_id", "brand_owner", "brand_name", "subbrand_name", "gtin_upc", "ingredients",
+                "not_a_significant_source_of", "serving_size", "serving_size_unit",
+                "household_serving_fulltext", "branded_food_category", "data_source", "package_weight",
+                "modified_date", "available_date", "market_country", "discontinued_date",
+                "preparation_state_code", "trade_channel", "short_description",
+            ],
+            branded_rows(),
+        )
+
+        def portion_rows():
+            row_id = 1
+            for fdc_id in range(first_fdc_id, first_fdc_id + self.foods):
+                if fdc_id in branded_ids:
+                    continue
+                for seq_num in range(1, self.random.randint(1, 4) + 1):
+                    unit_id, unit_name = self.random.choice(MEASURE_UNITS)
+                    description = "" if unit_id != 9999 else f"1 {self.random.choice(['small', 'medium', 'large'])}"
+                    yield [
+                        row_id, fdc_id, seq_num, self.random.choice([1, 0.5, 2]), unit_id, description,
+                        self.random.choice(["", "chopped", "sliced"]), round(self.random.uniform(5, 300), 1),
+                        "", "", "",
+                    ]
+                    row_id += 1
+
+        self._write(
+            self.fdc_dir / "food_portion.csv",
+            [
+                "id", "fdc_id", "seq_num", "amount", "measure_unit_id", "portion_description",
+                "modifier", "gram_weight", "data_points", "footnote", "min_year_acquired",
+            ],
+            portion_rows(),
+        )
+
+    def generate_openfoodfacts(self) -> None:
+        header = [
+            "code", "product_name", "generic_name", "brands", "categories_en",
+            "serving_size", "serving_quantity", "serving_quantity_unit",
+        ] + OFF_NUTRIENT_COLUMNS
+
+        def rows():
+            for _ in range(self.openfoodfacts):
+                roll = self.random.random()
+                if roll < 0.8:
+                    code = self._upc()
+                elif roll < 0.9:
+                    code = "0" + self._upc()
+                else:
+                    code = str(self.random.randint(1, 99999999))
+                protein, carbs, fat = self._macros()
+                kcal = round(protein * 4 + carbs * 4 + fat * 9)
+                serving = self.random.choice(["", "30 g", "1 bar (40g)", "250 ml"])
+                values = {
+                    "energy-kcal_100g": kcal,
+                    "energy-kj_100g": round(kcal * 4.184),
+                    "fat_100g": fat,
+                    "carbohydrates_100g": carbs,
+                    "proteins_100g": protein,
+                }
+                yield [
+                    code,
+                    self._food_name() if self.random.random() > 0.05 else "",
+                    "",
+                    self.random.choice(BRANDS),
+                    "Snacks",
+                    serving,
+                    self._parse_quantity(serving),
+                    "g" if "g" in serving else "",
+                ] + [
+                    values.get(column, round(self.random.uniform(0, 2), 4) if self.random.random() < 0.4 else "")
+                    for column in OFF_NUTRIENT_COLUMNS
+                ]
+
+        path = self.output_dir / "openfoodfacts.products.csv"
+        self._write(path, header, rows(), delimiter="\t")
+
+    def _parse_quantity(self, serving: str) -> str:
+        match = re.search(r"(\d+)\s*g", serving)
+        return match.group(1) if match else ""
+
+    def generate_myfooddata(self) -> None:
+        path = self.output_dir / "myfooddata.csv"
+        header = ["ID", "Name", "Food Group"] + MYFOODDATA_NUTRIENT_COLUMNS
+        for index in range(1, 4):
+            header += [f"Serving Weight {index} (g)", f"Serving Description {index} (g)"]
+
+        count = 0
+        with path.open("w", newline="", encoding="utf-8") as handle:
+            writer = csv.writer(handle)
+            # The real spreadsheet has three non-data rows before the header.
+            writer.writerow(["MyFoodData Nutrition Facts SpreadSheet (synthetic)"])
+            writer.writerow(["Generated for import benchmarks"])
+            writer.writerow(["Source: benchmarks/generate_fixtures.py"])
+            writer.writerow(header)
+            for food_id in range(100000, 100000 + self.myfooddata):
+                protein, carbs, fat = self._macros()
+                nutrients = [round(protein * 4 + carbs * 4 + fat * 9), fat, protein, carbs] + [
+                    round(self.random.uniform(0, 200), 2) for _ in MYFOODDATA_NUTRIENT_COLUMNS[4:]
+                ]
+                servings: List[object] = []
+                for index in range(3):
+                    if self.random.random() < 0.6:
+                        servings += [round(self.random.uniform(5, 300), 1), f"1 {self.random.choice(['cup', 'slice', 'piece'])}"]
+                    else:
+                        servings += ["", ""]
+                writer.writerow([food_id, self._food_name().capitalize(), "Snacks"] + nutrients + servings)
+                count += 1
+        self.row_counts[path.name] = count
+
+    def generate(self) -> Dict[str, int]:
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        self.generate_fdc()
+        self.generate_openfoodfacts()
+        self.generate_myfooddata()
+        return self.row_counts
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Generate synthetic FDC/OpenFoodFacts/MyFoodData import fixtures.")
+    parser.add_argument("--output-dir", default="benchmarks/fixtures", help="Directory to write fixtures to.")
+    parser.add_argument("--foods", type=int, default=20000, help="FDC foods to generate.")
+    parser.add_argument("--openfoodfacts", type=int, default=20000, help="OpenFoodFacts rows to generate.")
+    parser.add_argument("--myfooddata", type=int, default=5000, help="MyFoodData rows to generate.")
+    parser.add_argument("--seed", type=int, default=42, help="Random seed for reproducible fixtures.")
+    args = parser.parse_args()
+
+    generator = FixtureGenerator(
+        Path(args.output_dir),
+        foods=args.foods,
+        openfoodfacts=args.openfoodfacts,
+        myfooddata=args.myfooddata,
+        seed=args.seed,
+    )
+    for name, count in generator.generate().items():
+        print(f"{name}: {count} rows")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,269 @@
+import argparse
+import datetime
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from benchmarks.fake_elasticsearch import start_fake_elasticsearch
+from benchmarks.generate_fixtures import FixtureGenerator
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+
+
+class ImportBenchmark:
+    STAGES = (
+        "fdc",
+        "fdc-portions",
+        "openfoodfacts",
+        "elasticsearch",
+        "myfooddata",
+        "openfoodfacts-barcodes",
+        "fdc-portion-measurements",
+        "csv-backfill",
+        "es-reindex-direct",
+    )
+
+    def __init__(
+        self,
+        fixtures_dir: Path,
+        env_file: str,
+        stages: List[str],
+        reset_db: bool,
+    ) -> None:
+        self.fixtures_dir = fixtures_dir
+        self.env_file = env_file
+        self.stages = stages
+        self.reset_db = reset_db
+        self.results: List[Dict[str, object]] = []
+
+    def _fixture_rows(self, name: str) -> int:
+        path = self.fixtures_dir / name
+        if not path.exists():
+            path = self.fixtures_dir / "fdc" / name
+        with path.open("rb") as handle:
+            return max(sum(1 for _ in handle) - 1, 0)
+
+    def _stage_command(self, stage: str, es_url: str) -> List[str]:
+        fdc_dir = str(self.fixtures_dir / "fdc")
+        off_csv = str(self.fixtures_dir / "openfoodfacts.products.csv")
+        myfooddata_csv = str(self.fixtures_dir / "myfooddata.csv")
+        python = sys.executable
+
+        if stage in ("fdc", "fdc-portions", "openfoodfacts", "elasticsearch"):
+            command = [
+                python, "import_fdc_and_openfoodfacts_to_db.py",
+                "--fdc-dir", fdc_dir,
+                "--openfoodfacts-csv", off_csv,
+                "--env-file", self.env_file,
+                "--start-at", stage,
+                "--stop-after", stage,
+                "--es-url", es_url,
+            ]
+            if stage == "fdc":
+                # Always time the lookup build so runs stay comparable whatever the cache holds.
+                command.append("--rebuild-lookup-cache")
+            return command
+        if stage == "myfooddata":
+            return [python, "post_all_csv_data_to_db.py", "--csv-file", myfooddata_csv, "--env-file", self.env_file]
+        if stage == "openfoodfacts-barcodes":
+            return [python, "post_openfoodfacts_barcodes_to_db.py", "--csv-file", off_csv, "--env-file", self.env_file]
+        if stage == "fdc-portion-measurements":
+            return [python, "post_fdc_portion_measurements_to_db.py", "--fdc-dir", fdc_dir, "--env-file", self.env_file]
+        if stage == "csv-backfill":
+            return [
+                python, "backfill_csv_foods_and_recreate_index.py",
+                "--csv-file", myfooddata_csv,
+                "--env-file", self.env_file,
+                "--skip-recreate-index",
+            ]
+        if stage == "es-reindex-direct":
+            return [python, "reindex_foods.py", "--direct", "--env-file", self.env_file]
+        raise ValueError(f"Unknown benchmark stage: {stage}")
+
+    def _stage_rows(self, stage: str, es_documents: int) -> int:
+        if stage == "fdc":
+            return self._fixture_rows("food_nutrient.csv")
+        if stage in ("fdc-portions", "fdc-portion-measurements"):
+            return self._fixture_rows("food_portion.csv")
+        if stage in ("openfoodfacts", "openfoodfacts-barcodes"):
+            return self._fixture_rows("openfoodfacts.products.csv")
+        if stage in ("myfooddata", "csv-backfill"):
+            # Three banner rows precede the header in the MyFoodData spreadsheet.
+            return max(self._fixture_rows("myfooddata.csv") - 3, 0)
+        return es_documents
+
+    def _reset_database(self) -> None:
+        sys.path.insert(0, str(BACKEND_DIR))
+        from foodtracker_db import ConnectionFactory, load_db_config, session_settings_hook
+
+        connections = ConnectionFactory(
+            load_db_config(self.env_file),
+            pool_size=1,
+            session_hooks=[session_settings_hook({"foreign_key_checks": 0})],
+        )
+        conn = connections.connect()
+        cursor = conn.cursor()
+        try:
+            for table in ("food_barcode", "food_measurement", "food"):
+                cursor.execute(f"TRUNCATE TABLE {table}")
+            conn.commit()
+        finally:
+            cursor.close()
+            conn.close()
+
+    def _run_stage(self, stage: str, es_url: str, es_state) -> Dict[str, object]:
+        command = self._stage_command(stage, es_url)
+        env = dict(os.environ, ES_URL=es_url, PYTHONUNBUFFERED="1")
+        documents_before = es_state.snapshot()["documents"]
+
+        # stderr goes to a file, not a pipe: progress bars would fill a pipe nobody reads during wait4.
+        with tempfile.TemporaryFile() as stderr_file:
+            started = time.perf_counter()
+            process = subprocess.Popen(
+                command,
+                cwd=BACKEND_DIR,
+                env=env,
+                stdout=subprocess.DEVNULL,
+                stderr=stderr_file,
+            )
+            # wait4 reports the rusage of this child only, so peak RSS is per stage.
+            _pid, status, rusage = os.wait4(process.pid, 0)
+            wall_s = time.perf_counter() - started
+            stderr_file.seek(max(stderr_file.seek(0, os.SEEK_END) - 2000, 0))
+            stderr_tail = stderr_file.read().decode("utf-8", errors="replace")
+        exit_code = os.waitstatus_to_exitcode(status)
+
+        rows = self._stage_rows(stage, es_state.snapshot()["documents"] - documents_before)
+        # ru_maxrss is KiB on Linux and bytes on macOS.
+        peak_rss_mb = rusage.ru_maxrss / (1024 * 1024 if sys.platform == "darwin" else 1024)
+        result: Dict[str, object] = {
+            "stage": stage,
+            "rows": rows,
+            "wall_s": round(wall_s, 3),
+            "rows_per_s": round(rows / max(wall_s, 0.0001), 1),
+            "peak_rss_mb": round(peak_rss_mb, 1),
+            "exit_code": exit_code,
+        }
+        if exit_code != 0:
+            result["stderr_tail"] = stderr_tail
+        return result
+
+    def run(self) -> List[Dict[str, object]]:
+        if self.reset_db:
+            print("Truncating food, food_measurement and food_barcode ...")
+            self._reset_database()
+
+        server, es_state = start_fake_elasticsearch()
+        es_url = f"http://{server.server_address[0]}:{server.server_address[1]}"
+        print(f"Fake Elasticsearch listening on {es_url}")
+        try:
+            for stage in self.stages:
+                result = self._run_stage(stage, es_url, es_state)
+                self.results.append(result)
+                print(
+                    f"{stage:<26} rows={result['rows']:<9} wall={result['wall_s']:>8.2f}s "
+                    f"rows/s={result['rows_per_s']:>10.1f} peak_rss={result['peak_rss_mb']:>7.1f}MB "
+                    f"exit={result['exit_code']}"
+                )
+        finally:
+            server.shutdown()
+            server.server_close()
+        return self.results
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=BACKEND_DIR, text=True
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare_results(baseline_path: Path, results: List[Dict[str, object]]) -> None:
+    baseline = json.loads(baseline_path.read_text(encoding="utf-8"))
+    baseline_by_stage = {item["stage"]: item for item in baseline.get("stages", [])}
+    print(f"Comparison against {baseline_path} (commit {baseline.get('commit')}):")
+    for result in results:
+        previous = baseline_by_stage.get(result["stage"])
+        if not previous or not previous.get("rows_per_s"):
+            continue
+        change = (float(result["rows_per_s"]) / float(previous["rows_per_s"]) - 1.0) * 100.0
+        print(
+            f"  {result['stage']:<26} rows/s {previous['rows_per_s']} -> {result['rows_per_s']} "
+            f"({change:+.1f}%), peak_rss {previous['peak_rss_mb']} -> {result['peak_rss_mb']}MB"
+        )
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Benchmark the import scripts against synthetic fixtures.")
+    parser.add_argument("--env-file", required=True, help=".env file pointing at a disposable local MySQL database.")
+    parser.add_argument("--fixtures-dir", default="benchmarks/fixtures", help="Fixture directory (generated if missing).")
+    parser.add_argument("--foods", type=int, default=20000, help="FDC foods to generate when fixtures are missing.")
+    parser.add_argument("--openfoodfacts", type=int, default=20000, help="OpenFoodFacts rows to generate.")
+    parser.add_argument("--myfooddata", type=int, default=5000, help="MyFoodData rows to generate.")
+    parser.add_argument("--regenerate", action="store_true", help="Regenerate fixtures even if they exist.")
+    parser.add_argument(
+        "--stages",
+        nargs="+",
+        choices=ImportBenchmark.STAGES,
+        default=list(ImportBenchmark.STAGES),
+        help="Stages to run, in order.",
+    )
+    parser.add_argument(
+        "--reset-db",
+        action="store_true",
+        help="Truncate food, food_measurement and food_barcode before running (disposable databases only).",
+    )
+    parser.add_argument("--results", default=None, help="Results JSON path (default benchmarks/results/<commit>.json).")
+    parser.add_argument("--compare", default=None, help="Previous results JSON to compare against.")
+    args = parser.parse_args()
+
+    fixtures_dir = Path(args.fixtures_dir).resolve()
+    if args.regenerate or not (fixtures_dir / "fdc" / "food_nutrient.csv").exists():
+        print(f"Generating fixtures in {fixtures_dir} ...")
+        FixtureGenerator(
+            fixtures_dir,
+            foods=args.foods,
+            openfoodfacts=args.openfoodfacts,
+            myfooddata=args.myfooddata,
+        ).generate()
+
+    benchmark = ImportBenchmark(
+        fixtures_dir=fixtures_dir,
+        env_file=str(Path(args.env_file).resolve()),
+        stages=args.stages,
+        reset_db=args.reset_db,
+    )
+    results = benchmark.run()
+
+    commit = git_commit()
+    results_path = Path(args.results or f"benchmarks/results/{commit or 'unknown'}.json")
+    results_path.parent.mkdir(parents=True, exist_ok=True)
+    results_path.write_text(
+        json.dumps(
+            {
+                "commit": commit,
+                "timestamp": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+                "fixtures": str(fixtures_dir),
+                "stages": results,
+            },
+            indent=2,
+        ),
+        encoding="utf-8",
+    )
+    print(f"Results written to {results_path}")
+
+    if args.compare:
+        compare_results(Path(args.compare), results)
+
+    return 1 if any(result["exit_code"] != 0 for result in results) else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
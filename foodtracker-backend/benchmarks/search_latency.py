@@ -0,0 +1,229 @@
+import argparse
+import json
+import math
+import os
+import random
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import requests
+
+from benchmarks.run_import_benchmark import git_commit
+
+
+def scored_query(query: str, limit: int, popularity_boost: float = 10.0) -> Dict[str, object]:
+    """The fuzzy function_score query (plus popularity boost) of FoodSearchService.searchFoodsByName."""
+    return {
+        "size": limit,
+        "query": {
+            "bool": {
+                "must": [
+                    {
+                        "function_score": {
+                            "query": {
+                                "bool": {
+                                    "should": [
+                                        {
+                                            "multi_match": {
+                                                "query": query,
+                                                "fields": ["name^3", "brand^0.2"],
+                                                "type": "best_fields",
+                                                "fuzziness": "AUTO",
+                                                "operator": "and",
+                                                "boost": 4,
+                                            }
+                                        },
+                                        {
+                                            "match_phrase_prefix": {
+                                                "name": {
+                                                    "query": query,
+                                                    "max_expansions": 20,
+                                                    "boost": 1.25,
+                                                }
+                                            }
+                                        },
+                                        {
+                                            "match": {
+                                                "name": {
+                                                    "query": query,
+                                                    "fuzziness": "AUTO",
+                                                    "operator": "and",
+                                                    "boost": 2,
+                                                }
+                                            }
+                                        },
+                                        {
+                                            "match": {
+                                                "brand": {
+                                                    "query": query,
+                                                    "fuzziness": "AUTO",
+                                                    "operator": "and",
+                                                    "boost": 0.2,
+                                                }
+                                            }
+                                        },
+                                    ],
+                                    "minimum_should_match": 1,
+                                }
+                            },
+                            "functions": [{"filter": {"term": {"isCsvFood": True}}, "weight": 4}],
+                            "boost_mode": "multiply",
+                            "score_mode": "multiply",
+                        }
+                    }
+                ],
+                "should": [
+                    {"rank_feature": {"field": "popularity", "saturation": {}, "boost": popularity_boost}}
+                ],
+            }
+        },
+    }
+
+
+def completion_query(prefix: str, limit: int) -> Dict[str, object]:
+    """The completion lookup of FoodSearchService.suggestFoodsByName."""
+    return {
+        "_source": False,
+        "suggest": {"food_suggest": {"prefix": prefix, "completion": {"field": "suggest", "size": limit}}},
+    }
+
+
+QUERY_SHAPES = {"scored": scored_query, "completion": completion_query}
+
+
+def percentile(sorted_values: List[float], fraction: float) -> float:
+    """Nearest-rank percentile of an ascending list."""
+    if not sorted_values:
+        return 0.0
+    rank = max(math.ceil(fraction * len(sorted_values)), 1)
+    return sorted_values[rank - 1]
+
+
+def sample_prefixes(
+    session: requests.Session,
+    es_url: str,
+    index_name: str,
+    names: int,
+    max_length: int,
+    seed: int,
+) -> List[str]:
+    """Typeahead prefixes (1..max_length characters) of randomly sampled food names."""
+    response = session.post(
+        f"{es_url}/{index_name}/_search",
+        json={
+            "size": names,
+            "_source": ["name"],
+            "query": {"function_score": {"random_score": {"seed": seed, "field": "_seq_no"}}},
+        },
+        timeout=60,
+    )
+    response.raise_for_status()
+    prefixes = set()
+    for hit in response.json()["hits"]["hits"]:
+        name = str((hit.get("_source") or {}).get("name") or "").strip().lower()
+        for length in range(1, min(max_length, len(name)) + 1):
+            prefixes.add(name[:length])
+    return sorted(prefixes)
+
+
+def run_shape(
+    session: requests.Session,
+    es_url: str,
+    index_name: str,
+    shape: str,
+    queries: List[str],
+    limit: int,
+    iterations: int,
+    warmup: int,
+) -> Dict[str, object]:
+    build = QUERY_SHAPES[shape]
+    url = f"{es_url}/{index_name}/_search"
+    for query in queries[:warmup]:
+        session.post(url, json=build(query, limit), timeout=30).raise_for_status()
+
+    wall_ms: List[float] = []
+    took_ms: List[float] = []
+    for _ in range(iterations):
+        for query in queries:
+            started = time.perf_counter()
+            response = session.post(url, json=build(query, limit), timeout=30)
+            elapsed = (time.perf_counter() - started) * 1000.0
+            response.raise_for_status()
+            wall_ms.append(elapsed)
+            took_ms.append(float(response.json().get("took", 0)))
+
+    wall_ms.sort()
+    took_ms.sort()
+    return {
+        "shape": shape,
+        "requests": len(wall_ms),
+        "wall_p50_ms": round(percentile(wall_ms, 0.50), 2),
+        "wall_p99_ms": round(percentile(wall_ms, 0.99), 2),
+        "wall_mean_ms": round(sum(wall_ms) / max(len(wall_ms), 1), 2),
+        "took_p50_ms": percentile(took_ms, 0.50),
+        "took_p99_ms": percentile(took_ms, 0.99),
+    }
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(
+        description="Compare typeahead latency of the scored fuzzy query and the completion suggester."
+    )
+    parser.add_argument("--es-url", default=os.getenv("ES_URL", "http://localhost:9200"), help="Elasticsearch URL.")
+    parser.add_argument("--index", default=os.getenv("ES_FOOD_INDEX", "foods"), help="Food index to query.")
+    parser.add_argument("--queries", default=None, help="File with one query per line (default: sampled name prefixes).")
+    parser.add_argument("--sample-names", type=int, default=200, help="Food names to sample prefixes from.")
+    parser.add_argument("--max-prefix-length", type=int, default=3, help="Longest sampled prefix, in characters.")
+    parser.add_argument("--seed", type=int, default=42, help="Seed for sampling food names.")
+    parser.add_argument("--limit", type=int, default=20, help="Results requested per query.")
+    parser.add_argument("--iterations", type=int, default=5, help="Times each query is sent per shape.")
+    parser.add_argument("--warmup", type=int, default=50, help="Queries sent per shape before measuring.")
+    parser.add_argument("--results", default=None, help="Write the results as JSON to this path.")
+    args = parser.parse_args()
+
+    es_url = args.es_url.rstrip("/")
+    session = requests.Session()
+    try:
+        if args.queries:
+            lines = Path(args.queries).read_text(encoding="utf-8").splitlines()
+            queries = [line.strip() for line in lines if line.strip()]
+        else:
+            queries = sample_prefixes(
+                session, es_url, args.index, args.sample_names, args.max_prefix_length, args.seed
+            )
+        if not queries:
+            print(f"No queries to run; is the '{args.index}' index empty?")
+            return 1
+        random.Random(args.seed).shuffle(queries)
+        print(f"Running {len(queries)} queries x {args.iterations} iterations against {es_url}/{args.index} ...")
+
+        results = [
+            run_shape(session, es_url, args.index, shape, queries, args.limit, args.iterations, args.warmup)
+            for shape in QUERY_SHAPES
+        ]
+    finally:
+        session.close()
+
+    for result in results:
+        print(
+            f"  {result['shape']:<11} p50 {result['wall_p50_ms']:>8.2f}ms  p99 {result['wall_p99_ms']:>8.2f}ms  "
+            f"mean {result['wall_mean_ms']:>8.2f}ms  (ES took p50 {result['took_p50_ms']:.0f}ms, "
+            f"p99 {result['took_p99_ms']:.0f}ms)"
+        )
+
+    if args.results:
+        payload: Dict[str, Optional[object]] = {
+            "commit": git_commit(),
+            "index": args.index,
+            "queries": len(queries),
+            "iterations": args.iterations,
+            "shapes": results,
+        }
+        Path(args.results).write_text(json.dumps(payload, indent=2), encoding="utf-8")
+        print(f"Results written to {args.results}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
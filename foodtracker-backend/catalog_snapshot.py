@@ -0,0 +1,82 @@
+import hashlib
+import json
+import re
+from pathlib import Path
+from typing import Any, Dict, List, Sequence
+
+import pyarrow as pa
+
+# The food catalog, in restore order (parents first). Every table has an integer ``id`` primary key.
+CATALOG_TABLES = ("food", "food_measurement", "food_barcode")
+# Child tables and the column holding their food id; exports drop children of foods past the food id bound.
+CATALOG_PARENT_COLUMNS = {"food_measurement": "foodId", "food_barcode": "foodId"}
+MANIFEST_NAME = "manifest.json"
+SNAPSHOT_FORMAT = 1
+
+_DECIMAL_RE = re.compile(r"^decimal\((\d+),(\d+)\)")
+
+
+def arrow_type(column_type: str) -> pa.DataType:
+    """Arrow type that holds every value of a MySQL ``COLUMN_TYPE`` without loss."""
+    column_type = column_type.lower()
+    unsigned = "unsigned" in column_type
+    base = column_type.split("(", 1)[0].split(" ", 1)[0]
+    decimal = _DECIMAL_RE.match(column_type)
+    if decimal:
+        return pa.decimal128(int(decimal.group(1)), int(decimal.group(2)))
+    if base == "tinyint":
+        return pa.int16() if unsigned else pa.int8()
+    if base in ("smallint", "mediumint"):
+        return pa.int32()
+    if base == "int":
+        return pa.int64() if unsigned else pa.int32()
+    if base == "bigint":
+        return pa.uint64() if unsigned else pa.int64()
+    if base == "float":
+        return pa.float32()
+    if base == "double":
+        return pa.float64()
+    if base in ("datetime", "timestamp"):
+        return pa.timestamp("us")
+    if base == "date":
+        return pa.date32()
+    if base in ("binary", "varbinary", "tinyblob", "blob", "mediumblob", "longblob"):
+        return pa.binary()
+    return pa.string()
+
+
+def read_table_columns(cursor: Any, database: str, table: str) -> List[Dict[str, str]]:
+    """Column names and MySQL types of ``table``, in table order."""
+    cursor.execute(
+        "SELECT COLUMN_NAME, COLUMN_TYPE FROM information_schema.COLUMNS "
+        "WHERE TABLE_SCHEMA = %s AND TABLE_NAME = %s ORDER BY ORDINAL_POSITION",
+        (database, table),
+    )
+    return [{"name": str(name), "type": str(column_type)} for name, column_type in cursor.fetchall()]
+
+
+def arrow_schema(columns: Sequence[Dict[str, str]]) -> pa.Schema:
+    return pa.schema([pa.field(column["name"], arrow_type(column["type"])) for column in columns])
+
+
+def file_sha256(path: Path) -> str:
+    digest = hashlib.sha256()
+    with path.open("rb") as handle:
+        for block in iter(lambda: handle.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def write_manifest(snapshot_dir: Path, manifest: Dict[str, Any]) -> Path:
+    path = snapshot_dir / MANIFEST_NAME
+    temp_path = path.with_suffix(".json.tmp")
+    temp_path.write_text(json.dumps(manifest, indent=2), encoding="utf-8")
+    temp_path.replace(path)
+    return path
+
+
+def read_manifest(snapshot_dir: Path) -> Dict[str, Any]:
+    manifest = json.loads((snapshot_dir / MANIFEST_NAME).read_text(encoding="utf-8"))
+    if manifest.get("format") != SNAPSHOT_FORMAT:
+        raise ValueError(f"Unsupported snapshot format: {manifest.get('format')}")
+    return manifest
@@ -0,0 +1,191 @@
+import gzip
+import io
+import queue
+import threading
+import zipfile
+from pathlib import Path
+from typing import BinaryIO, Dict, Optional
+
+try:
+    import zstandard
+except ImportError:  # only needed for .zst inputs
+    zstandard = None
+
+READ_CHUNK_BYTES = 1024 * 1024
+READ_AHEAD_CHUNKS = 16
+COMPRESSED_SUFFIXES = (".gz", ".zst", ".zip")
+
+
+class BackgroundReader(io.RawIOBase):
+    """Reads ``raw`` in a background thread, ``READ_AHEAD_CHUNKS`` chunks ahead of the consumer.
+
+    gzip, zip and zstandard decompression release the GIL, so decompressing overlaps with parsing.
+    Errors raised by ``raw`` are re-raised to the consumer; closing early stops the thread.
+    """
+
+    def __init__(self, raw: BinaryIO, chunk_size: int = READ_CHUNK_BYTES, depth: int = READ_AHEAD_CHUNKS):
+        super().__init__()
+        self._raw = raw
+        self._chunk_size = chunk_size
+        self._chunks: "queue.Queue[object]" = queue.Queue(maxsize=depth)
+        self._stop = threading.Event()
+        self._current = memoryview(b"")
+        self._eof = False
+        self._thread = threading.Thread(target=self._produce, name="input-read-ahead", daemon=True)
+        self._thread.start()
+
+    def _put(self, item: object) -> bool:
+        while not self._stop.is_set():
+            try:
+                self._chunks.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _produce(self) -> None:
+        try:
+            while not self._stop.is_set():
+                chunk = self._raw.read(self._chunk_size)
+                if not chunk:
+                    break
+                if not self._put(chunk):
+                    return
+            self._put(b"")
+        except BaseException as exc:  # handed to the consumer thread
+            self._put(exc)
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+        if self._eof:
+            return 0
+        if not self._current:
+            item = self._chunks.get()
+            if isinstance(item, BaseException):
+                self._eof = True
+                raise item
+            if not item:
+                self._eof = True
+                return 0
+            self._current = memoryview(item)
+        size = min(len(buffer), len(self._current))
+        buffer[:size] = self._current[:size]
+        self._current = self._current[size:]
+        return size
+
+    def close(self) -> None:
+        if self.closed:
+            return
+        self._stop.set()
+        self._thread.join()
+        self._raw.close()
+        super().close()
+
+
+def _zip_member(archive: zipfile.ZipFile, name: Optional[str] = None) -> zipfile.ZipInfo:
+    members = [info for info in archive.infolist() if not info.is_dir()]
+    if name is not None:
+        for info in members:
+            if Path(info.filename).name == name:
+                return info
+        raise FileNotFoundError(f"{name} not found in {archive.filename}")
+    data_members = [info for info in members if info.filename.lower().endswith((".csv", ".tsv"))]
+    if len(data_members) != 1:
+        raise ValueError(f"Expected exactly one .csv/.tsv file in {archive.filename}, found {len(data_members)}.")
+    return data_members[0]
+
+
+def _open_decompressed(path: Path) -> BinaryIO:
+    suffix = path.suffix.lower()
+    if suffix == ".gz":
+        return gzip.open(path, "rb")
+    if suffix == ".zst":
+        if zstandard is None:
+            raise RuntimeError(f"Reading {path} needs the zstandard package.")
+        return zstandard.ZstdDecompressor().stream_reader(path.open("rb"), closefd=True)
+    if suffix == ".zip":
+        # The member keeps the archive file open after the ZipFile itself is closed.
+        with zipfile.ZipFile(path) as archive:
+            return archive.open(_zip_member(archive))
+    return path.open("rb")
+
+
+def open_input(path: Path, read_ahead: bool = True) -> BinaryIO:
+    """Open a data file as a binary stream, decompressing ``.gz``/``.zst``/single-file ``.zip`` inputs.
+
+    Compressed inputs are decompressed in a background thread unless ``read_ahead`` is False.
+    """
+    stream = _open_decompressed(path)
+    if read_ahead and path.suffix.lower() in COMPRESSED_SUFFIXES:
+        return io.BufferedReader(BackgroundReader(stream), buffer_size=READ_CHUNK_BYTES)
+    return stream
+
+
+class FdcSource:
+    """The FDC CSV files, either extracted into a directory or read in place from the FDC zip.
+
+    In a directory, ``<name>.gz`` and ``<name>.zst`` are used when ``<name>`` itself is missing.
+    Zip members are matched by file name, whatever folder the archive puts them in. Compressed
+    files are decompressed in a background thread unless ``read_ahead`` is False.
+    """
+
+    def __init__(self, path: Path, read_ahead: bool = True):
+        self.path = path
+        self.read_ahead = read_ahead
+        self.is_archive = path.suffix.lower() == ".zip"
+        self._members: Optional[Dict[str, zipfile.ZipInfo]] = None
+
+    @property
+    def members(self) -> Dict[str, zipfile.ZipInfo]:
+        """Archive members by file name, read from the zip directory on first use."""
+        if self._members is None:
+            self._members = {}
+            with zipfile.ZipFile(self.path) as archive:
+                for info in archive.infolist():
+                    if not info.is_dir():
+                        self._members.setdefault(Path(info.filename).name, info)
+        return self._members
+
+    def _file(self, name: str) -> Optional[Path]:
+        for candidate in (name, f"{name}.gz", f"{name}.zst"):
+            path = self.path / candidate
+            if path.exists():
+                return path
+        return None
+
+    def exists(self, name: str) -> bool:
+        if self.is_archive:
+            return name in self.members
+        return self._file(name) is not None
+
+    def describe(self, name: str) -> str:
+        if self.is_archive:
+            return f"{self.path}:{self.members[name].filename}" if name in self.members else f"{self.path}:{name}"
+        return str(self._file(name) or self.path / name)
+
+    def signature(self, name: str) -> str:
+        """Changes whenever the file's content may have changed (size and mtime, or the member's CRC)."""
+        if self.is_archive:
+            info = self.members.get(name)
+            return f"{name}:{info.file_size}:{info.CRC}" if info else f"{name}:missing"
+        path = self._file(name)
+        if path is None:
+            return f"{name}:missing"
+        stat = path.stat()
+        return f"{path.name}:{stat.st_size}:{stat.st_mtime_ns}"
+
+    def open(self, name: str) -> BinaryIO:
+        if self.is_archive:
+            if name not in self.members:
+                raise FileNotFoundError(f"Missing required file: {self.describe(name)}")
+            with zipfile.ZipFile(self.path) as archive:
+                member = archive.open(self.members[name])
+            if not self.read_ahead:
+                return member
+            return io.BufferedReader(BackgroundReader(member), buffer_size=READ_CHUNK_BYTES)
+        path = self._file(name)
+        if path is None:
+            raise FileNotFoundError(f"Missing required file: {self.path / name}")
+        return open_input(path, self.read_ahead)
@@ -0,0 +1,242 @@
+import argparse
+import datetime
+import gzip
+import json
+import os
+from typing import Any, List, Optional, Sequence, Tuple
+
+import mysql.connector
+import requests
+from tqdm import tqdm
+
+from food_documents import suggest_weight
+from foodtracker_db import ConnectionFactory, load_db_config
+from import_metrics import ImportMetrics, add_metrics_arguments
+
+# A food used in a recipe is logged every time the recipe is, so a recipe use outweighs one entry.
+RECIPE_USE_WEIGHT = 2.0
+
+# One pass over both usage tables: each side is grouped by food, then merged per food. The previous
+# score comes along so only foods whose score changed are pushed to Elasticsearch.
+USAGE_SQL = (
+    "SELECT usage_counts.foodId, SUM(usage_counts.entries), SUM(usage_counts.recipes), "
+    "MAX(usage_counts.lastLoggedAt), previous.score, f.isCsvFood "
+    "FROM ("
+    "SELECT foodId, COUNT(*) AS entries, 0 AS recipes, MAX(loggedAt) AS lastLoggedAt "
+    "FROM food_entry WHERE foodId IS NOT NULL GROUP BY foodId "
+    "UNION ALL "
+    "SELECT foodId, 0, COUNT(*), NULL FROM recipe_food GROUP BY foodId"
+    ") AS usage_counts "
+    "JOIN food f ON f.id = usage_counts.foodId "
+    "LEFT JOIN food_popularity previous ON previous.foodId = usage_counts.foodId "
+    "GROUP BY usage_counts.foodId, previous.score, f.isCsvFood "
+    "ORDER BY usage_counts.foodId"
+)
+
+UPSERT_SQL = (
+    "INSERT INTO food_popularity (foodId, entryCount, recipeCount, score, lastLoggedAt, computedAt) "
+    "VALUES (%s, %s, %s, %s, %s, %s) "
+    "ON DUPLICATE KEY UPDATE entryCount = VALUES(entryCount), recipeCount = VALUES(recipeCount), "
+    "score = VALUES(score), lastLoggedAt = VALUES(lastLoggedAt), computedAt = VALUES(computedAt)"
+)
+
+# Sets popularity and the completion weight derived from it; foods without completion inputs have no
+# suggest object to update.
+UPDATE_SCRIPT = (
+    "ctx._source.popularity = params.popularity; "
+    "if (ctx._source.suggest != null) { ctx._source.suggest.weight = params.weight; }"
+)
+
+
+def popularity_score(entry_count: int, recipe_count: int) -> float:
+    return float(entry_count) + RECIPE_USE_WEIGHT * float(recipe_count)
+
+
+class FoodPopularityJob:
+    """Recomputes food_popularity from food_entry/recipe_food usage and mirrors it into the food index.
+
+    Scores are written as scripted updates of the ``popularity`` rank_feature and the completion weight
+    derived from it, so the documents do not have to be reindexed. Foods that are no longer used lose
+    their row and their ``popularity`` field.
+    """
+
+    def __init__(
+        self,
+        env_file_path: Optional[str] = None,
+        es_url: Optional[str] = None,
+        es_index: str = "foods",
+        batch_size: int = 2000,
+        push_all: bool = False,
+        metrics: Optional[ImportMetrics] = None,
+    ):
+        self.metrics = metrics or ImportMetrics("compute_food_popularity")
+        self.db_config = load_db_config(env_file_path)
+        # One connection streams the aggregate while the other writes the results.
+        self.connections = ConnectionFactory(self.db_config, pool_size=2, pool_name="food-popularity")
+        self.es_url = es_url.rstrip("/") if es_url else None
+        self.es_index = es_index
+        self.batch_size = max(batch_size, 1)
+        self.push_all = push_all
+        self.session = requests.Session()
+        self.foods_scored = 0
+        self.foods_pushed = 0
+        self.foods_removed = 0
+        self.documents_missing = 0
+        self.es_errors = 0
+
+    def _push(self, scores: Sequence[Tuple[int, Optional[float], Any]]) -> None:
+        """Update ``popularity`` and the suggest weight for (foodId, score, isCsvFood); a None score removes it."""
+        if self.es_url is None or not scores:
+            return
+        action_prefix = '{"update":{"_index":%s,"retry_on_conflict":3,"_id":"' % json.dumps(self.es_index)
+        lines: List[str] = []
+        for food_id, score, is_csv_food in scores:
+            lines.append(f'{action_prefix}{int(food_id)}"}}}}')
+            params = {"popularity": score, "weight": suggest_weight(is_csv_food, score)}
+            lines.append(json.dumps({"script": {"source": UPDATE_SCRIPT, "lang": "painless", "params": params}}))
+        body = gzip.compress(("\n".join(lines) + "\n").encode("utf-8"), compresslevel=1)
+
+        with self.metrics.timer("es_bulk"):
+            response = self.session.post(
+                f"{self.es_url}/_bulk",
+                data=body,
+                headers={"Content-Type": "application/x-ndjson", "Content-Encoding": "gzip"},
+                timeout=120,
+            )
+            response.raise_for_status()
+            response_json = response.json()
+        self.foods_pushed += len(scores)
+        if response_json.get("errors"):
+            for item in response_json.get("items", []):
+                error = item.get("update", {}).get("error")
+                if not error:
+                    continue
+                # Foods that have not been indexed yet pick the score up on their next (re)index.
+                if error.get("type") == "document_missing_exception":
+                    self.documents_missing += 1
+                else:
+                    self.es_errors += 1
+
+    def _write_batch(
+        self,
+        cursor: Any,
+        conn: Any,
+        rows: List[Tuple[Any, ...]],
+        computed_at: datetime.datetime,
+    ) -> None:
+        params = []
+        changed: List[Tuple[int, Optional[float], Any]] = []
+        for food_id, entry_count, recipe_count, last_logged_at, previous_score, is_csv_food in rows:
+            entry_count = int(entry_count or 0)
+            recipe_count = int(recipe_count or 0)
+            score = popularity_score(entry_count, recipe_count)
+            params.append((int(food_id), entry_count, recipe_count, score, last_logged_at, computed_at))
+            if self.push_all or previous_score is None or float(previous_score) != score:
+                changed.append((int(food_id), score, is_csv_food))
+
+        with self.metrics.timer("upsert"):
+            cursor.executemany(UPSERT_SQL, params)
+        self.metrics.commit(conn)
+        self.foods_scored += len(rows)
+        self._push(changed)
+
+    def _remove_stale(self, cursor: Any, conn: Any, computed_at: datetime.datetime) -> None:
+        cursor.execute(
+            "SELECT p.foodId, f.isCsvFood FROM food_popularity p JOIN food f ON f.id = p.foodId "
+            "WHERE p.computedAt < %s",
+            (computed_at,),
+        )
+        stale = [(int(food_id), is_csv_food) for food_id, is_csv_food in cursor.fetchall()]
+        for start in range(0, len(stale), self.batch_size):
+            batch = stale[start:start + self.batch_size]
+            batch_ids = [food_id for food_id, _is_csv_food in batch]
+            placeholders = ", ".join(["%s"] * len(batch_ids))
+            with self.metrics.timer("delete_stale"):
+                cursor.execute(f"DELETE FROM food_popularity WHERE foodId IN ({placeholders})", batch_ids)
+            self.metrics.commit(conn)
+            self._push([(food_id, None, is_csv_food) for food_id, is_csv_food in batch])
+        self.foods_removed = len(stale)
+
+    def run(self) -> int:
+        computed_at = datetime.datetime.now().replace(microsecond=0)
+        read_conn = self.connections.connect()
+        write_conn = self.connections.connect()
+        # Unbuffered: rows are streamed from the server in batches instead of being loaded at once.
+        read_cursor = read_conn.cursor(buffered=False)
+        write_cursor = write_conn.cursor()
+        progress = tqdm(desc="Foods scored", unit="food", dynamic_ncols=True)
+        try:
+            with self.metrics.timer("aggregate"):
+                read_cursor.execute(USAGE_SQL)
+            while True:
+                with self.metrics.timer("fetch"):
+                    rows = read_cursor.fetchmany(self.batch_size)
+                if not rows:
+                    break
+                self._write_batch(write_cursor, write_conn, rows, computed_at)
+                progress.update(len(rows))
+            self._remove_stale(write_cursor, write_conn, computed_at)
+        except mysql.connector.Error:
+            write_conn.rollback()
+            raise
+        finally:
+            progress.close()
+            read_cursor.close()
+            write_cursor.close()
+            read_conn.close()
+            write_conn.close()
+            self.session.close()
+
+        self.metrics.count("foods_scored", self.foods_scored)
+        self.metrics.count("foods_pushed", self.foods_pushed)
+        self.metrics.count("foods_removed", self.foods_removed)
+        self.metrics.count("es_errors", self.es_errors)
+
+        print("Food popularity complete.")
+        print(f"Foods scored: {self.foods_scored}")
+        print(f"Foods no longer used: {self.foods_removed}")
+        if self.es_url is None:
+            print("Elasticsearch updates skipped.")
+        else:
+            updated = self.foods_pushed - self.documents_missing - self.es_errors
+            print(f"Elasticsearch documents updated: {updated}")
+            print(f"Foods not in the index yet: {self.documents_missing}")
+            print(f"Elasticsearch errors: {self.es_errors}")
+        return self.es_errors
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(
+        description="Compute food popularity from logged entries and recipes and push it to Elasticsearch."
+    )
+    parser.add_argument(
+        "--env-file",
+        default=None,
+        help="Optional path to .env file with DB_HOST/DB_PORT/DB_USER/DB_PASSWORD/DB_NAME.",
+    )
+    parser.add_argument("--batch-size", type=int, default=2000, help="Foods per upsert batch and bulk request.")
+    parser.add_argument(
+        "--push-all",
+        action="store_true",
+        help="Push every score to Elasticsearch, not just the ones that changed since the last run.",
+    )
+    parser.add_argument("--skip-es", action="store_true", help="Only update the food_popularity table.")
+    add_metrics_arguments(parser)
+    args = parser.parse_args()
+    metrics = ImportMetrics.from_args("compute_food_popularity", args)
+
+    job = FoodPopularityJob(
+        args.env_file,
+        es_url=None if args.skip_es else os.getenv("ES_URL", "http://localhost:9200"),
+        es_index=os.getenv("ES_FOOD_INDEX", "foods"),
+        batch_size=args.batch_size,
+        push_all=args.push_all,
+        metrics=metrics,
+    )
+    with metrics.session(), metrics.stage("popularity"):
+        error_count = job.run()
+    return 1 if error_count else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,198 @@
+import argparse
+import gzip
+import json
+import re
+import shutil
+import time
+from collections import Counter
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, TextIO, Tuple
+
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+MAX_EXAMPLE_LENGTH = 200
+SOURCE_ID_KEYS = ("sourceId", "barcode", "fdcId")
+
+
+def to_jsonable(value: Any) -> Any:
+    """Turn namedtuple records (and containers of them) into plain dicts/lists for JSON."""
+    if hasattr(value, "_asdict"):
+        return {key: to_jsonable(item) for key, item in value._asdict().items()}
+    if isinstance(value, dict):
+        return {key: to_jsonable(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [to_jsonable(item) for item in value]
+    return value
+
+
+def record_source_id(record: Any) -> Optional[str]:
+    """Best-effort sourceId/barcode of a failed record, looked up on the record and its ``food``."""
+    if not isinstance(record, dict):
+        return None
+    for candidate in (record, record.get("food")):
+        if not isinstance(candidate, dict):
+            continue
+        for key in SOURCE_ID_KEYS:
+            value = candidate.get(key)
+            if value not in (None, ""):
+                return str(value)
+    return None
+
+
+def _rotated_segments(path: Path) -> List[Tuple[int, Path]]:
+    pattern = re.compile(re.escape(path.name) + r"\.(\d+)(?:\.gz)?$")
+    rotated: List[Tuple[int, Path]] = []
+    if path.parent.exists():
+        for candidate in path.parent.iterdir():
+            match = pattern.match(candidate.name)
+            if match:
+                rotated.append((int(match.group(1)), candidate))
+    return sorted(rotated)
+
+
+def dead_letter_segments(path: Path) -> List[Path]:
+    """Rotated ``<path>.<n>[.gz]`` segments in write order, followed by the active file."""
+    segments = [segment for _index, segment in _rotated_segments(path)]
+    if path.exists():
+        segments.append(path)
+    return segments
+
+
+def iter_dead_letters(path: Path) -> Iterator[Dict[str, Any]]:
+    """Stream the entries of a dead-letter file, including its rotated segments."""
+    segments = dead_letter_segments(path)
+    if not segments and path.name.endswith(".gz") and path.exists():
+        segments = [path]
+    for segment in segments:
+        opener = gzip.open if segment.name.endswith(".gz") else open
+        with opener(segment, "rt", encoding="utf-8") as handle:
+            for line in handle:
+                if line.strip():
+                    yield json.loads(line)
+
+
+class DeadLetterWriter:
+    """Streams rows that could not be written, together with their error, to a JSON lines file.
+
+    The file is only created once the first row fails, so clean runs leave nothing behind. Once it
+    grows past ``max_bytes`` it is gzip-compressed to ``<path>.<n>.gz`` and a fresh file is started.
+    Only per-class counts and one example message per class are kept in memory.
+    """
+
+    def __init__(
+        self,
+        source: str,
+        path: Optional[str] = None,
+        max_bytes: int = DEFAULT_MAX_BYTES,
+        compress: bool = True,
+    ) -> None:
+        self.source = source
+        self.path = Path(path) if path else Path(f"{source}.dead_letter.jsonl")
+        self.max_bytes = max_bytes
+        self.compress = compress
+        self.count = 0
+        self.error_classes: Counter = Counter()
+        self.error_examples: Dict[Tuple[str, str], str] = {}
+        self.rotated_paths: List[Path] = []
+        self._handle: Optional[TextIO] = None
+        self._bytes_written = 0
+
+    @classmethod
+    def from_args(cls, source: str, args: argparse.Namespace) -> "DeadLetterWriter":
+        return cls(
+            source,
+            args.dead_letter_file,
+            max_bytes=int(max(args.dead_letter_max_mb, 0) * 1024 * 1024),
+        )
+
+    def write(
+        self,
+        record: Any,
+        error: BaseException,
+        stage: Optional[str] = None,
+        source_id: Optional[str] = None,
+        **context: Any,
+    ) -> None:
+        if self._handle is None:
+            self._open()
+        record = to_jsonable(record)
+        entry = {
+            "source": self.source,
+            "source_id": source_id if source_id is not None else record_source_id(record),
+            "stage": stage,
+            "failed_at": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "error_class": type(error).__name__,
+            "errno": getattr(error, "errno", None),
+            "error": str(error),
+            "context": context,
+            "record": record,
+        }
+        line = json.dumps(entry, default=str) + "\n"
+        self._handle.write(line)
+        self._handle.flush()
+        self._bytes_written += len(line.encode("utf-8"))
+        self.count += 1
+
+        key = (stage or "-", entry["error_class"])
+        self.error_classes[key] += 1
+        self.error_examples.setdefault(key, entry["error"][:MAX_EXAMPLE_LENGTH])
+
+        if self.max_bytes > 0 and self._bytes_written >= self.max_bytes:
+            self._rotate()
+
+    def _open(self) -> None:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._handle = self.path.open("a", encoding="utf-8")
+        self._bytes_written = self.path.stat().st_size
+
+    def _rotate(self) -> None:
+        self.close()
+        existing = _rotated_segments(self.path)
+        next_index = existing[-1][0] + 1 if existing else 1
+        if self.compress:
+            rotated = self.path.with_name(f"{self.path.name}.{next_index}.gz")
+            with self.path.open("rb") as source, gzip.open(rotated, "wb") as target:
+                shutil.copyfileobj(source, target)
+            self.path.unlink()
+        else:
+            rotated = self.path.with_name(f"{self.path.name}.{next_index}")
+            self.path.rename(rotated)
+        self.rotated_paths.append(rotated)
+
+    def summary(self) -> str:
+        if not self.count:
+            return "none"
+        rotated = f" (+{len(self.rotated_paths)} rotated segments)" if self.rotated_paths else ""
+        return f"{self.count} rows in {self.path}{rotated}"
+
+    def error_class_summary(self, limit: Optional[int] = None) -> List[str]:
+        """One line per (stage, error class), most frequent first, with an example message."""
+        return [
+            f"{count:>8}  {stage}  {error_class}: {self.error_examples[(stage, error_class)]}"
+            for (stage, error_class), count in self.error_classes.most_common(limit)
+        ]
+
+    def close(self) -> None:
+        if self._handle is not None:
+            self._handle.close()
+            self._handle = None
+
+    def __enter__(self) -> "DeadLetterWriter":
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.close()
+
+
+def add_dead_letter_arguments(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument(
+        "--dead-letter-file",
+        default=None,
+        help="JSON lines file for rows that still fail after batch bisection (default: <script>.dead_letter.jsonl).",
+    )
+    parser.add_argument(
+        "--dead-letter-max-mb",
+        type=float,
+        default=DEFAULT_MAX_BYTES / (1024 * 1024),
+        help="Rotate and gzip the dead-letter file once it reaches this size; 0 disables rotation.",
+    )
+
@@ -0,0 +1,255 @@
+import argparse
+import datetime
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+from tqdm import tqdm
+
+from catalog_snapshot import (
+    CATALOG_PARENT_COLUMNS,
+    CATALOG_TABLES,
+    MANIFEST_NAME,
+    SNAPSHOT_FORMAT,
+    arrow_schema,
+    file_sha256,
+    read_table_columns,
+    write_manifest,
+)
+from foodtracker_db import connect_once, load_db_config, split_id_span
+from import_metrics import ImportMetrics, add_metrics_arguments
+
+PARQUET_COMPRESSIONS = ("zstd", "snappy", "gzip", "none")
+
+
+def export_id_range(
+    db_config: Dict[str, Any],
+    snapshot_dir: str,
+    table: str,
+    columns: Sequence[Dict[str, str]],
+    part_index: int,
+    id_range: Tuple[int, int],
+    batch_rows: int,
+    compression: str,
+    parent_bound: Optional[Tuple[str, int]] = None,
+) -> Tuple[str, Dict[str, Any], Dict[str, float]]:
+    """Stream one id range of ``table`` into a Parquet part; returns (table, part entry, timings).
+
+    ``parent_bound`` is (column, max id): rows whose parent id is past it are left out.
+    """
+    start_id, end_id = id_range
+    schema = arrow_schema(columns)
+    relative_path = f"{table}/part-{part_index:05d}.parquet"
+    path = Path(snapshot_dir) / relative_path
+    temp_path = path.with_suffix(".parquet.tmp")
+    # Workers run in child processes, so timings travel back with the result.
+    timings = {"fetch": 0.0, "encode": 0.0}
+    row_count = 0
+    min_id = None
+    max_id = None
+
+    # Each worker process opens its own connection; connections cannot cross a fork.
+    conn = connect_once(db_config)
+    # Unbuffered: the range is streamed from the server instead of being loaded at once.
+    cursor = conn.cursor(buffered=False)
+    writer = None
+    try:
+        column_sql = ", ".join(f"`{column['name']}`" for column in columns)
+        params: Tuple[int, ...] = (start_id, end_id)
+        parent_sql = ""
+        if parent_bound is not None:
+            parent_sql = f" AND `{parent_bound[0]}` <= %s"
+            params += (parent_bound[1],)
+        cursor.execute(
+            f"SELECT {column_sql} FROM {table} WHERE id > %s AND id <= %s{parent_sql} ORDER BY id",
+            params,
+        )
+        id_position = [column["name"] for column in columns].index("id")
+        while True:
+            started = time.perf_counter()
+            rows = cursor.fetchmany(batch_rows)
+            timings["fetch"] += time.perf_counter() - started
+            if not rows:
+                break
+
+            started = time.perf_counter()
+            values = list(zip(*rows))
+            batch = pa.record_batch(
+                [pa.array(column_values, type=field.type) for column_values, field in zip(values, schema)],
+                schema=schema,
+            )
+            if writer is None:
+                path.parent.mkdir(parents=True, exist_ok=True)
+                writer = pq.ParquetWriter(temp_path, schema, compression=compression)
+            writer.write_batch(batch, row_group_size=batch_rows)
+            timings["encode"] += time.perf_counter() - started
+
+            row_count += len(rows)
+            if min_id is None:
+                min_id = int(rows[0][id_position])
+            max_id = int(rows[-1][id_position])
+    finally:
+        if writer is not None:
+            writer.close()
+        cursor.close()
+        conn.close()
+
+    if writer is None:
+        return table, {"file": None, "rows": 0}, timings
+    temp_path.replace(path)
+    part = {
+        "file": relative_path,
+        "rows": row_count,
+        "minId": min_id,
+        "maxId": max_id,
+        "bytes": path.stat().st_size,
+        "sha256": file_sha256(path),
+    }
+    return table, part, timings
+
+
+def export_snapshot(
+    db_config: Dict[str, Any],
+    snapshot_dir: Path,
+    tables: Sequence[str],
+    workers: int,
+    batch_rows: int,
+    compression: str,
+    metrics: ImportMetrics,
+) -> Dict[str, Any]:
+    if (snapshot_dir / MANIFEST_NAME).exists():
+        raise FileExistsError(f"{snapshot_dir} already holds a snapshot; pick a new --output-dir.")
+    snapshot_dir.mkdir(parents=True, exist_ok=True)
+    created_at = datetime.datetime.now().replace(microsecond=0)
+
+    conn = connect_once(db_config)
+    cursor = conn.cursor()
+    try:
+        table_columns = {table: read_table_columns(cursor, db_config["database"], table) for table in tables}
+        # Only the id bounds come from one consistent read: rows inserted after it are past them, and
+        # children of foods past the food bound are dropped. The workers read their ranges later, each
+        # on its own connection, so updates, deletes and late commits made meanwhile can still leave the
+        # tables inconsistent with each other (restore_catalog_snapshot.py reports orphans it finds).
+        cursor.execute("START TRANSACTION WITH CONSISTENT SNAPSHOT")
+        id_spans: Dict[str, Tuple[Optional[int], Optional[int]]] = {}
+        for table in set(tables) | {"food"}:
+            cursor.execute(f"SELECT MIN(id), MAX(id) FROM {table}")
+            id_spans[table] = cursor.fetchone()
+        conn.commit()
+    finally:
+        cursor.close()
+        conn.close()
+
+    food_max_id = int(id_spans["food"][1] or 0)
+    jobs: List[Tuple[str, int, Tuple[int, int]]] = []
+    for table in tables:
+        # More ranges than workers so a dense id range does not leave the pool idle.
+        for part_index, id_range in enumerate(split_id_span(*id_spans[table], max(workers, 1) * 4)):
+            jobs.append((table, part_index, id_range))
+
+    parts: Dict[str, List[Dict[str, Any]]] = {table: [] for table in tables}
+    progress = tqdm(total=len(jobs), desc="Snapshot parts", unit="part", dynamic_ncols=True)
+    try:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = [
+                executor.submit(
+                    export_id_range,
+                    db_config,
+                    str(snapshot_dir),
+                    table,
+                    table_columns[table],
+                    part_index,
+                    id_range,
+                    batch_rows,
+                    compression,
+                    (CATALOG_PARENT_COLUMNS[table], food_max_id) if table in CATALOG_PARENT_COLUMNS else None,
+                )
+                for table, part_index, id_range in jobs
+            ]
+            for future in as_completed(futures):
+                table, part, timings = future.result()
+                for operation, elapsed_s in timings.items():
+                    metrics.record(operation, elapsed_s)
+                if part["rows"]:
+                    parts[table].append(part)
+                progress.update(1)
+    finally:
+        progress.close()
+
+    manifest: Dict[str, Any] = {
+        "format": SNAPSHOT_FORMAT,
+        "createdAt": created_at.isoformat(),
+        "database": db_config["database"],
+        "compression": compression,
+        "tables": {},
+    }
+    for table in tables:
+        table_parts = sorted(parts[table], key=lambda part: part["minId"])
+        manifest["tables"][table] = {
+            "columns": table_columns[table],
+            "rows": sum(part["rows"] for part in table_parts),
+            "parts": table_parts,
+        }
+        metrics.count(f"{table}_rows", manifest["tables"][table]["rows"])
+    write_manifest(snapshot_dir, manifest)
+    return manifest
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(
+        description="Export the food catalog (foods, measurements, barcodes) as a Parquet snapshot."
+    )
+    parser.add_argument("--output-dir", required=True, help="Directory for the snapshot; must not hold one yet.")
+    parser.add_argument(
+        "--env-file",
+        default=None,
+        help="Optional path to .env file with DB_HOST/DB_PORT/DB_USER/DB_PASSWORD/DB_NAME.",
+    )
+    parser.add_argument(
+        "--tables",
+        nargs="+",
+        choices=CATALOG_TABLES,
+        default=list(CATALOG_TABLES),
+        help="Catalog tables to export.",
+    )
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 4, help="Parallel export processes.")
+    parser.add_argument("--batch-rows", type=int, default=50000, help="Rows per fetch and per Parquet row group.")
+    parser.add_argument(
+        "--compression",
+        choices=PARQUET_COMPRESSIONS,
+        default="zstd",
+        help="Parquet compression codec.",
+    )
+    add_metrics_arguments(parser)
+    args = parser.parse_args()
+    metrics = ImportMetrics.from_args("export_catalog_snapshot", args)
+
+    db_config = load_db_config(args.env_file, autocommit=True)
+    snapshot_dir = Path(args.output_dir)
+    tables = [table for table in CATALOG_TABLES if table in args.tables]
+    started_at = time.perf_counter()
+    with metrics.session(), metrics.stage("export"):
+        manifest = export_snapshot(
+            db_config,
+            snapshot_dir,
+            tables,
+            max(args.workers, 1),
+            max(args.batch_rows, 1),
+            args.compression,
+            metrics,
+        )
+
+    elapsed_s = max(time.perf_counter() - started_at, 0.0001)
+    print(f"Snapshot written to {snapshot_dir} in {elapsed_s:.2f}s")
+    for table, entry in manifest["tables"].items():
+        size_mb = sum(part["bytes"] for part in entry["parts"]) / (1024 * 1024)
+        print(f"  {table}: {entry['rows']} rows in {len(entry['parts'])} parts ({size_mb:.1f} MB)")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,371 @@
+import argparse
+import csv
+import heapq
+import io
+import re
+import tempfile
+from pathlib import Path
+from typing import BinaryIO, Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple, Union
+
+try:
+    import numpy as np
+except ImportError:  # only needed by the pyarrow backend and the nutrient sort
+    np = None
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    from pyarrow import csv as pa_csv
+except ImportError:  # pyarrow is optional; the csv module backend is used instead
+    pa = None
+
+from compressed_input import open_input
+
+CSV_BACKENDS = ("auto", "pyarrow", "csv")
+BLOCK_SIZE = 16 * 1024 * 1024
+NUTRIENT_GROUPING_MODES = ("auto", "grouped", "sort")
+DEFAULT_SORT_MEMORY_BYTES = 512 * 1024 * 1024
+# Buffered columns, their concatenation, the argsort order and the run array, per row.
+SORT_BYTES_PER_ROW = 80
+MIN_RUN_ROWS = 1024
+CSV_CHUNK_ROWS = 100_000
+RUN_DTYPE = [("fdc_id", "<i8"), ("nutrient_id", "<i8"), ("amount", "<f8")]
+NUMBER_RE = re.compile(r"[-+]?\d*\.?\d+(?:[eE][-+]?\d+)?")
+
+
+def resolve_csv_backend(backend: str = "auto") -> str:
+    if backend not in CSV_BACKENDS:
+        raise ValueError(f"Unknown CSV backend {backend!r}; expected one of {', '.join(CSV_BACKENDS)}.")
+    if backend == "auto":
+        return "pyarrow" if pa is not None else "csv"
+    if backend == "pyarrow" and pa is None:
+        raise RuntimeError("The pyarrow CSV backend needs pyarrow installed; use --csv-backend csv.")
+    return backend
+
+
+def parse_amount(value: Optional[str]) -> float:
+    """Parse a numeric CSV cell the way the importers' ``_clean_numeric`` does; 0.0 when unusable."""
+    if not value:
+        return 0.0
+    try:
+        return float(value)
+    except ValueError:
+        match = NUMBER_RE.search(value.replace(",", ""))
+        return float(match.group(0)) if match else 0.0
+
+
+def _open_stream(source: Union[Path, BinaryIO]) -> BinaryIO:
+    return open_input(source) if isinstance(source, Path) else source
+
+
+def _open_arrow_csv(stream: BinaryIO, column_types: Dict[str, object]):
+    return pa_csv.open_csv(
+        stream,
+        read_options=pa_csv.ReadOptions(block_size=BLOCK_SIZE),
+        convert_options=pa_csv.ConvertOptions(
+            column_types=column_types,
+            include_columns=list(column_types),
+            include_missing_columns=True,
+        ),
+    )
+
+
+def iter_rows(
+    source: Union[Path, BinaryIO],
+    columns: Sequence[str],
+    backend: str = "auto",
+) -> Iterator[Tuple[Optional[str], ...]]:
+    """Yield one tuple of string cells per row, in ``columns`` order.
+
+    Empty cells are ``""`` and columns missing from the file are ``None``, as with csv.DictReader,
+    but no per-row dict is built. With pyarrow the file is parsed in record batches. ``source`` is a
+    (possibly compressed) path or an open binary stream, which is closed once the rows are read.
+    """
+    stream = _open_stream(source)
+    if resolve_csv_backend(backend) == "pyarrow":
+        with stream:
+            reader = _open_arrow_csv(stream, {column: pa.string() for column in columns})
+            for batch in reader:
+                yield from zip(*(batch.column(index).to_pylist() for index in range(len(columns))))
+        return
+
+    with io.TextIOWrapper(stream, encoding="utf-8-sig", newline="") as handle:
+        reader = csv.reader(handle)
+        header = next(reader, None) or []
+        positions = [header.index(column) if column in header else None for column in columns]
+        for row in reader:
+            width = len(row)
+            yield tuple(
+                row[position] if position is not None and position < width else None
+                for position in positions
+            )
+
+
+def iter_nutrient_groups(
+    source: Union[Path, BinaryIO],
+    backend: str = "auto",
+    parse: Callable[[Optional[str]], float] = parse_amount,
+) -> Iterator[Tuple[str, Dict[int, float]]]:
+    """Yield ``(fdc_id, {nutrient_id: amount})`` for each run of consecutive food_nutrient.csv rows.
+
+    The pyarrow backend reads typed int64/int64/float64 columns and finds the fdc_id boundaries on
+    the arrays; ``parse`` is only used by the csv module backend.
+    """
+    if resolve_csv_backend(backend) == "pyarrow":
+        with _open_stream(source) as stream:
+            yield from _iter_nutrient_groups_arrow(stream)
+        return
+
+    current_fdc: Optional[str] = None
+    nutrients: Dict[int, float] = {}
+    for fdc_id, nutrient_id, amount in iter_rows(source, ("fdc_id", "nutrient_id", "amount"), "csv"):
+        if not fdc_id or not nutrient_id:
+            continue
+        if current_fdc is None:
+            current_fdc = fdc_id
+        if fdc_id != current_fdc:
+            yield current_fdc, nutrients
+            nutrients = {}
+            current_fdc = fdc_id
+        try:
+            nutrient_key = int(nutrient_id)
+        except ValueError:
+            continue
+        nutrients[nutrient_key] = parse(amount)
+    if current_fdc is not None:
+        yield current_fdc, nutrients
+
+
+NutrientArrays = Tuple["np.ndarray", "np.ndarray", "np.ndarray"]
+
+
+def _iter_nutrient_groups_arrow(stream: BinaryIO) -> Iterator[Tuple[str, Dict[int, float]]]:
+    for fdc_id, nutrients in _group_nutrient_arrays(_iter_nutrient_arrays_arrow(stream)):
+        yield str(fdc_id), nutrients
+
+
+def _iter_nutrient_arrays_arrow(stream: BinaryIO) -> Iterator[NutrientArrays]:
+    """Typed (fdc_id, nutrient_id, amount) arrays per record batch, without rows missing an id."""
+    column_types = {"fdc_id": pa.int64(), "nutrient_id": pa.int64(), "amount": pa.float64()}
+    try:
+        for batch in _open_arrow_csv(stream, column_types):
+            fdc_ids, nutrient_ids, amounts = batch.column(0), batch.column(1), batch.column(2)
+            if fdc_ids.null_count or nutrient_ids.null_count:
+                keep = pc.and_(pc.is_valid(fdc_ids), pc.is_valid(nutrient_ids))
+                fdc_ids = fdc_ids.filter(keep)
+                nutrient_ids = nutrient_ids.filter(keep)
+                amounts = amounts.filter(keep)
+            if len(fdc_ids):
+                yield fdc_ids.to_numpy(), nutrient_ids.to_numpy(), pc.fill_null(amounts, 0.0).to_numpy()
+    except pa.ArrowInvalid as exc:
+        name = getattr(stream, "name", "food_nutrient.csv")
+        raise ValueError(f"Could not parse {name} with pyarrow ({exc}); rerun with --csv-backend csv.") from exc
+
+
+def _iter_nutrient_arrays_csv(
+    source: Union[Path, BinaryIO],
+    parse: Callable[[Optional[str]], float],
+) -> Iterator[NutrientArrays]:
+    fdc_ids: List[int] = []
+    nutrient_ids: List[int] = []
+    amounts: List[float] = []
+    for fdc_id, nutrient_id, amount in iter_rows(source, ("fdc_id", "nutrient_id", "amount"), "csv"):
+        if not fdc_id or not nutrient_id:
+            continue
+        try:
+            fdc_key, nutrient_key = int(fdc_id), int(nutrient_id)
+        except ValueError:
+            continue
+        fdc_ids.append(fdc_key)
+        nutrient_ids.append(nutrient_key)
+        amounts.append(parse(amount))
+        if len(fdc_ids) >= CSV_CHUNK_ROWS:
+            yield np.array(fdc_ids, dtype=np.int64), np.array(nutrient_ids, dtype=np.int64), np.array(amounts)
+            fdc_ids, nutrient_ids, amounts = [], [], []
+    if fdc_ids:
+        yield np.array(fdc_ids, dtype=np.int64), np.array(nutrient_ids, dtype=np.int64), np.array(amounts)
+
+
+def _group_nutrient_arrays(chunks: Iterable[NutrientArrays]) -> Iterator[Tuple[int, Dict[int, float]]]:
+    """Group consecutive rows with the same fdc_id, also across chunk boundaries."""
+    current_fdc: Optional[int] = None
+    nutrients: Dict[int, float] = {}
+    for fdc_array, nutrient_array, amount_array in chunks:
+        if not len(fdc_array):
+            continue
+        nutrient_list = nutrient_array.tolist()
+        amount_list = amount_array.tolist()
+        boundaries = (np.flatnonzero(fdc_array[1:] != fdc_array[:-1]) + 1).tolist()
+        starts = [0] + boundaries
+        ends = boundaries + [len(fdc_array)]
+        for start, end in zip(starts, ends):
+            fdc_id = int(fdc_array[start])
+            if fdc_id != current_fdc:
+                if current_fdc is not None:
+                    yield current_fdc, nutrients
+                current_fdc = fdc_id
+                nutrients = {}
+            nutrients.update(zip(nutrient_list[start:end], amount_list[start:end]))
+    if current_fdc is not None:
+        yield current_fdc, nutrients
+
+
+def is_grouped_by_fdc_id(source: Union[Path, BinaryIO], backend: str = "auto") -> bool:
+    """Pre-pass over the fdc_id column: True when no fdc_id occurs in more than one run of rows."""
+    if resolve_csv_backend(backend) == "pyarrow":
+        run_ids = []
+        previous: Optional[int] = None
+        with _open_stream(source) as stream:
+            for batch in _open_arrow_csv(stream, {"fdc_id": pa.int64()}):
+                fdc_array = batch.column(0).drop_null().to_numpy()
+                if not len(fdc_array):
+                    continue
+                changes = np.concatenate(([fdc_array[0] != previous], fdc_array[1:] != fdc_array[:-1]))
+                run_ids.append(fdc_array[np.flatnonzero(changes)])
+                previous = int(fdc_array[-1])
+        if not run_ids:
+            return True
+        runs = np.concatenate(run_ids)
+        return len(np.unique(runs)) == len(runs)
+
+    seen = set()
+    previous_id: Optional[str] = None
+    for (fdc_id,) in iter_rows(source, ("fdc_id",), "csv"):
+        if not fdc_id or fdc_id == previous_id:
+            continue
+        if fdc_id in seen:
+            return False
+        seen.add(fdc_id)
+        previous_id = fdc_id
+    return True
+
+
+def _spill_run(directory: Path, index: int, buffered: List[NutrientArrays]) -> Path:
+    fdc_ids, nutrient_ids, amounts = (np.concatenate(parts) for parts in zip(*buffered))
+    # A stable sort keeps file order within a food, so the last row of a repeated nutrient still wins.
+    order = np.argsort(fdc_ids, kind="stable")
+    run = np.empty(len(order), dtype=RUN_DTYPE)
+    run["fdc_id"] = fdc_ids[order]
+    run["nutrient_id"] = nutrient_ids[order]
+    run["amount"] = amounts[order]
+    path = directory / f"run_{index:05d}.npy"
+    np.save(path, run)
+    return path
+
+
+def _iter_run_blocks(path: Path, block_rows: int) -> Iterator[NutrientArrays]:
+    run = np.load(path, mmap_mode="r")
+    for start in range(0, len(run), block_rows):
+        block = np.array(run[start : start + block_rows])
+        yield block["fdc_id"], block["nutrient_id"], block["amount"]
+
+
+def _tag_groups(
+    groups: Iterator[Tuple[int, Dict[int, float]]], run_index: int
+) -> Iterator[Tuple[int, int, Dict[int, float]]]:
+    for fdc_id, nutrients in groups:
+        yield fdc_id, run_index, nutrients
+
+
+def iter_sorted_nutrient_groups(
+    source: Union[Path, BinaryIO],
+    backend: str = "auto",
+    parse: Callable[[Optional[str]], float] = parse_amount,
+    memory_bytes: int = DEFAULT_SORT_MEMORY_BYTES,
+    spill_dir: Optional[Path] = None,
+) -> Iterator[Tuple[str, Dict[int, float]]]:
+    """Like ``iter_nutrient_groups`` for a food_nutrient.csv that is not grouped by fdc_id.
+
+    External merge sort: runs of rows that fit in ``memory_bytes`` are sorted by fdc_id and spilled
+    to .npy files in ``spill_dir``, then the runs are merged with a heap one food group at a time.
+    Every food is yielded once, in ascending fdc_id order, with all of its nutrients.
+    """
+    if np is None:
+        raise RuntimeError("Sorting food_nutrient.csv needs numpy installed.")
+    if resolve_csv_backend(backend) == "pyarrow":
+        stream = _open_stream(source)
+        chunks: Iterator[NutrientArrays] = _iter_nutrient_arrays_arrow(stream)
+    else:
+        stream = None
+        chunks = _iter_nutrient_arrays_csv(source, parse)
+    run_rows = max(memory_bytes // SORT_BYTES_PER_ROW, MIN_RUN_ROWS)
+
+    with tempfile.TemporaryDirectory(prefix="fdc_nutrient_sort_", dir=spill_dir) as spill_path:
+        directory = Path(spill_path)
+        runs: List[Path] = []
+        buffered: List[NutrientArrays] = []
+        buffered_rows = 0
+        try:
+            for chunk in chunks:
+                buffered.append(chunk)
+                buffered_rows += len(chunk[0])
+                if buffered_rows >= run_rows:
+                    runs.append(_spill_run(directory, len(runs), buffered))
+                    buffered, buffered_rows = [], 0
+        finally:
+            if stream is not None:
+                stream.close()
+
+        if not runs:
+            if buffered:
+                fdc_ids, nutrient_ids, amounts = (np.concatenate(parts) for parts in zip(*buffered))
+                order = np.argsort(fdc_ids, kind="stable")
+                in_memory = [(fdc_ids[order], nutrient_ids[order], amounts[order])]
+                for fdc_id, nutrients in _group_nutrient_arrays(in_memory):
+                    yield str(fdc_id), nutrients
+            return
+        if buffered:
+            runs.append(_spill_run(directory, len(runs), buffered))
+            buffered = []
+
+        # Ties on fdc_id come out in run order, i.e. file order, so later rows still overwrite earlier ones.
+        block_rows = max(run_rows // len(runs), MIN_RUN_ROWS)
+        merged = heapq.merge(
+            *(
+                _tag_groups(_group_nutrient_arrays(_iter_run_blocks(path, block_rows)), index)
+                for index, path in enumerate(runs)
+            )
+        )
+        current_fdc: Optional[int] = None
+        nutrients: Dict[int, float] = {}
+        for fdc_id, _run_index, run_nutrients in merged:
+            if fdc_id != current_fdc:
+                if current_fdc is not None:
+                    yield str(current_fdc), nutrients
+                current_fdc = fdc_id
+                nutrients = {}
+            nutrients.update(run_nutrients)
+        if current_fdc is not None:
+            yield str(current_fdc), nutrients
+
+
+def add_csv_backend_arguments(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument(
+        "--csv-backend",
+        choices=CSV_BACKENDS,
+        default="auto",
+        help="CSV parser for the FDC files: pyarrow record batches, or the csv module (auto: pyarrow if installed).",
+    )
+
+
+def add_nutrient_grouping_arguments(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument(
+        "--nutrient-grouping",
+        choices=NUTRIENT_GROUPING_MODES,
+        default="auto",
+        help=(
+            "How food_nutrient.csv rows are grouped per food: auto checks the file first and sorts it only "
+            "if some fdc_id is split over several runs of rows; grouped trusts the file; sort always sorts."
+        ),
+    )
+    parser.add_argument(
+        "--sort-memory-mb",
+        type=float,
+        default=DEFAULT_SORT_MEMORY_BYTES / (1024 * 1024),
+        help="Memory budget for sorting food_nutrient.csv; larger files are spilled to sorted runs on disk.",
+    )
+    parser.add_argument(
+        "--sort-spill-dir",
+        default=None,
+        help="Directory for the sort's spill files (default: the system temp directory).",
+    )
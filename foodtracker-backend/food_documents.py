@@ -0,0 +1,163 @@
+import json
+import math
+from typing import Any, Dict, List, Optional, Sequence
+
+# Served from _source/doc_values with the search hit, never searched on, so they are not indexed.
+MACRO_FIELDS = ("calories", "protein", "carbs", "fat")
+
+# Completion suggestions are ordered by weight; CSV foods get the same 4x preference as in the scored search.
+CSV_FOOD_SUGGEST_WEIGHT = 4
+SUGGEST_WEIGHT = 1
+# Completion weights are integers, so the popularity factor is scaled before rounding.
+SUGGEST_WEIGHT_SCALE = 100
+# The completion field rejects inputs containing these reserved characters.
+_SUGGEST_RESERVED = str.maketrans("", "", "\x00\x1e\x1f")
+
+# One row per food: id, name, brand, isCsvFood, the macros, the popularity score (compute_food_popularity.py)
+# and the default measurement (lowest id wins).
+FOOD_DOCUMENT_SELECT = (
+    "SELECT f.id, f.name, f.brand, f.isCsvFood, f.calories, f.protein, f.carbs, f.fat, p.score, "
+    "m.name, m.weightInGrams "
+    "FROM food f "
+    "LEFT JOIN food_popularity p ON p.foodId = f.id "
+    "LEFT JOIN food_measurement m ON m.id = ("
+    "SELECT MIN(d.id) FROM food_measurement d "
+    "WHERE d.foodId = f.id AND d.isDefault = 1 AND d.isActive = 1"
+    ")"
+)
+
+
+def build_index_payload() -> Dict[str, Any]:
+    return {
+        "settings": {
+            "analysis": {
+                "filter": {
+                    "edge_ngram_filter": {
+                        "type": "edge_ngram",
+                        "min_gram": 1,
+                        "max_gram": 20,
+                    }
+                },
+                "normalizer": {
+                    "lowercase_normalizer": {
+                        "type": "custom",
+                        "filter": ["lowercase"],
+                    }
+                },
+                "analyzer": {
+                    "name_prefix_analyzer": {
+                        "type": "custom",
+                        "tokenizer": "standard",
+                        "filter": ["lowercase", "edge_ngram_filter"],
+                    },
+                    "name_prefix_search": {
+                        "type": "custom",
+                        "tokenizer": "standard",
+                        "filter": ["lowercase"],
+                    },
+                },
+            }
+        },
+        "mappings": {
+            "properties": {
+                "name": {
+                    "type": "text",
+                    "fields": {
+                        "keyword": {
+                            "type": "keyword",
+                            "normalizer": "lowercase_normalizer",
+                        },
+                        "prefix": {
+                            "type": "text",
+                            "analyzer": "name_prefix_analyzer",
+                            "search_analyzer": "name_prefix_search",
+                        },
+                    },
+                },
+                "brand": {
+                    "type": "text",
+                    "fields": {
+                        "keyword": {
+                            "type": "keyword",
+                            "normalizer": "lowercase_normalizer",
+                        },
+                    },
+                },
+                "isCsvFood": {
+                    "type": "boolean",
+                },
+                "popularity": {
+                    "type": "rank_feature",
+                },
+                "suggest": {
+                    "type": "completion",
+                    "analyzer": "simple",
+                    "max_input_length": 50,
+                },
+                **{field: {"type": "float", "index": False} for field in MACRO_FIELDS},
+                "defaultMeasurement": {
+                    "properties": {
+                        "name": {"type": "keyword", "index": False},
+                        "weightInGrams": {"type": "float", "index": False},
+                    },
+                },
+            }
+        },
+    }
+
+
+def _number(value: Any) -> str:
+    # MySQL returns DECIMAL columns as Decimal, which json.dumps does not accept.
+    return "null" if value is None else repr(float(value))
+
+
+def suggest_inputs(name: Optional[str], brand: Optional[str]) -> List[str]:
+    """Completion inputs for a food: its name, plus "<brand> <name>" so typing the brand also finds it."""
+    name = (name or "").translate(_SUGGEST_RESERVED).strip()
+    brand = (brand or "").translate(_SUGGEST_RESERVED).strip()
+    inputs = [name] if name else []
+    if brand and name:
+        inputs.append(f"{brand} {name}")
+    return inputs
+
+
+def suggest_weight(is_csv_food: Any, popularity: Optional[float]) -> int:
+    """Completion weight: the CSV preference times ``1 + log1p(popularity)``, matching suggestWeight() in the API.
+
+    Short queries are answered by the suggester alone, so popularity has to reach them through the weight.
+    """
+    base = CSV_FOOD_SUGGEST_WEIGHT if is_csv_food else SUGGEST_WEIGHT
+    score = max(float(popularity or 0), 0.0)
+    return int(round(base * SUGGEST_WEIGHT_SCALE * (1 + math.log1p(score))))
+
+
+def food_document_json(row: Sequence[Any]) -> str:
+    """Serialize one ``FOOD_DOCUMENT_SELECT`` row (without its id) as the food's bulk document line."""
+    (
+        name, brand, is_csv_food, calories, protein, carbs, fat, popularity, measurement_name, measurement_grams,
+    ) = row
+    if measurement_name is None:
+        measurement = "null"
+    else:
+        measurement = '{"name":%s,"weightInGrams":%s}' % (json.dumps(measurement_name), _number(measurement_grams))
+    inputs = suggest_inputs(name, brand)
+    if inputs:
+        suggest = '{"input":%s,"weight":%d}' % (json.dumps(inputs), suggest_weight(is_csv_food, popularity))
+    else:
+        suggest = "null"
+    return (
+        '{"name":%s,"brand":%s,"isCsvFood":%s,"suggest":%s,"calories":%s,"protein":%s,"carbs":%s,"fat":%s,'
+        '"popularity":%s,"defaultMeasurement":%s}'
+        % (
+            json.dumps(name),
+            json.dumps(brand),
+            "true" if bool(is_csv_food) else "false",
+            suggest,
+            _number(calories),
+            _number(protein),
+            _number(carbs),
+            _number(fat),
+            _number(popularity),
+            measurement,
+        )
+    )
@@ -0,0 +1,228 @@
+import os
+import re
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Mapping, Optional, Sequence, Tuple
+
+import mysql.connector
+from mysql.connector import pooling
+
+SessionHook = Callable[[Any], None]
+
+SESSION_VARIABLE_RE = re.compile(r"^[A-Za-z_][A-Za-z0-9_]*$")
+# mysql-connector refuses pools outside 1..32 connections.
+MAX_POOL_SIZE = pooling.CNX_POOL_MAXSIZE
+
+
+def load_env_file(env_path: Path) -> None:
+    for line in env_path.read_text(encoding="utf-8").splitlines():
+        stripped = line.strip()
+        if not stripped or stripped.startswith("#") or "=" not in stripped:
+            continue
+        key, raw_value = stripped.split("=", 1)
+        key = key.strip()
+        value = raw_value.strip()
+        if value.startswith(("'", '"')) and value.endswith(("'", '"')) and len(value) >= 2:
+            value = value[1:-1]
+        os.environ.setdefault(key, value)
+
+
+def load_db_config(env_file_path: Optional[str] = None, autocommit: bool = False) -> Dict[str, Any]:
+    if env_file_path:
+        env_path = Path(env_file_path)
+    else:
+        env_path = Path(__file__).with_name(".env")
+
+    if env_path.exists():
+        load_env_file(env_path)
+
+    host = os.getenv("DB_HOST")
+    port = os.getenv("DB_PORT", "3306")
+    user = os.getenv("DB_USER")
+    password = os.getenv("DB_PASSWORD")
+    database = os.getenv("DB_NAME")
+
+    missing = [
+        key
+        for key, value in {
+            "DB_HOST": host,
+            "DB_USER": user,
+            "DB_PASSWORD": password,
+            "DB_NAME": database,
+        }.items()
+        if not value
+    ]
+
+    if missing:
+        raise ValueError(
+            f"Missing required DB settings: {', '.join(missing)}. "
+            f"Set them in environment or {env_path}."
+        )
+
+    try:
+        parsed_port = int(port)
+    except ValueError as exc:
+        raise ValueError(f"Invalid DB_PORT value: {port}") from exc
+
+    return {
+        "host": host,
+        "port": parsed_port,
+        "user": user,
+        "password": password,
+        "database": database,
+        "autocommit": autocommit,
+    }
+
+
+def session_settings_hook(settings: Mapping[str, Any]) -> SessionHook:
+    """Build a hook that applies ``SET SESSION name = value`` for each setting."""
+    for name in settings:
+        if not SESSION_VARIABLE_RE.match(name):
+            raise ValueError(f"Invalid session variable name: {name}")
+
+    def apply(conn: Any) -> None:
+        if not settings:
+            return
+        assignments = ", ".join(f"{name} = %s" for name in settings)
+        cursor = conn.cursor()
+        try:
+            cursor.execute(f"SET SESSION {assignments}", tuple(settings.values()))
+        finally:
+            cursor.close()
+
+    return apply
+
+
+class ConnectionFactory:
+    """Hands out pooled connections with the registered session hooks applied.
+
+    The pool resets session state when a connection is returned, so hooks run again on every
+    checkout and a connection never leaks settings (or prepared statements) into the next user.
+    """
+
+    def __init__(
+        self,
+        db_config: Dict[str, Any],
+        pool_size: int = 4,
+        session_hooks: Iterable[SessionHook] = (),
+        pool_name: str = "foodtracker-import",
+    ) -> None:
+        self.db_config = dict(db_config)
+        self.pool_size = min(max(pool_size, 1), MAX_POOL_SIZE)
+        self.pool_name = pool_name
+        self.session_hooks: List[SessionHook] = list(session_hooks)
+        self._pool: Optional[pooling.MySQLConnectionPool] = None
+
+    def add_session_hook(self, hook: SessionHook) -> None:
+        self.session_hooks.append(hook)
+
+    def connect(self) -> Any:
+        if self._pool is None:
+            self._pool = pooling.MySQLConnectionPool(
+                pool_name=self.pool_name,
+                pool_size=self.pool_size,
+                pool_reset_session=True,
+                **self.db_config,
+            )
+        conn = self._pool.get_connection()
+        try:
+            for hook in self.session_hooks:
+                hook(conn)
+        except Exception:
+            conn.close()
+            raise
+        return conn
+
+
+def connect_once(db_config: Dict[str, Any], session_hooks: Iterable[SessionHook] = ()) -> Any:
+    """A plain, unpooled connection for one-off queries and per-process workers.
+
+    Closing it closes the socket; a throwaway pool would only take the connection back and be dropped.
+    """
+    conn = mysql.connector.connect(**db_config)
+    try:
+        for hook in session_hooks:
+            hook(conn)
+    except Exception:
+        conn.close()
+        raise
+    return conn
+
+
+def split_id_ranges(db_config: Dict[str, Any], parts: int, table: str = "food") -> List[Tuple[int, int]]:
+    """Split ``table``'s id span into about ``parts`` ranges for keyset paging.
+
+    Ranges are (exclusive lower bound, inclusive upper bound).
+    """
+    conn = connect_once(db_config)
+    cursor = conn.cursor()
+    try:
+        cursor.execute(f"SELECT MIN(id), MAX(id) FROM {table}")
+        min_id, max_id = cursor.fetchone()
+    finally:
+        cursor.close()
+        conn.close()
+
+    return split_id_span(min_id, max_id, parts)
+
+
+def split_id_span(min_id: Optional[int], max_id: Optional[int], parts: int) -> List[Tuple[int, int]]:
+    """Split ``[min_id, max_id]`` into about ``parts`` (exclusive lower, inclusive upper) ranges."""
+    if min_id is None or max_id is None:
+        return []
+
+    lower = int(min_id) - 1
+    upper = int(max_id)
+    step = max((upper - lower + parts - 1) // parts, 1)
+    return [(start, min(start + step, upper)) for start in range(lower, upper, step)]
+
+
+def build_food_upsert_sql(columns: Sequence[str]) -> str:
+    placeholders = ", ".join(["%s"] * len(columns))
+    columns_sql = ", ".join(columns)
+    update_sql = ", ".join(f"{column}=VALUES({column})" for column in columns if column != "sourceId")
+    return (
+        f"INSERT INTO food ({columns_sql}) VALUES ({placeholders}) "
+        f"ON DUPLICATE KEY UPDATE id=LAST_INSERT_ID(id), {update_sql}"
+    )
+
+
+class PreparedStatements:
+    """Named SQL statements executed through server-side prepared cursors.
+
+    Each statement keeps its own ``cursor(prepared=True)``, so the server parses it once per
+    connection and every later execute only ships the parameters. Only use this for statements
+    that return no rows; result sets from prepared cursors must be drained before the connection
+    can run anything else.
+    """
+
+    def __init__(self, conn: Any, statements: Optional[Mapping[str, str]] = None) -> None:
+        self.conn = conn
+        self.statements: Dict[str, str] = {}
+        self._cursors: Dict[str, Any] = {}
+        for name, sql in (statements or {}).items():
+            self.register(name, sql)
+
+    def register(self, name: str, sql: str) -> None:
+        existing = self.statements.get(name)
+        if existing is not None and existing != sql:
+            raise ValueError(f"Prepared statement {name!r} is already registered with different SQL.")
+        self.statements[name] = sql
+
+    def execute(self, name: str, params: Sequence[Any]) -> Any:
+        """Execute a registered statement and return its cursor (for rowcount/lastrowid)."""
+        cursor = self._cursors.get(name)
+        if cursor is None:
+            cursor = self._cursors[name] = self.conn.cursor(prepared=True)
+        cursor.execute(self.statements[name], params if isinstance(params, tuple) else tuple(params))
+        return cursor
+
+    def close(self) -> None:
+        for cursor in self._cursors.values():
+            cursor.close()
+        self._cursors.clear()
+
+    def __enter__(self) -> "PreparedStatements":
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.close()
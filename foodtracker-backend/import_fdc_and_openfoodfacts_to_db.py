@@ -1,23 +1,77 @@
 import argparse
-import csv
+import hashlib
 import json
 import os
 import re
 import sqlite3
 import sys
-import tempfile
 import time
 from pathlib import Path
-from typing import Dict, Iterable, List, Optional, Tuple
+from typing import BinaryIO, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
 
 import mysql.connector
 import pandas as pd
 import requests
 from tqdm import tqdm
 
+from barcodes import BarcodeRejectLog, add_barcode_filter_arguments, gtin14
+from batch_sizing import AdaptiveBatchSizer, add_batch_size_arguments
+from compressed_input import FdcSource, open_input
+from dead_letter import DeadLetterWriter, add_dead_letter_arguments
+from fdc_csv import (
+    NUTRIENT_GROUPING_MODES,
+    add_csv_backend_arguments,
+    add_nutrient_grouping_arguments,
+    is_grouped_by_fdc_id,
+    iter_nutrient_groups,
+    iter_rows,
+    iter_sorted_nutrient_groups,
+    resolve_csv_backend,
+)
+from food_documents import FOOD_DOCUMENT_SELECT, build_index_payload, food_document_json
+from foodtracker_db import (
+    ConnectionFactory,
+    PreparedStatements,
+    build_food_upsert_sql,
+    load_db_config,
+    session_settings_hook,
+)
+from import_metrics import ImportMetrics, add_metrics_arguments
+from import_records import (
+    DEFAULT_MEASUREMENTS,
+    FoodPayload,
+    MeasurementRecord,
+    PortionRecord,
+    food_payload_from_dict,
+    food_record_type,
+    portion_record_from_dict,
+)
+from source_mappings import compile_extractor
+from table_indexes import check_integrity, deferrable_indexes, fetch_indexes, index_clause
+
 
 class FdcOpenFoodFactsImporter:
     IMPORT_STAGES = ("fdc", "fdc-portions", "openfoodfacts", "elasticsearch")
+    INITIAL_LOAD_TABLES = ("food", "food_measurement", "food_barcode")
+    # Bump when the lookup schema or population changes so cached builds are not reused.
+    LOOKUP_DB_VERSION = 1
+    LOOKUP_DB_SOURCES = ("food.csv", "branded_food.csv")
+    BRANDED_COLUMNS = (
+        "fdc_id",
+        "brand_owner",
+        "brand_name",
+        "gtin_upc",
+        "serving_size",
+        "serving_size_unit",
+        "household_serving_fulltext",
+    )
+    PORTION_COLUMNS = ("fdc_id", "measure_unit_id", "amount", "modifier", "portion_description", "gram_weight")
+    FOOD_MATCH_INDEX = {
+        "table": "food",
+        "name": "idx_food_name_calories",
+        "type": "BTREE",
+        "columns": [{"name": "name", "sub_part": None}, {"name": "calories", "sub_part": None}],
+    }
     FOOD_COLUMNS = [
         "sourceId",
         "isCsvFood",
@@ -89,6 +143,7 @@ class FdcOpenFoodFactsImporter:
         "lycopene",
         "luteinZeaxanthin",
     ]
+    FoodRecord = food_record_type("FdcFoodRecord", FOOD_COLUMNS)
 
     def __init__(
         self,
@@ -104,11 +159,26 @@ class FdcOpenFoodFactsImporter:
         es_index: str = "foods",
         skip_es_reindex: bool = False,
         drop_elasticsearch_db: bool = False,
+        initial_load: bool = False,
+        initial_load_state: Optional[Path] = None,
+        lookup_cache_dir: Optional[Path] = None,
+        rebuild_lookup_cache: bool = False,
+        csv_backend: str = "auto",
+        nutrient_grouping: str = "auto",
+        sort_memory_mb: float = 512,
+        sort_spill_dir: Optional[Path] = None,
+        metrics: Optional[ImportMetrics] = None,
+        batch_sizer: Optional[AdaptiveBatchSizer] = None,
+        dead_letters: Optional[DeadLetterWriter] = None,
+        barcode_rejects: Optional[BarcodeRejectLog] = None,
     ) -> None:
         self.fdc_dir = fdc_dir
         self.openfoodfacts_csv = openfoodfacts_csv
         self.env_file_path = env_file_path
         self.batch_size = batch_size
+        self.batch_sizer = batch_sizer or AdaptiveBatchSizer(batch_size, target_latency_s=0)
+        self.dead_letters = dead_letters or DeadLetterWriter("import_fdc_and_openfoodfacts_to_db")
+        self.barcode_rejects = barcode_rejects or BarcodeRejectLog("import_fdc_and_openfoodfacts_to_db")
         self.max_foods = max_foods
         self.max_openfoodfacts = max_openfoodfacts
         self.start_at = start_at
@@ -117,75 +187,63 @@ class FdcOpenFoodFactsImporter:
         self.es_index = es_index
         self.skip_es_reindex = skip_es_reindex
         self.drop_elasticsearch_db = drop_elasticsearch_db
+        self.initial_load = initial_load
+        self.initial_load_state = initial_load_state or Path(__file__).with_name(".initial_load_indexes.json")
+        self.lookup_cache_dir = lookup_cache_dir or Path(__file__).with_name(".fdc_lookup_cache")
+        self.rebuild_lookup_cache = rebuild_lookup_cache
+        self.csv_backend = resolve_csv_backend(csv_backend)
+        # pyarrow reads ahead on its own threads; the csv module gets a background decompression thread.
+        self.fdc_source = FdcSource(fdc_dir, read_ahead=self.csv_backend == "csv")
+        if nutrient_grouping not in NUTRIENT_GROUPING_MODES:
+            raise ValueError(f"Unknown nutrient grouping {nutrient_grouping!r}.")
+        self.nutrient_grouping = nutrient_grouping
+        self.sort_memory_bytes = int(max(sort_memory_mb, 1) * 1024 * 1024)
+        self.sort_spill_dir = sort_spill_dir
+        self.metrics = metrics or ImportMetrics("import_fdc_and_openfoodfacts_to_db")
 
         self.success_count = 0
         self.error_count = 0
         self.skipped_count = 0
         self.measurements_added_count = 0
         self.barcodes_added_count = 0
+        # Rows written by the open transaction; added to the counts above once it commits.
+        self._uncommitted_measurements = 0
+        self._uncommitted_barcodes = 0
         self.openfoodfacts_new_count = 0
         self.openfoodfacts_matched_count = 0
 
-        self.db_config = self._load_db_config(env_file_path)
-
-    def _load_db_config(self, env_file_path: Optional[str]) -> Dict[str, object]:
-        if env_file_path:
-            env_path = Path(env_file_path)
-        else:
-            env_path = Path(__file__).with_name(".env")
-
-        if env_path.exists():
-            self._load_env_file(env_path)
-
-        host = os.getenv("DB_HOST")
-        port = os.getenv("DB_PORT", "3306")
-        user = os.getenv("DB_USER")
-        password = os.getenv("DB_PASSWORD")
-        database = os.getenv("DB_NAME")
-
-        missing = [
-            key
-            for key, value in {
-                "DB_HOST": host,
-                "DB_USER": user,
-                "DB_PASSWORD": password,
-                "DB_NAME": database,
-            }.items()
-            if not value
-        ]
-
-        if missing:
-            raise ValueError(
-                f"Missing required DB settings: {', '.join(missing)}. "
-                f"Set them in environment or {env_path}."
-            )
-
-        try:
-            parsed_port = int(port)
-        except ValueError as exc:
-            raise ValueError(f"Invalid DB_PORT value: {port}") from exc
-
-        return {
-            "host": host,
-            "port": parsed_port,
-            "user": user,
-            "password": password,
-            "database": database,
-            "autocommit": False,
+        # OpenFoodFacts columns this importer does not get from the export are stored as 0.
+        self.openfoodfacts_extractor = compile_extractor(
+            "openfoodfacts",
+            self.FoodRecord,
+            fill=0.0,
+            conversions={"food_name": self._standardize_food_name},
+        )
+        self.extract_openfoodfacts_food = self.openfoodfacts_extractor.extract
+        self.db_config = load_db_config(env_file_path)
+        self.connections = ConnectionFactory(self.db_config)
+        if initial_load:
+            # Foreign key checks stay off for every connection until the integrity check passes.
+            # unique_checks stays on: the upserts resolve duplicates through the unique keys, and with
+            # it off InnoDB may buffer secondary unique inserts unchecked, so ON DUPLICATE KEY UPDATE
+            # could insert a second food.sourceId or food_barcode.barcode instead of updating.
+            self.connections.add_session_hook(session_settings_hook({"foreign_key_checks": 0}))
+        self.statement_sql = {
+            "food_upsert": build_food_upsert_sql(self.FOOD_COLUMNS),
+            "measurement_insert": (
+                "INSERT INTO food_measurement "
+                "(foodId, unit, name, abbreviation, weightInGrams, isDefault, isActive, isFromSource) "
+                "SELECT %s, %s, %s, %s, %s, %s, %s, %s "
+                "FROM DUAL WHERE NOT EXISTS ("
+                "SELECT 1 FROM food_measurement WHERE foodId = %s AND abbreviation = %s"
+                ")"
+            ),
+            "barcode_upsert": (
+                "INSERT INTO food_barcode (barcode, gtin, foodId) VALUES (%s, %s, %s) "
+                "ON DUPLICATE KEY UPDATE foodId=VALUES(foodId), gtin=VALUES(gtin)"
+            ),
         }
 
-    def _load_env_file(self, env_path: Path) -> None:
-        for line in env_path.read_text(encoding="utf-8").splitlines():
-            stripped = line.strip()
-            if not stripped or stripped.startswith("#") or "=" not in stripped:
-                continue
-            key, raw_value = stripped.split("=", 1)
-            key = key.strip()
-            value = raw_value.strip()
-            if value.startswith(("'", '"')) and value.endswith(("'", '"')) and len(value) >= 2:
-                value = value[1:-1]
-            os.environ.setdefault(key, value)
-
     def _clean_string(self, value) -> Optional[str]:
         if value is None or (isinstance(value, float) and pd.isna(value)):
             return None
@@ -254,89 +312,160 @@ class FdcOpenFoodFactsImporter:
                 + ", ".join(missing_columns)
             )
 
-    def _insert_or_update_food(self, cursor: mysql.connector.cursor.MySQLCursor, food: Dict) -> int:
-        placeholders = ", ".join(["%s"] * len(self.FOOD_COLUMNS))
-        columns_sql = ", ".join(self.FOOD_COLUMNS)
-        update_columns = [column for column in self.FOOD_COLUMNS if column != "sourceId"]
-        update_sql = ", ".join([f"{column}=VALUES({column})" for column in update_columns])
-
-        sql = (
-            f"INSERT INTO food ({columns_sql}) VALUES ({placeholders}) "
-            f"ON DUPLICATE KEY UPDATE id=LAST_INSERT_ID(id), {update_sql}"
-        )
-
-        values = [food.get(column) for column in self.FOOD_COLUMNS]
-        cursor.execute(sql, values)
+    def _insert_or_update_food(self, statements: PreparedStatements, food: tuple) -> int:
+        with self.metrics.timer("food_upsert"):
+            cursor = statements.execute("food_upsert", food)
         return int(cursor.lastrowid)
 
     def _ensure_measurements(
         self,
-        cursor: mysql.connector.cursor.MySQLCursor,
+        statements: PreparedStatements,
         food_id: int,
-        measurements: List[Dict],
+        measurements: Sequence[MeasurementRecord],
     ) -> None:
-        sql = (
-            "INSERT INTO food_measurement "
-            "(foodId, unit, name, abbreviation, weightInGrams, isDefault, isActive, isFromSource) "
-            "SELECT %s, %s, %s, %s, %s, %s, %s, %s "
-            "FROM DUAL WHERE NOT EXISTS ("
-            "SELECT 1 FROM food_measurement WHERE foodId = %s AND abbreviation = %s"
-            ")"
-        )
-
-        for measurement in measurements:
-            abbreviation = measurement["abbreviation"]
-            cursor.execute(
-                sql,
-                (
-                    food_id,
-                    measurement["unit"],
-                    measurement["name"],
-                    abbreviation,
-                    measurement["weightInGrams"],
-                    1 if measurement.get("isDefault") else 0,
-                    1,
-                    1 if measurement.get("isFromSource") else 0,
-                    food_id,
-                    abbreviation,
-                ),
-            )
-            self.measurements_added_count += 1
+        with self.metrics.timer("measurement_write"):
+            for measurement in measurements:
+                cursor = statements.execute(
+                    "measurement_insert",
+                    (
+                        food_id,
+                        measurement.unit,
+                        measurement.name,
+                        measurement.abbreviation,
+                        measurement.weightInGrams,
+                        1 if measurement.isDefault else 0,
+                        1,
+                        1 if measurement.isFromSource else 0,
+                        food_id,
+                        measurement.abbreviation,
+                    ),
+                )
+                self._uncommitted_measurements += max(cursor.rowcount, 0)
 
     def _insert_or_update_barcode(
         self,
-        cursor: mysql.connector.cursor.MySQLCursor,
+        statements: PreparedStatements,
         barcode: str,
         food_id: int,
     ) -> None:
-        sql = (
-            "INSERT INTO food_barcode (barcode, foodId) VALUES (%s, %s) "
-            "ON DUPLICATE KEY UPDATE foodId=VALUES(foodId)"
-        )
-        cursor.execute(sql, (barcode, food_id))
-        self.barcodes_added_count += 1
-
-    def _build_default_measurements(self) -> List[Dict]:
-        return [
-            {
-                "name": "100 grams",
-                "abbreviation": "100g",
-                "unit": "g",
-                "weightInGrams": 100.0,
-                "isDefault": True,
-                "isFromSource": True,
-            },
-            {
-                "name": "1 gram",
-                "abbreviation": "1g",
-                "unit": "g",
-                "weightInGrams": 1.0,
-                "isDefault": False,
-                "isFromSource": True,
-            },
-        ]
+        with self.metrics.timer("barcode_write"):
+            statements.execute("barcode_upsert", (barcode, gtin14(barcode), food_id))
+        self._uncommitted_barcodes += 1
 
-    def _build_portion_measurement(self, portion: Dict, unit_name: str) -> Optional[Dict]:
+    def _write_isolating_failures(
+        self,
+        conn: mysql.connector.MySQLConnection,
+        items: List[tuple],
+        write_item: Callable[[tuple], str],
+        stage: str,
+        on_commit: Optional[Callable[[], None]] = None,
+        on_rollback: Optional[Callable[[], None]] = None,
+    ) -> Tuple[List[str], int]:
+        """Commit ``items``; on failure retry each half until the failing items are isolated.
+
+        Returns the outcomes ``write_item`` reported for committed items and the number of items
+        sent to the dead-letter file.
+        """
+        self._uncommitted_measurements = 0
+        self._uncommitted_barcodes = 0
+        try:
+            outcomes = [write_item(item) for item in items]
+            self.metrics.commit(conn)
+        except mysql.connector.Error as exc:
+            conn.rollback()
+            if on_rollback:
+                on_rollback()
+            if len(items) == 1:
+                self.dead_letters.write(items[0], exc, stage=stage)
+                return [], 1
+            middle = len(items) // 2
+            left_outcomes, left_failed = self._write_isolating_failures(
+                conn, items[:middle], write_item, stage, on_commit, on_rollback
+            )
+            right_outcomes, right_failed = self._write_isolating_failures(
+                conn, items[middle:], write_item, stage, on_commit, on_rollback
+            )
+            return left_outcomes + right_outcomes, left_failed + right_failed
+        self.measurements_added_count += self._uncommitted_measurements
+        self.barcodes_added_count += self._uncommitted_barcodes
+        if on_commit:
+            on_commit()
+        return outcomes, 0
+
+    def _flush_pending(
+        self,
+        conn: mysql.connector.MySQLConnection,
+        pending: List[tuple],
+        write_item: Callable[[tuple], str],
+        stage: str,
+        on_commit: Optional[Callable[[], None]] = None,
+        on_rollback: Optional[Callable[[], None]] = None,
+    ) -> List[str]:
+        started = time.perf_counter()
+        outcomes, failed = self._write_isolating_failures(
+            conn, pending, write_item, stage, on_commit, on_rollback
+        )
+        self.batch_sizer.observe(len(pending), time.perf_counter() - started)
+        self.error_count += failed
+        pending.clear()
+        return outcomes
+
+    def _write_fdc_portion(self, statements: PreparedStatements, item: PortionRecord) -> str:
+        self._ensure_measurements(statements, item.foodId, (item.measurement,))
+        return "written"
+
+    def _openfoodfacts_writer(
+        self, statements: PreparedStatements, food_match_lookup: Dict[Tuple[str, int], int]
+    ) -> Tuple[Callable[[FoodPayload], str], Callable[[], None], Callable[[], None]]:
+        """Build the (write, on_commit, on_rollback) callbacks for OpenFoodFacts payloads.
+
+        New foods are added to ``food_match_lookup`` as they are inserted so later rows match them;
+        the rollback callback forgets the ones inserted by the open transaction again.
+        """
+        match_cache: Dict[Tuple[str, int], Optional[int]] = {}
+        uncommitted_keys: List[Tuple[str, int]] = []
+
+        def write_payload(payload: FoodPayload) -> str:
+            food = payload.food
+            barcode = payload.barcode
+            match_key = (food.name.lower(), int(food.calories))
+
+            food_id = match_cache.get(match_key)
+            if food_id is None:
+                food_id = food_match_lookup.get(match_key, 0)
+                match_cache[match_key] = food_id
+                if len(match_cache) > 50000:
+                    match_cache.clear()
+
+            if food_id:
+                self._ensure_measurements(statements, food_id, payload.measurements)
+                self._insert_or_update_barcode(statements, barcode, food_id)
+                return "matched"
+
+            new_food_id = self._insert_or_update_food(statements, food)
+            self._ensure_measurements(statements, new_food_id, payload.measurements)
+            self._insert_or_update_barcode(statements, barcode, new_food_id)
+            food_match_lookup[match_key] = new_food_id
+            match_cache[match_key] = new_food_id
+            uncommitted_keys.append(match_key)
+            return "new"
+
+        def forget_uncommitted() -> None:
+            for key in uncommitted_keys:
+                food_match_lookup.pop(key, None)
+                match_cache.pop(key, None)
+            uncommitted_keys.clear()
+
+        return write_payload, uncommitted_keys.clear, forget_uncommitted
+
+    def _write_fdc_food(self, statements: PreparedStatements, item: FoodPayload) -> str:
+        food_id = self._insert_or_update_food(statements, item.food)
+        self._ensure_measurements(statements, food_id, item.measurements)
+        if item.barcode:
+            self._insert_or_update_barcode(statements, item.barcode, food_id)
+        return "written"
+
+    def _build_portion_measurement(self, portion: Dict, unit_name: str) -> Optional[MeasurementRecord]:
         gram_weight = self._clean_numeric(portion.get("gram_weight"))
         if gram_weight <= 0:
             return None
@@ -351,16 +480,7 @@ class FdcOpenFoodFactsImporter:
             parts = [str(amount) if amount else "", modifier, unit_name]
             name = " ".join([part for part in parts if part]).strip() or unit_name
 
-        abbreviation = self._create_abbreviation(name)
-
-        return {
-            "name": name,
-            "abbreviation": abbreviation,
-            "unit": unit_name,
-            "weightInGrams": gram_weight,
-            "isDefault": False,
-            "isFromSource": True,
-        }
+        return MeasurementRecord(name, self._create_abbreviation(name), unit_name, gram_weight)
 
     def _parse_serving_grams(self, value: Optional[str]) -> Optional[float]:
         if not value:
@@ -373,20 +493,15 @@ class FdcOpenFoodFactsImporter:
         except ValueError:
             return None
 
-    def _load_nutrient_lookup(self, path: Path) -> Dict[str, List[Tuple[int, str]]]:
+    def _load_nutrient_lookup(self, stream: BinaryIO) -> Dict[str, List[Tuple[int, str]]]:
         lookup: Dict[str, List[Tuple[int, str]]] = {}
-        with path.open(newline="", encoding="utf-8") as handle:
-            reader = csv.DictReader(handle)
-            for row in reader:
-                name = row.get("name")
-                nutrient_id = row.get("id")
-                unit_name = row.get("unit_name")
-                if not name or not nutrient_id or not unit_name:
-                    continue
-                try:
-                    lookup.setdefault(name, []).append((int(nutrient_id), unit_name))
-                except ValueError:
-                    continue
+        for nutrient_id, name, unit_name in iter_rows(stream, ("id", "name", "unit_name"), self.csv_backend):
+            if not name or not nutrient_id or not unit_name:
+                continue
+            try:
+                lookup.setdefault(name, []).append((int(nutrient_id), unit_name))
+            except ValueError:
+                continue
         return lookup
 
     def _fdc_nutrient_ids(
@@ -548,130 +663,134 @@ class FdcOpenFoodFactsImporter:
             "vitaminK": first_amount(nutrient_ids["vitamin_k"]),
         }
 
-    def _iter_fdc_nutrients(self, path: Path) -> Iterable[Tuple[str, Dict[int, float]]]:
-        with path.open(newline="", encoding="utf-8") as handle:
-            reader = csv.DictReader(handle)
-            current_fdc: Optional[str] = None
-            nutrients: Dict[int, float] = {}
-            for row in reader:
-                fdc_id = row.get("fdc_id")
-                nutrient_id = row.get("nutrient_id")
-                if not fdc_id or not nutrient_id:
-                    continue
-                if current_fdc is None:
-                    current_fdc = fdc_id
-                if fdc_id != current_fdc:
-                    yield current_fdc, nutrients
-                    nutrients = {}
-                    current_fdc = fdc_id
-                try:
-                    nutrient_key = int(nutrient_id)
-                except ValueError:
-                    continue
-                amount = self._clean_numeric(row.get("amount"))
-                nutrients[nutrient_key] = amount
-            if current_fdc is not None:
-                yield current_fdc, nutrients
+    def _iter_fdc_nutrients(self) -> Iterable[Tuple[str, Dict[int, float]]]:
+        """food_nutrient.csv grouped per food, sorted by fdc_id first when the file is not grouped.
+
+        A food split over several runs of rows would otherwise be upserted once per run, each time
+        with only part of its nutrients.
+        """
+        name = "food_nutrient.csv"
+        grouped = self.nutrient_grouping == "grouped"
+        if self.nutrient_grouping == "auto":
+            with self.metrics.timer("nutrient_group_check"):
+                grouped = is_grouped_by_fdc_id(self.fdc_source.open(name), self.csv_backend)
+            if not grouped:
+                print(f"{self.fdc_source.describe(name)} is not grouped by fdc_id; sorting it first.")
+        if grouped:
+            return iter_nutrient_groups(self.fdc_source.open(name), self.csv_backend, self._clean_numeric)
+        return iter_sorted_nutrient_groups(
+            self.fdc_source.open(name),
+            self.csv_backend,
+            self._clean_numeric,
+            memory_bytes=self.sort_memory_bytes,
+            spill_dir=self.sort_spill_dir,
+        )
+
+    def _lookup_db_key(self) -> Tuple[str, str]:
+        """(directory key, content key) for the lookup cache, from the source files' sizes and mtimes."""
+        directory = str(self.fdc_dir.resolve())
+        signature = [f"v{self.LOOKUP_DB_VERSION}"]
+        signature.extend(self.fdc_source.signature(name) for name in self.LOOKUP_DB_SOURCES)
+        directory_key = hashlib.sha1(directory.encode("utf-8")).hexdigest()[:12]
+        content_key = hashlib.sha1("|".join(signature).encode("utf-8")).hexdigest()[:16]
+        return directory_key, content_key
 
     def _build_lookup_db(self) -> Path:
-        tmp_file = tempfile.NamedTemporaryFile(prefix="fdc_lookup_", suffix=".sqlite", delete=False)
-        tmp_file.close()
-        db_path = Path(tmp_file.name)
-        conn = sqlite3.connect(db_path)
-        conn.execute(
-            "CREATE TABLE food_meta (fdc_id TEXT PRIMARY KEY, description TEXT, data_type TEXT)"
-        )
-        conn.execute(
-            "CREATE TABLE branded_meta ("
-            "fdc_id TEXT PRIMARY KEY, "
-            "brand_owner TEXT, "
-            "brand_name TEXT, "
-            "gtin_upc TEXT, "
-            "serving_size REAL, "
-            "serving_size_unit TEXT, "
-            "household_serving_fulltext TEXT"
-            ")"
-        )
-        conn.commit()
+        """Return the FDC lookup database, reusing the cached build while its source files are unchanged."""
+        directory_key, content_key = self._lookup_db_key()
+        db_path = self.lookup_cache_dir / f"fdc_lookup_{directory_key}_{content_key}.sqlite"
+        if db_path.exists() and not self.rebuild_lookup_cache:
+            print(f"Reusing FDC lookup database {db_path}")
+            return db_path
+
+        self.lookup_cache_dir.mkdir(parents=True, exist_ok=True)
+        for stale in self.lookup_cache_dir.glob(f"fdc_lookup_{directory_key}_*.sqlite*"):
+            stale.unlink()
+
+        print(f"Building FDC lookup database {db_path}...")
+        # Built under a temporary name so an interrupted build is never mistaken for a finished one.
+        build_path = db_path.with_name(db_path.name + ".building")
+        with self.metrics.timer("lookup_db_build"):
+            conn = sqlite3.connect(build_path, isolation_level=None)
+            try:
+                # The file is a disposable cache: no rollback journal, no fsyncs.
+                conn.execute("PRAGMA journal_mode=OFF")
+                conn.execute("PRAGMA synchronous=OFF")
+                conn.execute("PRAGMA temp_store=MEMORY")
+                conn.execute("PRAGMA cache_size=-200000")
+                conn.execute("BEGIN")
+                conn.execute("CREATE TABLE food_meta (fdc_id TEXT, description TEXT, data_type TEXT)")
+                conn.execute(
+                    "CREATE TABLE branded_meta ("
+                    "fdc_id TEXT, "
+                    "brand_owner TEXT, "
+                    "brand_name TEXT, "
+                    "gtin_upc TEXT, "
+                    "serving_size REAL, "
+                    "serving_size_unit TEXT, "
+                    "household_serving_fulltext TEXT"
+                    ")"
+                )
 
-        self._populate_food_meta(conn)
-        self._populate_branded_meta(conn)
+                self._populate_food_meta(conn)
+                self._populate_branded_meta(conn)
 
-        conn.commit()
-        conn.close()
+                # Indexes are built once over the loaded rows instead of maintained per insert. The
+                # last row wins for a repeated fdc_id, as INSERT OR REPLACE did before.
+                for table in ("food_meta", "branded_meta"):
+                    conn.execute(
+                        f"DELETE FROM {table} WHERE rowid NOT IN "
+                        f"(SELECT MAX(rowid) FROM {table} GROUP BY fdc_id)"
+                    )
+                    conn.execute(f"CREATE UNIQUE INDEX idx_{table}_fdc_id ON {table} (fdc_id)")
+                conn.execute("COMMIT")
+                conn.execute("ANALYZE")
+            finally:
+                conn.close()
+        os.replace(build_path, db_path)
         return db_path
 
     def _populate_food_meta(self, conn: sqlite3.Connection) -> None:
-        path = self.fdc_dir / "food.csv"
-        with path.open(newline="", encoding="utf-8") as handle:
-            reader = csv.DictReader(handle)
-            rows = []
-            for row in reader:
-                fdc_id = row.get("fdc_id")
-                description = row.get("description")
-                data_type = row.get("data_type")
-                if not fdc_id or not description:
-                    continue
-                rows.append((fdc_id, description, data_type))
-                if len(rows) >= 5000:
-                    conn.executemany(
-                        "INSERT OR REPLACE INTO food_meta (fdc_id, description, data_type) "
-                        "VALUES (?, ?, ?)",
-                        rows,
-                    )
-                    rows = []
-            if rows:
-                conn.executemany(
-                    "INSERT OR REPLACE INTO food_meta (fdc_id, description, data_type) "
-                    "VALUES (?, ?, ?)",
-                    rows,
-                )
+        stream = self.fdc_source.open("food.csv")
+        conn.executemany(
+            "INSERT INTO food_meta (fdc_id, description, data_type) VALUES (?, ?, ?)",
+            (
+                row
+                for row in iter_rows(stream, ("fdc_id", "description", "data_type"), self.csv_backend)
+                if row[0] and row[1]
+            ),
+        )
 
     def _populate_branded_meta(self, conn: sqlite3.Connection) -> None:
-        path = self.fdc_dir / "branded_food.csv"
-        if not path.exists():
+        if not self.fdc_source.exists("branded_food.csv"):
             return
-        with path.open(newline="", encoding="utf-8") as handle:
-            reader = csv.DictReader(handle)
-            rows = []
-            for row in reader:
-                fdc_id = row.get("fdc_id")
-                if not fdc_id:
-                    continue
-                brand_owner = self._clean_string(row.get("brand_owner"))
-                brand_name = self._clean_string(row.get("brand_name"))
-                gtin_upc = self._clean_string(row.get("gtin_upc"))
-                serving_size = self._clean_numeric(row.get("serving_size"))
-                serving_size_unit = self._clean_string(row.get("serving_size_unit"))
-                household_serving = self._clean_string(row.get("household_serving_fulltext"))
-                rows.append(
-                    (
-                        fdc_id,
-                        brand_owner,
-                        brand_name,
-                        gtin_upc,
-                        serving_size,
-                        serving_size_unit,
-                        household_serving,
-                    )
-                )
-                if len(rows) >= 5000:
-                    conn.executemany(
-                        "INSERT OR REPLACE INTO branded_meta "
-                        "(fdc_id, brand_owner, brand_name, gtin_upc, serving_size, "
-                        "serving_size_unit, household_serving_fulltext) "
-                        "VALUES (?, ?, ?, ?, ?, ?, ?)",
-                        rows,
-                    )
-                    rows = []
-            if rows:
-                conn.executemany(
-                    "INSERT OR REPLACE INTO branded_meta "
-                    "(fdc_id, brand_owner, brand_name, gtin_upc, serving_size, "
-                    "serving_size_unit, household_serving_fulltext) "
-                    "VALUES (?, ?, ?, ?, ?, ?, ?)",
-                    rows,
+        conn.executemany(
+            "INSERT INTO branded_meta "
+            "(fdc_id, brand_owner, brand_name, gtin_upc, serving_size, "
+            "serving_size_unit, household_serving_fulltext) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (
+                (
+                    fdc_id,
+                    self._clean_string(brand_owner),
+                    self._clean_string(brand_name),
+                    self._clean_string(gtin_upc),
+                    self._clean_numeric(serving_size),
+                    self._clean_string(serving_size_unit),
+                    self._clean_string(household_serving),
                 )
+                for (
+                    fdc_id,
+                    brand_owner,
+                    brand_name,
+                    gtin_upc,
+                    serving_size,
+                    serving_size_unit,
+                    household_serving,
+                ) in iter_rows(self.fdc_source.open("branded_food.csv"), self.BRANDED_COLUMNS, self.csv_backend)
+                if fdc_id
+            ),
+        )
 
     def _lookup_food_meta(self, conn: sqlite3.Connection, fdc_id: str) -> Optional[Tuple[str, str]]:
         cursor = conn.execute(
@@ -698,102 +817,110 @@ class FdcOpenFoodFactsImporter:
         name: str,
         brand: Optional[str],
         nutrient_values: Dict[str, float],
-    ) -> Dict[str, object]:
-        base: Dict[str, object] = {
-            "sourceId": fdc_id,
-            "isCsvFood": True,
-            "name": name,
-            "brand": brand,
-            "calories": int(nutrient_values.get("calories", 0)),
-            "protein": nutrient_values.get("protein", 0.0),
-            "carbs": nutrient_values.get("carbs", 0.0),
-            "fat": nutrient_values.get("fat", 0.0),
-            "fiber": nutrient_values.get("fiber", 0.0),
-            "sugar": nutrient_values.get("sugar", 0.0),
-            "sodium": nutrient_values.get("sodium", 0.0),
-            "saturatedFat": nutrient_values.get("saturatedFat", 0.0),
-            "transFat": nutrient_values.get("transFat", 0.0),
-            "cholesterol": nutrient_values.get("cholesterol", 0.0),
-            "addedSugar": nutrient_values.get("addedSugar", 0.0),
-            "netCarbs": 0.0,
-            "solubleFiber": nutrient_values.get("solubleFiber", 0.0),
-            "insolubleFiber": nutrient_values.get("insolubleFiber", 0.0),
-            "water": nutrient_values.get("water", 0.0),
-            "pralScore": 0.0,
-            "omega3": 0.0,
-            "omega6": 0.0,
-            "monoFat": nutrient_values.get("monoFat", 0.0),
-            "polyFat": nutrient_values.get("polyFat", 0.0),
-            "ala": 0.0,
-            "epa": 0.0,
-            "dpa": 0.0,
-            "dha": 0.0,
-            "calcium": nutrient_values.get("calcium", 0.0),
-            "iron": nutrient_values.get("iron", 0.0),
-            "potassium": nutrient_values.get("potassium", 0.0),
-            "magnesium": nutrient_values.get("magnesium", 0.0),
-            "vitaminAiu": nutrient_values.get("vitaminAiu", 0.0),
-            "vitaminArae": nutrient_values.get("vitaminArae", 0.0),
-            "vitaminC": nutrient_values.get("vitaminC", 0.0),
-            "vitaminB12": nutrient_values.get("vitaminB12", 0.0),
-            "vitaminD": nutrient_values.get("vitaminD", 0.0),
-            "vitaminD2": nutrient_values.get("vitaminD2", 0.0),
-            "vitaminD3": nutrient_values.get("vitaminD3", 0.0),
-            "vitaminDiu": nutrient_values.get("vitaminDiu", 0.0),
-            "vitaminE": nutrient_values.get("vitaminE", 0.0),
-            "phosphorus": nutrient_values.get("phosphorus", 0.0),
-            "zinc": nutrient_values.get("zinc", 0.0),
-            "copper": nutrient_values.get("copper", 0.0),
-            "manganese": nutrient_values.get("manganese", 0.0),
-            "selenium": nutrient_values.get("selenium", 0.0),
-            "fluoride": nutrient_values.get("fluoride", 0.0),
-            "molybdenum": nutrient_values.get("molybdenum", 0.0),
-            "chlorine": 0.0,
-            "vitaminB1": nutrient_values.get("vitaminB1", 0.0),
-            "vitaminB2": nutrient_values.get("vitaminB2", 0.0),
-            "vitaminB3": nutrient_values.get("vitaminB3", 0.0),
-            "vitaminB5": nutrient_values.get("vitaminB5", 0.0),
-            "vitaminB6": nutrient_values.get("vitaminB6", 0.0),
-            "biotin": nutrient_values.get("biotin", 0.0),
-            "folate": nutrient_values.get("folate", 0.0),
-            "folicAcid": nutrient_values.get("folicAcid", 0.0),
-            "foodFolate": nutrient_values.get("foodFolate", 0.0),
-            "folateDfe": nutrient_values.get("folateDfe", 0.0),
-            "vitaminK": nutrient_values.get("vitaminK", 0.0),
-            "dihydrophylloquinone": 0.0,
-            "menaquinone4": 0.0,
-            "choline": nutrient_values.get("choline", 0.0),
-            "betaine": nutrient_values.get("betaine", 0.0),
-            "retinol": nutrient_values.get("retinol", 0.0),
-            "caroteneBeta": nutrient_values.get("caroteneBeta", 0.0),
-            "caroteneAlpha": nutrient_values.get("caroteneAlpha", 0.0),
-            "lycopene": nutrient_values.get("lycopene", 0.0),
-            "luteinZeaxanthin": nutrient_values.get("luteinZeaxanthin", 0.0),
-        }
-        return base
+    ) -> tuple:
+        return self.FoodRecord(
+            sourceId=fdc_id,
+            isCsvFood=True,
+            name=name,
+            brand=brand,
+            calories=int(nutrient_values.get("calories", 0)),
+            protein=nutrient_values.get("protein", 0.0),
+            carbs=nutrient_values.get("carbs", 0.0),
+            fat=nutrient_values.get("fat", 0.0),
+            fiber=nutrient_values.get("fiber", 0.0),
+            sugar=nutrient_values.get("sugar", 0.0),
+            sodium=nutrient_values.get("sodium", 0.0),
+            saturatedFat=nutrient_values.get("saturatedFat", 0.0),
+            transFat=nutrient_values.get("transFat", 0.0),
+            cholesterol=nutrient_values.get("cholesterol", 0.0),
+            addedSugar=nutrient_values.get("addedSugar", 0.0),
+            netCarbs=0.0,
+            solubleFiber=nutrient_values.get("solubleFiber", 0.0),
+            insolubleFiber=nutrient_values.get("insolubleFiber", 0.0),
+            water=nutrient_values.get("water", 0.0),
+            pralScore=0.0,
+            omega3=0.0,
+            omega6=0.0,
+            monoFat=nutrient_values.get("monoFat", 0.0),
+            polyFat=nutrient_values.get("polyFat", 0.0),
+            ala=0.0,
+            epa=0.0,
+            dpa=0.0,
+            dha=0.0,
+            calcium=nutrient_values.get("calcium", 0.0),
+            iron=nutrient_values.get("iron", 0.0),
+            potassium=nutrient_values.get("potassium", 0.0),
+            magnesium=nutrient_values.get("magnesium", 0.0),
+            vitaminAiu=nutrient_values.get("vitaminAiu", 0.0),
+            vitaminArae=nutrient_values.get("vitaminArae", 0.0),
+            vitaminC=nutrient_values.get("vitaminC", 0.0),
+            vitaminB12=nutrient_values.get("vitaminB12", 0.0),
+            vitaminD=nutrient_values.get("vitaminD", 0.0),
+            vitaminD2=nutrient_values.get("vitaminD2", 0.0),
+            vitaminD3=nutrient_values.get("vitaminD3", 0.0),
+            vitaminDiu=nutrient_values.get("vitaminDiu", 0.0),
+            vitaminE=nutrient_values.get("vitaminE", 0.0),
+            phosphorus=nutrient_values.get("phosphorus", 0.0),
+            zinc=nutrient_values.get("zinc", 0.0),
+            copper=nutrient_values.get("copper", 0.0),
+            manganese=nutrient_values.get("manganese", 0.0),
+            selenium=nutrient_values.get("selenium", 0.0),
+            fluoride=nutrient_values.get("fluoride", 0.0),
+            molybdenum=nutrient_values.get("molybdenum", 0.0),
+            chlorine=0.0,
+            vitaminB1=nutrient_values.get("vitaminB1", 0.0),
+            vitaminB2=nutrient_values.get("vitaminB2", 0.0),
+            vitaminB3=nutrient_values.get("vitaminB3", 0.0),
+            vitaminB5=nutrient_values.get("vitaminB5", 0.0),
+            vitaminB6=nutrient_values.get("vitaminB6", 0.0),
+            biotin=nutrient_values.get("biotin", 0.0),
+            folate=nutrient_values.get("folate", 0.0),
+            folicAcid=nutrient_values.get("folicAcid", 0.0),
+            foodFolate=nutrient_values.get("foodFolate", 0.0),
+            folateDfe=nutrient_values.get("folateDfe", 0.0),
+            vitaminK=nutrient_values.get("vitaminK", 0.0),
+            dihydrophylloquinone=0.0,
+            menaquinone4=0.0,
+            choline=nutrient_values.get("choline", 0.0),
+            betaine=nutrient_values.get("betaine", 0.0),
+            retinol=nutrient_values.get("retinol", 0.0),
+            caroteneBeta=nutrient_values.get("caroteneBeta", 0.0),
+            caroteneAlpha=nutrient_values.get("caroteneAlpha", 0.0),
+            lycopene=nutrient_values.get("lycopene", 0.0),
+            luteinZeaxanthin=nutrient_values.get("luteinZeaxanthin", 0.0),
+        )
 
     def _run_fdc_import(self, conn: mysql.connector.MySQLConnection, lookup_db: Path) -> None:
         self._validate_food_columns(conn)
-        nutrient_lookup = self._load_nutrient_lookup(self.fdc_dir / "nutrient.csv")
+        nutrient_lookup = self._load_nutrient_lookup(self.fdc_source.open("nutrient.csv"))
         nutrient_ids = self._fdc_nutrient_ids(nutrient_lookup)
 
-        lookup_conn = sqlite3.connect(lookup_db)
-        cursor = conn.cursor()
-        batch_count = 0
+        lookup_conn = sqlite3.connect(lookup_db.resolve().as_uri() + "?mode=ro", uri=True)
+        statements = PreparedStatements(conn, self.statement_sql)
+        pending: List[FoodPayload] = []
         processed = 0
 
+        def flush() -> None:
+            outcomes = self._flush_pending(
+                conn, pending, lambda item: self._write_fdc_food(statements, item), "fdc"
+            )
+            self.success_count += len(outcomes)
+
         for fdc_id, amounts in tqdm(
-            self._iter_fdc_nutrients(self.fdc_dir / "food_nutrient.csv"),
+            self.metrics.timed_iter("parse", self._iter_fdc_nutrients()),
             desc="FDC foods",
         ):
+            transform_started = time.perf_counter()
             meta = self._lookup_food_meta(lookup_conn, fdc_id)
             if not meta:
                 self.skipped_count += 1
+                self.metrics.record("transform", time.perf_counter() - transform_started)
                 continue
             name, _data_type = meta
             name = self._standardize_food_name(name)
             if not name:
                 self.skipped_count += 1
+                self.metrics.record("transform", time.perf_counter() - transform_started)
                 continue
 
             branded = self._lookup_branded_meta(lookup_conn, fdc_id)
@@ -807,14 +934,12 @@ class FdcOpenFoodFactsImporter:
                     barcode = upc
                 if serving_size and serving_unit and serving_unit.lower().startswith("g"):
                     measurement_name = household or f"{serving_size} {serving_unit}"
-                    serving_measurement = {
-                        "name": measurement_name,
-                        "abbreviation": self._create_abbreviation(measurement_name),
-                        "unit": serving_unit,
-                        "weightInGrams": float(serving_size),
-                        "isDefault": False,
-                        "isFromSource": True,
-                    }
+                    serving_measurement = MeasurementRecord(
+                        measurement_name,
+                        self._create_abbreviation(measurement_name),
+                        serving_unit,
+                        float(serving_size),
+                    )
 
             nutrient_values = self._extract_fdc_nutrients(amounts, nutrient_ids)
             food_payload = self._fdc_to_food_payload(
@@ -823,185 +948,88 @@ class FdcOpenFoodFactsImporter:
                 brand=brand,
                 nutrient_values=nutrient_values,
             )
+            measurements = DEFAULT_MEASUREMENTS
+            if serving_measurement:
+                measurements = DEFAULT_MEASUREMENTS + (serving_measurement,)
+            self.metrics.record("transform", time.perf_counter() - transform_started)
 
-            try:
-                food_id = self._insert_or_update_food(cursor, food_payload)
-                self._ensure_measurements(cursor, food_id, self._build_default_measurements())
-                if serving_measurement:
-                    self._ensure_measurements(cursor, food_id, [serving_measurement])
-                if barcode:
-                    self._insert_or_update_barcode(cursor, barcode, food_id)
-                self.success_count += 1
-                batch_count += 1
-                processed += 1
-            except mysql.connector.Error:
-                conn.rollback()
-                self.error_count += 1
-                continue
-
-            if batch_count >= self.batch_size:
-                conn.commit()
-                batch_count = 0
+            pending.append(FoodPayload(food_payload, measurements, barcode))
+            processed += 1
+            if len(pending) >= self.batch_sizer.size:
+                flush()
 
             if self.max_foods and processed >= self.max_foods:
                 break
 
-        if batch_count:
-            conn.commit()
+        if pending:
+            flush()
 
-        cursor.close()
+        statements.close()
         lookup_conn.close()
 
     def _run_fdc_portions(self, conn: mysql.connector.MySQLConnection) -> None:
-        portion_path = self.fdc_dir / "food_portion.csv"
-        measure_unit_path = self.fdc_dir / "measure_unit.csv"
-        if not portion_path.exists() or not measure_unit_path.exists():
+        if not self.fdc_source.exists("food_portion.csv") or not self.fdc_source.exists("measure_unit.csv"):
             return
 
         unit_lookup: Dict[str, str] = {}
-        with measure_unit_path.open(newline="", encoding="utf-8") as handle:
-            reader = csv.DictReader(handle)
-            for row in reader:
-                unit_id = row.get("id")
-                name = row.get("name")
-                if unit_id and name:
-                    unit_lookup[unit_id] = name
+        measure_units = self.fdc_source.open("measure_unit.csv")
+        for unit_id, name in iter_rows(measure_units, ("id", "name"), self.csv_backend):
+            if unit_id and name:
+                unit_lookup[unit_id] = name
 
         cursor = conn.cursor()
+        statements = PreparedStatements(conn, self.statement_sql)
         food_id_cache: Dict[str, int] = {}
-        batch_count = 0
+        pending: List[PortionRecord] = []
 
-        with portion_path.open(newline="", encoding="utf-8") as handle:
-            reader = csv.DictReader(handle)
-            for row in tqdm(reader, desc="FDC portions"):
-                fdc_id = row.get("fdc_id")
-                if not fdc_id:
-                    continue
+        def write_portion(item: PortionRecord) -> str:
+            return self._write_fdc_portion(statements, item)
 
-                food_id = food_id_cache.get(fdc_id)
-                if food_id is None:
-                    cursor.execute("SELECT id FROM food WHERE sourceId = %s LIMIT 1", (fdc_id,))
-                    result = cursor.fetchone()
-                    if not result:
-                        food_id_cache[fdc_id] = 0
-                        continue
-                    food_id = int(result[0])
-                    food_id_cache[fdc_id] = food_id
-                    if len(food_id_cache) > 50000:
-                        food_id_cache.clear()
+        rows = iter_rows(self.fdc_source.open("food_portion.csv"), self.PORTION_COLUMNS, self.csv_backend)
+        for values in tqdm(self.metrics.timed_iter("parse", rows), desc="FDC portions"):
+            fdc_id = values[0]
+            if not fdc_id:
+                continue
 
-                if food_id == 0:
+            food_id = food_id_cache.get(fdc_id)
+            if food_id is None:
+                cursor.execute("SELECT id FROM food WHERE sourceId = %s LIMIT 1", (fdc_id,))
+                result = cursor.fetchone()
+                if not result:
+                    food_id_cache[fdc_id] = 0
                     continue
+                food_id = int(result[0])
+                food_id_cache[fdc_id] = food_id
+                if len(food_id_cache) > 50000:
+                    food_id_cache.clear()
 
-                unit_name = unit_lookup.get(row.get("measure_unit_id") or "", "unit")
-                measurement = self._build_portion_measurement(row, unit_name)
-                if not measurement:
-                    continue
+            if food_id == 0:
+                continue
 
-                try:
-                    self._ensure_measurements(cursor, food_id, [measurement])
-                    batch_count += 1
-                except mysql.connector.Error:
-                    conn.rollback()
-                    continue
+            # Only rows for known foods get a dict, for the shared measurement builder.
+            row = dict(zip(self.PORTION_COLUMNS, values))
+            unit_name = unit_lookup.get(row["measure_unit_id"] or "", "unit")
+            with self.metrics.timer("transform"):
+                measurement = self._build_portion_measurement(row, unit_name)
+            if not measurement:
+                continue
 
-                if batch_count >= self.batch_size:
-                    conn.commit()
-                    batch_count = 0
+            pending.append(PortionRecord(fdc_id, food_id, measurement))
+            if len(pending) >= self.batch_sizer.size:
+                self._flush_pending(conn, pending, write_portion, "fdc-portions")
 
-        if batch_count:
-            conn.commit()
+        if pending:
+            self._flush_pending(conn, pending, write_portion, "fdc-portions")
 
+        statements.close()
         cursor.close()
 
-    def _openfoodfacts_payload(self, row: Dict) -> Optional[Dict]:
-        barcode = self._clean_string(row.get("code"))
-        name = self._standardize_food_name(row.get("product_name")) or self._standardize_food_name(
-            row.get("generic_name")
-        )
-
-        if not barcode or not name:
+    def _openfoodfacts_payload(self, row: Dict) -> Optional[FoodPayload]:
+        food = self.extract_openfoodfacts_food(row)
+        if food is None:
             return None
 
-        energy_kcal = self._clean_numeric(row.get("energy-kcal_100g"))
-        energy_kj = self._clean_numeric(row.get("energy-kj_100g")) or self._clean_numeric(
-            row.get("energy_100g")
-        )
-        calories = int(round(energy_kcal or (energy_kj / 4.184 if energy_kj else 0)))
-
-        food = {
-            "sourceId": barcode,
-            "isCsvFood": False,
-            "name": name,
-            "brand": self._clean_string(row.get("brands")),
-            "calories": calories,
-            "protein": self._clean_numeric(row.get("proteins_100g", 0)),
-            "carbs": self._clean_numeric(row.get("carbohydrates_100g", 0)),
-            "fat": self._clean_numeric(row.get("fat_100g", 0)),
-            "fiber": self._clean_numeric(row.get("fiber_100g", 0)),
-            "sugar": self._clean_numeric(row.get("sugars_100g", 0)),
-            "sodium": self._openfoodfacts_sodium(row),
-            "saturatedFat": self._clean_numeric(row.get("saturated-fat_100g", 0)),
-            "transFat": self._clean_numeric(row.get("trans-fat_100g", 0)),
-            "cholesterol": self._maybe_g_to_mg(self._clean_numeric(row.get("cholesterol_100g", 0))),
-            "addedSugar": self._clean_numeric(row.get("added-sugars_100g", 0)),
-            "netCarbs": 0.0,
-            "solubleFiber": self._clean_numeric(row.get("soluble-fiber_100g", 0)),
-            "insolubleFiber": self._clean_numeric(row.get("insoluble-fiber_100g", 0)),
-            "water": self._clean_numeric(row.get("water_100g", 0)),
-            "pralScore": 0.0,
-            "omega3": self._maybe_g_to_mg(self._clean_numeric(row.get("omega-3-fat_100g", 0))),
-            "omega6": self._maybe_g_to_mg(self._clean_numeric(row.get("omega-6-fat_100g", 0))),
-            "monoFat": self._maybe_g_to_mg(self._clean_numeric(row.get("monounsaturated-fat_100g", 0))),
-            "polyFat": self._maybe_g_to_mg(self._clean_numeric(row.get("polyunsaturated-fat_100g", 0))),
-            "ala": self._maybe_g_to_mg(self._clean_numeric(row.get("alpha-linolenic-acid_100g", 0))),
-            "epa": self._maybe_g_to_mg(self._clean_numeric(row.get("eicosapentaenoic-acid_100g", 0))),
-            "dpa": 0.0,
-            "dha": self._maybe_g_to_mg(self._clean_numeric(row.get("docosahexaenoic-acid_100g", 0))),
-            "calcium": self._clean_numeric(row.get("calcium_100g", 0)),
-            "iron": self._clean_numeric(row.get("iron_100g", 0)),
-            "potassium": self._clean_numeric(row.get("potassium_100g", 0)),
-            "magnesium": self._clean_numeric(row.get("magnesium_100g", 0)),
-            "vitaminAiu": 0.0,
-            "vitaminArae": self._clean_numeric(row.get("vitamin-a_100g", 0)),
-            "vitaminC": self._clean_numeric(row.get("vitamin-c_100g", 0)),
-            "vitaminB12": self._clean_numeric(row.get("vitamin-b12_100g", 0)),
-            "vitaminD": self._clean_numeric(row.get("vitamin-d_100g", 0)),
-            "vitaminD2": 0.0,
-            "vitaminD3": 0.0,
-            "vitaminDiu": 0.0,
-            "vitaminE": self._clean_numeric(row.get("vitamin-e_100g", 0)),
-            "phosphorus": self._clean_numeric(row.get("phosphorus_100g", 0)),
-            "zinc": self._clean_numeric(row.get("zinc_100g", 0)),
-            "copper": self._clean_numeric(row.get("copper_100g", 0)),
-            "manganese": self._clean_numeric(row.get("manganese_100g", 0)),
-            "selenium": self._clean_numeric(row.get("selenium_100g", 0)),
-            "fluoride": self._clean_numeric(row.get("fluoride_100g", 0)),
-            "molybdenum": self._clean_numeric(row.get("molybdenum_100g", 0)),
-            "chlorine": self._clean_numeric(row.get("chloride_100g", 0)),
-            "vitaminB1": self._clean_numeric(row.get("vitamin-b1_100g", 0)),
-            "vitaminB2": self._clean_numeric(row.get("vitamin-b2_100g", 0)),
-            "vitaminB3": self._clean_numeric(row.get("vitamin-pp_100g", 0)),
-            "vitaminB5": 0.0,
-            "vitaminB6": self._clean_numeric(row.get("vitamin-b6_100g", 0)),
-            "biotin": self._clean_numeric(row.get("biotin_100g", 0)),
-            "folate": self._clean_numeric(row.get("folates_100g", 0) or row.get("vitamin-b9_100g", 0)),
-            "folicAcid": 0.0,
-            "foodFolate": 0.0,
-            "folateDfe": 0.0,
-            "vitaminK": self._clean_numeric(row.get("vitamin-k_100g", 0)),
-            "dihydrophylloquinone": 0.0,
-            "menaquinone4": 0.0,
-            "choline": self._clean_numeric(row.get("choline_100g", 0)),
-            "betaine": self._clean_numeric(row.get("betaine_100g", 0)),
-            "retinol": 0.0,
-            "caroteneBeta": self._clean_numeric(row.get("beta-carotene_100g", 0)),
-            "caroteneAlpha": 0.0,
-            "lycopene": self._clean_numeric(row.get("lycopene_100g", 0)),
-            "luteinZeaxanthin": self._clean_numeric(row.get("lutein-zeaxanthin_100g", 0)),
-        }
-
-        measurements = self._build_default_measurements()
+        measurements = DEFAULT_MEASUREMENTS
         serving_size = self._clean_string(row.get("serving_size"))
         serving_quantity = self._clean_numeric(row.get("serving_quantity"))
         serving_unit = self._clean_string(row.get("serving_quantity_unit"))
@@ -1012,34 +1040,16 @@ class FdcOpenFoodFactsImporter:
                 serving_size = f"{serving_quantity} {serving_unit}"
 
         if serving_grams and serving_size:
-            measurements.append(
-                {
-                    "name": serving_size,
-                    "abbreviation": self._create_abbreviation(serving_size),
-                    "unit": self._create_unit_label(serving_size),
-                    "weightInGrams": float(serving_grams),
-                    "isDefault": False,
-                    "isFromSource": True,
-                }
+            measurements = DEFAULT_MEASUREMENTS + (
+                MeasurementRecord(
+                    serving_size,
+                    self._create_abbreviation(serving_size),
+                    self._create_unit_label(serving_size),
+                    float(serving_grams),
+                ),
             )
 
-        return {"barcode": barcode, "food": food, "measurements": measurements}
-
-    def _openfoodfacts_sodium(self, row: Dict) -> float:
-        sodium_g = self._clean_numeric(row.get("sodium_100g", 0))
-        if sodium_g > 0:
-            return sodium_g * 1000.0
-
-        salt_g = self._clean_numeric(row.get("salt_100g", 0))
-        if salt_g > 0:
-            return salt_g * 1000.0 * 0.4
-
-        return 0.0
-
-    def _maybe_g_to_mg(self, value: float) -> float:
-        if value <= 10:
-            return value * 1000.0
-        return value
+        return FoodPayload(food, measurements, food.sourceId)
 
     def _ensure_food_match_index(self, conn: mysql.connector.MySQLConnection) -> None:
         cursor = conn.cursor()
@@ -1057,7 +1067,8 @@ class FdcOpenFoodFactsImporter:
         self, conn: mysql.connector.MySQLConnection
     ) -> Dict[Tuple[str, int], int]:
         print("Building in-memory food match lookup (name+calories)...")
-        self._ensure_food_match_index(conn)
+        if not self.initial_load:
+            self._ensure_food_match_index(conn)
 
         count_cursor = conn.cursor()
         try:
@@ -1105,81 +1116,40 @@ class FdcOpenFoodFactsImporter:
             print(f"OpenFoodFacts CSV not found: {self.openfoodfacts_csv}")
             return
 
-        cursor = conn.cursor()
+        statements = PreparedStatements(conn, self.statement_sql)
         self._validate_food_columns(conn)
         food_match_lookup = self._build_food_match_lookup(conn)
 
         print("Reading OpenFoodFacts header to determine available columns...")
-        header = pd.read_csv(self.openfoodfacts_csv, sep="\t", nrows=0)
+        with open_input(self.openfoodfacts_csv, read_ahead=False) as stream:
+            header = pd.read_csv(stream, sep="\t", nrows=0)
         available_columns = set(header.columns)
-        desired_columns = {
-            "code",
-            "product_name",
-            "generic_name",
-            "brands",
-            "energy-kcal_100g",
-            "energy-kj_100g",
-            "energy_100g",
-            "fat_100g",
-            "saturated-fat_100g",
-            "trans-fat_100g",
-            "cholesterol_100g",
-            "carbohydrates_100g",
-            "sugars_100g",
-            "added-sugars_100g",
-            "fiber_100g",
-            "soluble-fiber_100g",
-            "insoluble-fiber_100g",
-            "proteins_100g",
-            "salt_100g",
-            "sodium_100g",
-            "omega-3-fat_100g",
-            "omega-6-fat_100g",
-            "monounsaturated-fat_100g",
-            "polyunsaturated-fat_100g",
-            "alpha-linolenic-acid_100g",
-            "eicosapentaenoic-acid_100g",
-            "docosahexaenoic-acid_100g",
-            "calcium_100g",
-            "iron_100g",
-            "potassium_100g",
-            "magnesium_100g",
-            "phosphorus_100g",
-            "zinc_100g",
-            "copper_100g",
-            "manganese_100g",
-            "selenium_100g",
-            "fluoride_100g",
-            "molybdenum_100g",
-            "chloride_100g",
-            "vitamin-a_100g",
-            "vitamin-c_100g",
-            "vitamin-b1_100g",
-            "vitamin-b2_100g",
-            "vitamin-pp_100g",
-            "vitamin-b6_100g",
-            "vitamin-b12_100g",
-            "folates_100g",
-            "vitamin-b9_100g",
-            "vitamin-d_100g",
-            "vitamin-e_100g",
-            "vitamin-k_100g",
-            "betaine_100g",
-            "choline_100g",
-            "beta-carotene_100g",
-            "lycopene_100g",
-            "lutein-zeaxanthin_100g",
-            "biotin_100g",
+        desired_columns = list(self.openfoodfacts_extractor.fields) + [
             "serving_size",
             "serving_quantity",
             "serving_quantity_unit",
-        }
+        ]
         usecols = [column for column in desired_columns if column in available_columns]
+        if "code" not in usecols:
+            raise ValueError("OpenFoodFacts CSV is missing required 'code' column.")
         print(f"OpenFoodFacts columns selected: {len(usecols)}")
 
-        match_cache: Dict[Tuple[str, int], Optional[int]] = {}
-        batch_count = 0
+        write_payload, on_commit, on_rollback = self._openfoodfacts_writer(statements, food_match_lookup)
+        pending: List[FoodPayload] = []
         processed = 0
+
+        def flush() -> None:
+            outcomes = self._flush_pending(
+                conn,
+                pending,
+                write_payload,
+                "openfoodfacts",
+                on_commit=on_commit,
+                on_rollback=on_rollback,
+            )
+            self.openfoodfacts_new_count += outcomes.count("new")
+            self.openfoodfacts_matched_count += outcomes.count("matched")
+
         scanned = 0
         skipped_before = self.skipped_count
         errors_before = self.error_count
@@ -1195,66 +1165,46 @@ class FdcOpenFoodFactsImporter:
             disable=False,
         )
 
+        openfoodfacts_stream = open_input(self.openfoodfacts_csv)
         try:
-            for chunk in pd.read_csv(
-                self.openfoodfacts_csv,
-                sep="\t",
-                usecols=usecols,
-                chunksize=5000,
-                dtype=str,
-                low_memory=False,
+            for chunk in self.metrics.timed_iter(
+                "parse",
+                pd.read_csv(
+                    openfoodfacts_stream,
+                    sep="\t",
+                    usecols=usecols,
+                    chunksize=5000,
+                    dtype=str,
+                    low_memory=False,
+                ),
             ):
                 chunk_index += 1
                 chunk_started_at = time.perf_counter()
-                rows = chunk.to_dict(orient="records")
-                scanned += len(rows)
-                progress.update(len(rows))
+                scanned += len(chunk)
+                progress.update(len(chunk))
+                # Drop unusable codes for the whole chunk at once, before any per-row work.
+                with self.metrics.timer("barcode_filter"):
+                    chunk = self.barcode_rejects.filter(chunk)
+                with self.metrics.timer("parse"):
+                    rows = chunk.to_dict(orient="records")
 
                 for row in rows:
-                    payload = self._openfoodfacts_payload(row)
+                    with self.metrics.timer("transform"):
+                        payload = self._openfoodfacts_payload(row)
                     if not payload:
                         self.skipped_count += 1
                         continue
 
-                    food = payload["food"]
-                    barcode = payload["barcode"]
-                    name = food["name"]
-                    calories = int(food["calories"])
-                    match_key = (name.lower(), calories)
-
-                    food_id = match_cache.get(match_key)
-                    if food_id is None:
-                        food_id = food_match_lookup.get(match_key, 0)
-                        match_cache[match_key] = food_id
-                        if len(match_cache) > 50000:
-                            match_cache.clear()
-
-                    try:
-                        if food_id:
-                            self._ensure_measurements(cursor, food_id, payload["measurements"])
-                            self._insert_or_update_barcode(cursor, barcode, food_id)
-                            self.openfoodfacts_matched_count += 1
-                        else:
-                            new_food_id = self._insert_or_update_food(cursor, food)
-                            self._ensure_measurements(cursor, new_food_id, payload["measurements"])
-                            self._insert_or_update_barcode(cursor, barcode, new_food_id)
-                            food_match_lookup[match_key] = new_food_id
-                            match_cache[match_key] = new_food_id
-                            self.openfoodfacts_new_count += 1
-                    except mysql.connector.Error:
-                        conn.rollback()
-                        self.error_count += 1
-                        continue
-
-                    batch_count += 1
+                    pending.append(payload)
                     processed += 1
 
-                    if batch_count >= self.batch_size:
-                        conn.commit()
-                        batch_count = 0
+                    if len(pending) >= self.batch_sizer.size:
+                        flush()
 
                     if self.max_openfoodfacts and processed >= self.max_openfoodfacts:
-                        conn.commit()
+                        if pending:
+                            flush()
+                        statements.close()
                         return
 
                 now = time.perf_counter()
@@ -1263,7 +1213,8 @@ class FdcOpenFoodFactsImporter:
                         "OpenFoodFacts heartbeat | "
                         f"scanned={scanned} processed={processed} "
                         f"new={self.openfoodfacts_new_count} matched={self.openfoodfacts_matched_count} "
-                        f"skipped={self.skipped_count - skipped_before} errors={self.error_count - errors_before}"
+                        f"skipped={self.skipped_count - skipped_before} errors={self.error_count - errors_before} "
+                        f"rejected={self.barcode_rejects.count}"
                     )
                     next_heartbeat_at = now + 30.0
 
@@ -1274,75 +1225,16 @@ class FdcOpenFoodFactsImporter:
                         f"({len(rows)} rows) in {chunk_elapsed:.2f}s"
                     )
         finally:
+            openfoodfacts_stream.close()
             progress.close()
 
-        if batch_count:
-            conn.commit()
+        if pending:
+            flush()
 
-        cursor.close()
+        statements.close()
 
     def _build_es_index_payload(self) -> Dict[str, object]:
-        return {
-            "settings": {
-                "analysis": {
-                    "filter": {
-                        "edge_ngram_filter": {
-                            "type": "edge_ngram",
-                            "min_gram": 1,
-                            "max_gram": 20,
-                        }
-                    },
-                    "normalizer": {
-                        "lowercase_normalizer": {
-                            "type": "custom",
-                            "filter": ["lowercase"],
-                        }
-                    },
-                    "analyzer": {
-                        "name_prefix_analyzer": {
-                            "type": "custom",
-                            "tokenizer": "standard",
-                            "filter": ["lowercase", "edge_ngram_filter"],
-                        },
-                        "name_prefix_search": {
-                            "type": "custom",
-                            "tokenizer": "standard",
-                            "filter": ["lowercase"],
-                        },
-                    },
-                }
-            },
-            "mappings": {
-                "properties": {
-                    "name": {
-                        "type": "text",
-                        "fields": {
-                            "keyword": {
-                                "type": "keyword",
-                                "normalizer": "lowercase_normalizer",
-                            },
-                            "prefix": {
-                                "type": "text",
-                                "analyzer": "name_prefix_analyzer",
-                                "search_analyzer": "name_prefix_search",
-                            },
-                        },
-                    },
-                    "brand": {
-                        "type": "text",
-                        "fields": {
-                            "keyword": {
-                                "type": "keyword",
-                                "normalizer": "lowercase_normalizer",
-                            },
-                        },
-                    },
-                    "isCsvFood": {
-                        "type": "boolean",
-                    },
-                }
-            },
-        }
+        return build_index_payload()
 
     def _delete_es_index(self) -> None:
         response = requests.delete(f"{self.es_url}/{self.es_index}", timeout=30)
@@ -1376,41 +1268,36 @@ class FdcOpenFoodFactsImporter:
         response.raise_for_status()
 
     def _bulk_index_foods(self) -> int:
-        conn = mysql.connector.connect(**self.db_config)
-        cursor = conn.cursor(dictionary=True)
-        cursor.execute("SELECT id, name, brand, isCsvFood FROM food ORDER BY id ASC")
+        conn = self.connections.connect()
+        cursor = conn.cursor()
+        cursor.execute(f"{FOOD_DOCUMENT_SELECT} ORDER BY f.id ASC")
         indexed_count = 0
         bulk_size = 500
         try:
             while True:
-                rows = cursor.fetchmany(bulk_size)
+                with self.metrics.timer("fetch"):
+                    rows = cursor.fetchmany(bulk_size)
                 if not rows:
                     break
 
                 lines: List[str] = []
                 for row in rows:
-                    food_id = int(row["id"])
+                    food_id = int(row[0])
                     lines.append(
                         '{"index":{"_index":"%s","_id":"%s"}}' % (self.es_index, str(food_id))
                     )
-                    lines.append(
-                        '{"name":%s,"brand":%s,"isCsvFood":%s}'
-                        % (
-                            json.dumps(row["name"]),
-                            json.dumps(row["brand"]),
-                            "true" if bool(row["isCsvFood"]) else "false",
-                        )
-                    )
+                    lines.append(food_document_json(row[1:]))
 
                 body = "\n".join(lines) + "\n"
-                response = requests.post(
-                    f"{self.es_url}/_bulk",
-                    data=body.encode("utf-8"),
-                    headers={"Content-Type": "application/x-ndjson"},
-                    timeout=60,
-                )
-                response.raise_for_status()
-                response_json = response.json()
+                with self.metrics.timer("es_bulk"):
+                    response = requests.post(
+                        f"{self.es_url}/_bulk",
+                        data=body.encode("utf-8"),
+                        headers={"Content-Type": "application/x-ndjson"},
+                        timeout=60,
+                    )
+                    response.raise_for_status()
+                    response_json = response.json()
                 if response_json.get("errors"):
                     raise RuntimeError("Elasticsearch bulk indexing reported errors.")
 
@@ -1440,9 +1327,130 @@ class FdcOpenFoodFactsImporter:
         indexed_count = self._bulk_index_foods()
         print(f"Elasticsearch reindex complete. Foods indexed: {indexed_count}")
 
+    def _begin_initial_load(self, conn: mysql.connector.MySQLConnection) -> None:
+        recorded: List[Dict] = []
+        if self.initial_load_state.exists():
+            # A previous initial load stopped before rebuilding; its indexes are already gone.
+            recorded = json.loads(self.initial_load_state.read_text(encoding="utf-8"))
+            print(f"Resuming initial load; {len(recorded)} indexes recorded in {self.initial_load_state}")
+        else:
+            cursor = conn.cursor()
+            try:
+                cursor.execute("SELECT COUNT(*) FROM food")
+                food_count = int(cursor.fetchone()[0])
+            finally:
+                cursor.close()
+            if food_count:
+                raise RuntimeError(
+                    f"--initial-load requires an empty food table; found {food_count} rows."
+                )
+
+        recorded_keys = {(index["table"], index["name"]) for index in recorded}
+        to_drop = [
+            index
+            for index in deferrable_indexes(conn, self.INITIAL_LOAD_TABLES)
+            if (index["table"], index["name"]) not in recorded_keys
+        ]
+        recorded.extend(to_drop)
+        if (self.FOOD_MATCH_INDEX["table"], self.FOOD_MATCH_INDEX["name"]) not in {
+            (index["table"], index["name"]) for index in recorded
+        }:
+            recorded.append(self.FOOD_MATCH_INDEX)
+
+        # Record before dropping so an interrupted run can still restore every index.
+        self.initial_load_state.write_text(json.dumps(recorded, indent=2), encoding="utf-8")
+
+        drops_by_table: Dict[str, List[str]] = {}
+        for index in to_drop:
+            drops_by_table.setdefault(index["table"], []).append(f"DROP INDEX `{index['name']}`")
+        cursor = conn.cursor()
+        try:
+            for table, clauses in drops_by_table.items():
+                print(f"Dropping secondary indexes on {table}: {', '.join(clauses)}")
+                cursor.execute(f"ALTER TABLE `{table}` {', '.join(clauses)}")
+        finally:
+            cursor.close()
+
+    def _finish_initial_load(self, conn: mysql.connector.MySQLConnection) -> None:
+        recorded = json.loads(self.initial_load_state.read_text(encoding="utf-8"))
+        existing = {(index["table"], index["name"]) for index in fetch_indexes(conn, self.INITIAL_LOAD_TABLES)}
+        adds_by_table: Dict[str, List[str]] = {}
+        for index in recorded:
+            if (index["table"], index["name"]) not in existing:
+                adds_by_table.setdefault(index["table"], []).append(index_clause(index))
+
+        cursor = conn.cursor()
+        try:
+            for table, clauses in adds_by_table.items():
+                # One ALTER per table builds every index from a single sorted scan.
+                print(f"Rebuilding {len(clauses)} secondary indexes on {table}...")
+                with self.metrics.timer("index_rebuild"):
+                    cursor.execute(f"ALTER TABLE `{table}` {', '.join(clauses)}")
+        finally:
+            cursor.close()
+        self.initial_load_state.unlink()
+
+        print("Checking unique keys and foreign keys...")
+        with self.metrics.timer("integrity_check"):
+            problems = check_integrity(conn, self.INITIAL_LOAD_TABLES)
+        if problems:
+            raise RuntimeError("Initial load integrity check failed: " + "; ".join(problems))
+        session_settings_hook({"foreign_key_checks": 1})(conn)
+        print("Initial load integrity check passed; foreign key checks re-enabled.")
+
+    def replay(self, entries: Iterable[Dict]) -> Tuple[int, int]:
+        """Write the records of dead-letter ``entries`` again, batched per import stage.
+
+        Returns (written, failed); rows that still fail are dead-lettered again.
+        """
+        conn = self.connections.connect()
+        self._validate_food_columns(conn)
+        statements = PreparedStatements(conn, self.statement_sql)
+        writers: Dict[str, Tuple[Callable[[tuple], str], Optional[Callable], Optional[Callable]]] = {
+            "fdc": (lambda item: self._write_fdc_food(statements, item), None, None),
+            "fdc-portions": (lambda item: self._write_fdc_portion(statements, item), None, None),
+        }
+        pending: Dict[str, List[tuple]] = {}
+        written = 0
+        errors_before = self.error_count
+
+        def flush(stage: str) -> None:
+            nonlocal written
+            if stage not in writers:
+                # Built lazily: the match lookup scans the whole food table.
+                writers[stage] = self._openfoodfacts_writer(statements, self._build_food_match_lookup(conn))
+            write_item, on_commit, on_rollback = writers[stage]
+            written += len(
+                self._flush_pending(conn, pending[stage], write_item, stage, on_commit, on_rollback)
+            )
+
+        try:
+            for entry in entries:
+                stage = entry.get("stage")
+                if stage not in ("fdc", "fdc-portions", "openfoodfacts"):
+                    self.dead_letters.write(
+                        entry.get("record"), ValueError(f"Cannot replay stage {stage!r}"), stage=stage
+                    )
+                    self.error_count += 1
+                    continue
+                stage_pending = pending.setdefault(stage, [])
+                if stage == "fdc-portions":
+                    stage_pending.append(portion_record_from_dict(entry["record"]))
+                else:
+                    stage_pending.append(food_payload_from_dict(entry["record"], self.FoodRecord))
+                if len(stage_pending) >= self.batch_sizer.size:
+                    flush(stage)
+            for stage, stage_pending in pending.items():
+                if stage_pending:
+                    flush(stage)
+        finally:
+            statements.close()
+            conn.close()
+        return written, self.error_count - errors_before
+
     def run(self) -> None:
         start = time.perf_counter()
-        conn = mysql.connector.connect(**self.db_config)
+        conn = self.connections.connect()
         start_idx = self.IMPORT_STAGES.index(self.start_at)
         stop_target = self.stop_after or self.IMPORT_STAGES[-1]
         stop_idx = self.IMPORT_STAGES.index(stop_target)
@@ -1453,28 +1461,42 @@ class FdcOpenFoodFactsImporter:
         run_fdc_portions = start_idx <= 1 <= stop_idx
         run_openfoodfacts = start_idx <= 2 <= stop_idx
         run_elasticsearch = start_idx <= 3 <= stop_idx
-        lookup_db: Optional[Path] = None
         try:
+            if self.initial_load:
+                with self.metrics.stage("initial-load-prepare"):
+                    self._begin_initial_load(conn)
             if run_fdc:
-                lookup_db = self._build_lookup_db()
-                print("Importing FoodData Central foods...")
-                self._run_fdc_import(conn, lookup_db)
+                with self.metrics.stage("fdc"):
+                    lookup_db = self._build_lookup_db()
+                    print(f"Importing FoodData Central foods (CSV backend: {self.csv_backend})...")
+                    self._run_fdc_import(conn, lookup_db)
             if run_fdc_portions:
-                print("Adding FoodData Central portions...")
-                self._run_fdc_portions(conn)
+                with self.metrics.stage("fdc-portions"):
+                    print("Adding FoodData Central portions...")
+                    self._run_fdc_portions(conn)
             if run_openfoodfacts:
-                print("Importing OpenFoodFacts foods/barcodes...")
-                self._run_openfoodfacts(conn)
+                with self.metrics.stage("openfoodfacts"):
+                    print("Importing OpenFoodFacts foods/barcodes...")
+                    self._run_openfoodfacts(conn)
+            if self.initial_load:
+                with self.metrics.stage("initial-load-rebuild"):
+                    self._finish_initial_load(conn)
         finally:
             conn.close()
-            if lookup_db:
-                try:
-                    lookup_db.unlink()
-                except OSError:
-                    pass
 
         if run_elasticsearch:
-            self._reindex_es_direct()
+            with self.metrics.stage("elasticsearch"):
+                self._reindex_es_direct()
+
+        self.metrics.count("fdc_foods_written", self.success_count)
+        self.metrics.count("openfoodfacts_new_foods", self.openfoodfacts_new_count)
+        self.metrics.count("openfoodfacts_matched_foods", self.openfoodfacts_matched_count)
+        self.metrics.count("measurements_written", self.measurements_added_count)
+        self.metrics.count("barcodes_written", self.barcodes_added_count)
+        self.metrics.count("barcodes_rejected", self.barcode_rejects.count)
+        self.metrics.count("rows_skipped", self.skipped_count)
+        self.metrics.count("errors", self.error_count)
+        self.metrics.count("batch_size_converged", self.batch_sizer.converged_size)
 
         elapsed = time.perf_counter() - start
         print("IMPORT SUMMARY")
@@ -1483,8 +1505,15 @@ class FdcOpenFoodFactsImporter:
         print(f"OpenFoodFacts matched foods: {self.openfoodfacts_matched_count}")
         print(f"Measurements inserted: {self.measurements_added_count}")
         print(f"Barcodes inserted: {self.barcodes_added_count}")
+        print(f"OpenFoodFacts rows rejected for their barcode: {self.barcode_rejects.summary()}")
+        for line in self.barcode_rejects.reason_summary():
+            print(line)
         print(f"Skipped rows: {self.skipped_count}")
         print(f"Errors: {self.error_count}")
+        print(f"Dead-lettered rows: {self.dead_letters.summary()}")
+        for line in self.dead_letters.error_class_summary(limit=10):
+            print(line)
+        print(f"Batch size: {self.batch_sizer.describe()}")
         print(f"Elapsed seconds: {elapsed:.2f}")
 
 
@@ -1495,15 +1524,15 @@ def main() -> int:
     parser.add_argument(
         "--fdc-dir",
         default="../data/FoodData_Central_csv_2025-12-18",
-        help="Path to the FoodData Central CSV directory.",
+        help="Path to the FoodData Central CSV directory or the FDC .zip.",
     )
     parser.add_argument(
         "--openfoodfacts-csv",
         default="../data/en.openfoodfacts.org.products.csv",
-        help="Path to the OpenFoodFacts TSV file.",
+        help="Path to the OpenFoodFacts TSV file (.gz, .zst and .zip are read directly).",
     )
     parser.add_argument("--env-file", default=None, help="Path to a .env file with DB credentials.")
-    parser.add_argument("--batch-size", type=int, default=500, help="DB commit batch size.")
+    add_batch_size_arguments(parser, default_batch_size=500)
     parser.add_argument("--max-foods", type=int, default=None, help="Limit FDC foods for testing.")
     parser.add_argument(
         "--max-openfoodfacts", type=int, default=None, help="Limit OpenFoodFacts rows for testing."
@@ -1540,8 +1569,42 @@ def main() -> int:
         action="store_true",
         help="Drop all Elasticsearch indices before recreating and indexing foods.",
     )
+    parser.add_argument(
+        "--initial-load",
+        action="store_true",
+        help=(
+            "Bulk load into an empty catalog: drop deferrable secondary indexes, disable foreign key "
+            "checks, then rebuild the indexes and verify integrity at the end."
+        ),
+    )
+    parser.add_argument(
+        "--initial-load-state",
+        default=None,
+        help="Where --initial-load records dropped index definitions (default: .initial_load_indexes.json).",
+    )
+    parser.add_argument(
+        "--lookup-cache-dir",
+        default=None,
+        help=(
+            "Directory for the FDC lookup database, reused while food.csv/branded_food.csv keep "
+            "their sizes and mtimes (default: .fdc_lookup_cache)."
+        ),
+    )
+    parser.add_argument(
+        "--rebuild-lookup-cache",
+        action="store_true",
+        help="Rebuild the FDC lookup database even if a cached build matches the input files.",
+    )
+    add_csv_backend_arguments(parser)
+    add_nutrient_grouping_arguments(parser)
+    add_dead_letter_arguments(parser)
+    add_barcode_filter_arguments(parser)
+    add_metrics_arguments(parser)
 
     args = parser.parse_args()
+    metrics = ImportMetrics.from_args("import_fdc_and_openfoodfacts_to_db", args)
+    dead_letters = DeadLetterWriter.from_args("import_fdc_and_openfoodfacts_to_db", args)
+    barcode_rejects = BarcodeRejectLog.from_args("import_fdc_and_openfoodfacts_to_db", args)
 
     importer = FdcOpenFoodFactsImporter(
         fdc_dir=Path(args.fdc_dir),
@@ -1556,8 +1619,21 @@ def main() -> int:
         es_index=args.es_index,
         skip_es_reindex=args.skip_es_reindex,
         drop_elasticsearch_db=args.drop_elastic_search_db,
+        initial_load=args.initial_load,
+        initial_load_state=Path(args.initial_load_state) if args.initial_load_state else None,
+        lookup_cache_dir=Path(args.lookup_cache_dir) if args.lookup_cache_dir else None,
+        rebuild_lookup_cache=args.rebuild_lookup_cache,
+        csv_backend=args.csv_backend,
+        nutrient_grouping=args.nutrient_grouping,
+        sort_memory_mb=args.sort_memory_mb,
+        sort_spill_dir=Path(args.sort_spill_dir) if args.sort_spill_dir else None,
+        metrics=metrics,
+        batch_sizer=AdaptiveBatchSizer.from_args(args),
+        dead_letters=dead_letters,
+        barcode_rejects=barcode_rejects,
     )
-    importer.run()
+    with metrics.session(), dead_letters, barcode_rejects:
+        importer.run()
     return 0
 
 
@@ -0,0 +1,380 @@
+import argparse
+import cProfile
+import contextlib
+import json
+import os
+import sys
+import threading
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple, TypeVar
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+T = TypeVar("T")
+
+COMMIT_LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+class OperationTimer:
+    __slots__ = ("calls", "total_s", "max_s")
+
+    def __init__(self) -> None:
+        self.calls = 0
+        self.total_s = 0.0
+        self.max_s = 0.0
+
+    def add(self, elapsed_s: float) -> None:
+        self.calls += 1
+        self.total_s += elapsed_s
+        if elapsed_s > self.max_s:
+            self.max_s = elapsed_s
+
+
+class LatencyHistogram:
+    def __init__(self, buckets: Tuple[float, ...] = COMMIT_LATENCY_BUCKETS) -> None:
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.total_s = 0.0
+        self.count = 0
+
+    def observe(self, value_s: float) -> None:
+        self.count += 1
+        self.total_s += value_s
+        for index, upper in enumerate(self.buckets):
+            if value_s <= upper:
+                self.counts[index] += 1
+                return
+        self.counts[-1] += 1
+
+    def cumulative(self) -> List[Tuple[str, int]]:
+        running = 0
+        result: List[Tuple[str, int]] = []
+        for upper, count in zip(self.buckets, self.counts):
+            running += count
+            result.append((f"{upper:g}", running))
+        result.append(("+Inf", running + self.counts[-1]))
+        return result
+
+
+class ImportMetrics:
+    """Per-stage timers, counters and commit latency histograms shared by the import scripts.
+
+    Timers are always collected; the report, cProfile and tracemalloc are only enabled via the
+    command line flags added by ``add_metrics_arguments``.
+    """
+
+    def __init__(
+        self,
+        script: str,
+        report_path: Optional[str] = None,
+        report_format: Optional[str] = None,
+        profile_path: Optional[str] = None,
+        tracemalloc_interval_s: Optional[float] = None,
+    ) -> None:
+        self.script = script
+        self.report_path = report_path
+        self.report_format = report_format or self._infer_format(report_path)
+        self.profile_path = profile_path
+        self.tracemalloc_interval_s = tracemalloc_interval_s
+
+        self.current_stage = "main"
+        self.stage_seconds: Dict[str, float] = {}
+        self.operations: Dict[Tuple[str, str], OperationTimer] = {}
+        self.counters: Dict[Tuple[str, str], int] = {}
+        self.commit_latency: Dict[str, LatencyHistogram] = {}
+        self.tracemalloc_peak_bytes = 0
+
+        self._started_at = time.perf_counter()
+        self._profiler: Optional[cProfile.Profile] = None
+        self._tracemalloc_stop = threading.Event()
+        self._tracemalloc_thread: Optional[threading.Thread] = None
+
+    @classmethod
+    def from_args(cls, script: str, args: argparse.Namespace) -> "ImportMetrics":
+        return cls(
+            script,
+            report_path=args.metrics_report,
+            report_format=args.metrics_format,
+            profile_path=args.profile,
+            tracemalloc_interval_s=args.tracemalloc_interval,
+        )
+
+    def _infer_format(self, report_path: Optional[str]) -> str:
+        if report_path and report_path.endswith(".prom"):
+            return "prometheus"
+        return "jsonl"
+
+    @contextlib.contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        previous_stage = self.current_stage
+        self.current_stage = name
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.stage_seconds[name] = self.stage_seconds.get(name, 0.0) + time.perf_counter() - started
+            self.current_stage = previous_stage
+
+    @contextlib.contextmanager
+    def timer(self, operation: str) -> Iterator[None]:
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(operation, time.perf_counter() - started)
+
+    def record(self, operation: str, elapsed_s: float) -> None:
+        key = (self.current_stage, operation)
+        timer = self.operations.get(key)
+        if timer is None:
+            timer = self.operations[key] = OperationTimer()
+        timer.add(elapsed_s)
+
+    def timed_iter(self, operation: str, iterable: Iterable[T]) -> Iterator[T]:
+        """Yield from ``iterable`` while charging the time spent producing each item to ``operation``."""
+        iterator = iter(iterable)
+        while True:
+            started = time.perf_counter()
+            try:
+                item = next(iterator)
+            except StopIteration:
+                self.record(operation, time.perf_counter() - started)
+                return
+            self.record(operation, time.perf_counter() - started)
+            yield item
+
+    def count(self, name: str, value: int = 1) -> None:
+        key = (self.current_stage, name)
+        self.counters[key] = self.counters.get(key, 0) + value
+
+    def observe_commit(self, latency_s: float) -> None:
+        histogram = self.commit_latency.get(self.current_stage)
+        if histogram is None:
+            histogram = self.commit_latency[self.current_stage] = LatencyHistogram()
+        histogram.observe(latency_s)
+
+    def commit(self, conn) -> float:
+        started = time.perf_counter()
+        conn.commit()
+        elapsed_s = time.perf_counter() - started
+        self.record("commit", elapsed_s)
+        self.observe_commit(elapsed_s)
+        return elapsed_s
+
+    def peak_rss_bytes(self) -> int:
+        if resource is None:
+            return 0
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # ru_maxrss is KiB on Linux and bytes on macOS.
+        return int(peak if sys.platform == "darwin" else peak * 1024)
+
+    @contextlib.contextmanager
+    def session(self) -> Iterator["ImportMetrics"]:
+        self._start_profiling()
+        try:
+            yield self
+        finally:
+            self._stop_profiling()
+            self.print_summary()
+            if self.report_path:
+                self.write_report(self.report_path)
+                print(f"Metrics report written to {self.report_path}")
+
+    def _start_profiling(self) -> None:
+        if self.tracemalloc_interval_s:
+            tracemalloc.start()
+            self._tracemalloc_thread = threading.Thread(target=self._tracemalloc_loop, daemon=True)
+            self._tracemalloc_thread.start()
+        if self.profile_path:
+            self._profiler = cProfile.Profile()
+            self._profiler.enable()
+
+    def _stop_profiling(self) -> None:
+        if self._profiler:
+            self._profiler.disable()
+            self._profiler.dump_stats(self.profile_path)
+            print(f"cProfile stats written to {self.profile_path}")
+            self._profiler = None
+        if self._tracemalloc_thread:
+            self._tracemalloc_stop.set()
+            self._tracemalloc_thread.join()
+            self._tracemalloc_thread = None
+            _current, peak = tracemalloc.get_traced_memory()
+            self.tracemalloc_peak_bytes = max(self.tracemalloc_peak_bytes, peak)
+            tracemalloc.stop()
+
+    def _tracemalloc_loop(self) -> None:
+        while not self._tracemalloc_stop.wait(self.tracemalloc_interval_s):
+            snapshot = tracemalloc.take_snapshot()
+            _current, peak = tracemalloc.get_traced_memory()
+            self.tracemalloc_peak_bytes = max(self.tracemalloc_peak_bytes, peak)
+            lines = [f"tracemalloc [{self.script}/{self.current_stage}] peak={peak / 1048576:.1f}MB"]
+            for stat in snapshot.statistics("lineno")[:10]:
+                lines.append(f"  {stat}")
+            print("\n".join(lines), file=sys.stderr)
+
+    def print_summary(self) -> None:
+        print("STAGE TIMINGS")
+        for stage, seconds in self.stage_seconds.items():
+            print(f"  {stage}: {seconds:.2f}s")
+            for (op_stage, operation), timer in sorted(
+                self.operations.items(), key=lambda item: -item[1].total_s
+            ):
+                if op_stage != stage:
+                    continue
+                print(
+                    f"    {operation}: {timer.total_s:.2f}s over {timer.calls} calls "
+                    f"(max {timer.max_s * 1000:.1f}ms)"
+                )
+        print(f"  peak RSS: {self.peak_rss_bytes() / 1048576:.1f}MB")
+
+    def _records(self) -> List[Dict[str, object]]:
+        base = {"script": self.script}
+        records: List[Dict[str, object]] = []
+        for stage, seconds in self.stage_seconds.items():
+            records.append({**base, "type": "stage", "stage": stage, "seconds": round(seconds, 6)})
+        for (stage, operation), timer in self.operations.items():
+            records.append(
+                {
+                    **base,
+                    "type": "operation",
+                    "stage": stage,
+                    "operation": operation,
+                    "calls": timer.calls,
+                    "seconds": round(timer.total_s, 6),
+                    "max_seconds": round(timer.max_s, 6),
+                }
+            )
+        for (stage, name), value in self.counters.items():
+            records.append({**base, "type": "counter", "stage": stage, "name": name, "value": value})
+        for stage, histogram in self.commit_latency.items():
+            records.append(
+                {
+                    **base,
+                    "type": "commit_latency",
+                    "stage": stage,
+                    "buckets": dict(histogram.cumulative()),
+                    "count": histogram.count,
+                    "sum_seconds": round(histogram.total_s, 6),
+                }
+            )
+        records.append(
+            {
+                **base,
+                "type": "run",
+                "elapsed_seconds": round(time.perf_counter() - self._started_at, 6),
+                "peak_rss_bytes": self.peak_rss_bytes(),
+                "tracemalloc_peak_bytes": self.tracemalloc_peak_bytes,
+                "finished_at": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            }
+        )
+        return records
+
+    def _prometheus_lines(self) -> List[str]:
+        def labels(**values: str) -> str:
+            rendered = ",".join(
+                f'{key}="{str(value).replace(chr(92), chr(92) * 2).replace(chr(34), chr(92) + chr(34))}"'
+                for key, value in values.items()
+            )
+            return "{" + rendered + "}"
+
+        script = self.script
+        lines = [
+            "# HELP foodtracker_import_stage_seconds Wall time spent in each import stage.",
+            "# TYPE foodtracker_import_stage_seconds gauge",
+        ]
+        for stage, seconds in self.stage_seconds.items():
+            lines.append(f"foodtracker_import_stage_seconds{labels(script=script, stage=stage)} {seconds:.6f}")
+
+        lines += [
+            "# HELP foodtracker_import_operation_seconds_total Time spent per operation.",
+            "# TYPE foodtracker_import_operation_seconds_total counter",
+        ]
+        for (stage, operation), timer in self.operations.items():
+            lines.append(
+                "foodtracker_import_operation_seconds_total"
+                f"{labels(script=script, stage=stage, operation=operation)} {timer.total_s:.6f}"
+            )
+        lines += [
+            "# HELP foodtracker_import_operation_calls_total Calls per operation.",
+            "# TYPE foodtracker_import_operation_calls_total counter",
+        ]
+        for (stage, operation), timer in self.operations.items():
+            lines.append(
+                "foodtracker_import_operation_calls_total"
+                f"{labels(script=script, stage=stage, operation=operation)} {timer.calls}"
+            )
+
+        lines += [
+            "# HELP foodtracker_import_events_total Import counters (rows, skips, errors, ...).",
+            "# TYPE foodtracker_import_events_total counter",
+        ]
+        for (stage, name), value in self.counters.items():
+            lines.append(f"foodtracker_import_events_total{labels(script=script, stage=stage, name=name)} {value}")
+
+        lines += [
+            "# HELP foodtracker_import_commit_latency_seconds Batch commit latency.",
+            "# TYPE foodtracker_import_commit_latency_seconds histogram",
+        ]
+        for stage, histogram in self.commit_latency.items():
+            for upper, count in histogram.cumulative():
+                lines.append(
+                    "foodtracker_import_commit_latency_seconds_bucket"
+                    f"{labels(script=script, stage=stage, le=upper)} {count}"
+                )
+            lines.append(
+                f"foodtracker_import_commit_latency_seconds_sum{labels(script=script, stage=stage)} "
+                f"{histogram.total_s:.6f}"
+            )
+            lines.append(
+                f"foodtracker_import_commit_latency_seconds_count{labels(script=script, stage=stage)} "
+                f"{histogram.count}"
+            )
+
+        lines += [
+            "# HELP foodtracker_import_peak_rss_bytes Peak resident memory of the import process.",
+            "# TYPE foodtracker_import_peak_rss_bytes gauge",
+            f"foodtracker_import_peak_rss_bytes{labels(script=script)} {self.peak_rss_bytes()}",
+        ]
+        return lines
+
+    def write_report(self, path: str) -> None:
+        report_path = Path(path)
+        report_path.parent.mkdir(parents=True, exist_ok=True)
+        if self.report_format == "prometheus":
+            # Write then rename so a textfile collector never reads a partial file.
+            tmp_path = report_path.with_name(report_path.name + f".{os.getpid()}.tmp")
+            tmp_path.write_text("\n".join(self._prometheus_lines()) + "\n", encoding="utf-8")
+            os.replace(tmp_path, report_path)
+            return
+
+        with report_path.open("a", encoding="utf-8") as handle:
+            for record in self._records():
+                handle.write(json.dumps(record) + "\n")
+
+
+def add_metrics_arguments(parser: argparse.ArgumentParser) -> None:
+    group = parser.add_argument_group("metrics")
+    group.add_argument(
+        "--metrics-report",
+        default=None,
+        help="Write a run report to this path (.prom for a Prometheus textfile, otherwise JSON lines).",
+    )
+    group.add_argument(
+        "--metrics-format",
+        choices=("jsonl", "prometheus"),
+        default=None,
+        help="Override the report format inferred from --metrics-report.",
+    )
+    group.add_argument("--profile", default=None, help="Run under cProfile and write stats to this path.")
+    group.add_argument(
+        "--tracemalloc-interval",
+        type=float,
+        default=None,
+        help="Enable tracemalloc and print the top allocations every N seconds.",
+    )
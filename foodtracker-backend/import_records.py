@@ -0,0 +1,51 @@
+from collections import namedtuple
+from typing import Any, Dict, NamedTuple, Optional, Sequence, Type
+
+
+def food_record_type(name: str, columns: Sequence[str]) -> Type[tuple]:
+    """Build a namedtuple with one field per food column, in ``columns`` order.
+
+    A record already is the parameter tuple of the food upsert built from the same columns, so it is
+    handed to the driver as is. Columns that are not set default to None.
+    """
+    return namedtuple(name, columns, defaults=(None,) * len(columns))
+
+
+class MeasurementRecord(NamedTuple):
+    name: str
+    abbreviation: str
+    unit: str
+    weightInGrams: float
+    isDefault: bool = False
+    isFromSource: bool = True
+
+
+# Shared by every payload; records are immutable, so they are never copied.
+DEFAULT_MEASUREMENTS = (
+    MeasurementRecord("100 grams", "100g", "g", 100.0, isDefault=True),
+    MeasurementRecord("1 gram", "1g", "g", 1.0),
+)
+
+
+class FoodPayload(NamedTuple):
+    food: Any
+    measurements: Sequence[MeasurementRecord]
+    barcode: Optional[str] = None
+
+
+class PortionRecord(NamedTuple):
+    fdcId: str
+    foodId: int
+    measurement: MeasurementRecord
+
+
+def food_payload_from_dict(data: Dict[str, Any], food_type: Type[tuple]) -> FoodPayload:
+    """Rebuild a payload from its JSON form (as written to the dead-letter file)."""
+    fields = set(food_type._fields)
+    food = food_type(**{key: value for key, value in data["food"].items() if key in fields})
+    measurements = [MeasurementRecord(**measurement) for measurement in data.get("measurements") or []]
+    return FoodPayload(food, measurements, data.get("barcode"))
+
+
+def portion_record_from_dict(data: Dict[str, Any]) -> PortionRecord:
+    return PortionRecord(data["fdcId"], int(data["foodId"]), MeasurementRecord(**data["measurement"]))
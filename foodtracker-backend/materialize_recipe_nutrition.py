@@ -0,0 +1,268 @@
+import argparse
+import datetime
+import math
+from typing import Any, Iterator, List, Optional, Sequence, Tuple
+
+import mysql.connector
+import numpy as np
+from tqdm import tqdm
+
+from foodtracker_db import ConnectionFactory, load_db_config
+from import_metrics import ImportMetrics, add_metrics_arguments
+from nutrition_totals import MEASUREMENT_GRAMS_SQL, NUTRIENT_COLUMNS, nutrient_matrix
+
+MATERIALIZE_MODES = ("incremental", "full")
+# recipe_nutrition holds one row per recipe and basis.
+SERVING_BASIS = "serving"
+HUNDRED_GRAMS_BASIS = "100g"
+
+# Grams of every ingredient of the listed recipes, with the app's measurement fallback.
+INGREDIENT_GRAMS_SQL = (
+    "SELECT rf.recipeId, rf.foodId, rf.servings * "
+    + MEASUREMENT_GRAMS_SQL.format(measurement="m", food="f")
+    + " FROM recipe_food rf "
+    "JOIN food f ON f.id = rf.foodId "
+    "LEFT JOIN food_measurement m ON m.id = rf.measurementId AND m.foodId = f.id "
+    "WHERE rf.recipeId IN ({placeholders})"
+)
+
+FOOD_NUTRIENTS_SQL = (
+    "SELECT id, " + ", ".join(NUTRIENT_COLUMNS) + " FROM food WHERE id IN ({placeholders}) ORDER BY id"
+)
+
+INSERT_SQL = (
+    "INSERT INTO recipe_nutrition (recipeId, basis, ingredientCount, totalGrams, "
+    + ", ".join(NUTRIENT_COLUMNS)
+    + ", computedAt) VALUES ("
+    + ", ".join(["%s"] * (len(NUTRIENT_COLUMNS) + 5))
+    + ")"
+)
+
+
+def _placeholders(count: int) -> str:
+    return ", ".join(["%s"] * count)
+
+
+def recipe_nutrients(
+    recipe_ids: np.ndarray,
+    ingredient_recipe_ids: np.ndarray,
+    ingredient_food_ids: np.ndarray,
+    ingredient_grams: np.ndarray,
+    food_ids: np.ndarray,
+    food_nutrients: np.ndarray,
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Whole-recipe nutrient totals, total grams and ingredient counts for the (sorted) ``recipe_ids``.
+
+    The ingredients become a (recipes x foods) matrix of grams / 100, so the totals are its product
+    with the (sorted) foods' per-100 g nutrient matrix.
+    """
+    rows = np.searchsorted(recipe_ids, ingredient_recipe_ids)
+    columns = np.searchsorted(food_ids, ingredient_food_ids)
+    weights = np.zeros((len(recipe_ids), len(food_ids)), dtype=np.float64)
+    np.add.at(weights, (rows, columns), ingredient_grams / 100.0)
+    totals = weights @ food_nutrients
+    total_grams = np.bincount(rows, weights=ingredient_grams, minlength=len(recipe_ids))
+    counts = np.bincount(rows, minlength=len(recipe_ids))
+    return totals, total_grams, counts
+
+
+class RecipeNutritionMaterializer:
+    """Maintains recipe_nutrition: every recipe's nutrients per serving and per 100 g.
+
+    The incremental mode recomputes recipes that have no rows yet, rows flagged ``stale`` (recipe edits
+    in the API, merge_duplicate_foods.py) and recipes using a food whose row changed since the newest
+    ``computedAt`` (``food.updatedAt``, bumped by the importers' upserts only when a value changes),
+    minus ``watermark_lag``. Measurement edits only reach recipes with a full run.
+    """
+
+    def __init__(
+        self,
+        env_file_path: Optional[str] = None,
+        mode: str = "incremental",
+        batch_size: int = 500,
+        watermark_lag: datetime.timedelta = datetime.timedelta(minutes=5),
+        metrics: Optional[ImportMetrics] = None,
+    ):
+        if mode not in MATERIALIZE_MODES:
+            raise ValueError(f"Unknown materialize mode: {mode}")
+        self.metrics = metrics or ImportMetrics("materialize_recipe_nutrition")
+        self.db_config = load_db_config(env_file_path)
+        self.connections = ConnectionFactory(self.db_config, pool_size=1, pool_name="recipe-nutrition")
+        self.mode = mode
+        self.batch_size = max(batch_size, 1)
+        self.watermark_lag = watermark_lag
+        self.recipes_written = 0
+
+    def _all_recipe_batches(self, cursor: Any) -> Iterator[List[Tuple[int, Any]]]:
+        last_id = 0
+        while True:
+            cursor.execute(
+                "SELECT id, servings FROM recipe WHERE id > %s ORDER BY id LIMIT %s", (last_id, self.batch_size)
+            )
+            rows = cursor.fetchall()
+            if not rows:
+                return
+            last_id = int(rows[-1][0])
+            yield rows
+
+    def _affected_recipe_ids(self, cursor: Any) -> Optional[List[int]]:
+        """Recipes to recompute in incremental mode, or None when there is nothing to compare against."""
+        cursor.execute("SELECT MAX(computedAt) FROM recipe_nutrition")
+        row = cursor.fetchone()
+        watermark = row[0] if row else None
+        if watermark is None:
+            return None
+        since = watermark - self.watermark_lag
+        cursor.execute(
+            "SELECT r.id FROM recipe r "
+            "LEFT JOIN recipe_nutrition n ON n.recipeId = r.id AND n.basis = %s "
+            "WHERE n.recipeId IS NULL OR n.stale = 1 "
+            "UNION "
+            "SELECT DISTINCT rf.recipeId FROM food f JOIN recipe_food rf ON rf.foodId = f.id "
+            "WHERE f.updatedAt >= %s",
+            (SERVING_BASIS, since),
+        )
+        recipe_ids = sorted(int(row[0]) for row in cursor.fetchall())
+        print(f"Recipes to recompute (foods changed since {since}): {len(recipe_ids)}")
+        return recipe_ids
+
+    def _affected_recipe_batches(self, cursor: Any, recipe_ids: Sequence[int]) -> Iterator[List[Tuple[int, Any]]]:
+        for start in range(0, len(recipe_ids), self.batch_size):
+            batch = list(recipe_ids[start:start + self.batch_size])
+            cursor.execute(
+                f"SELECT id, servings FROM recipe WHERE id IN ({_placeholders(len(batch))}) ORDER BY id", batch
+            )
+            rows = cursor.fetchall()
+            # Recipes deleted in the meantime are gone, and their rows with them (ON DELETE CASCADE).
+            if rows:
+                yield rows
+
+    def _materialize(
+        self,
+        cursor: Any,
+        conn: Any,
+        recipes: Sequence[Tuple[int, Any]],
+        computed_at: datetime.datetime,
+    ) -> None:
+        recipe_ids = np.array([int(row[0]) for row in recipes], dtype=np.int64)
+        servings = np.array([float(row[1] or 0) for row in recipes], dtype=np.float64)
+        id_params = recipe_ids.tolist()
+
+        with self.metrics.timer("fetch_ingredients"):
+            cursor.execute(INGREDIENT_GRAMS_SQL.format(placeholders=_placeholders(len(id_params))), id_params)
+            ingredients = cursor.fetchall()
+            ingredient_food_ids = np.array([int(row[1]) for row in ingredients], dtype=np.int64)
+            food_ids = np.unique(ingredient_food_ids)
+            if len(food_ids):
+                food_params = food_ids.tolist()
+                cursor.execute(
+                    FOOD_NUTRIENTS_SQL.format(placeholders=_placeholders(len(food_params))), food_params
+                )
+                food_rows = cursor.fetchall()
+            else:
+                food_rows = []
+
+        with self.metrics.timer("compute"):
+            totals, total_grams, counts = recipe_nutrients(
+                recipe_ids,
+                np.array([int(row[0]) for row in ingredients], dtype=np.int64),
+                ingredient_food_ids,
+                np.array([float(row[2] or 0) for row in ingredients], dtype=np.float64),
+                food_ids,
+                nutrient_matrix(food_rows, 1),
+            )
+            # A basis that does not exist (no servings, no grams) is stored as NULL nutrients.
+            with np.errstate(divide="ignore", invalid="ignore"):
+                per_serving = np.where((servings > 0)[:, None], totals / servings[:, None], np.nan)
+                per_100g = np.where((total_grams > 0)[:, None], totals * 100.0 / total_grams[:, None], np.nan)
+
+        params = []
+        for index, recipe_id in enumerate(id_params):
+            for basis, values in ((SERVING_BASIS, per_serving[index]), (HUNDRED_GRAMS_BASIS, per_100g[index])):
+                nutrients = [None if math.isnan(value) else value for value in values.tolist()]
+                params.append(
+                    (recipe_id, basis, int(counts[index]), float(total_grams[index]), *nutrients, computed_at)
+                )
+
+        try:
+            with self.metrics.timer("replace_rows"):
+                cursor.execute(
+                    f"DELETE FROM recipe_nutrition WHERE recipeId IN ({_placeholders(len(id_params))})", id_params
+                )
+                cursor.executemany(INSERT_SQL, params)
+            self.metrics.commit(conn)
+        except mysql.connector.Error:
+            conn.rollback()
+            raise
+        self.recipes_written += len(id_params)
+
+    def run(self) -> None:
+        computed_at = datetime.datetime.now().replace(microsecond=0)
+        conn = self.connections.connect()
+        cursor = conn.cursor()
+        progress = tqdm(desc="Recipes materialized", unit="recipe", dynamic_ncols=True)
+        try:
+            recipe_ids = None
+            if self.mode == "incremental":
+                with self.metrics.timer("find_affected"):
+                    recipe_ids = self._affected_recipe_ids(cursor)
+                if recipe_ids is None:
+                    print("recipe_nutrition is empty; materializing every recipe.")
+            if recipe_ids is None:
+                batches = self._all_recipe_batches(cursor)
+            else:
+                progress.total = len(recipe_ids)
+                batches = self._affected_recipe_batches(cursor, recipe_ids)
+            for recipes in batches:
+                self._materialize(cursor, conn, recipes, computed_at)
+                progress.update(len(recipes))
+        finally:
+            progress.close()
+            cursor.close()
+            conn.close()
+
+        self.metrics.count("recipes_written", self.recipes_written)
+        print("Recipe nutrition materialized.")
+        print(f"Recipes written: {self.recipes_written}")
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(
+        description="Materialize per-serving and per-100 g nutrients of every recipe into recipe_nutrition."
+    )
+    parser.add_argument(
+        "--env-file",
+        default=None,
+        help="Optional path to .env file with DB_HOST/DB_PORT/DB_USER/DB_PASSWORD/DB_NAME.",
+    )
+    parser.add_argument(
+        "--mode",
+        choices=MATERIALIZE_MODES,
+        default="incremental",
+        help="incremental recomputes new and stale recipes and recipes of changed foods; full recomputes all.",
+    )
+    parser.add_argument("--batch-size", type=int, default=500, help="Recipes computed per batch.")
+    parser.add_argument(
+        "--watermark-lag-minutes",
+        type=float,
+        default=5.0,
+        help="Also recompute recipes of foods changed this long before the watermark (late-committing imports).",
+    )
+    add_metrics_arguments(parser)
+    args = parser.parse_args()
+    metrics = ImportMetrics.from_args("materialize_recipe_nutrition", args)
+
+    materializer = RecipeNutritionMaterializer(
+        args.env_file,
+        mode=args.mode,
+        batch_size=args.batch_size,
+        watermark_lag=datetime.timedelta(minutes=max(args.watermark_lag_minutes, 0.0)),
+        metrics=metrics,
+    )
+    with metrics.session(), metrics.stage(f"materialize-{args.mode}"):
+        materializer.run()
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
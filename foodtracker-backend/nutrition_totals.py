@@ -0,0 +1,118 @@
+from typing import Any, Sequence, Tuple
+
+import numpy as np
+
+# Nutrient columns of ``food`` (all per 100 g), in entity order. Totals tables use the same names.
+NUTRIENT_COLUMNS = (
+    "calories",
+    "protein",
+    "carbs",
+    "fat",
+    "fiber",
+    "sugar",
+    "sodium",
+    "saturatedFat",
+    "transFat",
+    "cholesterol",
+    "addedSugar",
+    "netCarbs",
+    "solubleFiber",
+    "insolubleFiber",
+    "water",
+    "pralScore",
+    "omega3",
+    "omega6",
+    "calcium",
+    "iron",
+    "potassium",
+    "magnesium",
+    "vitaminAiu",
+    "vitaminArae",
+    "vitaminC",
+    "vitaminB12",
+    "vitaminD",
+    "vitaminE",
+    "phosphorus",
+    "zinc",
+    "copper",
+    "manganese",
+    "selenium",
+    "fluoride",
+    "molybdenum",
+    "chlorine",
+    "vitaminB1",
+    "vitaminB2",
+    "vitaminB3",
+    "vitaminB5",
+    "vitaminB6",
+    "biotin",
+    "folate",
+    "folicAcid",
+    "foodFolate",
+    "folateDfe",
+    "choline",
+    "betaine",
+    "retinol",
+    "caroteneBeta",
+    "caroteneAlpha",
+    "lycopene",
+    "luteinZeaxanthin",
+    "vitaminD2",
+    "vitaminD3",
+    "vitaminDiu",
+    "vitaminK",
+    "dihydrophylloquinone",
+    "menaquinone4",
+    "monoFat",
+    "polyFat",
+    "ala",
+    "epa",
+    "dpa",
+    "dha",
+)
+
+# Grams a measurement row stands for: the chosen measurement, else the food's default (or first)
+# measurement, else 100 g. Same fallback as the app's getMeasurementGrams/getDefaultMeasurement.
+# ``{food}``/``{measurement}`` are the aliases of the food and the chosen food_measurement row.
+MEASUREMENT_GRAMS_SQL = (
+    "COALESCE({measurement}.weightInGrams, ("
+    "SELECT dm.weightInGrams FROM food_measurement dm WHERE dm.foodId = {food}.id "
+    "ORDER BY dm.isDefault DESC, dm.id ASC LIMIT 1"
+    "), 100)"
+)
+
+
+def nutrient_matrix(rows: Sequence[Sequence[Any]], start: int) -> np.ndarray:
+    """(n, len(NUTRIENT_COLUMNS)) float matrix of the nutrient values in ``row[start:]`` of every row.
+
+    Missing values (NULL) count as 0, as in the app's totals.
+    """
+    if not rows:
+        return np.zeros((0, len(NUTRIENT_COLUMNS)), dtype=np.float64)
+    return np.nan_to_num(np.array([row[start:] for row in rows], dtype=np.float64), copy=False)
+
+
+def group_sums(keys: np.ndarray, amounts: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Sum the ``amounts`` rows (n, m) that share a ``keys`` row (n, k integers).
+
+    Returns the distinct keys in lexicographic order, their sums, and the group index of every input
+    row, for reducing other per-row values (counts, maxima) with ``np.bincount``/``np.maximum.at``.
+    """
+    if len(keys) == 0:
+        return keys[:0], amounts[:0], np.zeros(0, dtype=np.int64)
+    order = np.lexsort(keys.T[::-1])
+    sorted_keys = keys[order]
+    changed = np.any(sorted_keys[1:] != sorted_keys[:-1], axis=1)
+    starts = np.concatenate(([0], np.flatnonzero(changed) + 1))
+    sums = np.add.reduceat(amounts[order], starts, axis=0)
+    groups = np.empty(len(keys), dtype=np.int64)
+    groups[order] = np.cumsum(np.concatenate(([False], changed)))
+    return sorted_keys[starts], sums, groups
+
+
+def distinct_counts(groups: np.ndarray, values: np.ndarray, group_count: int) -> np.ndarray:
+    """Number of distinct ``values`` per group index."""
+    if len(groups) == 0:
+        return np.zeros(group_count, dtype=np.int64)
+    pairs = np.unique(np.column_stack((groups, values)), axis=0)
+    return np.bincount(pairs[:, 0], minlength=group_count)
@@ -1,15 +1,26 @@
 import argparse
-import os
 import re
 import sys
 import time
-from pathlib import Path
-from typing import Dict, List, Optional
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
 
 import mysql.connector
 import pandas as pd
 from tqdm import tqdm
 
+from batch_sizing import AdaptiveBatchSizer, add_batch_size_arguments
+from foodtracker_db import ConnectionFactory, PreparedStatements, build_food_upsert_sql, load_db_config
+from dead_letter import DeadLetterWriter, add_dead_letter_arguments
+from import_metrics import ImportMetrics, add_metrics_arguments
+from import_records import (
+    DEFAULT_MEASUREMENTS,
+    FoodPayload,
+    MeasurementRecord,
+    food_payload_from_dict,
+    food_record_type,
+)
+from source_mappings import compile_extractor
+
 
 class MyFoodDataImporter:
     FOOD_COLUMNS = [
@@ -82,6 +93,7 @@ class MyFoodDataImporter:
         "lycopene",
         "luteinZeaxanthin",
     ]
+    FoodRecord = food_record_type("MyFoodDataFoodRecord", FOOD_COLUMNS)
     SERVING_WEIGHT_RE = re.compile(
         r"^Serving Weight\s*(\d+)(?:\s*\(g\)|\s*grams?)?$",
         re.IGNORECASE,
@@ -96,10 +108,14 @@ class MyFoodDataImporter:
         csv_file_path: str,
         env_file_path: Optional[str] = None,
         measurements_only: bool = False,
+        metrics: Optional[ImportMetrics] = None,
+        dead_letters: Optional[DeadLetterWriter] = None,
     ):
         self.csv_file_path = csv_file_path
         self.env_file_path = env_file_path
         self.measurements_only = measurements_only
+        self.metrics = metrics or ImportMetrics("post_all_csv_data_to_db")
+        self.dead_letters = dead_letters or DeadLetterWriter("post_all_csv_data_to_db")
         self.success_count = 0
         self.error_count = 0
         self.skipped_count = 0
@@ -109,67 +125,23 @@ class MyFoodDataImporter:
         self.submitted_count = 0
         self.batch_success_count = 0
         self.batch_fail_count = 0
-        self.errors: List[str] = []
-        self.db_config = self._load_db_config(env_file_path)
-
-    def _load_db_config(self, env_file_path: Optional[str]) -> Dict:
-        if env_file_path:
-            env_path = Path(env_file_path)
-        else:
-            env_path = Path(__file__).with_name(".env")
-
-        if env_path.exists():
-            self._load_env_file(env_path)
-
-        host = os.getenv("DB_HOST")
-        port = os.getenv("DB_PORT", "3306")
-        user = os.getenv("DB_USER")
-        password = os.getenv("DB_PASSWORD")
-        database = os.getenv("DB_NAME")
-
-        missing = [
-            key
-            for key, value in {
-                "DB_HOST": host,
-                "DB_USER": user,
-                "DB_PASSWORD": password,
-                "DB_NAME": database,
-            }.items()
-            if not value
-        ]
-
-        if missing:
-            raise ValueError(
-                f"Missing required DB settings: {', '.join(missing)}. "
-                f"Set them in environment or {env_path}."
-            )
-
-        try:
-            parsed_port = int(port)
-        except ValueError as exc:
-            raise ValueError(f"Invalid DB_PORT value: {port}") from exc
-
-        return {
-            "host": host,
-            "port": parsed_port,
-            "user": user,
-            "password": password,
-            "database": database,
-            "autocommit": False,
+        self.extract_food = compile_extractor("myfooddata", self.FoodRecord).extract
+        self.db_config = load_db_config(env_file_path)
+        self.connections = ConnectionFactory(self.db_config)
+        self.statement_sql = {
+            "food_upsert": build_food_upsert_sql(self.FOOD_COLUMNS),
+            "measurement_insert": (
+                "INSERT INTO food_measurement "
+                "(foodId, unit, name, abbreviation, weightInGrams, isDefault, isActive, isFromSource) "
+                "SELECT %s, %s, %s, %s, %s, %s, %s, %s "
+                "FROM DUAL WHERE NOT EXISTS ("
+                "SELECT 1 FROM food_measurement "
+                "WHERE foodId = %s AND unit = %s AND name = %s AND abbreviation = %s "
+                "AND ABS(weightInGrams - %s) < 0.01"
+                ")"
+            ),
         }
 
-    def _load_env_file(self, env_path: Path) -> None:
-        for line in env_path.read_text(encoding="utf-8").splitlines():
-            stripped = line.strip()
-            if not stripped or stripped.startswith("#") or "=" not in stripped:
-                continue
-            key, raw_value = stripped.split("=", 1)
-            key = key.strip()
-            value = raw_value.strip()
-            if value.startswith(("'", '"')) and value.endswith(("'", '"')) and len(value) >= 2:
-                value = value[1:-1]
-            os.environ.setdefault(key, value)
-
     def _clean_string(self, value) -> Optional[str]:
         if pd.isna(value) or value in ("", "N/A", "NULL", "null", "None"):
             return None
@@ -211,25 +183,8 @@ class MyFoodDataImporter:
         cleaned = re.sub(r"^\d+(\.\d+)?\s*", "", description).strip()
         return cleaned or description.strip()
 
-    def _build_measurements(self, row: Dict) -> List[Dict]:
-        measurements = [
-            {
-                "name": "100 grams",
-                "abbreviation": "100g",
-                "unit": "g",
-                "weightInGrams": 100.0,
-                "isDefault": True,
-                "isFromSource": True,
-            },
-            {
-                "name": "1 gram",
-                "abbreviation": "1g",
-                "unit": "g",
-                "weightInGrams": 1.0,
-                "isDefault": False,
-                "isFromSource": True,
-            },
-        ]
+    def _build_measurements(self, row: Dict) -> List[MeasurementRecord]:
+        measurements = list(DEFAULT_MEASUREMENTS)
 
         weight_columns: Dict[int, str] = {}
         desc_columns: Dict[int, str] = {}
@@ -251,95 +206,21 @@ class MyFoodDataImporter:
 
             if weight > 0 and description:
                 measurements.append(
-                    {
-                        "name": description,
-                        "unit": self._create_unit_label(description),
-                        "abbreviation": self._create_abbreviation(description),
-                        "weightInGrams": weight,
-                        "isDefault": False,
-                        "isFromSource": True,
-                    }
+                    MeasurementRecord(
+                        description,
+                        self._create_abbreviation(description),
+                        self._create_unit_label(description),
+                        weight,
+                    )
                 )
 
         return measurements
 
-    def _row_to_payload(self, row: Dict) -> Optional[Dict]:
-        name = self._clean_string(row.get("Name"))
-        if not name:
+    def _row_to_payload(self, row: Dict) -> Optional[FoodPayload]:
+        food = self.extract_food(row)
+        if food is None:
             return None
-
-        food = {
-            "sourceId": self._clean_string(row.get("ID")),
-            "isCsvFood": True,
-            "name": name,
-            "calories": int(self._clean_numeric(row.get("Calories", 0))),
-            "protein": self._clean_numeric(row.get("Protein (g)", 0)),
-            "carbs": self._clean_numeric(row.get("Carbohydrate (g)", 0)),
-            "fat": self._clean_numeric(row.get("Fat (g)", 0)),
-            "fiber": self._clean_numeric(row.get("Fiber (g)", 0)),
-            "sugar": self._clean_numeric(row.get("Sugars (g)", 0)),
-            "sodium": self._clean_numeric(row.get("Sodium (mg)", 0)),
-            "saturatedFat": self._clean_numeric(row.get("Saturated Fats (g)", 0)),
-            "transFat": self._clean_numeric(row.get("Trans Fatty Acids (g)", 0)),
-            "cholesterol": self._clean_numeric(row.get("Cholesterol (mg)", 0)),
-            "addedSugar": self._clean_numeric(row.get("Added Sugar (g)", 0)),
-            "netCarbs": self._clean_numeric(row.get("Net-Carbs (g)", 0)),
-            "solubleFiber": self._clean_numeric(row.get("Soluble Fiber (g)", 0)),
-            "insolubleFiber": self._clean_numeric(row.get("Insoluble Fiber (g)", 0)),
-            "water": self._clean_numeric(row.get("Water (g)", 0)),
-            "pralScore": self._clean_numeric(row.get("PRAL score", 0)),
-            "omega3": self._clean_numeric(row.get("Omega 3s (mg)", 0)),
-            "omega6": self._clean_numeric(row.get("Omega 6s (mg)", 0)),
-            "monoFat": self._clean_numeric(row.get("Fatty acids, total monounsaturated (mg)", 0)),
-            "polyFat": self._clean_numeric(row.get("Fatty acids, total polyunsaturated (mg)", 0)),
-            "ala": self._clean_numeric(row.get("18:3 n-3 c,c,c (ALA) (mg)", 0)),
-            "epa": self._clean_numeric(row.get("20:5 n-3 (EPA) (mg)", 0)),
-            "dpa": self._clean_numeric(row.get("22:5 n-3 (DPA) (mg)", 0)),
-            "dha": self._clean_numeric(row.get("22:6 n-3 (DHA) (mg)", 0)),
-            "calcium": self._clean_numeric(row.get("Calcium (mg)", 0)),
-            "iron": self._clean_numeric(row.get("Iron, Fe (mg)", 0)),
-            "potassium": self._clean_numeric(row.get("Potassium, K (mg)", 0)),
-            "magnesium": self._clean_numeric(row.get("Magnesium (mg)", 0)),
-            "vitaminAiu": self._clean_numeric(row.get("Vitamin A, IU (IU)", 0)),
-            "vitaminArae": self._clean_numeric(row.get("Vitamin A, RAE (mcg)", 0)),
-            "vitaminC": self._clean_numeric(row.get("Vitamin C (mg)", 0)),
-            "vitaminB12": self._clean_numeric(row.get("Vitamin B-12 (mcg)", 0)),
-            "vitaminD": self._clean_numeric(row.get("Vitamin D (mcg)", 0)),
-            "vitaminD2": self._clean_numeric(row.get("Vitamin D2 (ergocalciferol) (mcg)", 0)),
-            "vitaminD3": self._clean_numeric(row.get("Vitamin D3 (cholecalciferol) (mcg)", 0)),
-            "vitaminDiu": self._clean_numeric(row.get("Vitamin D (IU) (IU)", 0)),
-            "vitaminE": self._clean_numeric(row.get("Vitamin E (Alpha-Tocopherol) (mg)", 0)),
-            "phosphorus": self._clean_numeric(row.get("Phosphorus, P (mg)", 0)),
-            "zinc": self._clean_numeric(row.get("Zinc, Zn (mg)", 0)),
-            "copper": self._clean_numeric(row.get("Copper, Cu (mg)", 0)),
-            "manganese": self._clean_numeric(row.get("Manganese (mg)", 0)),
-            "selenium": self._clean_numeric(row.get("Selenium, Se (mcg)", 0)),
-            "fluoride": self._clean_numeric(row.get("Fluoride, F (mcg)", 0)),
-            "molybdenum": self._clean_numeric(row.get("Molybdenum (mcg)", 0)),
-            "chlorine": self._clean_numeric(row.get("Chlorine (mg)", 0)),
-            "vitaminB1": self._clean_numeric(row.get("Thiamin (B1) (mg)", 0)),
-            "vitaminB2": self._clean_numeric(row.get("Riboflavin (B2) (mg)", 0)),
-            "vitaminB3": self._clean_numeric(row.get("Niacin (B3) (mg)", 0)),
-            "vitaminB5": self._clean_numeric(row.get("Pantothenic acid (B5) (mg)", 0)),
-            "vitaminB6": self._clean_numeric(row.get("Vitamin B6 (mg)", 0)),
-            "biotin": self._clean_numeric(row.get("Biotin (B7) (mcg)", 0)),
-            "folate": self._clean_numeric(row.get("Folate (B9) (mcg)", 0)),
-            "folicAcid": self._clean_numeric(row.get("Folic acid (mcg)", 0)),
-            "foodFolate": self._clean_numeric(row.get("Food Folate (mcg)", 0)),
-            "folateDfe": self._clean_numeric(row.get("Folate DFE (mcg)", 0)),
-            "vitaminK": self._clean_numeric(row.get("Vitamin K (mcg)", 0)),
-            "dihydrophylloquinone": self._clean_numeric(row.get("Dihydrophylloquinone (mcg)", 0)),
-            "menaquinone4": self._clean_numeric(row.get("Menaquinone-4 (mcg)", 0)),
-            "choline": self._clean_numeric(row.get("Choline (mg)", 0)),
-            "betaine": self._clean_numeric(row.get("Betaine (mg)", 0)),
-            "retinol": self._clean_numeric(row.get("Retinol (mcg)", 0)),
-            "caroteneBeta": self._clean_numeric(row.get("Carotene, beta (mcg)", 0)),
-            "caroteneAlpha": self._clean_numeric(row.get("Carotene, alpha (mcg)", 0)),
-            "lycopene": self._clean_numeric(row.get("Lycopene (mcg)", 0)),
-            "luteinZeaxanthin": self._clean_numeric(row.get("Lutein + Zeaxanthin (mcg)", 0)),
-        }
-
-        return {"food": food, "measurements": self._build_measurements(row)}
+        return FoodPayload(food, self._build_measurements(row))
 
     def _validate_food_columns(self, conn: mysql.connector.MySQLConnection) -> None:
         cursor = conn.cursor()
@@ -355,27 +236,17 @@ class MyFoodDataImporter:
                 "Food table is missing required columns: " + ", ".join(missing_columns)
             )
 
-    def _insert_or_update_food(self, cursor: mysql.connector.cursor.MySQLCursor, food: Dict) -> int:
-        placeholders = ", ".join(["%s"] * len(self.FOOD_COLUMNS))
-        columns_sql = ", ".join(self.FOOD_COLUMNS)
-        update_columns = [col for col in self.FOOD_COLUMNS if col != "sourceId"]
-        update_sql = ", ".join([f"{col}=VALUES({col})" for col in update_columns])
-
-        sql = (
-            f"INSERT INTO food ({columns_sql}) VALUES ({placeholders}) "
-            f"ON DUPLICATE KEY UPDATE id=LAST_INSERT_ID(id), {update_sql}"
-        )
-
-        values = [food.get(col) for col in self.FOOD_COLUMNS]
-        cursor.execute(sql, values)
+    def _insert_or_update_food(self, statements: PreparedStatements, food: tuple) -> int:
+        with self.metrics.timer("food_upsert"):
+            cursor = statements.execute("food_upsert", food)
         return int(cursor.lastrowid)
 
     def _find_food_id(
         self,
         cursor: mysql.connector.cursor.MySQLCursor,
-        food: Dict,
+        food: tuple,
     ) -> Optional[int]:
-        source_id = food.get("sourceId")
+        source_id = food.sourceId
         if source_id:
             cursor.execute(
                 "SELECT id FROM food WHERE sourceId = %s ORDER BY id LIMIT 1",
@@ -385,7 +256,7 @@ class MyFoodDataImporter:
             if row:
                 return int(row[0])
 
-        name = food.get("name")
+        name = food.name
         if name:
             cursor.execute(
                 "SELECT id FROM food WHERE name = %s ORDER BY id LIMIT 1",
@@ -398,88 +269,154 @@ class MyFoodDataImporter:
 
     def _ensure_measurements(
         self,
-        cursor: mysql.connector.cursor.MySQLCursor,
+        statements: PreparedStatements,
         food_id: int,
-        measurements: List[Dict],
+        measurements: Sequence[MeasurementRecord],
     ) -> Dict[str, int]:
-        sql = (
-            "INSERT INTO food_measurement "
-            "(foodId, unit, name, abbreviation, weightInGrams, isDefault, isActive, isFromSource) "
-            "SELECT %s, %s, %s, %s, %s, %s, %s, %s "
-            "FROM DUAL WHERE NOT EXISTS ("
-            "SELECT 1 FROM food_measurement "
-            "WHERE foodId = %s AND unit = %s AND name = %s AND abbreviation = %s "
-            "AND ABS(weightInGrams - %s) < 0.01"
-            ")"
-        )
-
         inserted = 0
         skipped = 0
-        for measurement in measurements:
-            abbreviation = measurement["abbreviation"]
-            cursor.execute(
-                sql,
-                (
-                    food_id,
-                    measurement["unit"],
-                    measurement["name"],
-                    abbreviation,
-                    measurement["weightInGrams"],
-                    1 if measurement.get("isDefault") else 0,
-                    1,
-                    1 if measurement.get("isFromSource") else 0,
-                    food_id,
-                    measurement["unit"],
-                    measurement["name"],
-                    abbreviation,
-                    measurement["weightInGrams"],
-                ),
-            )
-            if cursor.rowcount and cursor.rowcount > 0:
-                inserted += 1
-            else:
-                skipped += 1
+        with self.metrics.timer("measurement_write"):
+            for measurement in measurements:
+                cursor = statements.execute(
+                    "measurement_insert",
+                    (
+                        food_id,
+                        measurement.unit,
+                        measurement.name,
+                        measurement.abbreviation,
+                        measurement.weightInGrams,
+                        1 if measurement.isDefault else 0,
+                        1,
+                        1 if measurement.isFromSource else 0,
+                        food_id,
+                        measurement.unit,
+                        measurement.name,
+                        measurement.abbreviation,
+                        measurement.weightInGrams,
+                    ),
+                )
+                if cursor.rowcount and cursor.rowcount > 0:
+                    inserted += 1
+                else:
+                    skipped += 1
         return {"inserted": inserted, "skipped": skipped}
 
-    def _write_batch(self, conn: mysql.connector.MySQLConnection, batch: List[Dict], batch_id: int) -> Dict:
-        started = time.perf_counter()
-        cursor = conn.cursor()
-
+    def _write_rows(
+        self,
+        statements: PreparedStatements,
+        cursor: mysql.connector.cursor.MySQLCursor,
+        rows: List[FoodPayload],
+    ) -> Dict[str, int]:
+        counts = {"missing_food": 0, "measurements_inserted": 0, "measurements_skipped": 0}
+        for item in rows:
+            with self.metrics.timer("food_lookup"):
+                food_id = self._find_food_id(cursor, item.food)
+            if self.measurements_only:
+                if food_id is None:
+                    counts["missing_food"] += 1
+                    continue
+            else:
+                if food_id is None:
+                    food_id = self._insert_or_update_food(statements, item.food)
+            measurement_result = self._ensure_measurements(statements, food_id, item.measurements)
+            counts["measurements_inserted"] += measurement_result["inserted"]
+            counts["measurements_skipped"] += measurement_result["skipped"]
+        return counts
+
+    def _write_isolating_failures(
+        self,
+        statements: PreparedStatements,
+        cursor: mysql.connector.cursor.MySQLCursor,
+        rows: List[FoodPayload],
+        batch_id: int,
+    ) -> Tuple[int, List[str]]:
+        """Commit ``rows``; on failure retry each half until the failing rows are isolated.
+
+        Returns the number of rows committed and the errors of the rows sent to the dead-letter file.
+        """
+        conn = statements.conn
         try:
-            for item in batch:
-                food_id = self._find_food_id(cursor, item["food"])
-                if self.measurements_only:
-                    if food_id is None:
-                        self.skipped_missing_food_count += 1
-                        continue
-                else:
-                    if food_id is None:
-                        food_id = self._insert_or_update_food(cursor, item["food"])
-                measurement_result = self._ensure_measurements(cursor, food_id, item["measurements"])
-                self.measurements_added_count += measurement_result["inserted"]
-                self.measurements_skipped_count += measurement_result["skipped"]
-
-            conn.commit()
-            latency = time.perf_counter() - started
-            return {"ok": True, "rows": len(batch), "batch_id": batch_id, "latency_s": latency, "error": ""}
+            counts = self._write_rows(statements, cursor, rows)
+            self.metrics.commit(conn)
         except mysql.connector.Error as exc:
             conn.rollback()
-            latency = time.perf_counter() - started
-            return {"ok": False, "rows": len(batch), "batch_id": batch_id, "latency_s": latency, "error": str(exc)}
+            if len(rows) == 1:
+                self.dead_letters.write(rows[0], exc, stage="myfooddata", batch_id=batch_id)
+                return 0, [str(exc)]
+            middle = len(rows) // 2
+            left_written, left_errors = self._write_isolating_failures(statements, cursor, rows[:middle], batch_id)
+            right_written, right_errors = self._write_isolating_failures(statements, cursor, rows[middle:], batch_id)
+            return left_written + right_written, left_errors + right_errors
+
+        # Counters only move once the rows are committed, so retried halves are not double counted.
+        self.skipped_missing_food_count += counts["missing_food"]
+        self.measurements_added_count += counts["measurements_inserted"]
+        self.measurements_skipped_count += counts["measurements_skipped"]
+        return len(rows), []
+
+    def _write_batch(self, statements: PreparedStatements, batch: List[FoodPayload], batch_id: int) -> Dict:
+        started = time.perf_counter()
+        cursor = statements.conn.cursor()
+        try:
+            written, errors = self._write_isolating_failures(statements, cursor, batch, batch_id)
         finally:
             cursor.close()
+        latency = time.perf_counter() - started
+        return {
+            "ok": not errors,
+            "rows": len(batch),
+            "written": written,
+            "failed": len(errors),
+            "batch_id": batch_id,
+            "latency_s": latency,
+            "error": errors[0] if errors else "",
+        }
+
+    def replay(self, entries: Iterable[Dict], batch_size: int = 100) -> Tuple[int, int]:
+        """Write the records of dead-letter ``entries`` again; returns (written, failed)."""
+        conn = self.connections.connect()
+        self._validate_food_columns(conn)
+        statements = PreparedStatements(conn, self.statement_sql)
+        batch: List[FoodPayload] = []
+        batch_id = 0
+        written = 0
+        failed = 0
+        try:
+            for entry in entries:
+                batch.append(food_payload_from_dict(entry["record"], self.FoodRecord))
+                if len(batch) < batch_size:
+                    continue
+                batch_id += 1
+                result = self._write_batch(statements, batch, batch_id)
+                written += result["written"]
+                failed += result["failed"]
+                batch = []
+            if batch:
+                result = self._write_batch(statements, batch, batch_id + 1)
+                written += result["written"]
+                failed += result["failed"]
+        finally:
+            statements.close()
+            conn.close()
+        return written, failed
 
-    def import_foods(self, batch_size: int = 100, max_error_examples: int = 10) -> None:
+    def import_foods(
+        self,
+        batch_size: int = 100,
+        max_error_examples: int = 10,
+        batch_sizer: Optional[AdaptiveBatchSizer] = None,
+    ) -> None:
         print(f"Starting MyFoodData import from {self.csv_file_path}")
         print(
             "Target DB: "
             f"{self.db_config['user']}@{self.db_config['host']}:{self.db_config['port']}/{self.db_config['database']}"
         )
-        print(f"Settings: batch_size={batch_size}")
+        batch_sizer = batch_sizer or AdaptiveBatchSizer(batch_size, target_latency_s=0)
+        print(f"Settings: batch_size={batch_sizer.size}, batch sizing {batch_sizer.describe()}")
         if self.measurements_only:
             print("Mode: measurements-only (no food inserts/updates)")
 
-        batch: List[Dict] = []
+        batch: List[FoodPayload] = []
         processed_rows = 0
         submitted_batches = 0
         total_latency_s = 0.0
@@ -506,48 +443,50 @@ class MyFoodDataImporter:
             position=1,
         )
 
-        conn = mysql.connector.connect(**self.db_config)
+        conn = self.connections.connect()
         self._validate_food_columns(conn)
+        statements = PreparedStatements(conn, self.statement_sql)
 
         def flush_batch(force: bool = False) -> None:
             nonlocal batch, submitted_batches, total_latency_s
             if not batch:
                 return
-            if not force and len(batch) < batch_size:
+            if not force and len(batch) < batch_sizer.size:
                 return
 
             submitted_batches += 1
             self.submitted_count += len(batch)
-            result = self._write_batch(conn, batch, submitted_batches)
+            result = self._write_batch(statements, batch, submitted_batches)
             total_latency_s += result["latency_s"]
+            batch_sizer.observe(result["rows"], result["latency_s"])
             batches_progress.update(1)
 
+            self.success_count += result["written"]
+            self.error_count += result["failed"]
             if result["ok"]:
-                self.success_count += result["rows"]
                 self.batch_success_count += 1
                 tqdm.write(
                     f"OK    batch={result['batch_id']} rows={result['rows']} latency={result['latency_s']:.2f}s"
                 )
             else:
-                self.error_count += result["rows"]
                 self.batch_fail_count += 1
-                if len(self.errors) < max_error_examples:
-                    self.errors.append(
-                        f"batch={result['batch_id']} rows={result['rows']} error={result['error']}"
-                    )
                 tqdm.write(
-                    f"FAIL  batch={result['batch_id']} rows={result['rows']} error={result['error']}"
+                    f"FAIL  batch={result['batch_id']} rows={result['rows']} written={result['written']} "
+                    f"failed={result['failed']} error={result['error']}"
                 )
 
             batch = []
 
         try:
             # The CSV has 3 non-data rows before the header row; skiprows=[0,1,2] drops them.
-            for chunk in pd.read_csv(
-                self.csv_file_path,
-                skiprows=[0, 1, 2],
-                chunksize=5000,
-                low_memory=False,
+            for chunk in self.metrics.timed_iter(
+                "parse",
+                pd.read_csv(
+                    self.csv_file_path,
+                    skiprows=[0, 1, 2],
+                    chunksize=5000,
+                    low_memory=False,
+                ),
             ):
                 chunk.rename(columns=lambda col: str(col).strip(), inplace=True)
                 if "Name" not in chunk.columns:
@@ -555,9 +494,12 @@ class MyFoodDataImporter:
                         "CSV header missing expected 'Name' column. "
                         f"Found columns: {', '.join(str(col) for col in chunk.columns)}"
                     )
-                for row in chunk.to_dict(orient="records"):
+                with self.metrics.timer("parse"):
+                    rows = chunk.to_dict(orient="records")
+                for row in rows:
                     processed_rows += 1
-                    payload = self._row_to_payload(row)
+                    with self.metrics.timer("transform"):
+                        payload = self._row_to_payload(row)
                     if payload is None:
                         self.skipped_count += 1
                         rows_progress.update(1)
@@ -566,11 +508,12 @@ class MyFoodDataImporter:
                     batch.append(payload)
                     rows_progress.update(1)
 
-                    if len(batch) >= batch_size:
+                    if len(batch) >= batch_sizer.size:
                         flush_batch(force=True)
 
             flush_batch(force=True)
         finally:
+            statements.close()
             conn.close()
             rows_progress.close()
             batches_progress.close()
@@ -589,15 +532,24 @@ class MyFoodDataImporter:
         print(f"Measurements added: {self.measurements_added_count}")
         print(f"Measurements skipped (already existed): {self.measurements_skipped_count}")
         print(f"Successful batches: {self.batch_success_count}")
-        print(f"Failed batches: {self.batch_fail_count}")
+        print(f"Batches with failed rows: {self.batch_fail_count}")
+        print(f"Dead-lettered rows: {self.dead_letters.summary()}")
         print(f"Avg batch latency: {avg_latency_s:.2f}s")
+        print(f"Batch size: {batch_sizer.describe()}")
         print(f"Throughput: {self.success_count / elapsed_s:.1f} successful rows/sec")
 
+        self.metrics.count("rows_processed", processed_rows)
+        self.metrics.count("rows_skipped", self.skipped_count)
+        self.metrics.count("rows_written", self.success_count)
+        self.metrics.count("rows_failed", self.error_count)
+        self.metrics.count("batch_size_converged", batch_sizer.converged_size)
+        self.metrics.count("measurements_written", self.measurements_added_count)
+
         print("\n" + "=" * 50)
         print("IMPORT SUMMARY")
         print("=" * 50)
-        if self.errors:
-            print(f"First {len(self.errors)} errors: {self.errors}")
+        for line in self.dead_letters.error_class_summary(limit=max_error_examples):
+            print(line)
 
 
 if __name__ == "__main__":
@@ -612,7 +564,7 @@ if __name__ == "__main__":
         default=None,
         help="Optional path to .env file with DB_HOST/DB_PORT/DB_USER/DB_PASSWORD/DB_NAME.",
     )
-    parser.add_argument("--batch-size", type=int, default=100, help="Rows per DB transaction.")
+    add_batch_size_arguments(parser, default_batch_size=100)
     parser.add_argument(
         "--measurements-only",
         action="store_true",
@@ -622,13 +574,24 @@ if __name__ == "__main__":
         "--max-error-examples",
         type=int,
         default=10,
-        help="Maximum number of detailed errors to keep in summary.",
+        help="Maximum number of error classes to list in the summary.",
     )
+    add_dead_letter_arguments(parser)
+    add_metrics_arguments(parser)
 
     args = parser.parse_args()
-
-    importer = MyFoodDataImporter(args.csv_file, args.env_file, measurements_only=args.measurements_only)
-    importer.import_foods(
-        batch_size=args.batch_size,
-        max_error_examples=args.max_error_examples,
+    metrics = ImportMetrics.from_args("post_all_csv_data_to_db", args)
+    dead_letters = DeadLetterWriter.from_args("post_all_csv_data_to_db", args)
+
+    importer = MyFoodDataImporter(
+        args.csv_file,
+        args.env_file,
+        measurements_only=args.measurements_only,
+        metrics=metrics,
+        dead_letters=dead_letters,
     )
+    with metrics.session(), dead_letters, metrics.stage("myfooddata"):
+        importer.import_foods(
+            max_error_examples=args.max_error_examples,
+            batch_sizer=AdaptiveBatchSizer.from_args(args),
+        )
@@ -1,26 +1,58 @@
 import argparse
-import csv
-import os
 import re
 import sys
+import time
 from pathlib import Path
-from typing import Dict, Optional
+from typing import Dict, Iterable, List, Optional, Tuple
 
 import mysql.connector
 from tqdm import tqdm
 
+from batch_sizing import AdaptiveBatchSizer, add_batch_size_arguments
+from compressed_input import FdcSource
+from dead_letter import DeadLetterWriter, add_dead_letter_arguments
+from fdc_csv import add_csv_backend_arguments, iter_rows, resolve_csv_backend
+from foodtracker_db import ConnectionFactory, PreparedStatements, load_db_config
+from import_metrics import ImportMetrics, add_metrics_arguments
+from import_records import MeasurementRecord, PortionRecord, portion_record_from_dict
+
 
 class FdcPortionMeasurementImporter:
+    PORTION_COLUMNS = ("fdc_id", "measure_unit_id", "amount", "modifier", "portion_description", "gram_weight")
+
     def __init__(
         self,
         fdc_dir: str,
         env_file_path: Optional[str] = None,
         batch_size: int = 1000,
+        metrics: Optional[ImportMetrics] = None,
+        batch_sizer: Optional[AdaptiveBatchSizer] = None,
+        dead_letters: Optional[DeadLetterWriter] = None,
+        csv_backend: str = "auto",
     ):
         self.fdc_dir = Path(fdc_dir)
         self.env_file_path = env_file_path
         self.batch_size = max(batch_size, 1)
-        self.db_config = self._load_db_config(env_file_path)
+        self.csv_backend = resolve_csv_backend(csv_backend)
+        # pyarrow reads ahead on its own threads; the csv module gets a background decompression thread.
+        self.fdc_source = FdcSource(self.fdc_dir, read_ahead=self.csv_backend == "csv")
+        self.batch_sizer = batch_sizer or AdaptiveBatchSizer(self.batch_size, target_latency_s=0)
+        self.metrics = metrics or ImportMetrics("post_fdc_portion_measurements_to_db")
+        self.dead_letters = dead_letters or DeadLetterWriter("post_fdc_portion_measurements_to_db")
+        self.db_config = load_db_config(env_file_path)
+        self.connections = ConnectionFactory(self.db_config)
+        self.statement_sql = {
+            "measurement_insert": (
+                "INSERT INTO food_measurement "
+                "(foodId, unit, name, abbreviation, weightInGrams, isDefault, isActive, isFromSource) "
+                "SELECT %s, %s, %s, %s, %s, %s, %s, %s "
+                "FROM DUAL WHERE NOT EXISTS ("
+                "SELECT 1 FROM food_measurement "
+                "WHERE foodId = %s AND unit = %s AND name = %s AND abbreviation = %s "
+                "AND ABS(weightInGrams - %s) < 0.01"
+                ")"
+            ),
+        }
 
         self.rows_scanned = 0
         self.inserted = 0
@@ -29,64 +61,6 @@ class FdcPortionMeasurementImporter:
         self.skipped_invalid = 0
         self.errors = 0
 
-    def _load_db_config(self, env_file_path: Optional[str]) -> Dict:
-        if env_file_path:
-            env_path = Path(env_file_path)
-        else:
-            env_path = Path(__file__).with_name(".env")
-
-        if env_path.exists():
-            self._load_env_file(env_path)
-
-        host = os.getenv("DB_HOST")
-        port = os.getenv("DB_PORT", "3306")
-        user = os.getenv("DB_USER")
-        password = os.getenv("DB_PASSWORD")
-        database = os.getenv("DB_NAME")
-
-        missing = [
-            key
-            for key, value in {
-                "DB_HOST": host,
-                "DB_USER": user,
-                "DB_PASSWORD": password,
-                "DB_NAME": database,
-            }.items()
-            if not value
-        ]
-
-        if missing:
-            raise ValueError(
-                f"Missing required DB settings: {', '.join(missing)}. "
-                f"Set them in environment or {env_path}."
-            )
-
-        try:
-            parsed_port = int(port)
-        except ValueError as exc:
-            raise ValueError(f"Invalid DB_PORT value: {port}") from exc
-
-        return {
-            "host": host,
-            "port": parsed_port,
-            "user": user,
-            "password": password,
-            "database": database,
-            "autocommit": False,
-        }
-
-    def _load_env_file(self, env_path: Path) -> None:
-        for line in env_path.read_text(encoding="utf-8").splitlines():
-            stripped = line.strip()
-            if not stripped or stripped.startswith("#") or "=" not in stripped:
-                continue
-            key, raw_value = stripped.split("=", 1)
-            key = key.strip()
-            value = raw_value.strip()
-            if value.startswith(("'", '"')) and value.endswith(("'", '"')) and len(value) >= 2:
-                value = value[1:-1]
-            os.environ.setdefault(key, value)
-
     def _clean_string(self, value) -> Optional[str]:
         if value is None:
             return None
@@ -129,7 +103,7 @@ class FdcPortionMeasurementImporter:
             return str(int(amount))
         return f"{amount:g}"
 
-    def _build_measurement(self, row: Dict[str, str], unit_name: str) -> Optional[Dict]:
+    def _build_measurement(self, row: Dict[str, str], unit_name: str) -> Optional[MeasurementRecord]:
         gram_weight = self._clean_numeric(row.get("gram_weight"))
         if gram_weight <= 0:
             return None
@@ -144,136 +118,160 @@ class FdcPortionMeasurementImporter:
             parts = [amount_text, modifier, unit_name]
             name = " ".join([part for part in parts if part]).strip() or unit_name
 
-        return {
-            "unit": unit_name,
-            "name": name,
-            "abbreviation": self._create_abbreviation(name),
-            "weightInGrams": gram_weight,
-            "isDefault": False,
-            "isFromSource": True,
-        }
+        return MeasurementRecord(name, self._create_abbreviation(name), unit_name, gram_weight)
 
     def _load_unit_lookup(self) -> Dict[str, str]:
-        measure_unit_path = self.fdc_dir / "measure_unit.csv"
-        if not measure_unit_path.exists():
-            raise FileNotFoundError(f"Missing required file: {measure_unit_path}")
-
+        measure_units = self.fdc_source.open("measure_unit.csv")
         unit_lookup: Dict[str, str] = {}
-        with measure_unit_path.open(newline="", encoding="utf-8") as handle:
-            reader = csv.DictReader(handle)
-            for row in reader:
-                unit_id = self._clean_string(row.get("id"))
-                name = self._clean_string(row.get("name"))
-                if unit_id and name:
-                    unit_lookup[unit_id] = name
+        for raw_unit_id, raw_name in iter_rows(measure_units, ("id", "name"), self.csv_backend):
+            unit_id = self._clean_string(raw_unit_id)
+            name = self._clean_string(raw_name)
+            if unit_id and name:
+                unit_lookup[unit_id] = name
         return unit_lookup
 
     def _ensure_measurement(
         self,
-        cursor: mysql.connector.cursor.MySQLCursor,
+        statements: PreparedStatements,
         food_id: int,
-        measurement: Dict,
+        measurement: MeasurementRecord,
     ) -> bool:
-        sql = (
-            "INSERT INTO food_measurement "
-            "(foodId, unit, name, abbreviation, weightInGrams, isDefault, isActive, isFromSource) "
-            "SELECT %s, %s, %s, %s, %s, %s, %s, %s "
-            "FROM DUAL WHERE NOT EXISTS ("
-            "SELECT 1 FROM food_measurement "
-            "WHERE foodId = %s AND unit = %s AND name = %s AND abbreviation = %s "
-            "AND ABS(weightInGrams - %s) < 0.01"
-            ")"
-        )
-        cursor.execute(
-            sql,
-            (
-                food_id,
-                measurement["unit"],
-                measurement["name"],
-                measurement["abbreviation"],
-                measurement["weightInGrams"],
-                1 if measurement.get("isDefault") else 0,
-                1,
-                1 if measurement.get("isFromSource") else 0,
-                food_id,
-                measurement["unit"],
-                measurement["name"],
-                measurement["abbreviation"],
-                measurement["weightInGrams"],
-            ),
-        )
+        with self.metrics.timer("measurement_write"):
+            cursor = statements.execute(
+                "measurement_insert",
+                (
+                    food_id,
+                    measurement.unit,
+                    measurement.name,
+                    measurement.abbreviation,
+                    measurement.weightInGrams,
+                    1 if measurement.isDefault else 0,
+                    1,
+                    1 if measurement.isFromSource else 0,
+                    food_id,
+                    measurement.unit,
+                    measurement.name,
+                    measurement.abbreviation,
+                    measurement.weightInGrams,
+                ),
+            )
         return bool(cursor.rowcount and cursor.rowcount > 0)
 
+    def _write_isolating_failures(
+        self, conn, statements: PreparedStatements, items: List[PortionRecord]
+    ) -> Tuple[List[bool], int]:
+        """Commit ``items``; on failure retry each half until the failing rows are isolated."""
+        try:
+            outcomes = [
+                self._ensure_measurement(statements, item.foodId, item.measurement) for item in items
+            ]
+            self.metrics.commit(conn)
+        except mysql.connector.Error as exc:
+            conn.rollback()
+            if len(items) == 1:
+                self.dead_letters.write(items[0], exc, stage="fdc-portions")
+                return [], 1
+            middle = len(items) // 2
+            left_outcomes, left_failed = self._write_isolating_failures(conn, statements, items[:middle])
+            right_outcomes, right_failed = self._write_isolating_failures(conn, statements, items[middle:])
+            return left_outcomes + right_outcomes, left_failed + right_failed
+        return outcomes, 0
+
+    def _flush(self, conn, statements: PreparedStatements, pending: List[PortionRecord]) -> None:
+        started = time.perf_counter()
+        outcomes, failed = self._write_isolating_failures(conn, statements, pending)
+        self.batch_sizer.observe(len(pending), time.perf_counter() - started)
+        inserted = sum(1 for outcome in outcomes if outcome)
+        self.inserted += inserted
+        self.skipped_existing += len(outcomes) - inserted
+        self.errors += failed
+        pending.clear()
+
+    def replay(self, entries: Iterable[Dict]) -> Tuple[int, int]:
+        """Write the records of dead-letter ``entries`` again; returns (written, failed)."""
+        conn = self.connections.connect()
+        statements = PreparedStatements(conn, self.statement_sql)
+        pending: List[PortionRecord] = []
+        written_before = self.inserted + self.skipped_existing
+        errors_before = self.errors
+        try:
+            for entry in entries:
+                pending.append(portion_record_from_dict(entry["record"]))
+                if len(pending) >= self.batch_sizer.size:
+                    self._flush(conn, statements, pending)
+            if pending:
+                self._flush(conn, statements, pending)
+        finally:
+            statements.close()
+            conn.close()
+        return self.inserted + self.skipped_existing - written_before, self.errors - errors_before
+
     def run(self) -> None:
-        portion_path = self.fdc_dir / "food_portion.csv"
-        if not portion_path.exists():
-            raise FileNotFoundError(f"Missing required file: {portion_path}")
+        if not self.fdc_source.exists("food_portion.csv"):
+            raise FileNotFoundError(f"Missing required file: {self.fdc_source.describe('food_portion.csv')}")
 
-        print(f"Starting FDC portion measurement import from {portion_path}")
+        print(f"Starting FDC portion measurement import from {self.fdc_source.describe('food_portion.csv')}")
         print(
             "Target DB: "
             f"{self.db_config['user']}@{self.db_config['host']}:{self.db_config['port']}/{self.db_config['database']}"
         )
-        print(f"Settings: batch_size={self.batch_size}")
+        print(
+            f"Settings: batch_size={self.batch_sizer.size}, batch sizing {self.batch_sizer.describe()}, "
+            f"CSV backend {self.csv_backend}"
+        )
 
         unit_lookup = self._load_unit_lookup()
-        conn = mysql.connector.connect(**self.db_config)
+        conn = self.connections.connect()
         cursor = conn.cursor()
+        statements = PreparedStatements(conn, self.statement_sql)
         food_id_cache: Dict[str, int] = {}
-        pending = 0
+        pending: List[PortionRecord] = []
 
         try:
-            with portion_path.open(newline="", encoding="utf-8") as handle:
-                reader = csv.DictReader(handle)
-                for row in tqdm(reader, desc="FDC portions", unit="rows", file=sys.stdout):
-                    self.rows_scanned += 1
-
-                    fdc_id = self._clean_string(row.get("fdc_id"))
-                    if not fdc_id:
-                        self.skipped_invalid += 1
-                        continue
-
-                    food_id = food_id_cache.get(fdc_id)
-                    if food_id is None:
+            rows = self.metrics.timed_iter(
+                "parse", iter_rows(self.fdc_source.open("food_portion.csv"), self.PORTION_COLUMNS, self.csv_backend)
+            )
+            for values in tqdm(rows, desc="FDC portions", unit="rows", file=sys.stdout):
+                self.rows_scanned += 1
+
+                fdc_id = self._clean_string(values[0])
+                if not fdc_id:
+                    self.skipped_invalid += 1
+                    continue
+
+                food_id = food_id_cache.get(fdc_id)
+                if food_id is None:
+                    with self.metrics.timer("food_lookup"):
                         cursor.execute("SELECT id FROM food WHERE sourceId = %s LIMIT 1", (fdc_id,))
                         result = cursor.fetchone()
-                        if not result:
-                            food_id = 0
-                        else:
-                            food_id = int(result[0])
-                        food_id_cache[fdc_id] = food_id
-                        if len(food_id_cache) > 50000:
-                            food_id_cache.clear()
-
-                    if food_id == 0:
-                        self.skipped_missing_food += 1
-                        continue
-
-                    unit_id = self._clean_string(row.get("measure_unit_id")) or ""
-                    unit_name = unit_lookup.get(unit_id, "unit")
+                    if not result:
+                        food_id = 0
+                    else:
+                        food_id = int(result[0])
+                    food_id_cache[fdc_id] = food_id
+                    if len(food_id_cache) > 50000:
+                        food_id_cache.clear()
+
+                if food_id == 0:
+                    self.skipped_missing_food += 1
+                    continue
+
+                unit_id = self._clean_string(values[1]) or ""
+                unit_name = unit_lookup.get(unit_id, "unit")
+                row = dict(zip(self.PORTION_COLUMNS, values))
+                with self.metrics.timer("transform"):
                     measurement = self._build_measurement(row, unit_name)
-                    if measurement is None:
-                        self.skipped_invalid += 1
-                        continue
-
-                    try:
-                        if self._ensure_measurement(cursor, food_id, measurement):
-                            self.inserted += 1
-                        else:
-                            self.skipped_existing += 1
-                        pending += 1
-                    except mysql.connector.Error:
-                        conn.rollback()
-                        pending = 0
-                        self.errors += 1
-                        continue
-
-                    if pending >= self.batch_size:
-                        conn.commit()
-                        pending = 0
+                if measurement is None:
+                    self.skipped_invalid += 1
+                    continue
+
+                pending.append(PortionRecord(fdc_id, food_id, measurement))
+                if len(pending) >= self.batch_sizer.size:
+                    self._flush(conn, statements, pending)
         finally:
             if pending:
-                conn.commit()
+                self._flush(conn, statements, pending)
+            statements.close()
             cursor.close()
             conn.close()
 
@@ -283,6 +281,15 @@ class FdcPortionMeasurementImporter:
         print(f"Rows skipped (food not found): {self.skipped_missing_food}")
         print(f"Rows skipped (invalid data): {self.skipped_invalid}")
         print(f"Row errors: {self.errors}")
+        print(f"Dead-lettered rows: {self.dead_letters.summary()}")
+        for line in self.dead_letters.error_class_summary(limit=10):
+            print(line)
+        print(f"Batch size: {self.batch_sizer.describe()}")
+
+        self.metrics.count("rows_scanned", self.rows_scanned)
+        self.metrics.count("measurements_written", self.inserted)
+        self.metrics.count("errors", self.errors)
+        self.metrics.count("batch_size_converged", self.batch_sizer.converged_size)
 
 
 if __name__ == "__main__":
@@ -292,20 +299,30 @@ if __name__ == "__main__":
     parser.add_argument(
         "--fdc-dir",
         default="../data/FoodData_Central_foundation_food_csv_2025-12-18",
-        help="Directory containing food_portion.csv and measure_unit.csv.",
+        help="Directory (or FDC .zip) containing food_portion.csv and measure_unit.csv.",
     )
     parser.add_argument(
         "--env-file",
         default=None,
         help="Optional path to .env file with DB_HOST/DB_PORT/DB_USER/DB_PASSWORD/DB_NAME.",
     )
-    parser.add_argument("--batch-size", type=int, default=1000, help="Rows per DB transaction.")
+    add_batch_size_arguments(parser, default_batch_size=1000)
+    add_csv_backend_arguments(parser)
+    add_dead_letter_arguments(parser)
+    add_metrics_arguments(parser)
 
     args = parser.parse_args()
+    metrics = ImportMetrics.from_args("post_fdc_portion_measurements_to_db", args)
+    dead_letters = DeadLetterWriter.from_args("post_fdc_portion_measurements_to_db", args)
 
     importer = FdcPortionMeasurementImporter(
         fdc_dir=args.fdc_dir,
         env_file_path=args.env_file,
         batch_size=args.batch_size,
+        metrics=metrics,
+        batch_sizer=AdaptiveBatchSizer.from_args(args),
+        dead_letters=dead_letters,
+        csv_backend=args.csv_backend,
     )
-    importer.run()
+    with metrics.session(), dead_letters, metrics.stage("fdc-portions"):
+        importer.run()
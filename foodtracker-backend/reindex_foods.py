@@ -1,71 +1,17 @@
+import argparse
+import gzip
+import json
 import os
-from typing import Any, Dict, Optional
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Any, Dict, List, Optional, Tuple
 
 import requests
+from tqdm import tqdm
 
-
-def build_index_payload() -> Dict[str, Any]:
-    return {
-        "settings": {
-            "analysis": {
-                "filter": {
-                    "edge_ngram_filter": {
-                        "type": "edge_ngram",
-                        "min_gram": 1,
-                        "max_gram": 20,
-                    }
-                },
-                "normalizer": {
-                    "lowercase_normalizer": {
-                        "type": "custom",
-                        "filter": ["lowercase"],
-                    }
-                },
-                "analyzer": {
-                    "name_prefix_analyzer": {
-                        "type": "custom",
-                        "tokenizer": "standard",
-                        "filter": ["lowercase", "edge_ngram_filter"],
-                    },
-                    "name_prefix_search": {
-                        "type": "custom",
-                        "tokenizer": "standard",
-                        "filter": ["lowercase"],
-                    },
-                },
-            }
-        },
-        "mappings": {
-            "properties": {
-                "name": {
-                    "type": "text",
-                    "fields": {
-                        "keyword": {
-                            "type": "keyword",
-                            "normalizer": "lowercase_normalizer",
-                        },
-                        "prefix": {
-                            "type": "text",
-                            "analyzer": "name_prefix_analyzer",
-                            "search_analyzer": "name_prefix_search",
-                        },
-                    },
-                },
-                "brand": {
-                    "type": "text",
-                    "fields": {
-                        "keyword": {
-                            "type": "keyword",
-                            "normalizer": "lowercase_normalizer",
-                        },
-                    },
-                },
-                "isCsvFood": {
-                    "type": "boolean",
-                },
-            }
-        },
-    }
+from food_documents import FOOD_DOCUMENT_SELECT, build_index_payload, food_document_json
+from foodtracker_db import connect_once, load_db_config, split_id_ranges
+from import_metrics import ImportMetrics, add_metrics_arguments
 
 
 def delete_index(es_url: str, index_name: str) -> None:
@@ -81,31 +27,251 @@ def create_index(es_url: str, index_name: str) -> None:
     response.raise_for_status()
 
 
-def reindex_foods(api_base_url: str, api_token: Optional[str], endpoint: str) -> None:
+def reindex_foods(
+    api_base_url: str,
+    api_token: Optional[str],
+    endpoint: str,
+    job_endpoint: str = "/food/reindex-jobs",
+    poll_interval_s: float = 2.0,
+) -> None:
     headers = {}
     if api_token:
         headers["Authorization"] = f"Bearer {api_token}"
     response = requests.post(f"{api_base_url}{endpoint}", headers=headers, timeout=30)
     response.raise_for_status()
-    body = response.json()
-    print(f"Reindexed {body.get('indexedCount', 0)} foods.")
+    job = response.json()
+    print(f"Reindex job started: {job.get('jobId')}")
+
+    progress = tqdm(total=job.get("totalCount") or None, unit="foods", desc="Foods indexed")
+    try:
+        while job.get("status") == "running":
+            time.sleep(poll_interval_s)
+            response = requests.get(
+                f"{api_base_url}{job_endpoint}/{job['jobId']}",
+                headers=headers,
+                timeout=30,
+            )
+            response.raise_for_status()
+            job = response.json()
+            progress.update(int(job.get("indexedCount", 0)) - progress.n)
+            progress.set_postfix(
+                rate=f"{job.get('ratePerSecond', 0)}/s",
+                eta="?" if job.get("etaSeconds") is None else f"{job['etaSeconds']}s",
+            )
+    finally:
+        progress.close()
+
+    if job.get("status") != "completed":
+        raise RuntimeError(f"Reindex job failed: {job.get('error')}")
+    print(f"Reindexed {job.get('indexedCount', 0)} foods.")
+
+
+def index_id_range(
+    db_config: Dict[str, Any],
+    es_url: str,
+    index_name: str,
+    id_range: Tuple[int, int],
+    batch_size: int,
+) -> Tuple[int, int, Dict[str, float]]:
+    """Stream one food.id range from MySQL and bulk index it; returns (indexed, errors, timings)."""
+    last_id, end_id = id_range
+    indexed_count = 0
+    error_count = 0
+    # Workers run in child processes, so timings travel back with the result.
+    timings = {"fetch": 0.0, "serialize": 0.0, "es_bulk": 0.0}
+    action_prefix = '{"index":{"_index":%s,"_id":"' % json.dumps(index_name)
+
+    # Each worker process opens its own connection; connections cannot cross a fork.
+    conn = connect_once(db_config)
+    cursor = conn.cursor()
+    session = requests.Session()
+    try:
+        while True:
+            started = time.perf_counter()
+            cursor.execute(
+                f"{FOOD_DOCUMENT_SELECT} WHERE f.id > %s AND f.id <= %s ORDER BY f.id ASC LIMIT %s",
+                (last_id, end_id, batch_size),
+            )
+            rows = cursor.fetchall()
+            timings["fetch"] += time.perf_counter() - started
+            if not rows:
+                break
+
+            started = time.perf_counter()
+            lines: List[str] = []
+            for row in rows:
+                lines.append(f'{action_prefix}{int(row[0])}"}}}}')
+                lines.append(food_document_json(row[1:]))
+
+            body = gzip.compress(("\n".join(lines) + "\n").encode("utf-8"), compresslevel=1)
+            timings["serialize"] += time.perf_counter() - started
+
+            started = time.perf_counter()
+            response = session.post(
+                f"{es_url}/_bulk",
+                data=body,
+                headers={
+                    "Content-Type": "application/x-ndjson",
+                    "Content-Encoding": "gzip",
+                },
+                timeout=120,
+            )
+            response.raise_for_status()
+            response_json = response.json()
+            timings["es_bulk"] += time.perf_counter() - started
+            if response_json.get("errors"):
+                error_count += sum(
+                    1
+                    for item in response_json.get("items", [])
+                    if item.get("index", {}).get("error")
+                )
+
+            indexed_count += len(rows)
+            last_id = int(rows[-1][0])
+            if len(rows) < batch_size:
+                break
+    finally:
+        session.close()
+        cursor.close()
+        conn.close()
+
+    return indexed_count - error_count, error_count, timings
+
+
+def get_refresh_interval(es_url: str, index_name: str) -> Optional[str]:
+    """The index's explicit ``refresh_interval``, or None when it uses the cluster default."""
+    response = requests.get(f"{es_url}/{index_name}/_settings/index.refresh_interval", timeout=30)
+    response.raise_for_status()
+    settings = response.json().get(index_name, {}).get("settings", {})
+    return settings.get("index", {}).get("refresh_interval")
+
+
+def set_refresh_interval(es_url: str, index_name: str, interval: Optional[str]) -> None:
+    """Set ``refresh_interval``; None resets it to the cluster default."""
+    response = requests.put(
+        f"{es_url}/{index_name}/_settings",
+        json={"index": {"refresh_interval": interval}},
+        timeout=30,
+    )
+    response.raise_for_status()
+
+
+def reindex_foods_direct(
+    db_config: Dict[str, Any],
+    es_url: str,
+    index_name: str,
+    workers: int,
+    batch_size: int,
+    id_ranges: List[Tuple[int, int]],
+    metrics: Optional[ImportMetrics] = None,
+) -> int:
+    metrics = metrics or ImportMetrics("reindex_foods")
+    indexed_count = 0
+    error_count = 0
+    started_at = time.perf_counter()
+
+    previous_refresh_interval = get_refresh_interval(es_url, index_name)
+    set_refresh_interval(es_url, index_name, "-1")
+    try:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = [
+                executor.submit(index_id_range, db_config, es_url, index_name, id_range, batch_size)
+                for id_range in id_ranges
+            ]
+            for future in as_completed(futures):
+                range_indexed, range_errors, range_timings = future.result()
+                for operation, elapsed_s in range_timings.items():
+                    metrics.record(operation, elapsed_s)
+                indexed_count += range_indexed
+                error_count += range_errors
+                elapsed_s = max(time.perf_counter() - started_at, 0.0001)
+                print(
+                    f"Indexed {indexed_count} foods "
+                    f"({indexed_count / elapsed_s:.0f} docs/s, errors={error_count})"
+                )
+    finally:
+        set_refresh_interval(es_url, index_name, previous_refresh_interval)
+        requests.post(f"{es_url}/{index_name}/_refresh", timeout=120).raise_for_status()
+
+    metrics.count("foods_indexed", indexed_count)
+    metrics.count("index_errors", error_count)
+
+    elapsed_s = max(time.perf_counter() - started_at, 0.0001)
+    print(
+        f"Direct reindex complete: {indexed_count} foods in {elapsed_s:.2f}s "
+        f"({indexed_count / elapsed_s:.0f} docs/s), errors={error_count}"
+    )
+    return error_count
 
 
 def main() -> int:
+    parser = argparse.ArgumentParser(description="Recreate the Elasticsearch food index and reindex foods.")
+    parser.add_argument(
+        "--direct",
+        action="store_true",
+        help="Read foods straight from MySQL and bulk index them in parallel instead of calling the API.",
+    )
+    parser.add_argument(
+        "--env-file",
+        default=None,
+        help="Optional path to .env file with DB_HOST/DB_PORT/DB_USER/DB_PASSWORD/DB_NAME (--direct only).",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=os.cpu_count() or 4,
+        help="Parallel MySQL/Elasticsearch workers for --direct.",
+    )
+    parser.add_argument(
+        "--batch-size",
+        type=int,
+        default=2000,
+        help="Foods per bulk request for --direct.",
+    )
+    add_metrics_arguments(parser)
+    args = parser.parse_args()
+    metrics = ImportMetrics.from_args("reindex_foods", args)
+
     es_url = os.getenv("ES_URL", "http://localhost:9200").rstrip("/")
     index_name = os.getenv("ES_FOOD_INDEX", "foods")
     api_base_url = os.getenv("API_BASE_URL", "http://localhost:3001").rstrip("/")
     api_token = os.getenv("API_TOKEN")
     api_endpoint = os.getenv("API_REINDEX_ENDPOINT", "/food/recreate-index")
+    api_job_endpoint = os.getenv("API_REINDEX_JOB_ENDPOINT", "/food/reindex-jobs")
+
+    id_ranges: List[Tuple[int, int]] = []
+    if args.direct:
+        # Reach MySQL before the index is deleted: a bad .env or an unreachable database must not
+        # leave the live index empty.
+        db_config = load_db_config(args.env_file, autocommit=True)
+        # More ranges than workers so a dense id range does not leave the pool idle.
+        id_ranges = split_id_ranges(db_config, max(args.workers, 1) * 4)
+
+    with metrics.session():
+        with metrics.stage("recreate-index"):
+            print(f"Deleting index {index_name} at {es_url} (if it exists)...")
+            delete_index(es_url, index_name)
 
-    print(f"Deleting index {index_name} at {es_url} (if it exists)...")
-    delete_index(es_url, index_name)
+            print(f"Creating index {index_name} with updated mappings...")
+            create_index(es_url, index_name)
 
-    print(f"Creating index {index_name} with updated mappings...")
-    create_index(es_url, index_name)
+        if args.direct:
+            print(f"Reindexing foods directly from MySQL with {args.workers} workers...")
+            with metrics.stage("reindex-direct"):
+                error_count = reindex_foods_direct(
+                    db_config,
+                    es_url,
+                    index_name,
+                    args.workers,
+                    args.batch_size,
+                    id_ranges,
+                    metrics=metrics,
+                )
+            return 1 if error_count else 0
 
-    print(f"Calling {api_base_url}{api_endpoint}...")
-    reindex_foods(api_base_url, api_token, api_endpoint)
+        print(f"Calling {api_base_url}{api_endpoint}...")
+        with metrics.stage("reindex-api"):
+            reindex_foods(api_base_url, api_token, api_endpoint, api_job_endpoint)
 
     return 0
 
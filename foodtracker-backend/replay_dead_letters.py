@@ -0,0 +1,176 @@
+import argparse
+import sys
+from collections import Counter
+from pathlib import Path
+from typing import Callable, Dict, Iterator, List, Optional
+
+from dead_letter import DeadLetterWriter, iter_dead_letters
+
+
+def _myfooddata_importer(env_file: Optional[str], dead_letters: DeadLetterWriter):
+    from post_all_csv_data_to_db import MyFoodDataImporter
+
+    return MyFoodDataImporter("", env_file, dead_letters=dead_letters)
+
+
+def _openfoodfacts_importer(env_file: Optional[str], dead_letters: DeadLetterWriter):
+    from post_openfoodfacts_barcodes_to_db import OpenFoodFactsImporter
+
+    return OpenFoodFactsImporter("", env_file, dead_letters=dead_letters)
+
+
+def _fdc_portions_importer(env_file: Optional[str], dead_letters: DeadLetterWriter):
+    from post_fdc_portion_measurements_to_db import FdcPortionMeasurementImporter
+
+    return FdcPortionMeasurementImporter(".", env_file, dead_letters=dead_letters)
+
+
+def _combined_importer(env_file: Optional[str], dead_letters: DeadLetterWriter):
+    from import_fdc_and_openfoodfacts_to_db import FdcOpenFoodFactsImporter
+
+    return FdcOpenFoodFactsImporter(
+        fdc_dir=Path("."),
+        openfoodfacts_csv=Path("."),
+        env_file_path=env_file,
+        batch_size=500,
+        max_foods=None,
+        max_openfoodfacts=None,
+        dead_letters=dead_letters,
+    )
+
+
+# Dead-letter "source" -> factory for the importer whose write path replays its records.
+REPLAY_IMPORTERS: Dict[str, Callable] = {
+    "post_all_csv_data_to_db": _myfooddata_importer,
+    "post_openfoodfacts_barcodes_to_db": _openfoodfacts_importer,
+    "post_fdc_portion_measurements_to_db": _fdc_portions_importer,
+    "import_fdc_and_openfoodfacts_to_db": _combined_importer,
+}
+
+
+class DeadLetterReplayer:
+    """Feeds recorded import failures back through the importer that produced them."""
+
+    def __init__(
+        self,
+        paths: List[Path],
+        env_file_path: Optional[str] = None,
+        source: Optional[str] = None,
+        stages: Optional[List[str]] = None,
+        error_classes: Optional[List[str]] = None,
+        output_path: Optional[str] = None,
+    ):
+        self.paths = paths
+        self.env_file_path = env_file_path
+        self.source = source
+        self.stages = set(stages or [])
+        self.error_classes = set(error_classes or [])
+        self.output_path = output_path
+        self.selected: Counter = Counter()
+        self.ignored: Counter = Counter()
+
+    def _entries(self) -> Iterator[Dict]:
+        for path in self.paths:
+            for entry in iter_dead_letters(path):
+                source = entry.get("source")
+                if self.source is None:
+                    self.source = source
+                if source != self.source:
+                    self.ignored[f"other source {source}"] += 1
+                    continue
+                if self.stages and entry.get("stage") not in self.stages:
+                    self.ignored["stage filter"] += 1
+                    continue
+                if self.error_classes and entry.get("error_class") not in self.error_classes:
+                    self.ignored["error class filter"] += 1
+                    continue
+                self.selected[(entry.get("stage") or "-", entry.get("error_class"))] += 1
+                yield entry
+
+    def summarize(self) -> None:
+        for _entry in self._entries():
+            pass
+        self._print_counts()
+
+    def replay(self) -> int:
+        entries = self._entries()
+        first = next(entries, None)
+        if first is None:
+            print("No matching dead-letter entries.")
+            self._print_counts()
+            return 0
+
+        factory = REPLAY_IMPORTERS.get(self.source)
+        if factory is None:
+            raise ValueError(f"Don't know how to replay dead letters from {self.source!r}.")
+
+        # Rows that still fail go to a separate file so the input is never appended to while it is read.
+        output_path = self.output_path or f"{self.source}.replay.dead_letter.jsonl"
+        with DeadLetterWriter(self.source, output_path) as dead_letters:
+            importer = factory(self.env_file_path, dead_letters)
+
+            def all_entries() -> Iterator[Dict]:
+                yield first
+                yield from entries
+
+            written, failed = importer.replay(all_entries())
+            self._print_counts()
+            print(f"Rows written: {written}")
+            print(f"Rows still failing: {failed}")
+            print(f"Dead-lettered rows: {dead_letters.summary()}")
+            for line in dead_letters.error_class_summary(limit=10):
+                print(line)
+        return 1 if failed else 0
+
+    def _print_counts(self) -> None:
+        print(f"Source: {self.source or '-'}")
+        print(f"Entries selected: {sum(self.selected.values())}")
+        for (stage, error_class), count in self.selected.most_common():
+            print(f"{count:>8}  {stage}  {error_class}")
+        for reason, count in self.ignored.most_common():
+            print(f"Entries skipped ({reason}): {count}")
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(
+        description="Replay rows recorded in import dead-letter files through the import pipeline."
+    )
+    parser.add_argument(
+        "paths",
+        nargs="+",
+        help="Dead-letter files (<script>.dead_letter.jsonl); rotated .N.gz segments are read too.",
+    )
+    parser.add_argument("--env-file", default=None, help="Path to a .env file with DB credentials.")
+    parser.add_argument("--source", default=None, help="Only replay entries from this import script.")
+    parser.add_argument("--stage", action="append", default=None, help="Only replay entries from this stage.")
+    parser.add_argument(
+        "--error-class", action="append", default=None, help="Only replay entries with this error class."
+    )
+    parser.add_argument(
+        "--output",
+        default=None,
+        help="Where rows that fail again are written (default: <source>.replay.dead_letter.jsonl).",
+    )
+    parser.add_argument(
+        "--summary-only",
+        action="store_true",
+        help="Only print the matching entries per stage and error class; write nothing.",
+    )
+    args = parser.parse_args()
+
+    replayer = DeadLetterReplayer(
+        [Path(path) for path in args.paths],
+        env_file_path=args.env_file,
+        source=args.source,
+        stages=args.stage,
+        error_classes=args.error_class,
+        output_path=args.output,
+    )
+    if args.summary_only:
+        replayer.summarize()
+        return 0
+    return replayer.replay()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
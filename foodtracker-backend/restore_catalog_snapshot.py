@@ -0,0 +1,334 @@
+import argparse
+import json
+import os
+import shutil
+import tempfile
+import time
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+from tqdm import tqdm
+
+from catalog_snapshot import CATALOG_TABLES, file_sha256, read_manifest, read_table_columns
+from foodtracker_db import MAX_POOL_SIZE, ConnectionFactory, load_db_config, session_settings_hook
+from import_metrics import ImportMetrics, add_metrics_arguments
+from table_indexes import check_integrity, deferrable_indexes, index_clause
+
+NULL_FIELD = "\\N"
+
+
+def tsv_bytes(batch: pa.RecordBatch) -> memoryview:
+    """Rows of ``batch`` in the LOAD DATA default format: tab-separated, backslash escapes, \\N for NULL."""
+    fields = []
+    for column in batch.columns:
+        if pa.types.is_string(column.type) or pa.types.is_large_string(column.type):
+            text = pc.replace_substring(column, "\\", "\\\\")
+            text = pc.replace_substring(text, "\t", "\\t")
+            text = pc.replace_substring(text, "\n", "\\n")
+        else:
+            text = pc.cast(column, pa.string())
+        fields.append(pc.fill_null(text, NULL_FIELD))
+    lines = pc.binary_join_element_wise(pc.binary_join_element_wise(*fields, "\t"), "", "\n")
+    content = pc.binary_join(pa.ListArray.from_arrays(pa.array([0, len(lines)], pa.int32()), lines), "")[0]
+    return memoryview(content.as_buffer())
+
+
+def convert_part(
+    snapshot_dir: str,
+    part: Dict[str, Any],
+    column_names: Sequence[str],
+    work_dir: str,
+) -> Tuple[Dict[str, Any], str, Dict[str, float]]:
+    """Check one Parquet part against the manifest and write it as TSV; returns (part, TSV path, timings)."""
+    timings = {"verify_part": 0.0, "convert": 0.0}
+    path = Path(snapshot_dir) / part["file"]
+
+    started = time.perf_counter()
+    checksum = file_sha256(path)
+    if checksum != part["sha256"]:
+        raise ValueError(f"{part['file']}: checksum {checksum} does not match the manifest")
+    parquet_file = pq.ParquetFile(path)
+    if parquet_file.metadata.num_rows != part["rows"]:
+        raise ValueError(
+            f"{part['file']}: {parquet_file.metadata.num_rows} rows, manifest says {part['rows']}"
+        )
+    timings["verify_part"] += time.perf_counter() - started
+
+    started = time.perf_counter()
+    tsv_path = Path(work_dir) / (part["file"].replace("/", "__") + ".tsv")
+    with tsv_path.open("wb") as handle:
+        for batch in parquet_file.iter_batches(batch_size=65536, columns=list(column_names)):
+            handle.write(tsv_bytes(batch))
+    timings["convert"] += time.perf_counter() - started
+    return part, str(tsv_path), timings
+
+
+class CatalogSnapshotRestorer:
+    """Loads an export_catalog_snapshot.py snapshot into an empty database created by the migrations.
+
+    Secondary indexes (except those backing foreign keys) are dropped first and rebuilt with one ALTER
+    per table afterwards; the dropped definitions are recorded in ``index_state`` so an interrupted
+    restore can be rerun. Unique and foreign keys are checked after the rebuild, and every table's row
+    count must match the manifest.
+    """
+
+    def __init__(
+        self,
+        snapshot_dir: Path,
+        env_file_path: Optional[str] = None,
+        workers: int = 4,
+        load_connections: int = 4,
+        work_dir: Optional[Path] = None,
+        index_state: Optional[Path] = None,
+        metrics: Optional[ImportMetrics] = None,
+    ):
+        self.snapshot_dir = snapshot_dir
+        self.manifest = read_manifest(snapshot_dir)
+        self.tables = [table for table in CATALOG_TABLES if table in self.manifest["tables"]]
+        self.metrics = metrics or ImportMetrics("restore_catalog_snapshot")
+        self.db_config = {**load_db_config(env_file_path), "allow_local_infile": True}
+        self.workers = max(workers, 1)
+        # One pooled connection is kept for the index and verification statements.
+        self.load_connections = min(max(load_connections, 1), MAX_POOL_SIZE - 1)
+        if self.load_connections != load_connections:
+            print(f"--load-connections clamped to {self.load_connections} (pool limit {MAX_POOL_SIZE}).")
+        # Loader sessions skip per-row constraint checks; check_integrity covers them at the end.
+        self.connections = ConnectionFactory(
+            self.db_config,
+            pool_size=self.load_connections + 1,
+            session_hooks=[session_settings_hook({"unique_checks": 0, "foreign_key_checks": 0})],
+            pool_name="catalog-restore",
+        )
+        self.work_dir = work_dir
+        self.index_state = index_state or Path(__file__).with_name(".restore_indexes.json")
+        self.rows_loaded = 0
+        self.load_warnings = 0
+
+    def _column_names(self, table: str) -> List[str]:
+        return [column["name"] for column in self.manifest["tables"][table]["columns"]]
+
+    def _check_target_columns(self, conn: Any) -> None:
+        cursor = conn.cursor()
+        try:
+            for table in self.tables:
+                columns = read_table_columns(cursor, self.db_config["database"], table)
+                target = {column["name"] for column in columns}
+                if not target:
+                    raise RuntimeError(f"Table {table} does not exist; run the migrations first.")
+                missing = [name for name in self._column_names(table) if name not in target]
+                if missing:
+                    raise RuntimeError(
+                        f"{table} lacks snapshot columns {', '.join(missing)}; run the migrations first."
+                    )
+        finally:
+            cursor.close()
+
+    def _drop_indexes(self, conn: Any) -> List[Dict]:
+        cursor = conn.cursor()
+        try:
+            if self.index_state.exists():
+                # A previous restore stopped before rebuilding; its indexes are gone and its rows are partial.
+                recorded = json.loads(self.index_state.read_text(encoding="utf-8"))
+                print(f"Resuming interrupted restore; emptying {', '.join(self.tables)} again.")
+                for table in self.tables:
+                    cursor.execute(f"TRUNCATE TABLE `{table}`")
+            else:
+                for table in self.tables:
+                    cursor.execute(f"SELECT COUNT(*) FROM `{table}`")
+                    row_count = int(cursor.fetchone()[0])
+                    if row_count:
+                        raise RuntimeError(f"Restore requires empty catalog tables; {table} has {row_count} rows.")
+                recorded = []
+
+            recorded_keys = {(index["table"], index["name"]) for index in recorded}
+            to_drop = [
+                index
+                for index in deferrable_indexes(conn, self.tables, include_unique=True)
+                if (index["table"], index["name"]) not in recorded_keys
+            ]
+            recorded.extend(to_drop)
+            # Record before dropping so an interrupted run can still restore every index.
+            self.index_state.write_text(json.dumps(recorded, indent=2), encoding="utf-8")
+
+            drops_by_table: Dict[str, List[str]] = {}
+            for index in to_drop:
+                drops_by_table.setdefault(index["table"], []).append(f"DROP INDEX `{index['name']}`")
+            for table, clauses in drops_by_table.items():
+                print(f"Dropping secondary indexes on {table}: {', '.join(clauses)}")
+                cursor.execute(f"ALTER TABLE `{table}` {', '.join(clauses)}")
+        finally:
+            cursor.close()
+        return recorded
+
+    def _load_tsv(self, table: str, tsv_path: str) -> Tuple[int, int, float]:
+        """LOAD DATA one TSV file on a pooled connection; returns (rows, warnings, seconds)."""
+        columns_sql = ", ".join(f"`{name}`" for name in self._column_names(table))
+        started = time.perf_counter()
+        conn = self.connections.connect()
+        cursor = conn.cursor()
+        try:
+            cursor.execute(
+                f"LOAD DATA LOCAL INFILE %s INTO TABLE `{table}` CHARACTER SET utf8mb4 "
+                "FIELDS TERMINATED BY '\\t' ESCAPED BY '\\\\' LINES TERMINATED BY '\\n' "
+                f"({columns_sql})",
+                (tsv_path,),
+            )
+            rows = cursor.rowcount
+            # LOCAL loads turn bad values and duplicate keys into warnings instead of errors.
+            cursor.execute("SELECT @@warning_count")
+            warnings = int(cursor.fetchone()[0])
+            if warnings:
+                cursor.execute("SHOW WARNINGS LIMIT 5")
+                for level, code, message in cursor.fetchall():
+                    print(f"  {table} {Path(tsv_path).name}: {level} {code} {message}")
+            conn.commit()
+        finally:
+            cursor.close()
+            conn.close()
+        os.remove(tsv_path)
+        return rows, warnings, time.perf_counter() - started
+
+    def _load_parts(self, work_dir: Path) -> None:
+        jobs = [
+            (table, part) for table in self.tables for part in self.manifest["tables"][table]["parts"]
+        ]
+        progress = tqdm(total=len(jobs), desc="Snapshot parts loaded", unit="part", dynamic_ncols=True)
+        try:
+            with ProcessPoolExecutor(max_workers=self.workers) as converters, ThreadPoolExecutor(
+                max_workers=self.load_connections
+            ) as loaders:
+                conversions = {
+                    converters.submit(
+                        convert_part, str(self.snapshot_dir), part, self._column_names(table), str(work_dir)
+                    ): table
+                    for table, part in jobs
+                }
+                loads: List[Future] = []
+                # Each part is loaded as soon as it is converted, while the other parts keep converting.
+                for future in as_completed(conversions):
+                    _, tsv_path, timings = future.result()
+                    for operation, elapsed_s in timings.items():
+                        self.metrics.record(operation, elapsed_s)
+                    loads.append(loaders.submit(self._load_tsv, conversions[future], tsv_path))
+                for future in as_completed(loads):
+                    rows, warnings, elapsed_s = future.result()
+                    self.metrics.record("load", elapsed_s)
+                    self.rows_loaded += rows
+                    self.load_warnings += warnings
+                    progress.update(1)
+        finally:
+            progress.close()
+
+    def _rebuild_indexes(self, conn: Any, recorded: Sequence[Dict]) -> None:
+        adds_by_table: Dict[str, List[str]] = {}
+        for index in recorded:
+            adds_by_table.setdefault(index["table"], []).append(index_clause(index))
+        cursor = conn.cursor()
+        try:
+            for table, clauses in adds_by_table.items():
+                # One ALTER per table builds every index from a single sorted scan.
+                print(f"Rebuilding {len(clauses)} secondary indexes on {table}...")
+                with self.metrics.timer("index_rebuild"):
+                    cursor.execute(f"ALTER TABLE `{table}` {', '.join(clauses)}")
+        finally:
+            cursor.close()
+        self.index_state.unlink()
+
+    def _verify(self, conn: Any) -> None:
+        print("Checking unique keys, foreign keys and row counts...")
+        with self.metrics.timer("verify"):
+            problems = check_integrity(conn, self.tables)
+            cursor = conn.cursor()
+            try:
+                for table in self.tables:
+                    cursor.execute(f"SELECT COUNT(*) FROM `{table}`")
+                    row_count = int(cursor.fetchone()[0])
+                    expected = int(self.manifest["tables"][table]["rows"])
+                    if row_count != expected:
+                        problems.append(f"{table}: {row_count} rows, manifest says {expected}")
+                    self.metrics.count(f"{table}_rows", row_count)
+                cursor.execute(f"ANALYZE TABLE {', '.join(f'`{table}`' for table in self.tables)}")
+                cursor.fetchall()
+            finally:
+                cursor.close()
+        if problems:
+            message = "Snapshot restore verification failed: " + "; ".join(problems)
+            if any(problem.endswith("orphaned rows") for problem in problems):
+                # Only the export's id bounds are consistent; its ranges are read at different moments.
+                message += " (orphans are expected from a snapshot exported while the catalog was being written)"
+            raise RuntimeError(message)
+
+    def run(self) -> None:
+        work_dir = self.work_dir or Path(tempfile.mkdtemp(prefix="foodtracker-restore-"))
+        work_dir.mkdir(parents=True, exist_ok=True)
+        conn = self.connections.connect()
+        try:
+            self._check_target_columns(conn)
+            recorded = self._drop_indexes(conn)
+            self._load_parts(work_dir)
+            self._rebuild_indexes(conn, recorded)
+            self._verify(conn)
+        finally:
+            conn.close()
+            if self.work_dir is None:
+                shutil.rmtree(work_dir, ignore_errors=True)
+
+        self.metrics.count("rows_loaded", self.rows_loaded)
+        self.metrics.count("load_warnings", self.load_warnings)
+        print("Snapshot restore complete.")
+        print(f"Rows loaded: {self.rows_loaded}")
+        print(f"Load warnings: {self.load_warnings}")
+        for table in self.tables:
+            print(f"  {table}: {self.manifest['tables'][table]['rows']} rows")
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(
+        description="Restore an export_catalog_snapshot.py snapshot into an empty foodtracker database."
+    )
+    parser.add_argument("snapshot_dir", help="Snapshot directory (holds manifest.json).")
+    parser.add_argument(
+        "--env-file",
+        default=None,
+        help="Optional path to .env file with DB_HOST/DB_PORT/DB_USER/DB_PASSWORD/DB_NAME.",
+    )
+    parser.add_argument(
+        "--workers", type=int, default=os.cpu_count() or 4, help="Processes converting Parquet parts to TSV."
+    )
+    parser.add_argument("--load-connections", type=int, default=4, help="Parallel LOAD DATA connections.")
+    parser.add_argument(
+        "--work-dir",
+        default=None,
+        help="Directory for the intermediate TSV files (default: a temporary directory, removed afterwards).",
+    )
+    parser.add_argument(
+        "--index-state",
+        default=None,
+        help="Where the dropped index definitions are recorded (default: .restore_indexes.json).",
+    )
+    add_metrics_arguments(parser)
+    args = parser.parse_args()
+    metrics = ImportMetrics.from_args("restore_catalog_snapshot", args)
+
+    restorer = CatalogSnapshotRestorer(
+        Path(args.snapshot_dir),
+        args.env_file,
+        workers=args.workers,
+        load_connections=args.load_connections,
+        work_dir=Path(args.work_dir) if args.work_dir else None,
+        index_state=Path(args.index_state) if args.index_state else None,
+        metrics=metrics,
+    )
+    started_at = time.perf_counter()
+    with metrics.session(), metrics.stage("restore"):
+        restorer.run()
+    print(f"Restored in {time.perf_counter() - started_at:.2f}s")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,347 @@
+import argparse
+import datetime
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import mysql.connector
+import numpy as np
+from tqdm import tqdm
+
+from foodtracker_db import ConnectionFactory, load_db_config
+from import_metrics import ImportMetrics, add_metrics_arguments
+from nutrition_totals import MEASUREMENT_GRAMS_SQL, NUTRIENT_COLUMNS, distinct_counts, group_sums, nutrient_matrix
+
+ROLLUP_MODES = ("incremental", "full")
+# The row holding the whole day's totals; the other rows of a day are named after their meal.
+DAY_TOTAL_MEAL = ""
+NO_MEAL = -1
+EPOCH = datetime.datetime(1970, 1, 1)
+
+_NUTRIENTS_SQL = ", ".join(f"f.{column}" for column in NUTRIENT_COLUMNS)
+_GRAMS_SQL = MEASUREMENT_GRAMS_SQL.format(measurement="m", food="f")
+
+# One row per logged food, or per ingredient of a logged recipe, with the factor that turns the food's
+# per-100 g values into the amount eaten. A recipe entry eats entry.servings / recipe.servings of
+# every ingredient. Days are the user's local day the API stored with the entry (loggedDate), the same
+# day the diary shows it under. Rows arrive ordered by (userId, day), so each day can be finished as soon
+# as the stream has moved past it.
+ENTRY_ROWS_SQL = (
+    "SELECT e.userId, e.loggedDate AS day, ml.name, e.id, e.updatedAt, "
+    "CASE WHEN e.foodId IS NOT NULL THEN e.servings "
+    "ELSE e.servings / NULLIF(r.servings, 0) * rf.servings END "
+    f"* {_GRAMS_SQL} / 100, "
+    f"{_NUTRIENTS_SQL} "
+    "FROM food_entry e "
+    "{days_join}"
+    "LEFT JOIN recipe r ON e.foodId IS NULL AND r.id = e.recipeId "
+    "LEFT JOIN recipe_food rf ON rf.recipeId = r.id "
+    "JOIN food f ON f.id = COALESCE(e.foodId, rf.foodId) "
+    "LEFT JOIN food_measurement m ON m.id = IF(e.foodId IS NOT NULL, e.measurementId, rf.measurementId) "
+    "AND (e.foodId IS NOT NULL OR m.foodId = f.id) "
+    "LEFT JOIN meal ml ON ml.id = e.mealId "
+    "ORDER BY e.userId, e.loggedDate"
+)
+
+# Restricts the stream to the days staged in tmp_rollup_days (incremental mode).
+DAYS_JOIN_SQL = "JOIN tmp_rollup_days t ON t.userId = e.userId AND t.day = e.loggedDate "
+
+# Rows the API flagged stale after the entries were read describe deletes the stream has not seen; they
+# are left in place, flag included, for the next run.
+REPLACEABLE_SQL = "(stale = 0 OR staleAt IS NULL OR staleAt < %s)"
+
+# Upserts rather than inserts, so a row kept for its stale flag is refreshed without losing the flag.
+INSERT_SQL = (
+    "INSERT INTO daily_nutrition (userId, day, meal, entryCount, "
+    + ", ".join(NUTRIENT_COLUMNS)
+    + ", entriesUpdatedAt, computedAt) VALUES ("
+    + ", ".join(["%s"] * (len(NUTRIENT_COLUMNS) + 6))
+    + ") ON DUPLICATE KEY UPDATE "
+    + ", ".join(
+        f"{column} = VALUES({column})"
+        for column in ("entryCount", *NUTRIENT_COLUMNS, "entriesUpdatedAt", "computedAt")
+    )
+)
+
+
+class DailyNutritionRollup:
+    """Maintains daily_nutrition: per user and day, the nutrient totals of every meal and of the day.
+
+    Days are always recomputed from all of their entries and replaced as a whole. The incremental mode
+    only recomputes days with entries changed since the newest ``entriesUpdatedAt`` already rolled up
+    (minus ``watermark_lag``, for transactions that committed late), plus days the API flagged
+    ``stale`` after deleting an entry. Edited recipes and re-imported foods only reach past days with a
+    full run. Days are keyed by the entry's ``loggedDate``, the user's local day.
+    """
+
+    def __init__(
+        self,
+        env_file_path: Optional[str] = None,
+        mode: str = "incremental",
+        batch_rows: int = 20000,
+        watermark_lag: datetime.timedelta = datetime.timedelta(minutes=5),
+        metrics: Optional[ImportMetrics] = None,
+    ):
+        if mode not in ROLLUP_MODES:
+            raise ValueError(f"Unknown rollup mode: {mode}")
+        self.metrics = metrics or ImportMetrics("rollup_daily_nutrition")
+        self.db_config = load_db_config(env_file_path)
+        # One connection streams the entries while the other writes the totals.
+        self.connections = ConnectionFactory(self.db_config, pool_size=2, pool_name="daily-nutrition")
+        self.mode = mode
+        self.batch_rows = max(batch_rows, 1)
+        self.watermark_lag = watermark_lag
+        self.meal_codes: Dict[str, int] = {}
+        self.meal_names: List[str] = []
+        self.days_written = 0
+        self.rows_written = 0
+        self.days_removed = 0
+
+    def _meal_code(self, name: Optional[str]) -> int:
+        if name is None:
+            return NO_MEAL
+        code = self.meal_codes.get(name)
+        if code is None:
+            code = self.meal_codes[name] = len(self.meal_names)
+            self.meal_names.append(name)
+        return code
+
+    def _totals(self, rows: Sequence[Tuple[Any, ...]]) -> List[Tuple[Any, ...]]:
+        """daily_nutrition rows (minus computedAt) for the entry rows of complete days."""
+        count = len(rows)
+        keys = np.empty((count, 3), dtype=np.int64)
+        keys[:, 0] = np.fromiter((row[0] for row in rows), dtype=np.int64, count=count)
+        keys[:, 1] = np.fromiter((row[1].toordinal() for row in rows), dtype=np.int64, count=count)
+        keys[:, 2] = np.fromiter((self._meal_code(row[2]) for row in rows), dtype=np.int64, count=count)
+        entry_ids = np.fromiter((row[3] for row in rows), dtype=np.int64, count=count)
+        updated = np.array([row[4] for row in rows], dtype="datetime64[us]").astype(np.int64)
+        # A recipe without servings has no per-serving amounts; the app shows no nutrition for it either.
+        factors = np.fromiter(
+            (0.0 if row[5] is None else float(row[5]) for row in rows), dtype=np.float64, count=count
+        )
+        amounts = nutrient_matrix(rows, 6) * factors[:, None]
+
+        meal_keys, meal_sums, groups = group_sums(keys, amounts)
+        meal_counts = distinct_counts(groups, entry_ids, len(meal_keys))
+        meal_updated = np.full(len(meal_keys), np.iinfo(np.int64).min, dtype=np.int64)
+        np.maximum.at(meal_updated, groups, updated)
+
+        day_keys, day_sums, day_groups = group_sums(meal_keys[:, :2], meal_sums)
+        day_counts = np.bincount(day_groups, weights=meal_counts, minlength=len(day_keys)).astype(np.int64)
+        day_updated = np.full(len(day_keys), np.iinfo(np.int64).min, dtype=np.int64)
+        np.maximum.at(day_updated, day_groups, meal_updated)
+
+        output: List[Tuple[Any, ...]] = []
+        for key, sums, entry_count, last_updated in zip(
+            meal_keys.tolist(), meal_sums.tolist(), meal_counts.tolist(), meal_updated.tolist()
+        ):
+            if key[2] == NO_MEAL:
+                continue
+            output.append(self._row(key[0], key[1], self.meal_names[key[2]], entry_count, sums, last_updated))
+        for key, sums, entry_count, last_updated in zip(
+            day_keys.tolist(), day_sums.tolist(), day_counts.tolist(), day_updated.tolist()
+        ):
+            output.append(self._row(key[0], key[1], DAY_TOTAL_MEAL, entry_count, sums, last_updated))
+        return output
+
+    @staticmethod
+    def _row(
+        user_id: int,
+        day_ordinal: int,
+        meal: str,
+        entry_count: int,
+        sums: List[float],
+        updated_us: int,
+    ) -> Tuple[Any, ...]:
+        updated_at = EPOCH + datetime.timedelta(microseconds=updated_us)
+        return (user_id, datetime.date.fromordinal(day_ordinal), meal, entry_count, *sums, updated_at)
+
+    def _delete_days(
+        self,
+        cursor: Any,
+        days: Sequence[Tuple[int, datetime.date]],
+        read_at: datetime.datetime,
+        before: Optional[datetime.datetime] = None,
+    ) -> int:
+        deleted = 0
+        for start in range(0, len(days), 500):
+            chunk = days[start:start + 500]
+            params: List[Any] = [value for day in chunk for value in day]
+            params.append(read_at)
+            sql = "DELETE FROM daily_nutrition WHERE (userId, day) IN (%s) AND %s" % (
+                ", ".join(["(%s, %s)"] * len(chunk)),
+                REPLACEABLE_SQL,
+            )
+            if before is not None:
+                sql += " AND computedAt < %s"
+                params.append(before)
+            cursor.execute(sql, params)
+            deleted += cursor.rowcount or 0
+        return deleted
+
+    def _write(
+        self,
+        cursor: Any,
+        conn: Any,
+        rows: Sequence[Tuple[Any, ...]],
+        computed_at: datetime.datetime,
+        read_at: datetime.datetime,
+    ) -> None:
+        with self.metrics.timer("aggregate"):
+            totals = self._totals(rows)
+        days = sorted({(row[0], row[1]) for row in totals})
+        try:
+            with self.metrics.timer("replace_days"):
+                self._delete_days(cursor, days, read_at)
+                cursor.executemany(INSERT_SQL, [row + (computed_at,) for row in totals])
+            self.metrics.commit(conn)
+        except mysql.connector.Error:
+            conn.rollback()
+            raise
+        self.days_written += len(days)
+        self.rows_written += len(totals)
+
+    def _watermark(self, cursor: Any) -> Optional[datetime.datetime]:
+        cursor.execute("SELECT MAX(entriesUpdatedAt) FROM daily_nutrition")
+        row = cursor.fetchone()
+        return row[0] if row else None
+
+    def _stage_days(self, cursor: Any, since: datetime.datetime) -> List[Tuple[int, datetime.date]]:
+        cursor.execute("DROP TEMPORARY TABLE IF EXISTS tmp_rollup_days")
+        cursor.execute(
+            "CREATE TEMPORARY TABLE tmp_rollup_days ("
+            "userId INT NOT NULL, day DATE NOT NULL, PRIMARY KEY (userId, day)"
+            ")"
+        )
+        cursor.execute(
+            "INSERT IGNORE INTO tmp_rollup_days (userId, day) "
+            "SELECT DISTINCT userId, loggedDate FROM food_entry WHERE updatedAt >= %s",
+            (since,),
+        )
+        cursor.execute(
+            "INSERT IGNORE INTO tmp_rollup_days (userId, day) "
+            "SELECT DISTINCT userId, day FROM daily_nutrition WHERE stale = 1"
+        )
+        cursor.execute("SELECT userId, day FROM tmp_rollup_days ORDER BY userId, day")
+        return [(int(user_id), day) for user_id, day in cursor.fetchall()]
+
+    def run(self) -> None:
+        computed_at = datetime.datetime.now().replace(microsecond=0)
+        read_conn = self.connections.connect()
+        write_conn = self.connections.connect()
+        read_cursor = read_conn.cursor()
+        write_cursor = write_conn.cursor()
+        progress = tqdm(desc="Entry rows rolled up", unit="row", dynamic_ncols=True)
+        try:
+            staged_days: Optional[List[Tuple[int, datetime.date]]] = None
+            if self.mode == "incremental":
+                watermark = self._watermark(read_cursor)
+                if watermark is None:
+                    print("daily_nutrition is empty; running a full rollup.")
+                else:
+                    since = watermark - self.watermark_lag
+                    with self.metrics.timer("stage_days"):
+                        staged_days = self._stage_days(read_cursor, since)
+                    print(f"Days to recompute (entries changed since {since}): {len(staged_days)}")
+                    if not staged_days:
+                        return
+
+            # Stale flags the API sets from here on are kept; the stream may already miss their deletes.
+            read_cursor.execute("SELECT NOW(6)")
+            read_at = read_cursor.fetchone()[0]
+            # Unbuffered: entry rows are streamed from the server instead of being loaded at once.
+            stream = read_conn.cursor(buffered=False)
+            try:
+                with self.metrics.timer("query"):
+                    stream.execute(ENTRY_ROWS_SQL.format(days_join="" if staged_days is None else DAYS_JOIN_SQL))
+                carry: List[Tuple[Any, ...]] = []
+                while True:
+                    with self.metrics.timer("fetch"):
+                        fetched = stream.fetchmany(self.batch_rows)
+                    progress.update(len(fetched))
+                    if not fetched:
+                        if carry:
+                            self._write(write_cursor, write_conn, carry, computed_at, read_at)
+                        break
+                    rows = carry + fetched
+                    # The last day may continue in the next batch; hold it back until it is complete.
+                    last_day = (rows[-1][0], rows[-1][1])
+                    split = len(rows)
+                    while split > 0 and (rows[split - 1][0], rows[split - 1][1]) == last_day:
+                        split -= 1
+                    carry = rows[split:]
+                    if split:
+                        self._write(write_cursor, write_conn, rows[:split], computed_at, read_at)
+            finally:
+                stream.close()
+
+            # Days that no longer have entries were not rewritten above.
+            with self.metrics.timer("remove_empty_days"):
+                if staged_days is None:
+                    while True:
+                        write_cursor.execute(
+                            f"DELETE FROM daily_nutrition WHERE computedAt < %s AND {REPLACEABLE_SQL} LIMIT 5000",
+                            (computed_at, read_at),
+                        )
+                        removed = write_cursor.rowcount or 0
+                        self.metrics.commit(write_conn)
+                        self.days_removed += removed
+                        if removed < 5000:
+                            break
+                else:
+                    self.days_removed = self._delete_days(write_cursor, staged_days, read_at, before=computed_at)
+                    self.metrics.commit(write_conn)
+        finally:
+            progress.close()
+            read_cursor.close()
+            write_cursor.close()
+            read_conn.close()
+            write_conn.close()
+
+        self.metrics.count("days_written", self.days_written)
+        self.metrics.count("rows_written", self.rows_written)
+        self.metrics.count("rows_removed", self.days_removed)
+
+        print("Daily nutrition rollup complete.")
+        print(f"Days written: {self.days_written} ({self.rows_written} rows)")
+        print(f"Rows removed for days without entries: {self.days_removed}")
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(
+        description="Roll food entries up into per-user, per-day and per-meal nutrient totals (daily_nutrition)."
+    )
+    parser.add_argument(
+        "--env-file",
+        default=None,
+        help="Optional path to .env file with DB_HOST/DB_PORT/DB_USER/DB_PASSWORD/DB_NAME.",
+    )
+    parser.add_argument(
+        "--mode",
+        choices=ROLLUP_MODES,
+        default="incremental",
+        help="incremental recomputes only days with changed or deleted entries; full recomputes every day.",
+    )
+    parser.add_argument("--batch-rows", type=int, default=20000, help="Entry rows aggregated per batch.")
+    parser.add_argument(
+        "--watermark-lag-minutes",
+        type=float,
+        default=5.0,
+        help="Also recompute entries changed this long before the watermark (late-committing transactions).",
+    )
+    add_metrics_arguments(parser)
+    args = parser.parse_args()
+    metrics = ImportMetrics.from_args("rollup_daily_nutrition", args)
+
+    rollup = DailyNutritionRollup(
+        args.env_file,
+        mode=args.mode,
+        batch_rows=args.batch_rows,
+        watermark_lag=datetime.timedelta(minutes=max(args.watermark_lag_minutes, 0.0)),
+        metrics=metrics,
+    )
+    with metrics.session(), metrics.stage(f"rollup-{args.mode}"):
+        rollup.run()
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
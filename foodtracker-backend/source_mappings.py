@@ -0,0 +1,318 @@
+from typing import Any, Callable, Dict, Mapping, NamedTuple, Optional, Sequence, Tuple, Type
+
+from fdc_csv import NUMBER_RE
+
+MISSING_TOKENS = frozenset(("", "N/A", "NULL", "null", "None", "nan"))
+KJ_PER_KCAL = 4.184
+
+
+def parse_number(value: Any) -> float:
+    """Parse a source cell as a float; missing, NaN and unparseable cells are 0.0.
+
+    Strings such as ``"1,200 mg"`` yield their first number, like the importers' ``_clean_numeric``.
+    """
+    if value is None:
+        return 0.0
+    if value.__class__ is float:
+        return value if value == value else 0.0
+    if isinstance(value, str):
+        try:
+            number = float(value)
+        except ValueError:
+            stripped = value.strip()
+            if stripped in MISSING_TOKENS:
+                return 0.0
+            match = NUMBER_RE.search(stripped.replace(",", ""))
+            return float(match.group(0)) if match else 0.0
+        return number if number == number else 0.0
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        return 0.0
+    return number if number == number else 0.0
+
+
+def parse_text(value: Any) -> Optional[str]:
+    """Strip a source cell; missing, NaN and placeholder cells ("N/A", "NULL", ...) are None."""
+    if value is None or (value.__class__ is float and value != value):
+        return None
+    cleaned = str(value).strip()
+    if cleaned in MISSING_TOKENS:
+        return None
+    return cleaned
+
+
+def maybe_g_to_mg(value: float) -> float:
+    """OpenFoodFacts reports some mg nutrients in grams; values that small are taken to be grams."""
+    if value <= 10:
+        return value * 1000.0
+    return value
+
+
+CONVERSIONS: Dict[str, Callable[[Any], Any]] = {
+    "round": lambda value: int(round(value)),
+    "truncate": int,
+    "maybe_g_to_mg": maybe_g_to_mg,
+    # Importers that normalize names pass their own "food_name" conversion to compile_extractor.
+    "food_name": lambda value: value,
+}
+
+
+class FieldMapping(NamedTuple):
+    """How one ``food`` column is read from a source row.
+
+    ``sources`` is a fallback chain: the first source whose (scaled) value is truthy wins, and
+    ``convert`` is applied to the value that won.
+    """
+
+    column: str
+    kind: str
+    sources: Tuple[str, ...] = ()
+    scales: Tuple[float, ...] = ()
+    convert: Optional[str] = None
+    required: bool = False
+    value: Any = None
+
+
+def number(
+    column: str,
+    *sources: str,
+    scales: Sequence[float] = (),
+    convert: Optional[str] = None,
+) -> FieldMapping:
+    return FieldMapping(column, "number", tuple(sources), tuple(scales), convert)
+
+
+def text(column: str, *sources: str, convert: Optional[str] = None, required: bool = False) -> FieldMapping:
+    return FieldMapping(column, "text", tuple(sources), convert=convert, required=required)
+
+
+def constant(column: str, value: Any) -> FieldMapping:
+    return FieldMapping(column, "constant", value=value)
+
+
+MYFOODDATA_FIELDS: Tuple[FieldMapping, ...] = (
+    text("name", "Name", required=True),
+    text("sourceId", "ID"),
+    constant("isCsvFood", True),
+    number("calories", "Calories", convert="truncate"),
+    number("protein", "Protein (g)"),
+    number("carbs", "Carbohydrate (g)"),
+    number("fat", "Fat (g)"),
+    number("fiber", "Fiber (g)"),
+    number("sugar", "Sugars (g)"),
+    number("sodium", "Sodium (mg)"),
+    number("saturatedFat", "Saturated Fats (g)"),
+    number("transFat", "Trans Fatty Acids (g)"),
+    number("cholesterol", "Cholesterol (mg)"),
+    number("addedSugar", "Added Sugar (g)"),
+    number("netCarbs", "Net-Carbs (g)"),
+    number("solubleFiber", "Soluble Fiber (g)"),
+    number("insolubleFiber", "Insoluble Fiber (g)"),
+    number("water", "Water (g)"),
+    number("pralScore", "PRAL score"),
+    number("omega3", "Omega 3s (mg)"),
+    number("omega6", "Omega 6s (mg)"),
+    number("monoFat", "Fatty acids, total monounsaturated (mg)"),
+    number("polyFat", "Fatty acids, total polyunsaturated (mg)"),
+    number("ala", "18:3 n-3 c,c,c (ALA) (mg)"),
+    number("epa", "20:5 n-3 (EPA) (mg)"),
+    number("dpa", "22:5 n-3 (DPA) (mg)"),
+    number("dha", "22:6 n-3 (DHA) (mg)"),
+    number("calcium", "Calcium (mg)"),
+    number("iron", "Iron, Fe (mg)"),
+    number("potassium", "Potassium, K (mg)"),
+    number("magnesium", "Magnesium (mg)"),
+    number("vitaminAiu", "Vitamin A, IU (IU)"),
+    number("vitaminArae", "Vitamin A, RAE (mcg)"),
+    number("vitaminC", "Vitamin C (mg)"),
+    number("vitaminB12", "Vitamin B-12 (mcg)"),
+    number("vitaminD", "Vitamin D (mcg)"),
+    number("vitaminD2", "Vitamin D2 (ergocalciferol) (mcg)"),
+    number("vitaminD3", "Vitamin D3 (cholecalciferol) (mcg)"),
+    number("vitaminDiu", "Vitamin D (IU) (IU)"),
+    number("vitaminE", "Vitamin E (Alpha-Tocopherol) (mg)"),
+    number("phosphorus", "Phosphorus, P (mg)"),
+    number("zinc", "Zinc, Zn (mg)"),
+    number("copper", "Copper, Cu (mg)"),
+    number("manganese", "Manganese (mg)"),
+    number("selenium", "Selenium, Se (mcg)"),
+    number("fluoride", "Fluoride, F (mcg)"),
+    number("molybdenum", "Molybdenum (mcg)"),
+    number("chlorine", "Chlorine (mg)"),
+    number("vitaminB1", "Thiamin (B1) (mg)"),
+    number("vitaminB2", "Riboflavin (B2) (mg)"),
+    number("vitaminB3", "Niacin (B3) (mg)"),
+    number("vitaminB5", "Pantothenic acid (B5) (mg)"),
+    number("vitaminB6", "Vitamin B6 (mg)"),
+    number("biotin", "Biotin (B7) (mcg)"),
+    number("folate", "Folate (B9) (mcg)"),
+    number("folicAcid", "Folic acid (mcg)"),
+    number("foodFolate", "Food Folate (mcg)"),
+    number("folateDfe", "Folate DFE (mcg)"),
+    number("vitaminK", "Vitamin K (mcg)"),
+    number("dihydrophylloquinone", "Dihydrophylloquinone (mcg)"),
+    number("menaquinone4", "Menaquinone-4 (mcg)"),
+    number("choline", "Choline (mg)"),
+    number("betaine", "Betaine (mg)"),
+    number("retinol", "Retinol (mcg)"),
+    number("caroteneBeta", "Carotene, beta (mcg)"),
+    number("caroteneAlpha", "Carotene, alpha (mcg)"),
+    number("lycopene", "Lycopene (mcg)"),
+    number("luteinZeaxanthin", "Lutein + Zeaxanthin (mcg)"),
+)
+
+# Per 100 g columns of the OpenFoodFacts products export.
+OPENFOODFACTS_FIELDS: Tuple[FieldMapping, ...] = (
+    text("sourceId", "code", required=True),
+    text("name", "product_name", "generic_name", convert="food_name", required=True),
+    constant("isCsvFood", False),
+    text("brand", "brands"),
+    number(
+        "calories",
+        "energy-kcal_100g",
+        "energy-kj_100g",
+        "energy_100g",
+        scales=(1.0, 1 / KJ_PER_KCAL, 1 / KJ_PER_KCAL),
+        convert="round",
+    ),
+    number("protein", "proteins_100g"),
+    number("carbs", "carbohydrates_100g"),
+    number("fat", "fat_100g"),
+    number("fiber", "fiber_100g"),
+    number("sugar", "sugars_100g"),
+    # Sodium is reported in g; salt is 40% sodium.
+    number("sodium", "sodium_100g", "salt_100g", scales=(1000.0, 400.0)),
+    number("saturatedFat", "saturated-fat_100g"),
+    number("transFat", "trans-fat_100g"),
+    number("cholesterol", "cholesterol_100g", convert="maybe_g_to_mg"),
+    number("addedSugar", "added-sugars_100g"),
+    number("solubleFiber", "soluble-fiber_100g"),
+    number("insolubleFiber", "insoluble-fiber_100g"),
+    number("water", "water_100g"),
+    number("omega3", "omega-3-fat_100g", convert="maybe_g_to_mg"),
+    number("omega6", "omega-6-fat_100g", convert="maybe_g_to_mg"),
+    number("monoFat", "monounsaturated-fat_100g", convert="maybe_g_to_mg"),
+    number("polyFat", "polyunsaturated-fat_100g", convert="maybe_g_to_mg"),
+    number("ala", "alpha-linolenic-acid_100g", convert="maybe_g_to_mg"),
+    number("epa", "eicosapentaenoic-acid_100g", convert="maybe_g_to_mg"),
+    number("dha", "docosahexaenoic-acid_100g", convert="maybe_g_to_mg"),
+    number("calcium", "calcium_100g"),
+    number("iron", "iron_100g"),
+    number("potassium", "potassium_100g"),
+    number("magnesium", "magnesium_100g"),
+    number("phosphorus", "phosphorus_100g"),
+    number("zinc", "zinc_100g"),
+    number("copper", "copper_100g"),
+    number("manganese", "manganese_100g"),
+    number("selenium", "selenium_100g"),
+    number("fluoride", "fluoride_100g"),
+    number("molybdenum", "molybdenum_100g"),
+    number("chlorine", "chloride_100g"),
+    number("vitaminArae", "vitamin-a_100g"),
+    number("vitaminC", "vitamin-c_100g"),
+    number("vitaminB1", "vitamin-b1_100g"),
+    number("vitaminB2", "vitamin-b2_100g"),
+    number("vitaminB3", "vitamin-pp_100g"),
+    number("vitaminB6", "vitamin-b6_100g"),
+    number("vitaminB12", "vitamin-b12_100g"),
+    number("biotin", "biotin_100g"),
+    number("folate", "folates_100g", "vitamin-b9_100g"),
+    number("vitaminD", "vitamin-d_100g"),
+    number("vitaminE", "vitamin-e_100g"),
+    number("vitaminK", "vitamin-k_100g"),
+    number("betaine", "betaine_100g"),
+    number("choline", "choline_100g"),
+    number("caroteneBeta", "beta-carotene_100g"),
+    number("lycopene", "lycopene_100g"),
+    number("luteinZeaxanthin", "lutein-zeaxanthin_100g"),
+)
+
+SOURCE_MAPPINGS: Dict[str, Tuple[FieldMapping, ...]] = {
+    "myfooddata": MYFOODDATA_FIELDS,
+    "openfoodfacts": OPENFOODFACTS_FIELDS,
+}
+
+
+class SourceExtractor(NamedTuple):
+    extract: Callable[[Mapping[str, Any]], Optional[tuple]]
+    fields: Tuple[str, ...]
+    code: str
+
+
+def _source_expression(
+    mapping: FieldMapping,
+    namespace: Dict[str, Any],
+    conversions: Dict[str, Callable[[Any], Any]],
+) -> str:
+    if mapping.kind == "constant":
+        name = f"_const_{mapping.column}"
+        namespace[name] = mapping.value
+        return name
+    if mapping.kind not in ("number", "text"):
+        raise ValueError(f"Unknown kind {mapping.kind!r} for column {mapping.column!r}.")
+    if not mapping.sources:
+        raise ValueError(f"Column {mapping.column!r} has no source fields.")
+    if mapping.scales and len(mapping.scales) != len(mapping.sources):
+        raise ValueError(f"Column {mapping.column!r} needs one scale per source field.")
+
+    convert_name = None
+    if mapping.convert is not None:
+        if mapping.convert not in conversions:
+            raise ValueError(f"Unknown conversion {mapping.convert!r} for column {mapping.column!r}.")
+        convert_name = f"_convert_{mapping.convert}"
+        namespace[convert_name] = conversions[mapping.convert]
+
+    parse = "parse_number" if mapping.kind == "number" else "parse_text"
+    terms = []
+    for index, field in enumerate(mapping.sources):
+        term = f"{parse}(get({field!r}))"
+        scale = mapping.scales[index] if mapping.scales else 1.0
+        if scale != 1.0:
+            term = f"{term} * {scale!r}"
+        terms.append(term)
+    expression = " or ".join(terms)
+    if convert_name:
+        expression = f"{convert_name}({expression})"
+    return expression
+
+
+def compile_extractor(
+    source: str,
+    record_type: Type[tuple],
+    fill: Any = None,
+    conversions: Optional[Dict[str, Callable[[Any], Any]]] = None,
+) -> SourceExtractor:
+    """Generate one specialized ``extract(row)`` for ``source`` that builds ``record_type`` records.
+
+    Mappings for columns the record does not have are ignored and record columns without a mapping
+    get ``fill``. ``extract`` returns None when a required column is empty. The generated function
+    reads each source field once, inline, with no per-column dispatch.
+    """
+    if source not in SOURCE_MAPPINGS:
+        raise ValueError(f"Unknown source {source!r}; expected one of {', '.join(SOURCE_MAPPINGS)}.")
+    columns = record_type._fields
+    mappings = [mapping for mapping in SOURCE_MAPPINGS[source] if mapping.column in columns]
+    namespace: Dict[str, Any] = {
+        "parse_number": parse_number,
+        "parse_text": parse_text,
+        "Record": record_type,
+        "_fill": fill,
+    }
+    available = dict(CONVERSIONS, **(conversions or {}))
+
+    # Required columns are checked first so rejected rows cost as little as possible.
+    lines = [f"def extract_{source}(row):", "    get = row.get"]
+    for mapping in sorted(mappings, key=lambda mapping: not mapping.required):
+        lines.append(f"    f_{mapping.column} = {_source_expression(mapping, namespace, available)}")
+        if mapping.required:
+            lines.append(f"    if not f_{mapping.column}:")
+            lines.append("        return None")
+    mapped = {mapping.column for mapping in mappings}
+    arguments = ", ".join(f"f_{column}" if column in mapped else "_fill" for column in columns)
+    lines.append(f"    return Record({arguments})")
+    code = "\n".join(lines) + "\n"
+
+    exec(compile(code, f"<{source} extractor>", "exec"), namespace)
+    fields = tuple(dict.fromkeys(field for mapping in mappings for field in mapping.sources))
+    return SourceExtractor(namespace[f"extract_{source}"], fields, code)
@@ -0,0 +1,14 @@
+export type ReindexJobStatus = "running" | "completed" | "failed";
+
+export class ReindexJobDto {
+  jobId: string;
+  status: ReindexJobStatus;
+  recreateIndex: boolean;
+  indexedCount: number;
+  totalCount: number;
+  ratePerSecond: number;
+  etaSeconds: number | null;
+  startedAt: string;
+  finishedAt: string | null;
+  error: string | null;
+}
@@ -0,0 +1,29 @@
+import { Column, Entity, JoinColumn, OneToOne, PrimaryColumn } from "typeorm";
+import { Food } from "./food.entity";
+
+
+// Written by compute_food_popularity.py from food_entry and recipe_food usage.
+@Entity()
+export class FoodPopularity {
+  @PrimaryColumn()
+  foodId: number;
+
+  @OneToOne(() => Food, { onDelete: "CASCADE" })
+  @JoinColumn({ name: "foodId" })
+  food?: Food;
+
+  @Column({ type: "int", default: 0 })
+  entryCount: number; // Times the food was logged directly
+
+  @Column({ type: "int", default: 0 })
+  recipeCount: number; // Recipes that use the food
+
+  @Column("double")
+  score: number; // Fed to the popularity rank_feature in the search index
+
+  @Column({ type: "datetime", nullable: true })
+  lastLoggedAt?: Date | null;
+
+  @Column({ type: "datetime" })
+  computedAt: Date;
+}
@@ -1,4 +1,4 @@
-import { Column, Entity, PrimaryGeneratedColumn, ManyToOne, CreateDateColumn, OneToMany, Index, Unique } from "typeorm";
+import { Column, Entity, PrimaryGeneratedColumn, ManyToOne, CreateDateColumn, UpdateDateColumn, OneToMany, Index, Unique } from "typeorm";
 import { FoodMeasurement } from "src/foodmeasurement/entities/foodmeasurement.entity";
 import { RecipeFood } from "src/recipefood/entities/recipefood.entity";
 import { User } from "src/users/entities/user.entity";
@@ -229,4 +229,9 @@ export class Food {
 
   @CreateDateColumn()
   createdAt: Date;
+
+  // Only moves when a value changes, so recipe_nutrition can find the recipes of re-imported foods.
+  @Index('idx_food_updated_at')
+  @UpdateDateColumn()
+  updatedAt: Date;
 }
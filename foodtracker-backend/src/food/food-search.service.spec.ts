@@ -31,6 +31,8 @@ describe('FoodSearchService', () => {
 
   afterEach(() => {
     delete process.env.ES_BULK_BATCH_SIZE;
+    delete process.env.ES_TYPEAHEAD_MAX_LENGTH;
+    delete process.env.ES_POPULARITY_BOOST;
     jest.clearAllMocks();
   });
 
@@ -51,6 +53,101 @@ describe('FoodSearchService', () => {
     expect(bulkMock.mock.calls[2][0].operations).toHaveLength(2);
   });
 
+  it('indexes macros and the default measurement as numbers', async () => {
+    const service = new FoodSearchService();
+
+    await service.bulkIndexFoods([
+      {
+        id: 1,
+        name: 'Apple',
+        brand: null,
+        isCsvFood: true,
+        calories: 52,
+        protein: '0.30',
+        carbs: '13.81',
+        fat: null,
+        popularity: 12,
+        defaultMeasurement: { name: '1 medium', weightInGrams: '182.00' },
+      },
+      { id: 2, name: 'Water', isCsvFood: false },
+    ]);
+
+    const operations = bulkMock.mock.calls[0][0].operations;
+    expect(operations[1]).toEqual({
+      name: 'Apple',
+      brand: null,
+      isCsvFood: true,
+      suggest: { input: ['Apple'], weight: 1426 },
+      calories: 52,
+      protein: 0.3,
+      carbs: 13.81,
+      fat: null,
+      popularity: 12,
+      defaultMeasurement: { name: '1 medium', weightInGrams: 182 },
+    });
+    expect(operations[3]).toEqual({
+      name: 'Water',
+      brand: null,
+      isCsvFood: false,
+      suggest: { input: ['Water'], weight: 100 },
+      calories: null,
+      protein: null,
+      carbs: null,
+      fat: null,
+      popularity: null,
+      defaultMeasurement: null,
+    });
+  });
+
+  it('adds brand variants to the completion inputs', async () => {
+    const service = new FoodSearchService();
+
+    await service.bulkIndexFoods([{ id: 1, name: ' Greek Yogurt ', brand: 'Fage', isCsvFood: false }]);
+
+    expect(bulkMock.mock.calls[0][0].operations[1].suggest).toEqual({
+      input: ['Greek Yogurt', 'Fage Greek Yogurt'],
+      weight: 100,
+    });
+  });
+
+  it('answers short queries from the completion suggester', async () => {
+    searchMock.mockResolvedValueOnce({
+      hits: { hits: [] },
+      suggest: {
+        food_suggest: [{ text: 'ch', options: [{ _id: '7' }, { _id: '3' }] }],
+      },
+    });
+    const service = new FoodSearchService();
+
+    const ids = await service.searchFoodsByName(' ch ', 5);
+
+    expect(ids).toEqual([7, 3]);
+    expect(searchMock).toHaveBeenCalledTimes(1);
+    expect(searchMock).toHaveBeenCalledWith({
+      index: 'foods',
+      _source: false,
+      suggest: {
+        food_suggest: {
+          prefix: 'ch',
+          completion: { field: 'suggest', size: 5 },
+        },
+      },
+    });
+  });
+
+  it('falls back to the scored query when no suggestion matches', async () => {
+    searchMock
+      .mockResolvedValueOnce({ hits: { hits: [] }, suggest: { food_suggest: [{ text: 'qz', options: [] }] } })
+      .mockResolvedValueOnce({ hits: { hits: [{ _id: '12' }] } });
+    const service = new FoodSearchService();
+
+    const ids = await service.searchFoodsByName('qz', 5);
+
+    expect(ids).toEqual([12]);
+    expect(searchMock).toHaveBeenCalledTimes(2);
+    expect(searchMock.mock.calls[1][0]).toHaveProperty('query.bool.must.0.function_score');
+  });
+
   it('uses fuzzy-first search query payload', async () => {
     searchMock.mockResolvedValueOnce({
       hits: {
@@ -68,40 +165,49 @@ describe('FoodSearchService', () => {
         index: 'foods',
         size: 5,
         query: expect.objectContaining({
-          function_score: expect.objectContaining({
-            query: expect.objectContaining({
-              bool: expect.objectContaining({
-                should: expect.arrayContaining([
-                  expect.objectContaining({
-                    multi_match: expect.objectContaining({
-                      query: 'chiken brest',
-                      fields: ['name^3', 'brand^0.2'],
-                      fuzziness: 'AUTO',
-                    }),
-                  }),
-                  expect.objectContaining({
-                    match: expect.objectContaining({
-                      name: expect.objectContaining({
-                        fuzziness: 'AUTO',
-                      }),
+          bool: expect.objectContaining({
+            must: [
+              expect.objectContaining({
+                function_score: expect.objectContaining({
+                  query: expect.objectContaining({
+                    bool: expect.objectContaining({
+                      should: expect.arrayContaining([
+                        expect.objectContaining({
+                          multi_match: expect.objectContaining({
+                            query: 'chiken brest',
+                            fields: ['name^3', 'brand^0.2'],
+                            fuzziness: 'AUTO',
+                          }),
+                        }),
+                        expect.objectContaining({
+                          match: expect.objectContaining({
+                            name: expect.objectContaining({
+                              fuzziness: 'AUTO',
+                            }),
+                          }),
+                        }),
+                        expect.objectContaining({
+                          match: expect.objectContaining({
+                            brand: expect.objectContaining({
+                              boost: 0.2,
+                            }),
+                          }),
+                        }),
+                      ]),
                     }),
                   }),
-                  expect.objectContaining({
-                    match: expect.objectContaining({
-                      brand: expect.objectContaining({
-                        boost: 0.2,
-                      }),
+                  functions: expect.arrayContaining([
+                    expect.objectContaining({
+                      filter: { term: { isCsvFood: true } },
+                      weight: 4,
                     }),
-                  }),
-                ]),
-              }),
-            }),
-            functions: expect.arrayContaining([
-              expect.objectContaining({
-                filter: { term: { isCsvFood: true } },
-                weight: 4,
+                  ]),
+                }),
               }),
-            ]),
+            ],
+            should: [
+              { rank_feature: { field: 'popularity', saturation: {}, boost: 10 } },
+            ],
           }),
         }),
       }),
@@ -1,25 +1,110 @@
 import { Client } from '@elastic/elasticsearch';
 import { Injectable, Logger, OnModuleInit } from '@nestjs/common';
 
-type FoodSearchDocument = {
+type FoodSearchMeasurement = {
+  name: string;
+  weightInGrams: number | string;
+};
+
+// Macros and the default measurement ride along in each document so search hits can be rendered
+// without loading the foods from MySQL; they are stored but not indexed.
+export type FoodSearchDocument = {
   id: number;
   name: string;
   brand?: string | null;
   isCsvFood: boolean;
+  calories?: number | string | null;
+  protein?: number | string | null;
+  carbs?: number | string | null;
+  fat?: number | string | null;
+  popularity?: number | string | null;
+  defaultMeasurement?: FoodSearchMeasurement | null;
 };
 
+// Completion suggestions are ordered by weight; CSV foods get the same 4x preference as in the scored search.
+const CSV_FOOD_SUGGEST_WEIGHT = 4;
+const SUGGEST_WEIGHT = 1;
+// Completion weights are integers, so the popularity factor is scaled before rounding.
+const SUGGEST_WEIGHT_SCALE = 100;
+const SUGGEST_RESERVED_CHARACTERS = /[\u0000\u001e\u001f]/g;
+
+function suggestInputs(name: string | null | undefined, brand: string | null | undefined): string[] {
+  // The food's name, plus "<brand> <name>" so typing the brand also finds it.
+  const cleanName = (name ?? '').replace(SUGGEST_RESERVED_CHARACTERS, '').trim();
+  const cleanBrand = (brand ?? '').replace(SUGGEST_RESERVED_CHARACTERS, '').trim();
+  if (!cleanName) {
+    return [];
+  }
+  return cleanBrand ? [cleanName, `${cleanBrand} ${cleanName}`] : [cleanName];
+}
+
+// Short queries are answered by the suggester alone, so popularity reaches them through the weight.
+// Matches suggest_weight() in food_documents.py, which compute_food_popularity.py also uses.
+function suggestWeight(isCsvFood: boolean, popularity: number | null): number {
+  const base = isCsvFood ? CSV_FOOD_SUGGEST_WEIGHT : SUGGEST_WEIGHT;
+  return Math.round(base * SUGGEST_WEIGHT_SCALE * (1 + Math.log1p(Math.max(popularity ?? 0, 0))));
+}
+
+function toNumberOrNull(value: number | string | null | undefined): number | null {
+  if (value === null || value === undefined) {
+    return null;
+  }
+  const parsed = Number(value);
+  return Number.isFinite(parsed) ? parsed : null;
+}
+
+function toPositiveOrNull(value: number | string | null | undefined): number | null {
+  const parsed = toNumberOrNull(value);
+  return parsed !== null && parsed > 0 ? parsed : null;
+}
+
+function toSourceDocument(food: FoodSearchDocument) {
+  const inputs = suggestInputs(food.name, food.brand);
+  // rank_feature values must be positive; foods nobody logged simply have no popularity.
+  const popularity = toPositiveOrNull(food.popularity);
+  // MySQL DECIMAL columns come back as strings.
+  return {
+    name: food.name,
+    brand: food.brand ?? null,
+    isCsvFood: food.isCsvFood,
+    suggest: inputs.length
+      ? { input: inputs, weight: suggestWeight(food.isCsvFood, popularity) }
+      : null,
+    calories: toNumberOrNull(food.calories),
+    protein: toNumberOrNull(food.protein),
+    carbs: toNumberOrNull(food.carbs),
+    fat: toNumberOrNull(food.fat),
+    popularity,
+    defaultMeasurement: food.defaultMeasurement
+      ? {
+          name: food.defaultMeasurement.name,
+          weightInGrams: toNumberOrNull(food.defaultMeasurement.weightInGrams),
+        }
+      : null,
+  };
+}
+
 @Injectable()
 export class FoodSearchService implements OnModuleInit {
   private readonly logger = new Logger(FoodSearchService.name);
   private readonly client: Client;
   private readonly indexName: string;
   private readonly bulkBatchSize: number;
+  private readonly typeaheadMaxLength: number;
+  private readonly popularityBoost: number;
 
   constructor() {
     const node = process.env.ES_URL ?? 'http://localhost:9200';
     this.indexName = process.env.ES_FOOD_INDEX ?? 'foods';
     const parsedBatchSize = Number.parseInt(process.env.ES_BULK_BATCH_SIZE ?? '', 10);
     this.bulkBatchSize = Number.isFinite(parsedBatchSize) && parsedBatchSize > 0 ? parsedBatchSize : 500;
+    // Queries up to this many characters are answered by the completion suggester; 0 disables it.
+    const parsedTypeaheadLength = Number.parseInt(process.env.ES_TYPEAHEAD_MAX_LENGTH ?? '', 10);
+    this.typeaheadMaxLength =
+      Number.isFinite(parsedTypeaheadLength) && parsedTypeaheadLength >= 0 ? parsedTypeaheadLength : 3;
+    const parsedPopularityBoost = Number.parseFloat(process.env.ES_POPULARITY_BOOST ?? '');
+    this.popularityBoost =
+      Number.isFinite(parsedPopularityBoost) && parsedPopularityBoost > 0 ? parsedPopularityBoost : 10;
     this.client = new Client({ node });
   }
 
@@ -31,11 +116,7 @@ export class FoodSearchService implements OnModuleInit {
     await this.client.index({
       index: this.indexName,
       id: food.id.toString(),
-      document: {
-        name: food.name,
-        brand: food.brand ?? null,
-        isCsvFood: food.isCsvFood,
-      },
+      document: toSourceDocument(food),
       refresh: 'wait_for',
     });
   }
@@ -49,11 +130,7 @@ export class FoodSearchService implements OnModuleInit {
       const batch = foods.slice(start, start + this.bulkBatchSize);
       const operations = batch.flatMap((food) => [
         { index: { _index: this.indexName, _id: food.id.toString() } },
-        {
-          name: food.name,
-          brand: food.brand ?? null,
-          isCsvFood: food.isCsvFood,
-        },
+        toSourceDocument(food),
       ]);
 
       const response = await this.client.bulk({
@@ -73,65 +150,90 @@ export class FoodSearchService implements OnModuleInit {
       return [];
     }
 
+    // The first keystrokes are a prefix lookup in the completion FST; the scored fuzzy query only
+    // runs once there is enough text for fuzziness to matter, or when the prefix matches nothing.
+    if (sanitizedQuery.length <= this.typeaheadMaxLength) {
+      const suggestedIds = await this.suggestFoodsByName(sanitizedQuery, limit);
+      if (suggestedIds.length > 0) {
+        return suggestedIds;
+      }
+    }
+
     const response = await this.client.search({
       index: this.indexName,
       size: limit,
       query: {
-        function_score: {
-          query: {
-            bool: {
-              should: [
-                {
-                  multi_match: {
-                    query: sanitizedQuery,
-                    fields: ['name^3', 'brand^0.2'],
-                    type: 'best_fields',
-                    fuzziness: 'AUTO',
-                    operator: 'and',
-                    boost: 4,
-                  },
-                },
-                {
-                  match_phrase_prefix: {
-                    name: {
-                      query: sanitizedQuery,
-                      max_expansions: 20,
-                      boost: 1.25,
-                    },
-                  },
-                },
-                {
-                  match: {
-                    name: {
-                      query: sanitizedQuery,
-                      fuzziness: 'AUTO',
-                      operator: 'and',
-                      boost: 2,
-                    },
+        bool: {
+          must: [
+            {
+              function_score: {
+                query: {
+                  bool: {
+                    should: [
+                      {
+                        multi_match: {
+                          query: sanitizedQuery,
+                          fields: ['name^3', 'brand^0.2'],
+                          type: 'best_fields',
+                          fuzziness: 'AUTO',
+                          operator: 'and',
+                          boost: 4,
+                        },
+                      },
+                      {
+                        match_phrase_prefix: {
+                          name: {
+                            query: sanitizedQuery,
+                            max_expansions: 20,
+                            boost: 1.25,
+                          },
+                        },
+                      },
+                      {
+                        match: {
+                          name: {
+                            query: sanitizedQuery,
+                            fuzziness: 'AUTO',
+                            operator: 'and',
+                            boost: 2,
+                          },
+                        },
+                      },
+                      {
+                        match: {
+                          brand: {
+                            query: sanitizedQuery,
+                            fuzziness: 'AUTO',
+                            operator: 'and',
+                            boost: 0.2,
+                          },
+                        },
+                      },
+                    ],
+                    minimum_should_match: 1,
                   },
                 },
-                {
-                  match: {
-                    brand: {
-                      query: sanitizedQuery,
-                      fuzziness: 'AUTO',
-                      operator: 'and',
-                      boost: 0.2,
-                    },
+                functions: [
+                  {
+                    filter: { term: { isCsvFood: true } },
+                    weight: 4,
                   },
-                },
-              ],
-              minimum_should_match: 1,
+                ],
+                boost_mode: 'multiply',
+                score_mode: 'multiply',
+              },
             },
-          },
-          functions: [
+          ],
+          // Additive boost for foods people log; a rank_feature is read from the index, unlike a script score.
+          should: [
             {
-              filter: { term: { isCsvFood: true } },
-              weight: 4,
+              rank_feature: {
+                field: 'popularity',
+                saturation: {},
+                boost: this.popularityBoost,
+              },
             },
           ],
-          boost_mode: 'multiply',
-          score_mode: 'multiply',
         },
       },
     });
@@ -143,6 +245,39 @@ export class FoodSearchService implements OnModuleInit {
       .filter((id) => Number.isFinite(id));
   }
 
+  async suggestFoodsByName(prefix: string, limit: number): Promise<number[]> {
+    const sanitizedPrefix = prefix.trim();
+    if (!sanitizedPrefix) {
+      return [];
+    }
+
+    const response = await this.client.search({
+      index: this.indexName,
+      _source: false,
+      suggest: {
+        food_suggest: {
+          prefix: sanitizedPrefix,
+          completion: {
+            field: 'suggest',
+            size: limit,
+          },
+        },
+      },
+    });
+
+    const ids = new Set<number>();
+    for (const suggestion of response.suggest?.food_suggest ?? []) {
+      const options = Array.isArray(suggestion.options) ? suggestion.options : [suggestion.options];
+      for (const option of options) {
+        const id = Number.parseInt(String((option as { _id?: string })._id), 10);
+        if (Number.isFinite(id)) {
+          ids.add(id);
+        }
+      }
+    }
+    return [...ids].slice(0, limit);
+  }
+
   private async ensureIndex(): Promise<void> {
     const existsResponse = await this.client.indices.exists({ index: this.indexName });
     const indexExists =
@@ -232,6 +367,24 @@ export class FoodSearchService implements OnModuleInit {
             isCsvFood: {
               type: 'boolean',
             },
+            popularity: {
+              type: 'rank_feature',
+            },
+            suggest: {
+              type: 'completion',
+              analyzer: 'simple',
+              max_input_length: 50,
+            },
+            calories: { type: 'float', index: false },
+            protein: { type: 'float', index: false },
+            carbs: { type: 'float', index: false },
+            fat: { type: 'float', index: false },
+            defaultMeasurement: {
+              properties: {
+                name: { type: 'keyword', index: false },
+                weightInGrams: { type: 'float', index: false },
+              },
+            },
           },
         },
       });
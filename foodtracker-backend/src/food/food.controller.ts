@@ -5,6 +5,7 @@ import {
   Get,
   HttpCode,
   HttpStatus,
+  Param,
   ParseIntPipe,
   Post,
   Query,
@@ -60,14 +61,21 @@ export class FoodController {
   }
 
   @Post('reindex')
+  @HttpCode(HttpStatus.ACCEPTED)
   @UseGuards(PassportJwtAuthGuard)
   reindexFoods() {
-    return this.foodService.reindexFoods();
+    return this.foodService.startReindexJob(false);
   }
 
   @Post('recreate-index')
+  @HttpCode(HttpStatus.ACCEPTED)
   recreateFoodsIndex() {
-    return this.foodService.recreateFoodIndex();
+    return this.foodService.startReindexJob(true);
+  }
+
+  @Get('reindex-jobs/:jobId')
+  getReindexJob(@Param('jobId') jobId: string) {
+    return this.foodService.getReindexJob(jobId);
   }
 
   @Get('all')
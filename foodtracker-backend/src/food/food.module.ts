@@ -1,15 +1,17 @@
 import { UsersService } from "src/users/users.service";
 import { TypeOrmModule } from "@nestjs/typeorm";
 import { Module } from "@nestjs/common";
+import { FoodMeasurement } from "src/foodmeasurement/entities/foodmeasurement.entity";
 
 import { FoodController } from "./food.controller";
 import { Food } from "./entities/food.entity";
+import { FoodPopularity } from "./entities/food-popularity.entity";
 import { FoodSearchService } from "./food-search.service";
 import { FoodService } from "./food.service";
 
 
 @Module({
-  imports: [TypeOrmModule.forFeature([Food])],
+  imports: [TypeOrmModule.forFeature([Food, FoodMeasurement, FoodPopularity])],
   providers: [FoodSearchService, FoodService],
   controllers: [FoodController],
   exports: [FoodService],
@@ -1,8 +1,12 @@
 import { Test, TestingModule } from '@nestjs/testing';
 import { getRepositoryToken } from '@nestjs/typeorm';
+import { ConflictException, NotFoundException } from '@nestjs/common';
+import { In, MoreThan } from 'typeorm';
 import { FoodService } from './food.service';
 import { Food } from './entities/food.entity';
 import { FoodSearchService } from './food-search.service';
+import { FoodMeasurement } from 'src/foodmeasurement/entities/foodmeasurement.entity';
+import { FoodPopularity } from './entities/food-popularity.entity';
 
 describe('FoodService', () => {
   let service: FoodService;
@@ -11,19 +15,33 @@ describe('FoodService', () => {
     find: jest.fn(),
     findOneBy: jest.fn(),
     save: jest.fn(),
+    count: jest.fn(),
+  };
+  const foodMeasurementRepository = {
+    find: jest.fn(),
+  };
+  const foodPopularityRepository = {
+    find: jest.fn(),
+    findOneBy: jest.fn(),
   };
   const foodSearchService = {
     searchFoodsByName: jest.fn(),
     bulkIndexFoods: jest.fn(),
     indexFood: jest.fn(),
+    recreateIndex: jest.fn(),
   };
 
   beforeEach(async () => {
     process.env.ES_REINDEX_BATCH_SIZE = '2';
+    foodMeasurementRepository.find.mockResolvedValue([]);
+    foodPopularityRepository.find.mockResolvedValue([]);
+    foodPopularityRepository.findOneBy.mockResolvedValue(null);
     const module: TestingModule = await Test.createTestingModule({
       providers: [
         FoodService,
         { provide: getRepositoryToken(Food), useValue: foodRepository },
+        { provide: getRepositoryToken(FoodMeasurement), useValue: foodMeasurementRepository },
+        { provide: getRepositoryToken(FoodPopularity), useValue: foodPopularityRepository },
         { provide: FoodSearchService, useValue: foodSearchService },
       ],
     }).compile();
@@ -130,45 +148,158 @@ describe('FoodService', () => {
 
     expect(foodRepository.save).toHaveBeenCalledWith({ ...createFoodDto, isCsvFood: true });
     expect(foodSearchService.indexFood).toHaveBeenCalledWith({
-      ...createFoodDto,
+      id: undefined,
+      name: 'Test Food',
+      brand: null,
       isCsvFood: true,
+      calories: 100,
+      protein: 10,
+      carbs: 20,
+      fat: 5,
+      popularity: null,
+      defaultMeasurement: null,
     });
   });
 
+  it('indexes the default measurement of a new food', async () => {
+    const measurements = [
+      { name: '1 gram', weightInGrams: 1, isDefault: false, isActive: true },
+      { name: '1 cup', weightInGrams: 240, isDefault: true, isActive: true },
+    ];
+    foodRepository.findOneBy.mockResolvedValueOnce(null);
+    foodRepository.save.mockResolvedValueOnce({ id: 7, name: 'Milk', calories: 42, measurements, isCsvFood: true });
+
+    await service.createFood({ name: 'Milk', calories: 42 } as never);
+
+    expect(foodSearchService.indexFood).toHaveBeenCalledWith(
+      expect.objectContaining({ id: 7, defaultMeasurement: { name: '1 cup', weightInGrams: 240 } }),
+    );
+  });
+
+  it('keeps the popularity score when a food is indexed again', async () => {
+    const existing = { id: 9, sourceId: '9', name: 'Oats', calories: 380 };
+    foodRepository.findOneBy.mockResolvedValueOnce(existing);
+    foodRepository.save.mockResolvedValueOnce({ ...existing, isCsvFood: true });
+    foodPopularityRepository.findOneBy.mockResolvedValueOnce({ foodId: 9, score: 14 });
+
+    await service.createFood({ sourceId: '9', name: 'Oats', calories: 380 } as never);
+
+    expect(foodPopularityRepository.findOneBy).toHaveBeenCalledWith({ foodId: 9 });
+    expect(foodSearchService.indexFood).toHaveBeenCalledWith(expect.objectContaining({ id: 9, popularity: 14 }));
+  });
+
   it('reindexes foods in batches', async () => {
+    const macros = { calories: 52, protein: '0.30', carbs: '13.81', fat: '0.20' };
     const firstBatch = [
-      { id: 1, name: 'Apple', brand: null, isCsvFood: true },
-      { id: 2, name: 'Banana', brand: 'Brand', isCsvFood: false },
+      { id: 1, name: 'Apple', brand: null, isCsvFood: true, ...macros },
+      { id: 2, name: 'Banana', brand: 'Brand', isCsvFood: false, ...macros },
     ];
-    const secondBatch = [{ id: 3, name: 'Carrot', brand: null, isCsvFood: true }];
+    const secondBatch = [{ id: 3, name: 'Carrot', brand: null, isCsvFood: true, ...macros }];
 
     foodRepository.find
       .mockResolvedValueOnce(firstBatch)
       .mockResolvedValueOnce(secondBatch)
       .mockResolvedValueOnce([]);
+    foodMeasurementRepository.find.mockResolvedValueOnce([
+      { id: 10, name: '1 medium', weightInGrams: '182.00', food: { id: 1 } },
+      { id: 11, name: '1 cup', weightInGrams: '150.00', food: { id: 1 } },
+    ]);
+    foodPopularityRepository.find.mockResolvedValueOnce([{ foodId: 2, score: 7 }]);
 
     const result = await service.reindexFoods();
 
     expect(foodSearchService.bulkIndexFoods).toHaveBeenCalledTimes(2);
     expect(foodSearchService.bulkIndexFoods).toHaveBeenNthCalledWith(1, [
-      { ...firstBatch[0], isCsvFood: true },
-      { ...firstBatch[1], isCsvFood: false },
+      { ...firstBatch[0], popularity: null, defaultMeasurement: { name: '1 medium', weightInGrams: '182.00' } },
+      { ...firstBatch[1], popularity: 7, defaultMeasurement: null },
     ]);
     expect(foodSearchService.bulkIndexFoods).toHaveBeenNthCalledWith(2, [
-      { ...secondBatch[0], isCsvFood: true },
+      { ...secondBatch[0], popularity: null, defaultMeasurement: null },
     ]);
+    expect(foodPopularityRepository.find).toHaveBeenNthCalledWith(1, {
+      select: { foodId: true, score: true },
+      where: { foodId: In([1, 2]) },
+    });
     expect(result).toEqual({ indexedCount: 3 });
     expect(foodRepository.find).toHaveBeenNthCalledWith(1, {
-      select: ['id', 'name', 'brand', 'isCsvFood'],
+      select: ['id', 'name', 'brand', 'isCsvFood', 'calories', 'protein', 'carbs', 'fat'],
+      where: { id: MoreThan(0) },
       take: 2,
-      skip: 0,
       order: { id: 'ASC' },
     });
     expect(foodRepository.find).toHaveBeenNthCalledWith(2, {
-      select: ['id', 'name', 'brand', 'isCsvFood'],
+      select: ['id', 'name', 'brand', 'isCsvFood', 'calories', 'protein', 'carbs', 'fat'],
+      where: { id: MoreThan(2) },
       take: 2,
-      skip: 2,
       order: { id: 'ASC' },
     });
+    expect(foodMeasurementRepository.find).toHaveBeenNthCalledWith(
+      1,
+      expect.objectContaining({
+        where: { food: { id: In([1, 2]) }, isDefault: true, isActive: true },
+        order: { id: 'ASC' },
+      }),
+    );
+  });
+
+  it('runs recreate-index as a background job with progress', async () => {
+    foodRepository.count.mockResolvedValueOnce(3);
+    foodRepository.find
+      .mockResolvedValueOnce([
+        { id: 1, name: 'Apple', brand: null, isCsvFood: true },
+        { id: 2, name: 'Banana', brand: null, isCsvFood: false },
+      ])
+      .mockResolvedValueOnce([{ id: 3, name: 'Carrot', brand: null, isCsvFood: true }]);
+
+    const started = await service.startReindexJob(true);
+
+    expect(started).toEqual(
+      expect.objectContaining({
+        status: 'running',
+        recreateIndex: true,
+        indexedCount: 0,
+        totalCount: 3,
+      }),
+    );
+
+    await new Promise((resolve) => setImmediate(resolve));
+
+    const finished = service.getReindexJob(started.jobId);
+    expect(foodSearchService.recreateIndex).toHaveBeenCalledTimes(1);
+    expect(finished).toEqual(
+      expect.objectContaining({
+        jobId: started.jobId,
+        status: 'completed',
+        indexedCount: 3,
+        etaSeconds: 0,
+      }),
+    );
+  });
+
+  it('attaches concurrent starts to one job and rejects a conflicting recreateIndex', async () => {
+    let releaseFirstBatch: (foods: Food[]) => void = () => undefined;
+    foodRepository.count.mockResolvedValueOnce(0);
+    foodRepository.find.mockReturnValueOnce(
+      new Promise<Food[]>((resolve) => {
+        releaseFirstBatch = resolve;
+      }),
+    );
+
+    const [first, second] = await Promise.all([
+      service.startReindexJob(false),
+      service.startReindexJob(false),
+    ]);
+
+    expect(second.jobId).toBe(first.jobId);
+    expect(foodRepository.count).toHaveBeenCalledTimes(1);
+    await expect(service.startReindexJob(true)).rejects.toThrow(ConflictException);
+
+    releaseFirstBatch([]);
+    await new Promise((resolve) => setImmediate(resolve));
+    expect(service.getReindexJob(first.jobId).status).toBe('completed');
+  });
+
+  it('throws when a reindex job does not exist', () => {
+    expect(() => service.getReindexJob('missing')).toThrow(NotFoundException);
   });
 });
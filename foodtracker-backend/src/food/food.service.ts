@@ -1,24 +1,45 @@
-import { Injectable, Logger, NotFoundException } from "@nestjs/common";
+import { ConflictException, Injectable, Logger, NotFoundException } from "@nestjs/common";
 import { User } from "src/users/entities/user.entity";
 import { InjectRepository } from "@nestjs/typeorm";
 import { UserRequest } from "src/common/user";
-import { In, Repository } from "typeorm";
+import { randomUUID } from "crypto";
+import { In, MoreThan, Repository } from "typeorm";
 
 import { CreateBasicFoodDto } from "./dto/createbasicfood.dto";
 import { CreateFoodDto } from "./dto/createfood.dto";
 import { AllFoodsDto } from "./dto/allfoods.dto";
+import { ReindexJobDto } from "./dto/reindexjob.dto";
+import { FoodMeasurement } from "src/foodmeasurement/entities/foodmeasurement.entity";
 import { Food } from "./entities/food.entity";
-import { FoodSearchService } from "./food-search.service";
+import { FoodPopularity } from "./entities/food-popularity.entity";
+import { FoodSearchDocument, FoodSearchService } from "./food-search.service";
 
+const MAX_RETAINED_REINDEX_JOBS = 20;
+
+type ReindexJob = {
+  jobId: string;
+  status: ReindexJobDto["status"];
+  recreateIndex: boolean;
+  indexedCount: number;
+  totalCount: number;
+  startedAt: Date;
+  finishedAt: Date | null;
+  error: string | null;
+};
 
 @Injectable()
 export class FoodService {
   private readonly logger = new Logger(FoodService.name);
   private readonly reindexBatchSize: number;
+  private readonly reindexJobs = new Map<string, ReindexJob>();
 
   constructor(
     @InjectRepository(Food)
     private readonly foodRepository: Repository<Food>,
+    @InjectRepository(FoodMeasurement)
+    private readonly foodMeasurementRepository: Repository<FoodMeasurement>,
+    @InjectRepository(FoodPopularity)
+    private readonly foodPopularityRepository: Repository<FoodPopularity>,
     private readonly foodSearchService: FoodSearchService
   ) {
     const parsedBatchSize = Number.parseInt(
@@ -97,15 +118,16 @@ export class FoodService {
     return ids.map((id) => foodsById.get(id)).filter((food): food is Food => Boolean(food));
   }
 
-  async reindexFoods(): Promise<{ indexedCount: number }> {
+  async reindexFoods(onProgress?: (indexedCount: number) => void): Promise<{ indexedCount: number }> {
     let indexedCount = 0;
-    let offset = 0;
+    let lastId = 0;
 
+    // Keyset pagination on id keeps every batch an index range scan, unlike OFFSET.
     while (true) {
       const foods = await this.foodRepository.find({
-        select: ["id", "name", "brand", "isCsvFood"],
+        select: ["id", "name", "brand", "isCsvFood", "calories", "protein", "carbs", "fat"],
+        where: { id: MoreThan(lastId) },
         take: this.reindexBatchSize,
-        skip: offset,
         order: { id: "ASC" },
       });
 
@@ -113,15 +135,20 @@ export class FoodService {
         break;
       }
 
+      const foodIds = foods.map((food) => food.id);
+      const [defaultMeasurements, popularity] = await Promise.all([
+        this.findDefaultMeasurements(foodIds),
+        this.findPopularity(foodIds),
+      ]);
       await this.foodSearchService.bulkIndexFoods(
-        foods.map((food) => ({
-          ...food,
-          isCsvFood: Boolean(food.isCsvFood),
-        }))
+        foods.map((food) =>
+          this.toSearchDocument(food, defaultMeasurements.get(food.id), popularity.get(food.id))
+        )
       );
 
       indexedCount += foods.length;
-      offset += foods.length;
+      lastId = foods[foods.length - 1].id;
+      onProgress?.(indexedCount);
 
       if (foods.length < this.reindexBatchSize) {
         break;
@@ -131,17 +158,167 @@ export class FoodService {
     return { indexedCount };
   }
 
-  async recreateFoodIndex(): Promise<{ indexedCount: number }> {
-    await this.foodSearchService.recreateIndex();
-    return this.reindexFoods();
+  async startReindexJob(recreateIndex: boolean): Promise<ReindexJobDto> {
+    const runningJob = [...this.reindexJobs.values()].find((job) => job.status === "running");
+    if (runningJob) {
+      if (runningJob.recreateIndex !== recreateIndex) {
+        throw new ConflictException(
+          `Reindex job ${runningJob.jobId} is already running with recreateIndex=${runningJob.recreateIndex}.`
+        );
+      }
+      return this.toReindexJobDto(runningJob);
+    }
+
+    // Registered before the first await so concurrent requests see it and attach to it.
+    const job: ReindexJob = {
+      jobId: randomUUID(),
+      status: "running",
+      recreateIndex,
+      indexedCount: 0,
+      totalCount: 0,
+      startedAt: new Date(),
+      finishedAt: null,
+      error: null,
+    };
+    this.reindexJobs.set(job.jobId, job);
+    this.pruneReindexJobs();
+
+    try {
+      job.totalCount = await this.foodRepository.count();
+    } catch (error) {
+      job.status = "failed";
+      job.error = error instanceof Error ? error.message : String(error);
+      job.finishedAt = new Date();
+      throw error;
+    }
+
+    void this.runReindexJob(job);
+
+    return this.toReindexJobDto(job);
   }
 
-  private async indexFoodSafe(food: Food): Promise<void> {
+  getReindexJob(jobId: string): ReindexJobDto {
+    const job = this.reindexJobs.get(jobId);
+
+    if (!job) {
+      throw new NotFoundException("Reindex job was not found with id: " + jobId);
+    }
+
+    return this.toReindexJobDto(job);
+  }
+
+  private async runReindexJob(job: ReindexJob): Promise<void> {
     try {
-      await this.foodSearchService.indexFood({
-        ...food,
-        isCsvFood: Boolean(food.isCsvFood),
+      if (job.recreateIndex) {
+        await this.foodSearchService.recreateIndex();
+      }
+      const result = await this.reindexFoods((indexedCount) => {
+        job.indexedCount = indexedCount;
       });
+      job.indexedCount = result.indexedCount;
+      job.status = "completed";
+    } catch (error) {
+      this.logger.error("Food reindex job failed.", error as Error);
+      job.status = "failed";
+      job.error = error instanceof Error ? error.message : String(error);
+    } finally {
+      job.finishedAt = new Date();
+    }
+  }
+
+  private pruneReindexJobs(): void {
+    for (const [jobId, job] of this.reindexJobs) {
+      if (this.reindexJobs.size <= MAX_RETAINED_REINDEX_JOBS) {
+        break;
+      }
+      if (job.status !== "running") {
+        this.reindexJobs.delete(jobId);
+      }
+    }
+  }
+
+  private toReindexJobDto(job: ReindexJob): ReindexJobDto {
+    const endedAt = job.finishedAt ?? new Date();
+    const elapsedSeconds = Math.max((endedAt.getTime() - job.startedAt.getTime()) / 1000, 0.001);
+    const ratePerSecond = job.indexedCount / elapsedSeconds;
+    const remaining = Math.max(job.totalCount - job.indexedCount, 0);
+
+    let etaSeconds: number | null = null;
+    if (job.status !== "running") {
+      etaSeconds = 0;
+    } else if (ratePerSecond > 0) {
+      etaSeconds = Math.round(remaining / ratePerSecond);
+    }
+
+    return {
+      jobId: job.jobId,
+      status: job.status,
+      recreateIndex: job.recreateIndex,
+      indexedCount: job.indexedCount,
+      totalCount: job.totalCount,
+      ratePerSecond: Math.round(ratePerSecond * 10) / 10,
+      etaSeconds,
+      startedAt: job.startedAt.toISOString(),
+      finishedAt: job.finishedAt ? job.finishedAt.toISOString() : null,
+      error: job.error,
+    };
+  }
+
+  private async findDefaultMeasurements(foodIds: number[]): Promise<Map<number, FoodMeasurement>> {
+    const measurements = await this.foodMeasurementRepository.find({
+      select: { id: true, name: true, weightInGrams: true, food: { id: true } },
+      where: { food: { id: In(foodIds) }, isDefault: true, isActive: true },
+      relations: { food: true },
+      order: { id: "ASC" },
+    });
+
+    // The lowest id wins when a food has several defaults, as in the Python bulk indexers.
+    const byFoodId = new Map<number, FoodMeasurement>();
+    for (const measurement of measurements) {
+      if (!byFoodId.has(measurement.food.id)) {
+        byFoodId.set(measurement.food.id, measurement);
+      }
+    }
+    return byFoodId;
+  }
+
+  private async findPopularity(foodIds: number[]): Promise<Map<number, number>> {
+    const rows = await this.foodPopularityRepository.find({
+      select: { foodId: true, score: true },
+      where: { foodId: In(foodIds) },
+    });
+    return new Map(rows.map((row) => [row.foodId, row.score]));
+  }
+
+  private toSearchDocument(
+    food: Food,
+    defaultMeasurement?: FoodMeasurement,
+    popularity?: number
+  ): FoodSearchDocument {
+    const measurement =
+      defaultMeasurement ?? food.measurements?.find((candidate) => candidate.isDefault && candidate.isActive !== false);
+
+    return {
+      id: food.id,
+      name: food.name,
+      brand: food.brand ?? null,
+      isCsvFood: Boolean(food.isCsvFood),
+      calories: food.calories,
+      protein: food.protein,
+      carbs: food.carbs,
+      fat: food.fat,
+      popularity: popularity ?? null,
+      defaultMeasurement: measurement
+        ? { name: measurement.name, weightInGrams: measurement.weightInGrams }
+        : null,
+    };
+  }
+
+  private async indexFoodSafe(food: Food): Promise<void> {
+    try {
+      // Indexing replaces the whole document, so the popularity written by the batch job is carried over.
+      const popularity = food.id ? await this.foodPopularityRepository.findOneBy({ foodId: food.id }) : null;
+      await this.foodSearchService.indexFood(this.toSearchDocument(food, undefined, popularity?.score));
     } catch (error) {
       this.logger.warn("Failed to index food in Elasticsearch.", error as Error);
     }
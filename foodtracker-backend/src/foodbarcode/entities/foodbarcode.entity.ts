@@ -1,4 +1,4 @@
-import { Column, CreateDateColumn, Entity, ManyToOne, PrimaryGeneratedColumn } from "typeorm";
+import { Column, CreateDateColumn, Entity, Index, ManyToOne, PrimaryGeneratedColumn } from "typeorm";
 import { Food } from "src/food/entities/food.entity";
 
 @Entity()
@@ -9,6 +9,11 @@ export class FoodBarcode {
   @Column({ unique: true })
   barcode: string;
 
+  // Canonical GTIN-14 of barcode (see toGtin14); lookups probe this instead of barcode spellings.
+  @Index("idx_food_barcode_gtin")
+  @Column({ type: "char", length: 14, nullable: true })
+  gtin?: string | null;
+
   @ManyToOne(() => Food, { onDelete: "CASCADE" })
   food: Food;
 
@@ -2,6 +2,7 @@ import { Test, TestingModule } from "@nestjs/testing";
 import { getRepositoryToken } from "@nestjs/typeorm";
 import { FoodService } from "src/food/food.service";
 import { Food } from "src/food/entities/food.entity";
+import { IsNull } from "typeorm";
 
 import { FoodBarcodeService } from "./foodbarcode.service";
 import { FoodBarcode } from "./entities/foodbarcode.entity";
@@ -54,7 +55,7 @@ describe("FoodBarcodeService", () => {
     ]);
 
     expect(foodService.createFood).toHaveBeenCalled();
-    expect(foodBarcodeRepository.save).toHaveBeenCalledWith({ barcode: "00012345", food });
+    expect(foodBarcodeRepository.save).toHaveBeenCalledWith({ barcode: "00012345", gtin: null, food });
     expect(result.createdFoods).toBe(1);
     expect(result.matchedFoods).toBe(0);
     expect(result.barcodesCreated).toBe(1);
@@ -88,4 +89,75 @@ describe("FoodBarcodeService", () => {
     expect(result.createdFoods).toBe(1);
     expect(result.barcodesUpdated).toBe(1);
   });
+
+  it("stores the canonical GTIN-14 of a valid barcode", async () => {
+    const food = { id: 12, name: "Cereal" } as Food;
+    foodService.createFood.mockResolvedValue(food);
+    foodBarcodeRepository.findOne.mockResolvedValue(null);
+
+    await service.upsertBarcodeMappings([
+      {
+        barcode: "036000291452",
+        food: {
+          name: "Cereal",
+          calories: 380,
+          protein: 7,
+          carbs: 84,
+          fat: 2,
+          fiber: 3,
+          sugar: 20,
+          sodium: 500,
+        },
+      },
+    ]);
+
+    expect(foodBarcodeRepository.save).toHaveBeenCalledWith({
+      barcode: "036000291452",
+      gtin: "00036000291452",
+      food,
+    });
+  });
+
+  it("finds a UPC-A scan stored as EAN-13 with one GTIN lookup", async () => {
+    const food = { id: 5, name: "Cereal" } as Food;
+    foodBarcodeRepository.findOne.mockResolvedValue({ barcode: "0036000291452", food });
+
+    const result = await service.getFoodByBarcode(" 036000291452 ");
+
+    expect(result).toBe(food);
+    expect(foodBarcodeRepository.findOne).toHaveBeenCalledTimes(1);
+    expect(foodBarcodeRepository.findOne).toHaveBeenCalledWith(
+      expect.objectContaining({ where: { gtin: "00036000291452" } }),
+    );
+  });
+
+  it("falls back to an exact match for codes that are not GTINs", async () => {
+    const food = { id: 6, name: "Deli Salad" } as Food;
+    foodBarcodeRepository.findOne.mockResolvedValue({ barcode: "2012345", food });
+
+    const result = await service.getFoodByBarcode("2012345");
+
+    expect(result).toBe(food);
+    expect(foodBarcodeRepository.findOne).toHaveBeenCalledTimes(1);
+    expect(foodBarcodeRepository.findOne).toHaveBeenCalledWith(
+      expect.objectContaining({ where: { barcode: "2012345", gtin: IsNull() } }),
+    );
+  });
+
+  it("finds rows without a GTIN yet by their UPC-A/EAN-13 variant", async () => {
+    const food = { id: 7, name: "Soup" } as Food;
+    foodBarcodeRepository.findOne
+      .mockResolvedValueOnce(null)
+      .mockResolvedValueOnce(null)
+      .mockResolvedValueOnce({ barcode: "0036000291452", gtin: null, food });
+
+    const result = await service.getFoodByBarcode("036000291452");
+
+    expect(result).toBe(food);
+    expect(foodBarcodeRepository.findOne).toHaveBeenCalledTimes(3);
+    expect(foodBarcodeRepository.findOne).toHaveBeenNthCalledWith(
+      3,
+      expect.objectContaining({ where: { barcode: "0036000291452", gtin: IsNull() } }),
+    );
+  });
 });
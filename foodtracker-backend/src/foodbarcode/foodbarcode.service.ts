@@ -3,10 +3,11 @@ import { InjectRepository } from '@nestjs/typeorm';
 import type { CreateFoodDto } from 'src/food/dto/createfood.dto';
 import { Food } from 'src/food/entities/food.entity';
 import { FoodService } from 'src/food/food.service';
-import { Repository } from 'typeorm';
+import { IsNull, Repository } from 'typeorm';
 
 import { CreateFoodBarcodeDto } from './dto/createfoodbarcode.dto';
 import { FoodBarcode } from './entities/foodbarcode.entity';
+import { toGtin14 } from './gtin';
 
 type UpsertSummary = {
   createdFoods: number;
@@ -64,11 +65,16 @@ export class FoodBarcodeService {
       if (existingMapping) {
         if (existingMapping.food?.id !== food.id) {
           existingMapping.food = food;
+          existingMapping.gtin = toGtin14(barcode);
           await this.foodBarcodeRepository.save(existingMapping);
           summary.barcodesUpdated += 1;
         }
       } else {
-        await this.foodBarcodeRepository.save({ barcode, food });
+        await this.foodBarcodeRepository.save({
+          barcode,
+          gtin: toGtin14(barcode),
+          food,
+        });
         summary.barcodesCreated += 1;
       }
     }
@@ -82,28 +88,33 @@ export class FoodBarcodeService {
       return null;
     }
 
-    const findByBarcode = (b: string) =>
-      this.foodBarcodeRepository.findOne({
-        where: { barcode: b },
+    // UPC-A, EAN-13 and GTIN-14 spellings of one product share a GTIN-14,
+    // so a single idx_food_barcode_gtin probe covers all of them.
+    const gtin = toGtin14(normalized);
+    if (gtin) {
+      const mapping = await this.foodBarcodeRepository.findOne({
+        where: { gtin },
         relations: ['food', 'food.measurements'],
+        order: { id: 'ASC' },
       });
-
-    // Exact match
-    let mapping = await findByBarcode(normalized);
-    if (mapping) return mapping.food ?? null;
-
-    // UPC-A (12 digits) → try EAN-13 (leading zero)
-    if (/^\d{12}$/.test(normalized)) {
-      mapping = await findByBarcode('0' + normalized);
       if (mapping) return mapping.food ?? null;
     }
 
-    // EAN-13 with leading zero (13 digits) → try UPC-A (strip leading zero)
-    if (/^\d{13}$/.test(normalized) && normalized.startsWith('0')) {
-      mapping = await findByBarcode(normalized.slice(1));
+    // Codes that are not GTINs (store codes), and rows backfill_barcode_gtin.py has not filled yet:
+    // those still need the exact spelling, then the UPC-A/EAN-13 variants.
+    const candidates = [normalized];
+    if (/^\d{12}$/.test(normalized)) {
+      candidates.push('0' + normalized);
+    } else if (/^0\d{12}$/.test(normalized)) {
+      candidates.push(normalized.slice(1));
+    }
+    for (const candidate of candidates) {
+      const mapping = await this.foodBarcodeRepository.findOne({
+        where: { barcode: candidate, gtin: IsNull() },
+        relations: ['food', 'food.measurements'],
+      });
       if (mapping) return mapping.food ?? null;
     }
-
     return null;
   }
 
@@ -0,0 +1,22 @@
+import { toGtin14 } from './gtin';
+
+describe('toGtin14', () => {
+  it('pads UPC-A, EAN-13, EAN-8 and GTIN-14 to the same 14-digit key', () => {
+    expect(toGtin14('036000291452')).toBe('00036000291452');
+    expect(toGtin14('0036000291452')).toBe('00036000291452');
+    expect(toGtin14('00036000291452')).toBe('00036000291452');
+    expect(toGtin14('96385074')).toBe('00000096385074');
+  });
+
+  it('ignores spaces, dots and dashes', () => {
+    expect(toGtin14(' 0-36000-29145-2 ')).toBe('00036000291452');
+  });
+
+  it('rejects wrong check digits, lengths, all-zero codes and non-ASCII digits', () => {
+    expect(toGtin14('036000291453')).toBeNull();
+    expect(toGtin14('12345')).toBeNull();
+    expect(toGtin14('0000000000000')).toBeNull();
+    expect(toGtin14('０３６０００２９１４５２')).toBeNull();
+    expect(toGtin14(undefined)).toBeNull();
+  });
+});
@@ -0,0 +1,22 @@
+// GTIN-8 (EAN-8), GTIN-12 (UPC-A), GTIN-13 (EAN-13) and GTIN-14; all become GTIN-14 by left-padding zeros.
+const GTIN_LENGTHS = new Set([8, 12, 13, 14]);
+
+/**
+ * Canonical GTIN-14 of a barcode, or null when it is not a valid GTIN.
+ * Mirrors gtin14() in barcodes.py, which the importers use to fill food_barcode.gtin.
+ */
+export function toGtin14(value?: string | null): string | null {
+  const digits = (value ?? '').replace(/[\s.-]/g, '');
+  if (!/^\d+$/.test(digits) || !GTIN_LENGTHS.has(digits.length) || /^0+$/.test(digits)) {
+    return null;
+  }
+
+  let total = 0;
+  for (let index = digits.length - 2, weight = 3; index >= 0; index -= 1, weight = 4 - weight) {
+    total += Number(digits[index]) * weight;
+  }
+  if ((10 - (total % 10)) % 10 !== Number(digits[digits.length - 1])) {
+    return null;
+  }
+  return digits.padStart(14, '0');
+}
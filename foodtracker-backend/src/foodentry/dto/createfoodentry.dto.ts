@@ -1,4 +1,4 @@
-import { IsDate, IsIn, IsInt, IsNumber, IsOptional, Min } from 'class-validator';
+import { IsDate, IsIn, IsInt, IsNumber, IsOptional, Max, Min } from 'class-validator';
 import { Type } from 'class-transformer';
 
 export const MEAL_TYPES = [0, 1, 2, 3] as const;
@@ -38,4 +38,12 @@ export class CreateFoodEntryDto {
   @Type(() => Date)
   @IsDate()
   loggedAt?: Date;
+
+  // Minutes the client's clock is ahead of UTC at loggedAt; picks the local day the entry is filed under.
+  @IsOptional()
+  @Type(() => Number)
+  @IsInt()
+  @Min(-840)
+  @Max(840)
+  utcOffsetMinutes?: number;
 }
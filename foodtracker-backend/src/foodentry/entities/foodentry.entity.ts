@@ -1,4 +1,4 @@
-import { Column, Entity, PrimaryGeneratedColumn, ManyToOne, CreateDateColumn } from "typeorm";
+import { Column, Entity, PrimaryGeneratedColumn, ManyToOne, CreateDateColumn, UpdateDateColumn, Index } from "typeorm";
 import { Recipe } from "src/recipe/entities/recipe.entity";
 import { User } from "src/users/entities/user.entity";
 import { Meal } from "src/meal/entities/meal.entity";
@@ -7,6 +7,7 @@ import { FoodMeasurement } from "src/foodmeasurement/entities/foodmeasurement.en
 
 
 @Entity()
+@Index('idx_food_entry_user_logged_date', ['user', 'loggedDate'])
 export class FoodEntry {
   @PrimaryGeneratedColumn()
   id: number;
@@ -31,4 +32,13 @@ export class FoodEntry {
 
   @CreateDateColumn()
   loggedAt: Date;
+
+  // The client's local day at loggedAt (YYYY-MM-DD); daily_nutrition rows are keyed by it.
+  @Column({ type: 'date' })
+  loggedDate: string;
+
+  // Watermark for the incremental daily_nutrition rollup (rollup_daily_nutrition.py).
+  @Index('idx_food_entry_updated_at')
+  @UpdateDateColumn()
+  updatedAt: Date;
 }
@@ -29,6 +29,7 @@ describe('FoodentryService', () => {
     save: jest.Mock;
     findOne: jest.Mock;
     remove: jest.Mock;
+    query: jest.Mock;
   };
   let mealRepository: {
     findOne: jest.Mock;
@@ -66,6 +67,7 @@ describe('FoodentryService', () => {
       save: jest.fn(),
       findOne: jest.fn(),
       remove: jest.fn(),
+      query: jest.fn(),
     };
     mealRepository = {
       findOne: jest.fn(),
@@ -230,6 +232,7 @@ describe('FoodentryService', () => {
           servings: 1,
           mealType: 0,
           loggedAt: new Date('2025-01-01T00:00:00.000Z'),
+          utcOffsetMinutes: -300,
         },
         userId,
       ),
@@ -243,6 +246,7 @@ describe('FoodentryService', () => {
       servings: 1,
       meal,
       loggedAt: new Date('2025-01-01T00:00:00.000Z'),
+      loggedDate: '2024-12-31',
     });
   });
 
@@ -294,8 +298,12 @@ describe('FoodentryService', () => {
     ).rejects.toBeInstanceOf(NotFoundException);
   });
 
-  it('delete removes the entry', async () => {
-    const entry = { id: 9 } as FoodEntry;
+  it('delete removes the entry and flags its day for the nutrition rollup', async () => {
+    const entry = {
+      id: 9,
+      loggedAt: new Date('2025-01-15T08:00:00.000Z'),
+      loggedDate: '2025-01-15',
+    } as FoodEntry;
     foodEntryRepository.findOne.mockResolvedValue(entry);
     foodEntryRepository.remove.mockResolvedValue(entry);
 
@@ -304,6 +312,10 @@ describe('FoodentryService', () => {
       where: { id: 9, user: { id: 2 } },
     });
     expect(foodEntryRepository.remove).toHaveBeenCalledWith(entry);
+    expect(foodEntryRepository.query).toHaveBeenCalledWith(
+      'UPDATE daily_nutrition SET stale = 1, staleAt = NOW(6) WHERE userId = ? AND day = ?',
+      [2, '2025-01-15'],
+    );
   });
 
   it('delete throws when entry is missing', async () => {
@@ -18,6 +18,7 @@ import {
 } from './dto/createfoodentry.dto';
 import { UpdateFoodEntryDto } from './dto/updatefoodentry.dto';
 import { FoodEntry } from './entities/foodentry.entity';
+import { toLoggedDate } from './logged-date';
 
 @Injectable()
 export class FoodentryService {
@@ -134,8 +135,15 @@ export class FoodentryService {
   }
 
   async create(createFoodEntryDto: CreateFoodEntryDto, userId: number) {
-    const { foodId, recipeId, measurementId, servings, mealType, loggedAt } =
-      createFoodEntryDto;
+    const {
+      foodId,
+      recipeId,
+      measurementId,
+      servings,
+      mealType,
+      loggedAt,
+      utcOffsetMinutes,
+    } = createFoodEntryDto;
     const hasFood = foodId != null;
     const hasRecipe = recipeId != null;
 
@@ -213,6 +221,7 @@ export class FoodentryService {
       }
     }
 
+    const entryLoggedAt = loggedAt ?? new Date();
     const newEntry = this.foodEntryRepository.create({
       user: { id: userId },
       food,
@@ -220,7 +229,8 @@ export class FoodentryService {
       measurement,
       servings,
       meal,
-      loggedAt: loggedAt ?? undefined,
+      loggedAt: entryLoggedAt,
+      loggedDate: toLoggedDate(entryLoggedAt, utcOffsetMinutes),
     });
     const savedEntry = await this.foodEntryRepository.save(newEntry);
 
@@ -292,6 +302,12 @@ export class FoodentryService {
     }
 
     await this.foodEntryRepository.remove(entry);
+    // A deleted entry leaves nothing behind for the incremental rollup to notice; flag its day instead.
+    // staleAt tells a rollup already streaming this day to leave the flag set for its next run.
+    await this.foodEntryRepository.query(
+      'UPDATE daily_nutrition SET stale = 1, staleAt = NOW(6) WHERE userId = ? AND day = ?',
+      [userId, entry.loggedDate],
+    );
     return true;
   }
 
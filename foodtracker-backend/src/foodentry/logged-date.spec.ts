@@ -0,0 +1,18 @@
+import { toLoggedDate } from './logged-date';
+
+describe('toLoggedDate', () => {
+  it('uses the client offset to find the local day', () => {
+    const loggedAt = new Date('2025-01-15T23:30:00.000Z');
+
+    expect(toLoggedDate(loggedAt, 0)).toBe('2025-01-15');
+    expect(toLoggedDate(loggedAt, 60)).toBe('2025-01-16');
+    expect(toLoggedDate(new Date('2025-01-16T03:00:00.000Z'), -300)).toBe('2025-01-15');
+  });
+
+  it('falls back to the server timezone without an offset', () => {
+    const loggedAt = new Date(2025, 0, 15, 23, 30);
+
+    expect(toLoggedDate(loggedAt)).toBe('2025-01-15');
+    expect(toLoggedDate(loggedAt, null)).toBe('2025-01-15');
+  });
+});
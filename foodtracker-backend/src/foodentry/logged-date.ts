@@ -0,0 +1,12 @@
+function pad(value: number): string {
+  return value.toString().padStart(2, '0');
+}
+
+// The calendar day an entry belongs to: local to the client when it sent its UTC offset, otherwise local
+// to the server. daily_nutrition is keyed by this day, so the rollup and the diary agree on midnight.
+export function toLoggedDate(loggedAt: Date, utcOffsetMinutes?: number | null): string {
+  if (utcOffsetMinutes === null || utcOffsetMinutes === undefined) {
+    return `${loggedAt.getFullYear()}-${pad(loggedAt.getMonth() + 1)}-${pad(loggedAt.getDate())}`;
+  }
+  return new Date(loggedAt.getTime() + utcOffsetMinutes * 60 * 1000).toISOString().slice(0, 10);
+}
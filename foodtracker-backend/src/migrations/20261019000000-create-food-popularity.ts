@@ -0,0 +1,62 @@
+import { MigrationInterface, QueryRunner, Table, TableForeignKey } from 'typeorm';
+
+export class CreateFoodPopularity20261019000000 implements MigrationInterface {
+  name = 'CreateFoodPopularity20261019000000';
+
+  public async up(queryRunner: QueryRunner): Promise<void> {
+    await queryRunner.createTable(
+      new Table({
+        name: 'food_popularity',
+        columns: [
+          {
+            name: 'foodId',
+            type: 'int',
+            isPrimary: true,
+          },
+          {
+            name: 'entryCount',
+            type: 'int',
+            isNullable: false,
+            default: 0,
+          },
+          {
+            name: 'recipeCount',
+            type: 'int',
+            isNullable: false,
+            default: 0,
+          },
+          {
+            name: 'score',
+            type: 'double',
+            isNullable: false,
+          },
+          {
+            name: 'lastLoggedAt',
+            type: 'datetime',
+            isNullable: true,
+          },
+          {
+            name: 'computedAt',
+            type: 'datetime',
+            isNullable: false,
+          },
+        ],
+      }),
+      true,
+    );
+
+    await queryRunner.createForeignKey(
+      'food_popularity',
+      new TableForeignKey({
+        columnNames: ['foodId'],
+        referencedColumnNames: ['id'],
+        referencedTableName: 'food',
+        onDelete: 'CASCADE',
+      }),
+    );
+  }
+
+  public async down(queryRunner: QueryRunner): Promise<void> {
+    await queryRunner.dropTable('food_popularity');
+  }
+}
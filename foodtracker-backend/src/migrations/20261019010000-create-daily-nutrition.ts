@@ -0,0 +1,189 @@
+import {
+  MigrationInterface,
+  QueryRunner,
+  Table,
+  TableColumn,
+  TableForeignKey,
+  TableIndex,
+} from 'typeorm';
+
+// Nutrient columns of food, in entity order; rollup_daily_nutrition.py sums each of them.
+const NUTRIENT_COLUMNS = [
+  'calories',
+  'protein',
+  'carbs',
+  'fat',
+  'fiber',
+  'sugar',
+  'sodium',
+  'saturatedFat',
+  'transFat',
+  'cholesterol',
+  'addedSugar',
+  'netCarbs',
+  'solubleFiber',
+  'insolubleFiber',
+  'water',
+  'pralScore',
+  'omega3',
+  'omega6',
+  'calcium',
+  'iron',
+  'potassium',
+  'magnesium',
+  'vitaminAiu',
+  'vitaminArae',
+  'vitaminC',
+  'vitaminB12',
+  'vitaminD',
+  'vitaminE',
+  'phosphorus',
+  'zinc',
+  'copper',
+  'manganese',
+  'selenium',
+  'fluoride',
+  'molybdenum',
+  'chlorine',
+  'vitaminB1',
+  'vitaminB2',
+  'vitaminB3',
+  'vitaminB5',
+  'vitaminB6',
+  'biotin',
+  'folate',
+  'folicAcid',
+  'foodFolate',
+  'folateDfe',
+  'choline',
+  'betaine',
+  'retinol',
+  'caroteneBeta',
+  'caroteneAlpha',
+  'lycopene',
+  'luteinZeaxanthin',
+  'vitaminD2',
+  'vitaminD3',
+  'vitaminDiu',
+  'vitaminK',
+  'dihydrophylloquinone',
+  'menaquinone4',
+  'monoFat',
+  'polyFat',
+  'ala',
+  'epa',
+  'dpa',
+  'dha',
+];
+
+export class CreateDailyNutrition20261019010000 implements MigrationInterface {
+  name = 'CreateDailyNutrition20261019010000';
+
+  public async up(queryRunner: QueryRunner): Promise<void> {
+    await queryRunner.addColumn(
+      'food_entry',
+      new TableColumn({
+        name: 'updatedAt',
+        type: 'datetime',
+        precision: 6,
+        isNullable: false,
+        default: 'CURRENT_TIMESTAMP(6)',
+        onUpdate: 'CURRENT_TIMESTAMP(6)',
+      }),
+    );
+
+    await queryRunner.createIndex(
+      'food_entry',
+      new TableIndex({
+        name: 'idx_food_entry_updated_at',
+        columnNames: ['updatedAt'],
+      }),
+    );
+
+    await queryRunner.createTable(
+      new Table({
+        name: 'daily_nutrition',
+        columns: [
+          {
+            name: 'userId',
+            type: 'int',
+            isPrimary: true,
+          },
+          {
+            name: 'day',
+            type: 'date',
+            isPrimary: true,
+          },
+          {
+            // Meal name, or '' for the whole day's totals.
+            name: 'meal',
+            type: 'varchar',
+            length: '255',
+            isPrimary: true,
+          },
+          {
+            name: 'entryCount',
+            type: 'int',
+            isNullable: false,
+            default: 0,
+          },
+          ...NUTRIENT_COLUMNS.map((name) => ({
+            name,
+            type: 'double',
+            isNullable: false,
+            default: 0,
+          })),
+          {
+            name: 'entriesUpdatedAt',
+            type: 'datetime',
+            precision: 6,
+            isNullable: false,
+          },
+          {
+            name: 'computedAt',
+            type: 'datetime',
+            isNullable: false,
+          },
+          {
+            name: 'stale',
+            type: 'boolean',
+            isNullable: false,
+            default: false,
+          },
+        ],
+      }),
+      true,
+    );
+
+    await queryRunner.createIndices('daily_nutrition', [
+      new TableIndex({
+        name: 'idx_daily_nutrition_entries_updated_at',
+        columnNames: ['entriesUpdatedAt'],
+      }),
+      new TableIndex({
+        name: 'idx_daily_nutrition_computed_at',
+        columnNames: ['computedAt'],
+      }),
+      new TableIndex({
+        name: 'idx_daily_nutrition_stale',
+        columnNames: ['stale'],
+      }),
+    ]);
+
+    await queryRunner.createForeignKey(
+      'daily_nutrition',
+      new TableForeignKey({
+        columnNames: ['userId'],
+        referencedColumnNames: ['id'],
+        referencedTableName: 'user',
+        onDelete: 'CASCADE',
+      }),
+    );
+  }
+
+  public async down(queryRunner: QueryRunner): Promise<void> {
+    await queryRunner.dropTable('daily_nutrition');
+    await queryRunner.dropIndex('food_entry', 'idx_food_entry_updated_at');
+    await queryRunner.dropColumn('food_entry', 'updatedAt');
+  }
+}
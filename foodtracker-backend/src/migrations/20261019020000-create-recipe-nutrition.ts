@@ -0,0 +1,180 @@
+import {
+  MigrationInterface,
+  QueryRunner,
+  Table,
+  TableColumn,
+  TableForeignKey,
+  TableIndex,
+} from 'typeorm';
+
+// Nutrient columns of food, in entity order; materialize_recipe_nutrition.py fills each of them.
+const NUTRIENT_COLUMNS = [
+  'calories',
+  'protein',
+  'carbs',
+  'fat',
+  'fiber',
+  'sugar',
+  'sodium',
+  'saturatedFat',
+  'transFat',
+  'cholesterol',
+  'addedSugar',
+  'netCarbs',
+  'solubleFiber',
+  'insolubleFiber',
+  'water',
+  'pralScore',
+  'omega3',
+  'omega6',
+  'calcium',
+  'iron',
+  'potassium',
+  'magnesium',
+  'vitaminAiu',
+  'vitaminArae',
+  'vitaminC',
+  'vitaminB12',
+  'vitaminD',
+  'vitaminE',
+  'phosphorus',
+  'zinc',
+  'copper',
+  'manganese',
+  'selenium',
+  'fluoride',
+  'molybdenum',
+  'chlorine',
+  'vitaminB1',
+  'vitaminB2',
+  'vitaminB3',
+  'vitaminB5',
+  'vitaminB6',
+  'biotin',
+  'folate',
+  'folicAcid',
+  'foodFolate',
+  'folateDfe',
+  'choline',
+  'betaine',
+  'retinol',
+  'caroteneBeta',
+  'caroteneAlpha',
+  'lycopene',
+  'luteinZeaxanthin',
+  'vitaminD2',
+  'vitaminD3',
+  'vitaminDiu',
+  'vitaminK',
+  'dihydrophylloquinone',
+  'menaquinone4',
+  'monoFat',
+  'polyFat',
+  'ala',
+  'epa',
+  'dpa',
+  'dha',
+];
+
+export class CreateRecipeNutrition20261019020000 implements MigrationInterface {
+  name = 'CreateRecipeNutrition20261019020000';
+
+  public async up(queryRunner: QueryRunner): Promise<void> {
+    await queryRunner.addColumn(
+      'food',
+      new TableColumn({
+        name: 'updatedAt',
+        type: 'datetime',
+        precision: 6,
+        isNullable: false,
+        default: 'CURRENT_TIMESTAMP(6)',
+        onUpdate: 'CURRENT_TIMESTAMP(6)',
+      }),
+    );
+
+    await queryRunner.createIndex(
+      'food',
+      new TableIndex({
+        name: 'idx_food_updated_at',
+        columnNames: ['updatedAt'],
+      }),
+    );
+
+    await queryRunner.createTable(
+      new Table({
+        name: 'recipe_nutrition',
+        columns: [
+          {
+            name: 'recipeId',
+            type: 'int',
+            isPrimary: true,
+          },
+          {
+            // 'serving' or '100g'.
+            name: 'basis',
+            type: 'varchar',
+            length: '16',
+            isPrimary: true,
+          },
+          {
+            name: 'ingredientCount',
+            type: 'int',
+            isNullable: false,
+            default: 0,
+          },
+          {
+            name: 'totalGrams',
+            type: 'double',
+            isNullable: false,
+            default: 0,
+          },
+          // NULL when the basis does not exist (a recipe without servings or grams).
+          ...NUTRIENT_COLUMNS.map((name) => ({
+            name,
+            type: 'double',
+            isNullable: true,
+          })),
+          {
+            name: 'computedAt',
+            type: 'datetime',
+            isNullable: false,
+          },
+          {
+            name: 'stale',
+            type: 'boolean',
+            isNullable: false,
+            default: false,
+          },
+        ],
+      }),
+      true,
+    );
+
+    await queryRunner.createIndices('recipe_nutrition', [
+      new TableIndex({
+        name: 'idx_recipe_nutrition_computed_at',
+        columnNames: ['computedAt'],
+      }),
+      new TableIndex({
+        name: 'idx_recipe_nutrition_stale',
+        columnNames: ['stale'],
+      }),
+    ]);
+
+    await queryRunner.createForeignKey(
+      'recipe_nutrition',
+      new TableForeignKey({
+        columnNames: ['recipeId'],
+        referencedColumnNames: ['id'],
+        referencedTableName: 'recipe',
+        onDelete: 'CASCADE',
+      }),
+    );
+  }
+
+  public async down(queryRunner: QueryRunner): Promise<void> {
+    await queryRunner.dropTable('recipe_nutrition');
+    await queryRunner.dropIndex('food', 'idx_food_updated_at');
+    await queryRunner.dropColumn('food', 'updatedAt');
+  }
+}
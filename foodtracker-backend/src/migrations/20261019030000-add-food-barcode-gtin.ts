@@ -0,0 +1,32 @@
+import { MigrationInterface, QueryRunner, TableColumn, TableIndex } from 'typeorm';
+
+export class AddFoodBarcodeGtin20261019030000 implements MigrationInterface {
+  name = 'AddFoodBarcodeGtin20261019030000';
+
+  public async up(queryRunner: QueryRunner): Promise<void> {
+    // Canonical GTIN-14 of barcode; NULL for codes that are not valid GTINs.
+    // Existing rows are filled by backfill_barcode_gtin.py.
+    await queryRunner.addColumn(
+      'food_barcode',
+      new TableColumn({
+        name: 'gtin',
+        type: 'char',
+        length: '14',
+        isNullable: true,
+      }),
+    );
+
+    await queryRunner.createIndex(
+      'food_barcode',
+      new TableIndex({
+        name: 'idx_food_barcode_gtin',
+        columnNames: ['gtin'],
+      }),
+    );
+  }
+
+  public async down(queryRunner: QueryRunner): Promise<void> {
+    await queryRunner.dropIndex('food_barcode', 'idx_food_barcode_gtin');
+    await queryRunner.dropColumn('food_barcode', 'gtin');
+  }
+}
@@ -0,0 +1,47 @@
+import { MigrationInterface, QueryRunner, TableColumn, TableIndex } from 'typeorm';
+
+export class AddFoodEntryLoggedDate20261019040000 implements MigrationInterface {
+  name = 'AddFoodEntryLoggedDate20261019040000';
+
+  public async up(queryRunner: QueryRunner): Promise<void> {
+    await queryRunner.addColumn(
+      'food_entry',
+      new TableColumn({
+        name: 'loggedDate',
+        type: 'date',
+        isNullable: true,
+      }),
+    );
+
+    // Older entries were rolled up by DATE(loggedAt), so they keep that day.
+    await queryRunner.query('UPDATE food_entry SET loggedDate = DATE(loggedAt)');
+    await queryRunner.query('ALTER TABLE food_entry MODIFY loggedDate date NOT NULL');
+
+    await queryRunner.createIndex(
+      'food_entry',
+      new TableIndex({
+        name: 'idx_food_entry_user_logged_date',
+        columnNames: ['userId', 'loggedDate'],
+      }),
+    );
+
+    // When the API last flagged the day stale; a running rollup keeps flags set after it started.
+    await queryRunner.addColumn(
+      'daily_nutrition',
+      new TableColumn({
+        name: 'staleAt',
+        type: 'datetime',
+        precision: 6,
+        isNullable: true,
+      }),
+    );
+
+    await queryRunner.query('UPDATE daily_nutrition SET staleAt = computedAt WHERE stale = 1');
+  }
+
+  public async down(queryRunner: QueryRunner): Promise<void> {
+    await queryRunner.dropColumn('daily_nutrition', 'staleAt');
+    await queryRunner.dropIndex('food_entry', 'idx_food_entry_user_logged_date');
+    await queryRunner.dropColumn('food_entry', 'loggedDate');
+  }
+}
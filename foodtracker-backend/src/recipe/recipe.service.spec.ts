@@ -17,6 +17,7 @@ describe('RecipeService', () => {
     findOne: jest.Mock;
     createQueryBuilder: jest.Mock;
     remove: jest.Mock;
+    query: jest.Mock;
   };
   let recipeFoodRepository: {
     delete: jest.Mock;
@@ -55,6 +56,7 @@ describe('RecipeService', () => {
       findOne: jest.fn(),
       createQueryBuilder: jest.fn().mockReturnValue(queryBuilder),
       remove: jest.fn(),
+      query: jest.fn(),
     };
 
     recipeFoodRepository = {
@@ -253,6 +255,10 @@ describe('RecipeService', () => {
         }),
       ]),
     );
+    expect(recipeRepository.query).toHaveBeenCalledWith(
+      'UPDATE recipe_nutrition SET stale = 1 WHERE recipeId = ?',
+      [9],
+    );
   });
 
   it('throws when updating a missing recipe', async () => {
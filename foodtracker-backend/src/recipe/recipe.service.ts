@@ -129,6 +129,11 @@ export class RecipeService {
     recipe.calories = await this.calculateTotalCalories(ingredientsForCalories);
 
     await this.recipeRepository.save(recipe);
+    // Recomputed by the next materialize_recipe_nutrition.py run.
+    await this.recipeRepository.query(
+      'UPDATE recipe_nutrition SET stale = 1 WHERE recipeId = ?',
+      [recipe.id],
+    );
     return this.getRecipe(recipe.id, userId);
   }
 
@@ -0,0 +1,142 @@
+from typing import Any, Dict, List, Sequence, Tuple
+
+
+def fetch_indexes(conn: Any, tables: Sequence[str]) -> List[Dict]:
+    """Every index of ``tables`` in the current database, with its columns in key order."""
+    placeholders = ", ".join(["%s"] * len(tables))
+    cursor = conn.cursor()
+    try:
+        cursor.execute(
+            "SELECT TABLE_NAME, INDEX_NAME, NON_UNIQUE, INDEX_TYPE, COLUMN_NAME, SUB_PART "
+            "FROM information_schema.STATISTICS "
+            f"WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME IN ({placeholders}) "
+            "ORDER BY TABLE_NAME, INDEX_NAME, SEQ_IN_INDEX",
+            tuple(tables),
+        )
+        rows = cursor.fetchall()
+    finally:
+        cursor.close()
+
+    indexes: Dict[Tuple[str, str], Dict] = {}
+    for table, name, non_unique, index_type, column, sub_part in rows:
+        index = indexes.setdefault(
+            (str(table), str(name)),
+            {
+                "table": str(table),
+                "name": str(name),
+                "unique": not int(non_unique),
+                "type": str(index_type),
+                "columns": [],
+            },
+        )
+        index["columns"].append(
+            {"name": str(column), "sub_part": int(sub_part) if sub_part is not None else None}
+        )
+    return list(indexes.values())
+
+
+def fetch_foreign_keys(conn: Any, tables: Sequence[str]) -> List[Dict]:
+    """Foreign keys declared on ``tables`` in the current database."""
+    placeholders = ", ".join(["%s"] * len(tables))
+    cursor = conn.cursor()
+    try:
+        cursor.execute(
+            "SELECT TABLE_NAME, CONSTRAINT_NAME, COLUMN_NAME, "
+            "REFERENCED_TABLE_NAME, REFERENCED_COLUMN_NAME "
+            "FROM information_schema.KEY_COLUMN_USAGE "
+            "WHERE TABLE_SCHEMA = DATABASE() AND REFERENCED_TABLE_NAME IS NOT NULL "
+            f"AND TABLE_NAME IN ({placeholders}) "
+            "ORDER BY TABLE_NAME, CONSTRAINT_NAME, ORDINAL_POSITION",
+            tuple(tables),
+        )
+        rows = cursor.fetchall()
+    finally:
+        cursor.close()
+
+    foreign_keys: Dict[Tuple[str, str], Dict] = {}
+    for table, name, column, referenced_table, referenced_column in rows:
+        foreign_key = foreign_keys.setdefault(
+            (str(table), str(name)),
+            {
+                "table": str(table),
+                "name": str(name),
+                "referenced_table": str(referenced_table),
+                "columns": [],
+                "referenced_columns": [],
+            },
+        )
+        foreign_key["columns"].append(str(column))
+        foreign_key["referenced_columns"].append(str(referenced_column))
+    return list(foreign_keys.values())
+
+
+def deferrable_indexes(conn: Any, tables: Sequence[str], include_unique: bool = False) -> List[Dict]:
+    """Secondary indexes of ``tables`` that can be dropped for a bulk load and rebuilt afterwards.
+
+    Unique keys stay unless ``include_unique`` (the importer's upserts resolve duplicates through
+    them), and indexes that back a foreign key always stay because MySQL refuses to drop them.
+    """
+    fk_columns = [
+        (foreign_key["table"], foreign_key["columns"]) for foreign_key in fetch_foreign_keys(conn, tables)
+    ]
+    deferrable: List[Dict] = []
+    for index in fetch_indexes(conn, tables):
+        if index["name"] == "PRIMARY" or (index["unique"] and not include_unique):
+            continue
+        columns = [column["name"] for column in index["columns"]]
+        if any(table == index["table"] and columns[: len(fk)] == fk for table, fk in fk_columns):
+            continue
+        deferrable.append(index)
+    return deferrable
+
+
+def index_clause(index: Dict) -> str:
+    """``ALTER TABLE`` clause that recreates a ``fetch_indexes`` index."""
+    columns_sql = ", ".join(
+        f"`{column['name']}`" + (f"({column['sub_part']})" if column["sub_part"] else "")
+        for column in index["columns"]
+    )
+    if index["type"] == "FULLTEXT":
+        kind = "FULLTEXT INDEX"
+    elif index.get("unique"):
+        kind = "UNIQUE INDEX"
+    else:
+        kind = "INDEX"
+    return f"ADD {kind} `{index['name']}` ({columns_sql})"
+
+
+def check_integrity(conn: Any, tables: Sequence[str]) -> List[str]:
+    """Duplicated unique keys and orphaned foreign keys in ``tables``, as readable problem lines."""
+    problems: List[str] = []
+    cursor = conn.cursor()
+    try:
+        for index in fetch_indexes(conn, tables):
+            if not index["unique"] or index["name"] == "PRIMARY":
+                continue
+            columns_sql = ", ".join(f"`{column['name']}`" for column in index["columns"])
+            not_null_sql = " AND ".join(f"`{column['name']}` IS NOT NULL" for column in index["columns"])
+            cursor.execute(
+                f"SELECT COUNT(*) FROM (SELECT 1 FROM `{index['table']}` WHERE {not_null_sql} "
+                f"GROUP BY {columns_sql} HAVING COUNT(*) > 1) AS duplicates"
+            )
+            duplicates = int(cursor.fetchone()[0])
+            if duplicates:
+                problems.append(f"{index['table']}.{index['name']}: {duplicates} duplicated keys")
+
+        for foreign_key in fetch_foreign_keys(conn, tables):
+            join_sql = " AND ".join(
+                f"p.`{referenced}` = c.`{column}`"
+                for column, referenced in zip(foreign_key["columns"], foreign_key["referenced_columns"])
+            )
+            not_null_sql = " AND ".join(f"c.`{column}` IS NOT NULL" for column in foreign_key["columns"])
+            cursor.execute(
+                f"SELECT COUNT(*) FROM `{foreign_key['table']}` c "
+                f"LEFT JOIN `{foreign_key['referenced_table']}` p ON {join_sql} "
+                f"WHERE {not_null_sql} AND p.`{foreign_key['referenced_columns'][0]}` IS NULL"
+            )
+            orphans = int(cursor.fetchone()[0])
+            if orphans:
+                problems.append(f"{foreign_key['table']}.{foreign_key['name']}: {orphans} orphaned rows")
+    finally:
+        cursor.close()
+    return problems
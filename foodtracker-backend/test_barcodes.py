@@ -0,0 +1,73 @@
+import pandas as pd
+
+from barcodes import filter_barcodes, gs1_check_digit, gtin14
+
+FULLWIDTH_UPC = "０３６０００２９１４５２"
+
+
+def test_gtin14_pads_every_spelling_to_one_key():
+    assert gtin14("036000291452") == "00036000291452"
+    assert gtin14("0036000291452") == "00036000291452"
+    assert gtin14(" 0-36000-29145-2 ") == "00036000291452"
+    assert gtin14("96385074") == "00000096385074"
+
+
+def test_gtin14_rejects_invalid_codes():
+    for code in (None, "", "abc", "12345", "036000291453", "0000000000000", FULLWIDTH_UPC):
+        assert gtin14(code) is None
+
+
+def with_check_digit(payload):
+    return payload + str(gs1_check_digit(payload))
+
+
+def test_filter_barcodes_reasons():
+    codes = pd.Series(
+        [
+            "036000291452",
+            None,
+            "abc",
+            FULLWIDTH_UPC,
+            "12345",
+            "0000000000000",
+            "036000291453",
+            with_check_digit("5" + "0" * 10),
+            with_check_digit("99" + "1" * 10),
+        ]
+    )
+
+    gtins, reasons = filter_barcodes(codes)
+
+    assert gtins[0] == "00036000291452"
+    assert gtins[1:].isna().all()
+    assert reasons[0] is None or pd.isna(reasons[0])
+    assert list(reasons[1:]) == [
+        "missing",
+        "not-digits",
+        "not-digits",
+        "length",
+        "all-zeros",
+        "check-digit",
+        "coupon-prefix",
+        "coupon-prefix",
+    ]
+
+
+def test_filter_barcodes_keeps_in_store_prefixes_by_default():
+    codes = pd.Series([with_check_digit("2" + "0" * 10), with_check_digit("2" + "1" * 6), "036000291452"])
+
+    gtins, reasons = filter_barcodes(codes)
+    assert gtins.notna().all()
+    assert reasons.isna().all()
+
+    gtins, reasons = filter_barcodes(codes, reject_in_store=True)
+    assert list(reasons[:2]) == ["in-store-prefix", "in-store-prefix"]
+    assert gtins[2] == "00036000291452"
+
+
+def test_filter_barcodes_matches_gtin14():
+    codes = pd.Series(["036000291452", "4006381333931", "96385074", "00012345", FULLWIDTH_UPC, "x1"])
+
+    gtins, _reasons = filter_barcodes(codes)
+
+    assert [None if pd.isna(gtin) else gtin for gtin in gtins] == [gtin14(code) for code in codes]
@@ -3,10 +3,15 @@ import { CreateFoodEntryDto } from '@/types/foodentry/createfoodentry';
 import { FoodEntry } from '@/types/foodentry/foodentry';
 import { UpdateFoodEntryDto } from '@/types/foodentry/updatefoodentry';
 
+// The offset at loggedAt lets the API file the entry under the same local day the diary shows it on.
 export const createFoodEntry = async (
   payload: CreateFoodEntryDto,
 ): Promise<FoodEntry> => {
-  return apiMethods.post<FoodEntry>('/foodentry/create', payload);
+  const loggedAt = payload.loggedAt ? new Date(payload.loggedAt) : new Date();
+  return apiMethods.post<FoodEntry>('/foodentry/create', {
+    ...payload,
+    utcOffsetMinutes: payload.utcOffsetMinutes ?? -loggedAt.getTimezoneOffset(),
+  });
 };
 
 export const getFoodEntryHistory = async ({
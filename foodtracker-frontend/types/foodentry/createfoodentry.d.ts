@@ -15,4 +15,5 @@ export interface CreateFoodEntryDto {
     servings: number;
     mealType: MealType;
     loggedAt?: Date;
+    utcOffsetMinutes?: number;
 }